@@ -1,7 +1,15 @@
+"""The FastAPI application, built by ``create_app()``.
+
+Importing this package stays cheap: process-pool workers and the NiceGUI
+entry point import ``app.services`` without building an app they never
+serve. FastAPI, the routers and Jinja2 are only imported when the app is
+created, either by ``create_app()`` (``uvicorn --factory app:create_app``)
+or on first access to ``app.app`` (``uvicorn app:app``).
+"""
 import os
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+import threading
+from typing import TYPE_CHECKING, Optional
+
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -10,60 +18,114 @@ load_dotenv()
 # Import core components
 from .core.config import settings
 from .core.logging_config import get_logger
-from .core.error_handling import register_exception_handlers
+from .core.startup import startup_phase, warm_start
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+    from fastapi.templating import Jinja2Templates
 
 # Initialize main application logger
 logger = get_logger(__name__)
 
-app = FastAPI(
-    title=settings.APP_NAME, # Use setting for title
-    description="Enterprise-ready FastAPI application base.",
-    version="1.0.0",
-    debug=settings.DEBUG, # Use setting for debug mode
-    # Add other FastAPI parameters if needed, e.g., lifespan context managers for DB connections
-)
-
-# Mount static files directory
 static_dir = os.path.join(os.path.dirname(__file__), 'static')
-if os.path.exists(static_dir) and os.path.isdir(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
-    logger.info(f"Using static directory at {static_dir}")
-else:
-    logger.warning(f"Static directory not found at {static_dir}. Create it if you need to serve static files.")
-
-# Configure Jinja2 templates
 templates_dir = os.path.join(os.path.dirname(__file__), 'templates')
-if os.path.exists(templates_dir) and os.path.isdir(templates_dir):
-    templates = Jinja2Templates(directory=templates_dir)
-    logger.info(f"Using templates directory at {templates_dir}")
-else:
-    templates = None
-    logger.warning(f"Templates directory not found at {templates_dir}. Create it if you need to use Jinja2 templates.")
 
-# Import and include routers after app creation
-from .api import routes as api_routes
-from .frontend import routes as frontend_routes
+_app: Optional["FastAPI"] = None
+_app_lock = threading.Lock()
+_templates: Optional["Jinja2Templates"] = None
+_templates_lock = threading.Lock()
+
+
+def get_templates() -> Optional["Jinja2Templates"]:
+    """Jinja2 templates for the frontend pages, loaded on first use; None without a templates directory."""
+    global _templates
+    with _templates_lock:
+        if _templates is None and os.path.isdir(templates_dir):
+            from fastapi.templating import Jinja2Templates
+            _templates = Jinja2Templates(directory=templates_dir)
+            logger.info(f"Using templates directory at {templates_dir}")
+        return _templates
+
+
+def create_app() -> "FastAPI":
+    """Build the FastAPI application with the API and frontend routers."""
+    with startup_phase("framework"):
+        from fastapi import FastAPI
+        from fastapi.staticfiles import StaticFiles
+        from .core.error_handling import register_exception_handlers
+        from .core.metrics import record_request_metrics
+
+        app = FastAPI(
+            title=settings.APP_NAME, # Use setting for title
+            description="Enterprise-ready FastAPI application base.",
+            version="1.0.0",
+            debug=settings.DEBUG, # Use setting for debug mode
+            # Add other FastAPI parameters if needed, e.g., lifespan context managers for DB connections
+        )
+
+        # Mount static files directory
+        if os.path.exists(static_dir) and os.path.isdir(static_dir):
+            app.mount("/static", StaticFiles(directory=static_dir), name="static")
+            logger.info(f"Using static directory at {static_dir}")
+        else:
+            logger.warning(f"Static directory not found at {static_dir}. Create it if you need to serve static files.")
+        if not os.path.isdir(templates_dir):
+            logger.warning(f"Templates directory not found at {templates_dir}. Create it if you need to use Jinja2 templates.")
+
+    with startup_phase("routers"):
+        from .api import routes as api_routes
+        from .frontend import routes as frontend_routes
+
+        # Include routers
+        app.include_router(api_routes.router, prefix="/api", tags=["api"])
+        app.include_router(frontend_routes.router, tags=["frontend"])
+
+    # Note: The application is designed to be extensible.
+    # When AI-generated code is added, it can be placed in the 'generated' directory
+    # and imported here with its own router.
+
+    # Register custom exception handlers
+    register_exception_handlers(app)
+
+    # Count and time every request per route
+    app.middleware("http")(record_request_metrics)
 
-# Include routers
-app.include_router(api_routes.router, prefix="/api", tags=["api"])
-app.include_router(frontend_routes.router, tags=["frontend"])
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+    return app
 
-# Note: The application is designed to be extensible.
-# When AI-generated code is added, it can be placed in the 'generated' directory
-# and imported here with its own router.
 
-# Register custom exception handlers
-register_exception_handlers(app)
+def __getattr__(name: str):
+    # ``app.app`` for ``uvicorn app:app`` and gunicorn: the application, created on first access
+    global _app
+    if name == "app":
+        with _app_lock:
+            if _app is None:
+                _app = create_app()
+            return _app
+    if name == "templates":
+        return get_templates()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 
 # --- Startup and Shutdown Events ---
-@app.on_event("startup")
 async def startup_event():
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION} ({settings.APP_ENV})")
+    # Map the shared history indexes, then exercise the validation rule plans,
+    # before the first request arrives
+    warm_start()
     # Add any startup tasks here (database connections, etc.)
 
-@app.on_event("shutdown")
 async def shutdown_event():
     logger.info(f"Shutting down {settings.APP_NAME}")
-    # Add any cleanup tasks here
\ No newline at end of file
+    # Let running validation jobs finish and stop the worker pool
+    from .services.job_queue import shutdown_job_queue
+    shutdown_job_queue()
+    # Close pooled connections to the official registries
+    from .services.registry_client import close_registry_client
+    await close_registry_client()
+    # Stop the document extraction workers
+    from .services.extraction import shutdown_extraction_pool
+    shutdown_extraction_pool()
+    # Add any cleanup tasks here
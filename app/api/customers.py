@@ -0,0 +1,35 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+
+from ..models.customer import CustomerMatch
+from ..services.document_index import normalize_name
+from ..services.name_matching import NAME_THRESHOLD
+from ..services.shared_indexes import get_shared_indexes
+
+router = APIRouter(prefix="/customers")
+
+
+def _similar(name: str, threshold: float, limit: int) -> List[CustomerMatch]:
+    indexes = get_shared_indexes()
+    indexes.refresh()
+    with indexes.lock:
+        matches = indexes.history.similar_customers(name, threshold)
+    return [
+        CustomerMatch(name=display, normalized_name=other, score=round(score, 4))
+        for other, display, score in matches[:limit]
+    ]
+
+
+@router.get('/similar', response_model=List[CustomerMatch])
+async def similar_customers(
+    name: str,
+    threshold: float = Query(NAME_THRESHOLD, ge=0.0, le=1.0),
+    limit: int = Query(20, ge=1, le=500),
+):
+    """Customers in the submission history whose name matches ``name`` despite accents, initials or word order."""
+    normalized = normalize_name(name)
+    if normalized is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Name has no letters or digits")
+    return await run_in_threadpool(_similar, normalized, threshold, limit)
@@ -0,0 +1,134 @@
+import json
+import os
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..models.extraction import ExtractedDocument, ExtractedPage
+from ..models.ingest import IngestReport
+from ..services.extraction import (
+    ExtractionError, detect_kind, extract_documents, get_extraction_pool, remove_spooled, spool_file, spool_stream,
+)
+from ..services.ingestion import FORMATS, DocumentIngestor, IngestFormatError, ingest_stream, iter_lines
+
+router = APIRouter(prefix="/documents")
+
+_CONTENT_TYPE_FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "ndjson",
+    "text/csv": "csv",
+}
+
+
+def _detect_format(explicit: Optional[str], content_type: str, filename: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    if filename:
+        extension = os.path.splitext(filename)[1].lower().lstrip(".")
+        if extension in ("ndjson", "jsonl"):
+            return "ndjson"
+        if extension == "csv":
+            return "csv"
+    fmt = _CONTENT_TYPE_FORMATS.get(content_type.split(";")[0].strip().lower())
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send NDJSON or CSV, or pass ?format=ndjson|csv",
+        )
+    return fmt
+
+
+@router.post('/ingest', response_model=IngestReport)
+async def ingest_documents(
+    request: Request,
+    format: Optional[str] = Query(None, pattern=f"^({'|'.join(FORMATS)})$"),
+    application_id: Optional[str] = None,
+    validate: bool = True,
+):
+    """Stream an NDJSON or CSV feed of documents into storage and queue their validation.
+
+    The body may be the raw feed or a multipart form with a ``file`` field.
+    Records are processed in chunks as they arrive; rejected lines are
+    reported individually.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            # python-multipart spools the upload to a temporary file, not memory
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or not hasattr(upload, "file"):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing 'file' form field")
+            ingestor = DocumentIngestor(
+                _detect_format(format, upload.content_type or "", upload.filename),
+                application_id=application_id,
+                validate=validate,
+            )
+            try:
+                return await run_in_threadpool(ingestor.ingest, iter_lines(iter(lambda: upload.file.read(1 << 16), b"")))
+            finally:
+                await upload.close()
+
+        ingestor = DocumentIngestor(_detect_format(format, content_type), application_id=application_id, validate=validate)
+        return await ingest_stream(request.stream(), ingestor)
+    except IngestFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+def _extraction_events(path: str, kind: str, pages: int, filename: Optional[str], application_id: Optional[str],
+                       validate: bool) -> Iterator[str]:
+    try:
+        for event in extract_documents(path, kind, filename=filename, application_id=application_id,
+                                       validate=validate, pages=pages):
+            key = "page" if isinstance(event, ExtractedPage) else "document" if isinstance(event, ExtractedDocument) else "report"
+            yield json.dumps({key: event.model_dump(mode="json")}) + "\n"
+    finally:
+        remove_spooled(path)
+
+
+@router.post('/extract')
+async def extract_documents_from_upload(
+    request: Request,
+    application_id: Optional[str] = None,
+    validate: bool = True,
+):
+    """Extract documents from an uploaded PDF or image and validate them as they are read.
+
+    The body may be the raw file or a multipart form with a ``file`` field;
+    either way it is spooled to disk, not memory. The response streams
+    newline-delimited JSON: a ``page`` object per page as it is parsed, a
+    ``document`` object (with its validation result) as each document is
+    completed and stored, and a final ``report``.
+    """
+    content_type = request.headers.get("content-type", "")
+    filename = None
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or not hasattr(upload, "file"):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing 'file' form field")
+            filename = upload.filename
+            try:
+                path = await run_in_threadpool(spool_file, upload.file)
+            finally:
+                await upload.close()
+        else:
+            path = await spool_stream(request.stream())
+    except ExtractionError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+
+    try:
+        kind = await run_in_threadpool(detect_kind, path)
+        pages = await run_in_threadpool(get_extraction_pool().count_pages, path, kind)
+    except ExtractionError as exc:
+        remove_spooled(path)
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc))
+    # The generator runs on a worker thread; each line is sent as soon as it is produced
+    return StreamingResponse(
+        _extraction_events(path, kind, pages, filename, application_id, validate),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..models.document import DocumentType
+from ..services.document_batch import require_pyarrow
+from ..services.export import FORMATS, MEDIA_TYPES, export_results
+from ..services.storage import SEVERITIES, ResultFilter, get_store
+
+router = APIRouter(prefix="/exports")
+
+_SEVERITY_PATTERN = f"^({'|'.join(SEVERITIES)})$"
+
+
+def _selection(
+    application_id: Optional[str],
+    document_type: Optional[List[DocumentType]],
+    since: Optional[date],
+    until: Optional[date],
+    severity: Optional[str],
+) -> ResultFilter:
+    if since and until and until < since:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'until' is before 'since'")
+    return ResultFilter(
+        application_id=application_id,
+        doc_types=tuple(document_type or ()),
+        since=since.isoformat() if since else None,
+        # Validation dates are timestamps: everything before the next day
+        until=(until + timedelta(days=1)).isoformat() if until else None,
+        severity=severity,
+    )
+
+
+def _attachment(filename: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+@router.get('/results')
+async def export_validation_results(
+    format: str = Query("csv", pattern=f"^({'|'.join(FORMATS)})$"),
+    application_id: Optional[str] = None,
+    document_type: Optional[List[DocumentType]] = Query(None),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    severity: Optional[str] = Query(None, pattern=_SEVERITY_PATTERN),
+):
+    """Stream the stored validation results as CSV, NDJSON or Parquet.
+
+    Filters by validation date (``since`` and ``until``, both inclusive),
+    document type (repeatable) and minimum severity. CSV and Parquet have one
+    row per issue; NDJSON has one result per line. Rows are read from the
+    store and encoded as the response is sent.
+    """
+    selection = _selection(application_id, document_type, since, until, severity)
+    if format == "parquet":
+        try:
+            require_pyarrow()
+        except ImportError as exc:
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(exc))
+    store = get_store()
+    body = export_results(format, store.iter_results(selection, batch_size=settings.EXPORT_BATCH_SIZE), severity)
+    filename = f"validation-results-{date.today().isoformat()}.{format}"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=_attachment(filename))
+
+
+@router.get('/summary')
+async def export_summary(
+    request: Request,
+    application_id: Optional[str] = None,
+    document_type: Optional[List[DocumentType]] = Query(None),
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    severity: Optional[str] = Query(None, pattern=_SEVERITY_PATTERN),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(settings.EXPORT_SUMMARY_PAGE_SIZE, ge=1, le=5000),
+    download: bool = False,
+):
+    """Compliance summary as printable HTML: totals per document type, then one page of results.
+
+    Print it to PDF from the browser; each page links to the previous and
+    next ones.
+    """
+    from .. import get_templates
+
+    selection = _selection(application_id, document_type, since, until, severity)
+    templates = get_templates()
+    if templates is None:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Templates directory not found")
+    store = get_store()
+    totals = await run_in_threadpool(store.result_summary, selection)
+    result_count = sum(counts["results"] for counts in totals.values())
+    pages = max(1, -(-result_count // page_size))
+    if page > pages:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Page {page} of {pages} requested")
+
+    stream = templates.env.get_template("compliance_summary.html").stream(
+        selection=selection,
+        totals=totals,
+        result_count=result_count,
+        severities=SEVERITIES,
+        results=store.iter_results(selection, offset=(page - 1) * page_size, limit=page_size,
+                                   batch_size=settings.EXPORT_BATCH_SIZE),
+        page=page,
+        pages=pages,
+        previous_url=str(request.url.include_query_params(page=page - 1)) if page > 1 else None,
+        next_url=str(request.url.include_query_params(page=page + 1)) if page < pages else None,
+        generated_at=date.today().isoformat(),
+    )
+    # Render in chunks of template fragments rather than one fragment per write
+    stream.enable_buffering(64)
+    headers = _attachment(f"compliance-summary-{page}.html") if download else None
+    return StreamingResponse(
+        (chunk.encode("utf-8") for chunk in stream), media_type="text/html", headers=headers
+    )
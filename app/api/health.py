@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
 import os
 
@@ -16,4 +17,32 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "environment": os.getenv("APP_ENV", "development"),
         "version": os.getenv("APP_VERSION", "1.0.0")
-    }
\ No newline at end of file
+    }
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the shared indexes are loaded and the validation engine has warmed up.
+
+    ``startup`` breaks the cold start of this worker down into timed phases.
+    """
+    from ..core.startup import get_startup_report
+    from ..services.shared_indexes import get_shared_indexes, shared_indexes_loaded
+    from ..services.validation_engine import get_ruleset_version, get_warm_up_state, is_warm
+    warm_up = get_warm_up_state()
+    ready = is_warm() and shared_indexes_loaded()
+    body = {
+        "status": "ready" if ready else "warming",
+        "timestamp": datetime.now().isoformat(),
+        "pid": os.getpid(),
+        "engine": {
+            "warm": is_warm(),
+            "warm_up_seconds": warm_up["seconds"],
+            "rules_version": get_ruleset_version(),
+        },
+        "indexes": {
+            "loaded": shared_indexes_loaded(),
+            "documents": len(get_shared_indexes().history) if shared_indexes_loaded() else 0,
+        },
+        "startup": get_startup_report(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
@@ -0,0 +1,72 @@
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..models.document import Document, ValidationResult
+from ..models.job import ValidationJob
+from ..services.job_queue import JobNotFoundError, get_job_queue
+from ..services.template_library import get_template_library
+
+router = APIRouter(prefix="/jobs")
+
+
+async def _job_or_404(job_id: str) -> ValidationJob:
+    # Jobs run by another worker process are read from the store
+    try:
+        return await run_in_threadpool(get_job_queue().get, job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+
+
+@router.post('', response_model=ValidationJob, status_code=status.HTTP_202_ACCEPTED)
+async def submit_validation_job(
+    documents: List[Document],
+    cross_check: bool = True,
+    triage: Optional[bool] = None,
+    application_id: Optional[str] = None,
+):
+    """Queue documents for background validation and return the job immediately.
+
+    ``triage`` overrides ``TRIAGE_MODE``: stop checking a document once its risk score reaches the threshold.
+    The results are stored under ``application_id`` when the job completes.
+    """
+    queue = get_job_queue()
+    templates = get_template_library()
+    await run_in_threadpool(templates.refresh)
+    job_id = await run_in_threadpool(
+        queue.submit, documents, cross_check=cross_check, templates=templates, triage=triage,
+        application_id=application_id,
+    )
+    return await _job_or_404(job_id)
+
+
+@router.get('/{job_id}', response_model=ValidationJob)
+async def get_validation_job(job_id: str):
+    """Current status and progress of a validation job."""
+    return await _job_or_404(job_id)
+
+
+@router.get('/{job_id}/results', response_model=List[ValidationResult])
+async def get_validation_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """Page through the results a job has produced so far."""
+    await _job_or_404(job_id)
+    return await run_in_threadpool(get_job_queue().results, job_id, offset=offset, limit=limit)
+
+
+@router.get('/{job_id}/stream')
+async def stream_validation_job(job_id: str):
+    """Stream job progress as newline-delimited JSON until the job finishes."""
+    await _job_or_404(job_id)
+
+    async def progress():
+        async for job in get_job_queue().stream(job_id):
+            yield json.dumps(job.model_dump(mode="json")) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..core.metrics import REGISTRY
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Engine, queue and HTTP metrics for Prometheus to scrape."""
+    # Importing the engine registers its metrics even before the first validation
+    from ..services import job_queue, result_cache, validation_engine  # noqa: F401
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,4 +1,20 @@
-from fastapi import APIRouter
+import asyncio
+import json
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..models.document import Document, DocumentType, ValidationIssue, ValidationResult
+from ..services.job_queue import JobNotFoundError, get_job_queue
+from ..services.storage import get_store
+from ..services.template_library import get_template_library
+from ..services.validation_engine import (
+    REGISTRY_LOOKUPS, TEMPLATE_MATCHING, add_issues, get_rule_schedule, get_rule_set_info, reload_rules,
+    triage_threshold, triaged, validate_batch,
+)
 
 # Create router
 router = APIRouter()
@@ -7,9 +23,200 @@ router = APIRouter()
 from .health import router as health_router
 router.include_router(health_router, tags=["health"])
 
+# Background validation jobs
+from .jobs import router as jobs_router
+router.include_router(jobs_router, tags=["jobs"])
+
+# Bulk document ingestion
+from .documents import router as documents_router
+router.include_router(documents_router, tags=["documents"])
+
+# Prometheus metrics
+from .metrics import router as metrics_router
+router.include_router(metrics_router, tags=["metrics"])
+
+# Genuine layout templates for authenticity checks
+from .templates import router as templates_router
+router.include_router(templates_router, tags=["templates"])
+
+# Fuzzy search of the customer history
+from .customers import router as customers_router
+router.include_router(customers_router, tags=["customers"])
+
+# Compliance exports of validation results
+from .exports import router as exports_router
+router.include_router(exports_router, tags=["exports"])
+
 @router.get('/ping')
 async def ping_pong():
     """A simple ping endpoint."""
     return {"message": "pong!"}
 
+async def check_registries(documents: List[Document]) -> List[List[ValidationIssue]]:
+    # The registry client and httpx are only imported once a request asks for registry checks
+    from ..services.registry_checks import registry_issues
+    return await registry_issues(documents)
+
+def _template_issues(documents: List[Document]) -> List[List[ValidationIssue]]:
+    library = get_template_library()
+    # Templates may have been added through another worker
+    library.refresh()
+    return library.issues_for_batch(documents)
+
+@router.get('/rules/schedule')
+async def rule_schedule(document_type: DocumentType):
+    """Rules for a document type in fast-triage order, with their measured cost and hit rate."""
+    return await run_in_threadpool(get_rule_schedule, document_type)
+
+@router.get('/rules/active')
+async def active_rules():
+    """Version of the rule set this worker validates with, and the rule file it was compiled from."""
+    return await run_in_threadpool(get_rule_set_info)
+
+@router.post('/rules/reload')
+async def reload_rule_file():
+    """Re-read the rule file now rather than at the next check.
+
+    Only this worker reloads at once; the others pick the change up within
+    ``RULES_RELOAD_INTERVAL``. A file that fails to compile is rejected with
+    422 and the active rule set stays in place.
+    """
+    await run_in_threadpool(reload_rules, True)
+    info = get_rule_set_info()
+    if info["error"]:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=info["error"])
+    return info
+
+async def _triaged_batch(documents: List[Document], registry: bool) -> List[ValidationResult]:
+    """Rules first; template matching and registry lookups only for documents still under the risk threshold."""
+    stop_at = triage_threshold(True)
+    results = await run_in_threadpool(validate_batch, documents, True)
+    pending = []
+    for position, result in enumerate(results):
+        # Both stages are skipped together, and each skip is recorded on the result
+        skip = triaged(result, stop_at, TEMPLATE_MATCHING)
+        if registry:
+            triaged(result, stop_at, REGISTRY_LOOKUPS)
+        if not skip:
+            pending.append(position)
+    remaining = [documents[position] for position in pending]
+    lookups = [run_in_threadpool(_template_issues, remaining)]
+    if registry:
+        lookups.append(check_registries(remaining))
+    for position, *issues in zip(pending, *await asyncio.gather(*lookups)):
+        for extra in issues:
+            add_issues(results[position], extra)
+    return results
+
+async def _store_results(results: List[ValidationResult], application_id: Optional[str]) -> List[ValidationResult]:
+    """Keep results for the compliance exports, unless ``VALIDATION_STORE_RESULTS`` is off."""
+    if settings.VALIDATION_STORE_RESULTS:
+        await run_in_threadpool(get_store().replace_results, results, application_id)
+    return results
+
+@router.post('/validate/batch', response_model=List[ValidationResult])
+async def validate_documents_batch(
+    documents: List[Document],
+    registry: bool = False,
+    triage: Optional[bool] = None,
+    application_id: Optional[str] = None,
+):
+    """Validate a batch of documents in one call, grouped by document type.
+
+    Documents carrying a page ``layout`` are compared with the genuine
+    layout templates. With ``registry=true`` (and ``REGISTRY_URL``
+    configured), PPSNs, accounts and employers are also checked against the
+    official registries while the rules run. In fast triage mode
+    (``triage=true`` or ``TRIAGE_MODE``) those run after the rules, and only
+    for documents whose risk score is still under the threshold. The
+    results are stored under ``application_id`` (``VALIDATION_STORE_RESULTS``).
+    """
+    if triage_threshold(triage) is not None:
+        return await _store_results(await _triaged_batch(documents, registry), application_id)
+    # Batch validation is CPU-bound; keep it off the event loop
+    if not registry:
+        results, extra_issues = await asyncio.gather(
+            run_in_threadpool(validate_batch, documents), run_in_threadpool(_template_issues, documents)
+        )
+    else:
+        results, extra_issues, registry_issues = await asyncio.gather(
+            run_in_threadpool(validate_batch, documents),
+            run_in_threadpool(_template_issues, documents),
+            check_registries(documents),
+        )
+        extra_issues = [own + registry for own, registry in zip(extra_issues, registry_issues)]
+    for result, issues in zip(results, extra_issues):
+        if issues:
+            result.issues.extend(issues)
+            result.is_valid = result.is_valid and not any(issue.severity == "HIGH" for issue in issues)
+    return await _store_results(results, application_id)
+
+def _event(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    """One server-sent event; ``event_id`` is what the browser sends back as ``Last-Event-ID``."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _result_events(job_id: str, offset: int) -> AsyncIterator[str]:
+    job = None
+    async for batch in get_job_queue().stream_results(job_id, offset):
+        job = batch.job.model_dump(mode="json", exclude={"revised"})
+        if batch.results:
+            results = [{"position": position, "result": result.model_dump(mode="json")} for position, result in batch.results]
+            yield _event("results", {"job": job, "offset": batch.offset, "results": results}, batch.next_offset)
+        else:
+            yield _event("progress", {"job": job})
+    yield _event("done", {"job": job})
+
+def _event_stream(job_id: str, offset: int) -> StreamingResponse:
+    return StreamingResponse(
+        _result_events(job_id, offset),
+        media_type="text/event-stream",
+        # Proxies must pass each event on as it is written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post('/validate/stream')
+async def validate_documents_stream(
+    documents: List[Document],
+    cross_check: bool = True,
+    triage: Optional[bool] = None,
+    application_id: Optional[str] = None,
+):
+    """Validate documents as a background job and stream the results as server-sent events.
+
+    Each ``results`` event carries the results validated since the last
+    one, with their ``position`` in the submitted list, and its ``id`` is
+    the offset to resume from. When ``cross_check`` is set, results the
+    cross-document checks change are sent again at the end. ``progress``
+    events report status changes and keep the connection alive; ``done``
+    ends the stream. Resume with ``GET /validate/stream/{job_id}``. The
+    results are stored under ``application_id`` when the job completes.
+    """
+    queue = get_job_queue()
+    templates = get_template_library()
+    await run_in_threadpool(templates.refresh)
+    job_id = await run_in_threadpool(
+        queue.submit, documents, cross_check=cross_check, templates=templates, triage=triage,
+        application_id=application_id,
+    )
+    return _event_stream(job_id, 0)
+
+@router.get('/validate/stream/{job_id}')
+async def resume_validation_stream(
+    job_id: str,
+    offset: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Resume a result stream from ``offset``, or from the ``Last-Event-ID`` an ``EventSource`` reconnects with."""
+    try:
+        await run_in_threadpool(get_job_queue().get, job_id)
+    except JobNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Job {job_id} not found")
+    if offset is None:
+        try:
+            offset = max(int(last_event_id), 0) if last_event_id else 0
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Last-Event-ID must be a stream offset")
+    return _event_stream(job_id, offset)
+
 # Add additional API routes here using the @router decorator
@@ -0,0 +1,85 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from ..models.document import Document, DocumentType, PageLayout
+from ..models.template import LayoutTemplate, TemplateMatch
+from ..services.extraction import ExtractionError, detect_kind, get_extraction_pool, remove_spooled, spool_stream
+from ..services.template_library import document_issuer, get_template_library
+
+router = APIRouter(prefix="/templates")
+
+
+class NewLayoutTemplate(BaseModel):
+    """Model representing a genuine layout to add to the library"""
+    document_type: DocumentType
+    issuer: str
+    name: Optional[str] = None
+    layout: PageLayout
+
+
+def _library():
+    library = get_template_library()
+    library.refresh()
+    return library
+
+
+@router.get('', response_model=List[LayoutTemplate])
+async def list_templates(document_type: Optional[DocumentType] = None, issuer: Optional[str] = None):
+    """Genuine layouts on file, optionally for one document type or issuer."""
+    return (await run_in_threadpool(_library)).templates(document_type, issuer)
+
+
+@router.post('', response_model=LayoutTemplate, status_code=status.HTTP_201_CREATED)
+async def add_template(template: NewLayoutTemplate):
+    """Add a genuine layout whose hashes were computed elsewhere."""
+    library = await run_in_threadpool(_library)
+    return await run_in_threadpool(library.add, template.document_type, template.issuer, template.layout, template.name)
+
+
+@router.post('/image', response_model=LayoutTemplate, status_code=status.HTTP_201_CREATED)
+async def add_template_from_image(
+    request: Request,
+    document_type: DocumentType,
+    issuer: str,
+    name: Optional[str] = None,
+    page: int = Query(1, ge=1),
+):
+    """Add the layout of a genuine document sent as the raw body (an image, or a scanned PDF)."""
+    try:
+        path = await spool_stream(request.stream())
+    except ExtractionError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    try:
+        kind = await run_in_threadpool(detect_kind, path)
+        layout = await run_in_threadpool(get_extraction_pool().page_layout, path, kind, page - 1)
+    except (ExtractionError, IndexError, EOFError) as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc) or "Page not found")
+    finally:
+        remove_spooled(path)
+    if layout is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="The page is not an image, so it has no layout hash"
+        )
+    library = await run_in_threadpool(_library)
+    return await run_in_threadpool(library.add, document_type, issuer, layout, name)
+
+
+@router.delete('/{template_id}', status_code=status.HTTP_204_NO_CONTENT)
+async def remove_template(template_id: str):
+    library = await run_in_threadpool(_library)
+    if not await run_in_threadpool(library.remove, template_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Template {template_id} not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post('/match', response_model=List[TemplateMatch])
+async def match_templates(document: Document, limit: int = Query(5, ge=1, le=100), any_issuer: bool = False):
+    """Templates nearest to a document's layout: its issuer's, or every issuer's with ``any_issuer``."""
+    if document.layout is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Document has no layout")
+    library = await run_in_threadpool(_library)
+    issuer = None if any_issuer else document_issuer(document)
+    return library.matches(document.type, document.layout, issuer=issuer, limit=limit)
@@ -1,12 +1,93 @@
 from pydantic_settings import BaseSettings
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "My Enterprise App"
     APP_VERSION: str = "1.0.0"  # Semantic versioning
     APP_ENV: str = os.getenv("APP_ENV", "development")
     DEBUG: bool = False
+    FRAMEWORK: str = "nicegui"  # What main.py serves: "nicegui" (UI and API) or "fastapi" (API and Jinja2 pages)
+
+    # Document and result storage
+    STORAGE_URL: str = "sqlite:///data/documents.db"
+
+    # Server worker processes (see gunicorn.conf.py); above 1, jobs are shared through the store
+    WORKERS: int = 1
+    JOB_POLL_INTERVAL: float = 0.5  # Seconds between store polls for a job another worker runs
+    # Read-only snapshot of the history and fingerprint indexes, memory-mapped by every worker
+    INDEX_SNAPSHOT_DIR: Optional[str] = "data/index"
+    # Documents a worker may have to index from the store at startup before it rebuilds the
+    # snapshot in the background, so the next cold start maps them instead (0 never rebuilds)
+    INDEX_SNAPSHOT_MAX_LAG: int = 10_000
+
+    # Background validation jobs
+    VALIDATION_EXECUTOR: str = "thread"  # "thread" or "process"
+    VALIDATION_WORKERS: int = 2
+    VALIDATION_CHUNK_SIZE: int = 500
+    VALIDATION_FIRST_CHUNK_SIZE: int = 16  # Chunks double from this size up to VALIDATION_CHUNK_SIZE, so first results come quickly
+    VALIDATION_MAX_CONCURRENT_JOBS: int = 4
+    VALIDATION_JOB_RETENTION: int = 1000  # Finished jobs kept in memory
+    VALIDATION_STORE_RESULTS: bool = True  # Keep API and job results in the document store, e.g. for compliance exports
+    # Results streamed to clients (/api/validate/stream and the UI) go out in coalesced batches
+    STREAM_COALESCE_INTERVAL: float = 0.1  # Seconds between batches while results keep arriving
+    STREAM_MAX_BATCH: int = 500  # Results per batch
+
+    # Rule file (JSON, or YAML with PyYAML) replacing, adding or disabling built-in rules; see app/services/rule_dsl.py
+    RULES_PATH: Optional[str] = None  # e.g. "rules.example.yaml"
+    RULES_RELOAD_INTERVAL: float = 5.0  # Seconds between checks of the rule file for changes
+
+    # Fast triage: stop validating a document once its risk score (1.0 per HIGH issue,
+    # 0.3 per MEDIUM, 0.1 per LOW) reaches the threshold; rules run cheapest and most selective first
+    TRIAGE_MODE: bool = False
+    TRIAGE_RISK_THRESHOLD: float = 1.0
+    RULE_SCHEDULE_INTERVAL: float = 30.0  # Seconds between re-ordering rules from their measured cost and hit rate
+
+    # Validation result cache
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_SIZE: int = 100_000  # Entries kept in memory (LRU)
+    RESULT_CACHE_TTL: int = 24 * 60 * 60  # Seconds
+    RESULT_CACHE_DISK_PATH: Optional[str] = None  # e.g. "data/result_cache.db"
+
+    # Official-registry lookups (Revenue PPSNs, bank accounts, CRO employers); unset disables them
+    REGISTRY_URL: Optional[str] = None  # e.g. "http://localhost:8100" for the stub server
+    REGISTRY_TIMEOUT: float = 5.0  # Seconds per request
+    REGISTRY_MAX_CONNECTIONS: int = 20  # Pooled connections to the registry
+    REGISTRY_CONCURRENCY: int = 10  # Requests in flight at once
+    REGISTRY_CACHE_SIZE: int = 50_000  # Lookups kept in memory (LRU)
+    REGISTRY_CACHE_TTL: int = 60 * 60  # Seconds
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: Dict[str, str] = {}  # Per-logger levels, e.g. {"app.services.ingestion": "DEBUG"}
+    LOG_JSON: bool = False  # One JSON object per line instead of the text format
+    LOG_FILE: Optional[str] = "logs/app.log"
+    LOG_QUEUE_SIZE: int = 10_000  # Records buffered for the writer thread; extra records are dropped
+    LOG_BATCH_SIZE: int = 256  # Records written per flush
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # Share of DEBUG records kept
+
+    # Metrics
+    METRICS_SAMPLE_RATE: float = 0.01  # Share of validations whose rule latencies are timed (0 disables timing)
+
+    # Bulk ingestion
+    INGEST_CHUNK_SIZE: int = 2000  # Documents stored and queued per chunk
+    INGEST_MAX_LINE_BYTES: int = 1024 * 1024
+    INGEST_MAX_REPORTED_ERRORS: int = 1000
+    INGEST_MAX_PENDING_JOBS: int = 2  # Validation jobs a feed may have queued before parsing waits for the oldest
+
+    # Compliance exports of validation results
+    EXPORT_BATCH_SIZE: int = 1000  # Results read from the store, and rows encoded, per chunk
+    EXPORT_PARQUET_ROW_GROUP: int = 50_000  # Rows buffered per Parquet row group
+    EXPORT_SUMMARY_PAGE_SIZE: int = 200  # Results per page of the HTML summary
+
+    # Document extraction from uploaded PDFs and images
+    EXTRACTION_UPLOAD_DIR: Optional[str] = None  # Where uploads are spooled; None uses the system temp dir
+    EXTRACTION_MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024
+    EXTRACTION_WORKERS: int = 1  # Extraction processes
+    EXTRACTION_PAGES_PER_TASK: int = 8  # Pages parsed per task handed to a worker
+    EXTRACTION_WORKER_MEMORY_MB: int = 256  # Heap limit per extraction process (0 disables)
+    EXTRACTION_MAX_TASKS_PER_CHILD: int = 100  # Tasks before a worker is replaced, returning its memory
+    EXTRACTION_MAX_IMAGE_PIXELS: int = 50_000_000  # Larger images are rejected rather than decoded
     
     class Config:
         env_file = ".env"
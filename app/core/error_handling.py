@@ -8,6 +8,9 @@ from .logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Validation errors included in the log line for a rejected request
+LOGGED_VALIDATION_ERRORS = 10
+
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     logger.error(f"HTTPException: {exc.status_code} {exc.detail} for {request.method} {request.url.path}")
     return JSONResponse(
@@ -16,13 +19,19 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     )
 
 async def request_validation_exception_handler(request: Request, exc: RequestValidationError):
+    errors = exc.errors()
     error_messages = []
-    for error in exc.errors():
+    # Bulk uploads can fail on thousands of records; log a sample, never the body itself
+    for error in errors[:LOGGED_VALIDATION_ERRORS]:
         field = ".".join(str(loc) for loc in error["loc"])
         message = error["msg"]
         error_messages.append(f"Field '{field}': {message}")
-    
-    logger.warning(f"RequestValidationError: {error_messages} for {request.method} {request.url.path} - Body: {await request.body()}")
+    more = f" (+{len(errors) - len(error_messages)} more)" if len(errors) > len(error_messages) else ""
+    size = request.headers.get("content-length", "unknown")
+
+    logger.warning(
+        f"RequestValidationError: {error_messages}{more} for {request.method} {request.url.path} - Body: {size} bytes"
+    )
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": "Validation Error", "errors": exc.errors()},
@@ -1,33 +1,240 @@
+"""Application logging.
+
+Log calls never touch the disk or stdout on the caller's thread: the ``app``
+logger only enqueues records (``QueueHandler``), and a background
+``QueueListener`` drains the queue in batches, writing each batch to the
+console and the rotating log file with a single flush. When the queue is
+full, records are dropped and counted rather than blocking the event loop.
+
+Settings: ``LOG_LEVEL`` and ``LOG_LEVELS`` (per-logger overrides, e.g.
+``{"app.services.ingestion": "DEBUG"}``), ``LOG_JSON`` for one JSON object
+per line, and ``LOG_DEBUG_SAMPLE_RATE`` to keep only a share of DEBUG records.
+"""
+import atexit
+import copy
+import json
 import logging
+import os
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from .config import settings
+from .metrics import callback_metric
 
 # Define log format
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(module)s:%(funcName)s:%(lineno)d - %(message)s"
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps only ``rate`` of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueues records without blocking; counts the ones dropped when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments and render the traceback now, but leave formatting to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _BatchFlushMixin:
+    """Defers a stream handler's per-record flush to the end of each batch."""
+
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        stream = getattr(self, "stream", None)
+        if stream is not None and getattr(stream, "closed", False):
+            return
+        try:
+            super().flush()
+        except (ValueError, OSError):
+            # Closed under us, e.g. a test runner's captured stdout at exit
+            pass
+
+    def close(self) -> None:
+        self.flush_batch()
+        super().close()
+
+
+class BatchStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchRotatingFileHandler(_BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class BatchingQueueListener(QueueListener):
+    """Drains up to ``batch_size`` queued records at a time and flushes each handler once per batch."""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def enqueue_sentinel(self) -> None:
+        # Block rather than fail if the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                self.handle(record)
+            for handler in self.handlers:
+                if isinstance(handler, _BatchFlushMixin):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+
+
 # Create a custom logger
 logger = logging.getLogger("app")
-logger.setLevel(logging.INFO) # Default level, can be overridden by config
 
-# Create handlers
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+_listener: Optional[BatchingQueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_lock = threading.Lock()
+
+
+def configure_logging() -> None:
+    """(Re)build the ``app`` logging pipeline from settings; safe to call more than once."""
+    global _listener, _queue_handler
+    with _lock:
+        shutdown_logging()
+        formatter = JsonFormatter() if settings.LOG_JSON else logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+
+        # Create handlers
+        console_handler = BatchStreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        handlers = [console_handler]
+        if settings.LOG_FILE:
+            # Creates the log directory if it doesn't exist
+            directory = os.path.dirname(settings.LOG_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_handler = BatchRotatingFileHandler(
+                settings.LOG_FILE, maxBytes=1024*1024*5, backupCount=5, encoding='utf-8'
+            )  # 5MB per file, 5 backup files
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _queue_handler.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+        _listener = BatchingQueueListener(log_queue, *handlers, batch_size=settings.LOG_BATCH_SIZE)
+
+        logger.setLevel(settings.LOG_LEVEL.upper())
+        logger.addHandler(_queue_handler)
+        for name, level in settings.LOG_LEVELS.items():
+            logging.getLogger(name).setLevel(level.upper())
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out everything still queued and stop the listener thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logger.removeHandler(_queue_handler)
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = _queue_handler = None
+    # Registered again by the next configure_logging()
+    atexit.unregister(shutdown_logging)
+
+
+def _restart_after_fork() -> None:
+    """Give a forked worker its own listener; the parent's thread does not survive the fork."""
+    global _listener, _queue_handler, _lock
+    _lock = threading.Lock()
+    if _queue_handler is not None:
+        logger.removeHandler(_queue_handler)
+    _listener = _queue_handler = None
+    configure_logging()
+
+
+def dropped_records() -> int:
+    """Records discarded because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
 
-# File handler (optional, but good for production)
-# Creates a logs directory if it doesn't exist
-import os
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-file_handler = RotatingFileHandler('logs/app.log', maxBytes=1024*1024*5, backupCount=5, encoding='utf-8') # 5MB per file, 5 backup files
-file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
 
-# Add handlers to the logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+configure_logging()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+callback_metric(
+    "log_records_dropped_total", "Log records dropped because the queue was full", (),
+    lambda: {(): dropped_records()}, kind="counter",
+)
 
 def get_logger(name: str) -> logging.Logger:
     """Returns a logger instance with the specified name, inheriting base config."""
     return logging.getLogger(name)
 
-# End of logging configuration
\ No newline at end of file
+# End of logging configuration
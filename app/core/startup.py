@@ -0,0 +1,95 @@
+"""Timing of the startup phases of this process.
+
+Machines are stopped when idle, so the first request after a stop waits for
+the whole cold start: interpreter and framework imports, building the app,
+mapping the index snapshot, compiling the rules and warming them up. Each
+phase runs under ``startup_phase`` and the breakdown is reported by the
+readiness probe, with every phase's start measured from process start so
+that import time shows up as the gap before the first one. Phases may nest:
+the rules are compiled while the API routers are imported.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+def _process_started() -> float:
+    """Wall-clock time this process started; the import of this module where /proc is unavailable."""
+    try:
+        with open("/proc/self/stat", encoding="ascii") as handle:
+            # Field 22, counted after the parenthesised command name
+            ticks = int(handle.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as handle:
+            uptime = float(handle.read().split()[0])
+        return time.time() - uptime + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+PROCESS_STARTED = _process_started()
+# Monotonic clock reading that corresponds to PROCESS_STARTED
+_origin = time.perf_counter() - (time.time() - PROCESS_STARTED)
+
+_lock = threading.Lock()
+_phases: List[Dict[str, float]] = []
+_ready_after: Optional[float] = None
+
+
+def uptime() -> float:
+    """Seconds since this process started."""
+    return time.perf_counter() - _origin
+
+
+@contextmanager
+def startup_phase(name: str) -> Iterator[None]:
+    """Time one startup phase; repeated phases (e.g. after a restart of the app) are each recorded."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase = {"name": name, "started_after": started - _origin, "seconds": time.perf_counter() - started}
+        with _lock:
+            _phases.append(phase)
+
+
+def mark_ready() -> None:
+    """Record that startup has finished and the process can take requests."""
+    global _ready_after
+    with _lock:
+        if _ready_after is None:
+            _ready_after = uptime()
+
+
+def get_startup_report() -> dict:
+    """When the process started, each phase's start and duration in seconds, and when it became ready."""
+    with _lock:
+        phases = [
+            {"name": phase["name"], "started_after": round(phase["started_after"], 4), "seconds": round(phase["seconds"], 4)}
+            for phase in sorted(_phases, key=lambda phase: phase["started_after"])
+        ]
+        ready_after = _ready_after
+    return {
+        "process_started_at": datetime.fromtimestamp(PROCESS_STARTED).isoformat(timespec="milliseconds"),
+        "phases": phases,
+        "ready_after_seconds": round(ready_after, 4) if ready_after is not None else None,
+    }
+
+
+def warm_start() -> None:
+    """Load everything the first request would otherwise wait for, timing each phase.
+
+    Maps the history index snapshot (indexing only what was stored since it
+    was taken) and exercises the rule plans, which were compiled when the
+    validation engine was imported. Extraction and template matching stay
+    unloaded until a request needs them.
+    """
+    from app.services import validation_engine
+    from app.services.shared_indexes import get_shared_indexes
+    with startup_phase("indexes"):
+        get_shared_indexes()
+    with startup_phase("warm_up"):
+        validation_engine.warm_up()
+    mark_ready()
@@ -1,142 +1,673 @@
-from nicegui import ui, app
-import logging
+"""NiceGUI frontend: documents, uploads and validation results, one application per page.
+
+Imported by main.py only when ``FRAMEWORK`` is ``nicegui``. ``create_app()``
+attaches the JSON API, metrics and the startup and shutdown hooks to
+NiceGUI's app.
+"""
 import asyncio
-from datetime import datetime
 import os
+from nicegui import ui, app
+from starlette.concurrency import iterate_in_threadpool
+from datetime import datetime
+import uuid
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
-
-# Initialize counter for demo
-count = 0
-
-# Custom CSS for enhanced styling
-ui.add_head_html("""
-<style>
-    .hero-gradient {
-        background: linear-gradient(135deg, #6366F1 0%, #8B5CF6 100%);
-    }
-    .feature-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 10px 25px -5px rgba(0, 0, 0, 0.1), 0 10px 10px -5px rgba(0, 0, 0, 0.04);
-    }
-    .animate-pulse {
-        animation: pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite;
-    }
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: .7; }
+# Import validation services and models
+from app.models.document import Document, DocumentType, ValidationResult
+from app.services.validation_engine import get_validation_rules
+from app.services.incremental import IncrementalValidator
+from app.services.shared_indexes import get_shared_indexes
+from app.services.template_library import get_template_library
+from app.services.storage import close_store, get_store
+from app.services.extraction import ExtractionError, detect_kind, extract_documents, remove_spooled, spool_file
+from app.models.extraction import ExtractedDocument, ExtractedPage, ExtractionReport
+from app.core.config import settings
+from app.core.startup import startup_phase, warm_start
+
+
+def create_app():
+    """Configure NiceGUI's app: static files, the JSON API and the startup and shutdown hooks."""
+    app.title = "Document Validation System - Credit Union Fraud Detection"
+    app.favicon = "🔍"
+
+    # Set up static files
+    static_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+    app.add_static_files('/static', static_dir)
+
+    # Expose the JSON API alongside the UI
+    with startup_phase("routers"):
+        from app.api.routes import router as api_router
+        from app.core.metrics import record_request_metrics
+        app.include_router(api_router, prefix="/api", tags=["api"])
+    app.middleware("http")(record_request_metrics)
+
+    # Map the indexes and exercise the validation plans before the first request
+    app.on_startup(warm_start)
+    # Let running validation jobs finish when the server stops
+    app.on_shutdown(shutdown)
+    return app
+
+
+async def shutdown() -> None:
+    # Drain the job queue, then release the store, the pooled registry
+    # connections and the extraction workers
+    from app.services.job_queue import shutdown_job_queue
+    from app.services.registry_client import close_registry_client
+    from app.services.extraction import shutdown_extraction_pool
+    shutdown_job_queue()
+    close_store()
+    await close_registry_client()
+    shutdown_extraction_pool()
+
+
+# Documents and results live in the persistent store, scoped per application
+store = get_store()
+
+ROWS_PER_PAGE = 25
+
+
+class PagedTable:
+    """A ``ui.table`` paged on the server: only the visible page is held and sent to the browser.
+
+    ``fetch(offset, limit)`` returns the rows of one page and ``count()`` the
+    total. Changed rows are patched in place with ``patch`` instead of
+    re-fetching or re-rendering the table.
+    """
+
+    def __init__(
+        self,
+        columns: List[dict],
+        fetch: Callable[[int, int], List[dict]],
+        count: Callable[[], int],
+        row_key: str = 'id',
+        rows_per_page: int = ROWS_PER_PAGE,
+    ):
+        self.fetch = fetch
+        self.count = count
+        self.row_key = row_key
+        self.table = ui.table(
+            columns=columns,
+            rows=[],
+            row_key=row_key,
+            pagination={'page': 1, 'rowsPerPage': rows_per_page, 'rowsNumber': 0},
+        ).classes('w-full').props(':rows-per-page-options="[10, 25, 50, 100]"')
+        # Quasar asks the server for each page once rowsNumber is set
+        self.table.on('request', self._on_request, ['pagination'])
+
+    def _on_request(self, e) -> None:
+        pagination = e.args['pagination']
+        self.refresh(page=pagination['page'], rows_per_page=pagination['rowsPerPage'] or ROWS_PER_PAGE)
+
+    def refresh(self, page: Optional[int] = None, rows_per_page: Optional[int] = None) -> None:
+        """Reload the current (or given) page from the server-side source."""
+        pagination = dict(self.table.pagination)
+        rows_per_page = rows_per_page or pagination['rowsPerPage']
+        total = self.count()
+        last_page = max(1, -(-total // rows_per_page))
+        page = min(page or pagination['page'], last_page)
+        pagination.update(page=page, rowsPerPage=rows_per_page, rowsNumber=total)
+        self.table._props['pagination'] = pagination
+        self.table.rows = self.fetch((page - 1) * rows_per_page, rows_per_page)
+
+    def patch(self, rows: Iterable[dict], total: int) -> None:
+        """Replace the visible rows whose keys match ``rows`` and update the row total.
+
+        Rows that are not on the current page are only counted; a short last
+        page is topped up by reloading it.
+        """
+        pagination = self.table.pagination
+        changed = {row[self.row_key]: row for row in rows}
+        visible = self.table.rows
+        for position, row in enumerate(visible):
+            replacement = changed.get(row[self.row_key])
+            if replacement is not None:
+                visible[position] = replacement
+        if total != pagination.get('rowsNumber') and len(visible) < pagination['rowsPerPage']:
+            self.refresh()
+            return
+        pagination['rowsNumber'] = total
+        self.table.update()
+
+
+class SeveritySummary:
+    """Running issue totals per severity, adjusted per changed result rather than recounted."""
+
+    SEVERITIES = ('HIGH', 'MEDIUM', 'LOW')
+
+    def __init__(self, counts_by_document: Dict[str, Tuple[int, int, int]]):
+        self._counts = dict(counts_by_document)
+        self.totals = {
+            severity: sum(counts[i] for counts in self._counts.values())
+            for i, severity in enumerate(self.SEVERITIES)
+        }
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._counts
+
+    @property
+    def documents(self) -> int:
+        return len(self._counts)
+
+    @property
+    def issues(self) -> int:
+        return sum(self.totals.values())
+
+    def _adjust(self, counts: Tuple[int, int, int], sign: int) -> None:
+        for severity, count in zip(self.SEVERITIES, counts):
+            self.totals[severity] += sign * count
+
+    def update(self, result: ValidationResult) -> None:
+        """Account for a new or re-validated result."""
+        self.remove(result.document_id)
+        severities = [issue.severity for issue in result.issues]
+        counts = tuple(severities.count(severity) for severity in self.SEVERITIES)
+        self._counts[result.document_id] = counts
+        self._adjust(counts, 1)
+
+    def remove(self, document_id: str) -> None:
+        counts = self._counts.pop(document_id, None)
+        if counts is not None:
+            self._adjust(counts, -1)
+
+    def clear(self) -> None:
+        self.__init__({})
+
+
+class ResultStream:
+    """Results handed over by a validation thread, taken on the event loop in coalesced batches.
+
+    ``put`` and ``close`` may be called from any thread. ``batches()`` yields
+    the first result as soon as it arrives, then whatever arrived during each
+    ``interval``, so the page is updated over its websocket a few times a
+    second rather than once per document.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = settings.STREAM_COALESCE_INTERVAL,
+        max_batch: int = settings.STREAM_MAX_BATCH,
+    ):
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.interval = interval
+        self.max_batch = max_batch
+
+    def put(self, result: ValidationResult) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, result)
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+    async def batches(self) -> AsyncIterator[List[ValidationResult]]:
+        closed = False
+        while not closed:
+            batch = []
+            item = await self._queue.get()
+            while True:
+                if item is None:
+                    closed = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            if batch:
+                yield batch
+            if not closed:
+                await asyncio.sleep(self.interval)
+
+
+def document_row(doc: Document) -> dict:
+    """Table row for one uploaded document."""
+    return {'id': doc.id, 'type': doc.type.value, 'customer_name': doc.customer_name, 'upload_date': doc.upload_date}
+
+
+def result_row(result: ValidationResult) -> dict:
+    """Table row for one validation result, with its issues for the detail cell."""
+    return {
+        'id': result.document_id,
+        'document': f"{result.document_type.value}: {result.customer_name}",
+        'status': 'VALID' if not result.issues else 'ISSUES DETECTED',
+        'issues': [issue.model_dump() for issue in result.issues],
     }
-</style>
-""")
 
-# Define the main page with enhanced UI
+# Define UI components
 @ui.page('/')
-def main_page():
-    """Main page of the NiceGUI application with modern, appealing UI."""
-    # Hero section with gradient background
-    with ui.column().classes('w-full hero-gradient text-white p-8'):
-        ui.label('Project Base').classes('text-4xl font-bold mb-2')
-        ui.label('A Python-Native Web Application Framework').classes('text-xl mb-4')
-        ui.markdown('''
-        Build powerful web applications with pure Python. No JavaScript required.
-        ''')
-        with ui.row().classes('mt-4'):
-            ui.button('Get Started', on_click=lambda: ui.open('/docs')).props('color=white text-purple-700 push')
-            ui.button('Learn More', on_click=lambda: ui.navigate('#features')).props('outline color=white push')
+def index(application: Optional[str] = None):
+    # Each page works on its own application; pass ?application=<id> to resume one
+    application_id = application or str(uuid.uuid4())
+    # Every stored document, indexed for fraud-ring and near-duplicate checks across
+    # applications; memory-mapped from the index snapshot when one has been built
+    indexes = get_shared_indexes()
+    # Remembers this page's last validation so re-runs only check what changed
+    templates = get_template_library()
+    validator = IncrementalValidator(indexes.history, indexes.duplicates, indexes.lock, templates=templates)
     
-    # Features section
-    with ui.column().classes('w-full max-w-6xl mx-auto p-8').id('features'):
-        ui.label('Key Features').classes('text-3xl font-bold text-center mb-8')
+    with ui.column().classes('w-full max-w-screen-xl mx-auto p-4'):
+        # Header
+        with ui.row().classes('w-full justify-between items-center'):
+            ui.image('/static/img/logo.png').classes('h-12')
+            ui.label('Document Validation System').classes('text-2xl font-bold text-blue-800')
+            ui.label('Credit Union Fraud Detection').classes('text-lg text-gray-600')
         
-        with ui.grid(columns=3).classes('gap-6'):
-            # Feature cards with hover effects
-            for title, icon, description in [
-                ('Python-Native UI', '🐍', 'Build beautiful interfaces with pure Python code'),
-                ('Real-time Updates', '⚡', 'Reactive components that update instantly'),
-                ('FastAPI Integration', '🚀', 'Seamlessly combine with powerful API endpoints'),
-                ('Type Safety', '✅', 'Leverage Python type hints for better code'),
-                ('Modern Design', '🎨', 'Clean, responsive layouts out of the box'),
-                ('Easy Deployment', '🌐', 'Deploy anywhere with Docker and fly.io')
-            ]:
-                with ui.card().classes('feature-card transition-all duration-300 h-full'):
-                    ui.label(f'{icon} {title}').classes('text-xl font-bold mb-2')
-                    ui.label(description).classes('text-gray-600')
+        ui.separator()
         
-        # Demo section with interactive components
-    with ui.column().classes('w-full bg-gray-100 p-8'):
-        ui.label('Interactive Demo').classes('text-3xl font-bold text-center mb-8')
+        # Main content
+        with ui.tabs().classes('w-full') as tabs:
+            upload_tab = ui.tab('Document Upload')
+            validation_tab = ui.tab('Validation Rules')
+            results_tab = ui.tab('Validation Results')
         
-        with ui.card().classes('w-full max-w-3xl mx-auto'):
-            ui.label('Try it out').classes('text-xl font-bold mb-4')
-            
-            # Counter demo with improved styling
-            with ui.row().classes('items-center justify-center mb-6'):
-                ui.label('Counter:').classes('mr-2')
-                label = ui.label(str(count)).classes('text-2xl font-bold px-4 py-2 bg-gray-200 rounded')
+        with ui.tab_panels(tabs, value=upload_tab).classes('w-full'):
+            # Upload Panel
+            with ui.tab_panel(upload_tab):
+                with ui.card().classes('w-full'):
+                    ui.label('Upload Documents for Validation').classes('text-xl font-bold mb-4')
+                    
+                    # Document type selection
+                    doc_type = ui.select(
+                        label='Document Type',
+                        options=[
+                            {'label': 'Bank Statement', 'value': DocumentType.BANK_STATEMENT},
+                            {'label': 'Payslip', 'value': DocumentType.PAYSLIP},
+                            {'label': 'Irish Residency Permit (IRP)', 'value': DocumentType.IRP},
+                            {'label': 'PPSN Document', 'value': DocumentType.PPSN},
+                            {'label': 'Tax Record', 'value': DocumentType.TAX_RECORD}
+                        ],
+                        value=DocumentType.BANK_STATEMENT
+                    ).classes('w-full mb-4')
+                    
+                    # Mock document data inputs
+                    with ui.column().classes('w-full gap-4'):
+                        customer_name = ui.input(label='Customer Name').classes('w-full')
+                        customer_dob = ui.date(label='Date of Birth').classes('w-full')
+                        customer_address = ui.input(label='Address').classes('w-full')
+                        
+                        # Conditional fields based on document type
+                        bank_fields = ui.column().classes('w-full gap-4')
+                        payslip_fields = ui.column().classes('w-full gap-4')
+                        irp_fields = ui.column().classes('w-full gap-4')
+                        ppsn_fields = ui.column().classes('w-full gap-4')
+                        tax_fields = ui.column().classes('w-full gap-4')
+                        
+                        with bank_fields:
+                            ui.label('Bank Statement Details').classes('font-bold')
+                            account_number = ui.input(label='Account Number (IBAN)').classes('w-full')
+                            opening_balance = ui.number(label='Opening Balance (€)', format='%.2f').classes('w-full')
+                            closing_balance = ui.number(label='Closing Balance (€)', format='%.2f').classes('w-full')
+                            statement_date = ui.date(label='Statement Date').classes('w-full')
+                        
+                        with payslip_fields:
+                            ui.label('Payslip Details').classes('font-bold')
+                            employer_name = ui.input(label='Employer Name').classes('w-full')
+                            gross_pay = ui.number(label='Gross Pay (€)', format='%.2f').classes('w-full')
+                            net_pay = ui.number(label='Net Pay (€)', format='%.2f').classes('w-full')
+                            pay_date = ui.date(label='Pay Date').classes('w-full')
+                            
+                        with irp_fields:
+                            ui.label('IRP Details').classes('font-bold')
+                            irp_number = ui.input(label='IRP Number').classes('w-full')
+                            nationality = ui.input(label='Nationality').classes('w-full')
+                            expiry_date = ui.date(label='Expiry Date').classes('w-full')
+                            
+                        with ppsn_fields:
+                            ui.label('PPSN Details').classes('font-bold')
+                            ppsn_number = ui.input(label='PPSN Number').classes('w-full')
+                            issue_date = ui.date(label='Issue Date').classes('w-full')
+                            
+                        with tax_fields:
+                            ui.label('Tax Record Details').classes('font-bold')
+                            tax_year = ui.input(label='Tax Year').classes('w-full')
+                            total_income = ui.number(label='Total Income (€)', format='%.2f').classes('w-full')
+                            tax_paid = ui.number(label='Tax Paid (€)', format='%.2f').classes('w-full')
+                    
+                    # Show/hide relevant fields based on document type
+                    def update_visible_fields():
+                        doc_type_value = doc_type.value
+                        bank_fields.visible = doc_type_value == DocumentType.BANK_STATEMENT
+                        payslip_fields.visible = doc_type_value == DocumentType.PAYSLIP
+                        irp_fields.visible = doc_type_value == DocumentType.IRP
+                        ppsn_fields.visible = doc_type_value == DocumentType.PPSN
+                        tax_fields.visible = doc_type_value == DocumentType.TAX_RECORD
+                    
+                    doc_type.on_change(update_visible_fields)
+                    update_visible_fields()
+                    
+                    # Add document button
+                    def add_document():
+                        doc_id = str(uuid.uuid4())
+                        doc_type_value = doc_type.value
+                        
+                        # Common document data
+                        doc_data = {
+                            'id': doc_id,
+                            'type': doc_type_value,
+                            'customer_name': customer_name.value,
+                            'customer_dob': customer_dob.value.isoformat() if customer_dob.value else None,
+                            'customer_address': customer_address.value,
+                            'upload_date': datetime.now().isoformat()
+                        }
+                        
+                        # Add document-specific data
+                        if doc_type_value == DocumentType.BANK_STATEMENT:
+                            doc_data.update({
+                                'account_number': account_number.value,
+                                'opening_balance': opening_balance.value,
+                                'closing_balance': closing_balance.value,
+                                'statement_date': statement_date.value.isoformat() if statement_date.value else None
+                            })
+                        elif doc_type_value == DocumentType.PAYSLIP:
+                            doc_data.update({
+                                'employer_name': employer_name.value,
+                                'gross_pay': gross_pay.value,
+                                'net_pay': net_pay.value,
+                                'pay_date': pay_date.value.isoformat() if pay_date.value else None
+                            })
+                        elif doc_type_value == DocumentType.IRP:
+                            doc_data.update({
+                                'irp_number': irp_number.value,
+                                'nationality': nationality.value,
+                                'expiry_date': expiry_date.value.isoformat() if expiry_date.value else None
+                            })
+                        elif doc_type_value == DocumentType.PPSN:
+                            doc_data.update({
+                                'ppsn_number': ppsn_number.value,
+                                'issue_date': issue_date.value.isoformat() if issue_date.value else None
+                            })
+                        elif doc_type_value == DocumentType.TAX_RECORD:
+                            doc_data.update({
+                                'tax_year': tax_year.value,
+                                'total_income': total_income.value,
+                                'tax_paid': tax_paid.value
+                            })
+                        
+                        # Create document object
+                        document = Document(**doc_data)
+                        store.add_document(document, application_id)
+                        
+                        # Update document list
+                        update_document_list()
+                        
+                        # Show success notification
+                        ui.notify(f'{doc_type_value.value} added successfully', type='positive')
+                    
+                    ui.button('Add Document', on_click=add_document).classes('bg-blue-500 text-white')
                 
-                def increment():
-                    global count
-                    count += 1
-                    label.text = str(count)
-                    logger.info(f"Counter incremented to {count}")
+                # File upload: PDFs and scanned images are extracted page by page
+                with ui.card().classes('w-full mt-4'):
+                    ui.label('Extract Documents from Files').classes('text-xl font-bold mb-4')
+                    ui.label('Upload PDFs or scanned images; each document found is added as its pages are read.') \
+                        .classes('text-gray-600 mb-2')
+                    extraction_status = ui.label()
+                    extraction_progress = ui.linear_progress(show_value=False).props('indeterminate').classes('w-full mb-2')
+                    extraction_progress.visible = False
+                    
+                    async def extract_upload(path: str, kind: str, name: str):
+                        extraction_progress.visible = True
+                        try:
+                            events = extract_documents(path, kind, filename=name, application_id=application_id, validate=False)
+                            # Pages are read on the extraction workers; the page stays responsive
+                            async for event in iterate_in_threadpool(events):
+                                if isinstance(event, ExtractedPage):
+                                    extraction_status.text = f'{name}: read page {event.page}'
+                                elif isinstance(event, ExtractedDocument):
+                                    update_document_list()
+                                elif isinstance(event, ExtractionReport):
+                                    extraction_status.text = (
+                                        f'{name}: {event.documents} documents from {event.pages} pages'
+                                        + (f', {event.failed_pages} pages unreadable' if event.failed_pages else '')
+                                    )
+                        except ExtractionError as exc:
+                            ui.notify(f'Could not extract {name}: {exc}', type='negative')
+                        finally:
+                            extraction_progress.visible = False
+                            await asyncio.get_running_loop().run_in_executor(None, remove_spooled, path)
+                    
+                    def handle_upload(e):
+                        # Spool now: the upload's temporary file does not outlive the request
+                        try:
+                            path = spool_file(e.content)
+                        except ExtractionError as exc:
+                            ui.notify(str(exc), type='negative')
+                            return None
+                        try:
+                            kind = detect_kind(path)
+                        except ExtractionError as exc:
+                            remove_spooled(path)
+                            ui.notify(f'{e.name}: {exc}', type='negative')
+                            return None
+                        return extract_upload(path, kind, e.name)
+                    
+                    ui.upload(on_upload=handle_upload, multiple=True, auto_upload=True) \
+                        .props('accept=".pdf,.png,.jpg,.jpeg,.tif,.tiff"').classes('w-full')
                 
-                def decrement():
-                    global count
-                    count -= 1
-                    label.text = str(count)
-                    logger.info(f"Counter decremented to {count}")
+                # Document list
+                with ui.card().classes('w-full mt-4'):
+                    ui.label('Uploaded Documents').classes('text-xl font-bold mb-4')
+                    
+                    # Paged on the server: only the visible page is loaded and sent to the browser
+                    document_table = PagedTable(
+                        columns=[
+                            {'name': 'type', 'label': 'Document Type', 'field': 'type', 'align': 'left'},
+                            {'name': 'customer_name', 'label': 'Customer', 'field': 'customer_name', 'align': 'left'},
+                            {'name': 'upload_date', 'label': 'Uploaded', 'field': 'upload_date', 'align': 'left'},
+                            {'name': 'actions', 'label': '', 'field': 'id', 'align': 'right'},
+                        ],
+                        fetch=lambda offset, limit: [
+                            document_row(doc)
+                            for doc in store.list_documents(application_id=application_id, offset=offset, limit=limit)
+                        ],
+                        count=lambda: store.count_documents(application_id=application_id),
+                    )
+                    document_table.table.props('no-data-label="No documents uploaded yet"')
+                    document_table.table.add_slot('body-cell-actions', r'''
+                        <q-td :props="props">
+                            <q-btn size="sm" color="primary" label="View" class="q-mr-sm"
+                                   @click="() => $parent.$emit('view', props.row)" />
+                            <q-btn size="sm" color="negative" label="Remove"
+                                   @click="() => $parent.$emit('remove', props.row)" />
+                        </q-td>
+                    ''')
+                    
+                    def update_document_list():
+                        document_table.refresh()
+                    
+                    def view_document(e):
+                        ui.notify(f"Viewing document: {e.args['id']}")
+                        # In a full implementation, this would show document details
+                    
+                    def remove_document(e):
+                        document_id = e.args['id']
+                        store.remove_document(document_id)
+                        document_table.refresh()
+                        # The store drops the document's result too
+                        if document_id in summary:
+                            summary.remove(document_id)
+                            refresh_results()
+                        ui.notify('Document removed', type='warning')
+                    
+                    document_table.table.on('view', view_document)
+                    document_table.table.on('remove', remove_document)
+                    update_document_list()
                 
-                ui.button('−', on_click=decrement).props('round color=red').classes('text-xl')
-                ui.button('+', on_click=increment).props('round color=green').classes('text-xl')
+                # Validation button
+                with ui.card().classes('w-full mt-4'):
+                    ui.label('Run Validation').classes('text-xl font-bold mb-4')
+                    
+                    validation_progress = ui.linear_progress(show_value=False).props('indeterminate').classes('w-full mb-2')
+                    validation_progress.visible = False
+                    
+                    async def run_validation():
+                        # Storage calls are blocking SQLite queries: keep them off the event loop
+                        loop = asyncio.get_running_loop()
+                        current_documents = await loop.run_in_executor(
+                            None, lambda: store.list_documents(application_id=application_id, limit=None)
+                        )
+                        if not current_documents:
+                            ui.notify('No documents to validate', type='negative')
+                            return
+                        
+                        # Re-validate off the event loop; only documents changed since the
+                        # last run (and the cross-document checks they feed) are re-checked
+                        validation_progress.visible = True
+                        try:
+                            # Pick up documents other workers stored since the last run
+                            await loop.run_in_executor(None, indexes.refresh)
+                            await loop.run_in_executor(None, templates.refresh)
+                            stream = ResultStream(loop)
+                            
+                            def sync():
+                                try:
+                                    return validator.sync(current_documents, on_result=stream.put)
+                                finally:
+                                    stream.close()
+                            
+                            running = loop.run_in_executor(None, sync)
+                            # Show each result as soon as its document is checked; the
+                            # cross-document findings follow with the final results
+                            tabs.set_value(results_tab)
+                            async for batch in stream.batches():
+                                await loop.run_in_executor(None, store.replace_results, batch, application_id)
+                                for result in batch:
+                                    summary.update(result)
+                                update_results_display(batch)
+                            revalidation = await running
+                        except Exception as exc:
+                            ui.notify(f'Validation failed: {exc}', type='negative')
+                            return
+                        finally:
+                            validation_progress.visible = False
+                        
+                        def store_results():
+                            if revalidation.full:
+                                # First run on this page: replace whatever was stored before
+                                store.clear_results(application_id)
+                                store.add_results(revalidation.results, application_id)
+                            else:
+                                store.replace_results(revalidation.results, application_id)
+                        
+                        await loop.run_in_executor(None, store_results)
+                        if revalidation.full:
+                            summary.clear()
+                        for document_id in revalidation.removed:
+                            summary.remove(document_id)
+                        for result in revalidation.results:
+                            summary.update(result)
+                        
+                        # Only the changed rows are sent
+                        if revalidation.full:
+                            refresh_results()
+                        else:
+                            update_results_display(revalidation.results)
+                        
+                        ui.notify(
+                            f'Validation completed: re-checked {revalidation.documents_checked} of '
+                            f'{len(current_documents)} documents',
+                            type='positive',
+                        )
+                    
+                    ui.button('Validate All Documents', on_click=run_validation).classes('bg-green-600 text-white')
             
-            # Color picker demo
-            ui.label('Color Picker Demo').classes('font-bold mt-4')
-            color = ui.color_picker('Choose a color', value='#6366F1')
+            # Validation Rules Panel
+            with ui.tab_panel(validation_tab):
+                with ui.card().classes('w-full'):
+                    ui.label('Document Validation Rules').classes('text-xl font-bold mb-4')
+                    
+                    # Display validation rules for each document type
+                    with ui.tabs().classes('w-full') as rule_tabs:
+                        for doc_type in DocumentType:
+                            ui.tab(doc_type.value)
+                    
+                    with ui.tab_panels(rule_tabs).classes('w-full'):
+                        for doc_type in DocumentType:
+                            with ui.tab_panel(ui.tab(doc_type.value)):
+                                rules = get_validation_rules(doc_type)
+                                
+                                ui.table(
+                                    columns=[
+                                        {'name': 'category', 'label': 'Rule Category', 'field': 'category', 'align': 'left'},
+                                        {'name': 'description', 'label': 'Description', 'field': 'description', 'align': 'left'},
+                                        {'name': 'severity', 'label': 'Severity', 'field': 'severity', 'align': 'left'},
+                                    ],
+                                    rows=rules,
+                                    row_key='rule_id',
+                                ).classes('w-full')
             
-            with ui.row().classes('items-center mt-2'):
-                ui.label('Selected color:')
-                with ui.element('div').classes('w-8 h-8 rounded border border-gray-300').bind_style_from(color, 'background-color'):
-                    pass
-                ui.label().bind_text_from(color)
-    
-    # Call to action section
-    with ui.column().classes('w-full bg-blue-900 text-white p-8 text-center'):
-        ui.label('Ready to Build Your Python Web App?').classes('text-3xl font-bold mb-4')
-        ui.label('Get started with Project Base today and create amazing web applications with pure Python').classes('text-xl mb-6')
-        ui.button('Start Building Now', on_click=lambda: ui.notify('Project initialized!')).props('size=large color=white text-blue-900 push')
-        
-    # Footer
-    with ui.footer().classes('w-full bg-gray-800 text-white p-4 text-center'):
-        ui.label(f'© {datetime.now().year} Project Base. All rights reserved.')
-        ui.label('Built with Python and NiceGUI').classes('text-sm text-gray-400 mt-1')
-        with ui.card().classes('w-full mt-4'):
-            ui.label('Sample Chart').classes('text-xl')
-            chart = ui.chart({
-                'title': {'text': 'Sample Data'},
-                'xAxis': {'categories': ['Jan', 'Feb', 'Mar', 'Apr', 'May']},
-                'series': [{
-                    'name': 'Data Series 1',
-                    'data': [29, 71, 106, 129, 144]
-                }, {
-                    'name': 'Data Series 2',
-                    'data': [80, 120, 105, 110, 95]
-                }]
-            }).classes('h-64')
-
-# API endpoints can be added with FastAPI
-@app.get('/api/health')
-def health_check():
-    """Health check endpoint."""
-    return {'status': 'ok'}
-
-# Configure app
-app.title = 'NiceGUI Application'
-
-# This is needed for the main.py integration
-if __name__ == '__main__':
-    ui.run()
\ No newline at end of file
+            # Results Panel
+            with ui.tab_panel(results_tab):
+                # Kept as running totals and adjusted per changed result
+                summary = SeveritySummary(store.result_counts(application_id))
+                
+                with ui.card().classes('w-full mb-4 bg-blue-50'):
+                    ui.label('Validation Summary').classes('text-xl font-bold mb-2')
+                    
+                    with ui.row().classes('gap-4'):
+                        with ui.card().classes('bg-white'):
+                            ui.label('Documents').classes('font-bold')
+                            documents_label = ui.label()
+                        
+                        with ui.card().classes('bg-white'):
+                            ui.label('Total Issues').classes('font-bold')
+                            issues_label = ui.label()
+                        
+                        with ui.card().classes('bg-red-100'):
+                            ui.label('High Severity').classes('font-bold text-red-700')
+                            high_label = ui.label().classes('text-red-700')
+                        
+                        with ui.card().classes('bg-yellow-100'):
+                            ui.label('Medium Severity').classes('font-bold text-yellow-700')
+                            medium_label = ui.label().classes('text-yellow-700')
+                        
+                        with ui.card().classes('bg-blue-100'):
+                            ui.label('Low Severity').classes('font-bold text-blue-700')
+                            low_label = ui.label().classes('text-blue-700')
+                
+                def update_summary():
+                    documents_label.text = str(summary.documents)
+                    issues_label.text = str(summary.issues)
+                    high_label.text = str(summary.totals['HIGH'])
+                    medium_label.text = str(summary.totals['MEDIUM'])
+                    low_label.text = str(summary.totals['LOW'])
+                
+                results_table = PagedTable(
+                    columns=[
+                        {'name': 'document', 'label': 'Document', 'field': 'document', 'align': 'left'},
+                        {'name': 'status', 'label': 'Status', 'field': 'status', 'align': 'left'},
+                        {'name': 'issues', 'label': 'Issues', 'field': 'issues', 'align': 'left'},
+                    ],
+                    fetch=lambda offset, limit: [
+                        result_row(result)
+                        for result in store.list_results(application_id=application_id, offset=offset, limit=limit)
+                    ],
+                    count=lambda: summary.documents,
+                )
+                results_table.table.props('no-data-label="No validation results yet"')
+                results_table.table.add_slot('body-cell-status', r'''
+                    <q-td :props="props">
+                        <q-badge :color="props.value === 'VALID' ? 'green' : 'red'" :label="props.value" />
+                    </q-td>
+                ''')
+                results_table.table.add_slot('body-cell-issues', r'''
+                    <q-td :props="props" style="white-space: normal">
+                        <div v-if="props.value.length === 0" class="text-green-600">No issues detected</div>
+                        <div v-for="issue in props.value" class="q-mb-sm">
+                            <q-badge :color="{HIGH: 'red', MEDIUM: 'orange', LOW: 'blue'}[issue.severity]" :label="issue.severity" />
+                            <span class="q-ml-sm text-weight-medium">{{ issue.category }}:</span>
+                            {{ issue.description }}
+                            <div class="text-caption text-grey-7">{{ issue.recommendation }}</div>
+                        </div>
+                    </q-td>
+                ''')
+                
+                def refresh_results():
+                    """Reload the visible page, e.g. after a full run or a removal."""
+                    results_table.refresh()
+                    update_summary()
+                
+                def update_results_display(changed: List[ValidationResult]):
+                    """Patch only the changed results into the visible page."""
+                    results_table.patch([result_row(result) for result in changed], summary.documents)
+                    update_summary()
+                
+                refresh_results()
@@ -1,16 +1,15 @@
 from fastapi import Request
 from fastapi.responses import HTMLResponse
 from . import router
-from .. import templates
-import os
-from datetime import datetime
+from .. import get_templates
+from ..core.logging_config import get_logger
+
+logger = get_logger(__name__)
 
 @router.get('/', response_class=HTMLResponse)
 async def index(request: Request):
     """Serves the main index page using Jinja2 templates."""
-    import logging
-    logger = logging.getLogger(__name__)
-
+    templates = get_templates()
     if not templates:
         error_msg = "Templates support is not configured. Check app/__init__.py."
         logger.error(error_msg)
@@ -24,7 +23,7 @@ async def index(request: Request):
         # The existence of 'templates' object implies it's configured.
         # FastAPI/Starlette's Jinja2Templates will raise an internal error if the specific template is not found.
         # This will be caught by the generic exception handler.
-        logger.info(f"Attempting to render index.html")
+        logger.debug("Rendering index.html")
         return templates.TemplateResponse("index.html", {"request": request, "url": "/"})
     except Exception as e:
         # This will catch errors if index.html is missing or if there's a rendering error within the template itself.
@@ -34,7 +33,7 @@ async def index(request: Request):
         # It's often better to let the centralized error handlers deal with the response
         # For now, returning a simple HTML error for clarity during development.
         return HTMLResponse(
-            content=f"<html><body><h1>Application Error</h1><p>Could not render the page. Please check logs.</p></body></html>",
+            content="<html><body><h1>Application Error</h1><p>Could not render the page. Please check logs.</p></body></html>",
             status_code=500
         )
 
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+
+
+class CustomerMatch(BaseModel):
+    """Model representing a previously seen customer whose name matches a query"""
+    name: str = Field(..., description="Customer name as written on a stored document")
+    normalized_name: str = Field(..., description="Normalized form the name was matched on")
+    score: float = Field(..., description="Similarity to the query, from 0 to 1")
@@ -1,7 +1,9 @@
 from enum import Enum
-from typing import List, Dict, Any, Optional
+from typing import Annotated, List, Dict, Any, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+
+import numpy as np
+from pydantic import BaseModel, Field, PlainSerializer, PlainValidator, WithJsonSchema, computed_field, model_validator
 
 
 class DocumentType(str, Enum):
@@ -12,6 +14,89 @@ class DocumentType(str, Enum):
     TAX_RECORD = "Tax Record"
 
 
+def _array_field(dtype: str, to_list, item_schema: dict):
+    """A NumPy array field, validated from and serialized to a JSON list."""
+    def validate(value) -> np.ndarray:
+        array = np.asarray(value, dtype=dtype)
+        if array.ndim != 1:
+            raise ValueError("expected a flat list")
+        return array
+    return Annotated[
+        np.ndarray,
+        PlainValidator(validate),
+        PlainSerializer(to_list),
+        WithJsonSchema({"type": "array", "items": item_schema}),
+    ]
+
+
+DateArray = _array_field("datetime64[D]", lambda a: np.datetime_as_string(a).tolist(), {"type": "string", "format": "date"})
+AmountArray = _array_field("float64", lambda a: [None if v != v else v for v in a.tolist()], {"type": ["number", "null"]})
+
+
+class Transactions(BaseModel):
+    """Model representing the lines of a bank statement, one NumPy array per column
+
+    Accepts either columns (``{"dates": [...], "amounts": [...], ...}``) or a
+    list of lines (``[{"date": ..., "amount": ..., "balance": ...}, ...]``).
+    Amounts are signed (credits positive); ``balances`` is the running
+    balance printed after each line, NaN where none is printed.
+    """
+    dates: DateArray
+    amounts: AmountArray
+    balances: Optional[AmountArray] = None
+    descriptions: Optional[List[str]] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_lines(cls, data: Any) -> Any:
+        if not isinstance(data, list):
+            return data
+        columns = {
+            "dates": [line.get("date") for line in data],
+            "amounts": [line.get("amount") for line in data],
+        }
+        if any(line.get("balance") is not None for line in data):
+            columns["balances"] = [line.get("balance") for line in data]
+        if any(line.get("description") is not None for line in data):
+            columns["descriptions"] = [line.get("description") or "" for line in data]
+        return columns
+
+    @model_validator(mode="after")
+    def _check_lengths(self) -> "Transactions":
+        size = len(self.dates)
+        if np.isnan(self.amounts).any():
+            raise ValueError("every line needs an amount")
+        for name in ("amounts", "balances", "descriptions"):
+            column = getattr(self, name)
+            if column is not None and len(column) != size:
+                raise ValueError(f"{name} has {len(column)} entries for {size} dates")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Transactions):
+            return NotImplemented
+        return (
+            np.array_equal(self.dates, other.dates)
+            and np.array_equal(self.amounts, other.amounts, equal_nan=True)
+            and (self.balances is None) == (other.balances is None)
+            and (self.balances is None or np.array_equal(self.balances, other.balances, equal_nan=True))
+            and self.descriptions == other.descriptions
+        )
+
+
+class PageLayout(BaseModel):
+    """Model representing perceptual hashes of a document's first page
+
+    Hashes are 64-bit, written as 16 hex digits: one of the whole page and
+    one per named region (logo, header, seal) for locating a deviation.
+    """
+    hash: str = Field(..., pattern=r"^[0-9a-f]{16}$")
+    regions: Dict[str, str] = {}
+
+
 class Document(BaseModel):
     """Base model for all document types"""
     id: str
@@ -20,6 +105,8 @@ class Document(BaseModel):
     customer_dob: Optional[str] = None
     customer_address: Optional[str] = None
     upload_date: str
+    issuer: Optional[str] = Field(None, description="Issuing bank, employer or authority, if known")
+    layout: Optional[PageLayout] = None
     
     # Document-specific fields - these will be populated based on document type
     # Bank Statement fields
@@ -27,6 +114,7 @@ class Document(BaseModel):
     opening_balance: Optional[float] = None
     closing_balance: Optional[float] = None
     statement_date: Optional[str] = None
+    transactions: Optional[Transactions] = None
     
     # Payslip fields
     employer_name: Optional[str] = None
@@ -49,6 +137,15 @@ class Document(BaseModel):
     tax_paid: Optional[float] = None
 
 
+# Contribution of one issue of each severity to a result's risk score
+SEVERITY_WEIGHTS: Dict[str, float] = {"HIGH": 1.0, "MEDIUM": 0.3, "LOW": 0.1}
+
+
+def risk_score(issues: List["ValidationIssue"]) -> float:
+    """Summed severity weight of ``issues``: 1.0 per HIGH issue."""
+    return sum(SEVERITY_WEIGHTS.get(issue.severity, 0.0) for issue in issues)
+
+
 class ValidationIssue(BaseModel):
     """Model representing a validation issue found in a document"""
     severity: str = Field(..., description="HIGH, MEDIUM, or LOW")
@@ -64,4 +161,10 @@ class ValidationResult(BaseModel):
     customer_name: str
     validation_date: str
     issues: List[ValidationIssue] = []
-    is_valid: bool = True
\ No newline at end of file
+    is_valid: bool = True
+    skipped_checks: List[str] = Field([], description="Checks fast triage did not run once the risk threshold was reached")
+
+    @computed_field
+    @property
+    def risk_score(self) -> float:
+        return round(risk_score(self.issues), 4)
\ No newline at end of file
@@ -0,0 +1,32 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from .document import Document, DocumentType, ValidationResult
+
+
+class ExtractedPage(BaseModel):
+    """Model representing what was read from one page of an uploaded file"""
+    page: int = Field(..., description="1-based page (or image frame) number")
+    document_type: Optional[DocumentType] = Field(None, description="Type named on the page, if any")
+    fields: List[str] = Field([], description="Document fields found on the page")
+    lines: int = Field(0, description="Bank statement lines found on the page")
+    error: Optional[str] = None
+
+
+class ExtractedDocument(BaseModel):
+    """Model representing a document assembled from one or more pages, with its validation"""
+    document: Document
+    first_page: int
+    last_page: int
+    result: Optional[ValidationResult] = None
+
+
+class ExtractionReport(BaseModel):
+    """Model summarising the extraction of one uploaded file"""
+    application_id: Optional[str] = None
+    filename: Optional[str] = None
+    pages: int = 0
+    failed_pages: int = 0
+    documents: int = 0
+    elapsed_seconds: float = 0.0
+    pages_per_second: float = 0.0
@@ -0,0 +1,20 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class IngestError(BaseModel):
+    """Model representing a record rejected during bulk ingestion"""
+    line: int = Field(..., description="1-based line number in the uploaded feed")
+    error: str = Field(..., description="Why the record was rejected")
+
+
+class IngestReport(BaseModel):
+    """Model summarising a bulk ingestion run"""
+    application_id: Optional[str] = None
+    accepted: int = 0
+    rejected: int = 0
+    errors: List[IngestError] = []
+    errors_truncated: bool = False
+    job_ids: List[str] = Field([], description="Validation jobs queued for the accepted documents")
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
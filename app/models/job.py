@@ -0,0 +1,31 @@
+from enum import Enum
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ValidationJob(BaseModel):
+    """Model representing the progress of a background validation job"""
+    id: str
+    status: JobStatus = JobStatus.PENDING
+    total: int = Field(..., description="Number of documents submitted")
+    completed: int = Field(0, description="Number of documents validated so far")
+    application_id: Optional[str] = Field(None, description="Application the results are stored under")
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    revised: List[int] = Field(
+        default_factory=list,
+        description="Positions of results changed by the cross-document checks after they were first reported",
+    )
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
@@ -0,0 +1,18 @@
+from enum import Enum
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class RegistryKind(str, Enum):
+    PPSN = "ppsn"
+    ACCOUNT = "account"
+    EMPLOYER = "employer"
+
+
+class RegistryRecord(BaseModel):
+    """Model representing what an official registry holds for one identifier"""
+    kind: RegistryKind
+    key: str = Field(..., description="PPSN, IBAN or employer name as looked up")
+    name: Optional[str] = Field(None, description="Registered holder: person, account holder or company")
+    dob: Optional[str] = Field(None, description="Registered date of birth, for PPSNs")
+    status: Optional[str] = Field(None, description="Registry status, e.g. active, closed, dissolved")
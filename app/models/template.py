@@ -0,0 +1,23 @@
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+from .document import DocumentType, PageLayout
+
+
+class LayoutTemplate(BaseModel):
+    """Model representing a known genuine layout of one issuer's document"""
+    id: str
+    document_type: DocumentType
+    issuer: str = Field(..., description="Issuing bank, employer or authority")
+    name: Optional[str] = Field(None, description="e.g. 'Current account statement, 2023 layout'")
+    layout: PageLayout
+    added_at: str
+
+
+class TemplateMatch(BaseModel):
+    """Model representing how closely a document's layout matches one template"""
+    template_id: str
+    issuer: str
+    name: Optional[str] = None
+    distance: int = Field(..., description="Bits of the 64-bit page hash that differ")
+    region_distances: Dict[str, int] = {}
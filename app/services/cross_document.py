@@ -0,0 +1,233 @@
+"""Cross-document checks.
+
+These rules compare the documents of one application with each other and,
+for fraud-ring detection, with the historical ``DocumentIndex``. Every check
+works from index postings, so an application of n documents costs O(n)
+lookups rather than O(n²) pairwise comparisons. Names and employers are
+compared fuzzily (``name_matching``), scoring only pairs that share a block.
+"""
+from dataclasses import dataclass
+from statistics import median
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.logging_config import get_logger
+from app.models.document import Document, DocumentType, ValidationIssue
+from .document_index import FUZZY_THRESHOLDS, KEY_FIELDS, DocumentIndex
+from .name_matching import cluster, similarity
+
+logger = get_logger(__name__)
+
+# Relative gap tolerated between annualised payslip pay and declared income
+SALARY_TOLERANCE = 0.3
+PAY_PERIODS_PER_YEAR = 12
+
+# (document id, issue description) pairs produced by a check
+Findings = Iterable[Tuple[str, str]]
+
+
+@dataclass(frozen=True)
+class CrossDocumentRule:
+    """A check over a whole application, optionally consulting history.
+
+    ``fields`` are the document fields the check reads; a change to any of
+    them on one document can change the findings for the others. ``source``
+    is the generated code of a rule compiled from a rule file.
+    """
+    rule_id: str
+    category: str
+    description: str
+    severity: str
+    recommendation: str
+    check: Callable[[DocumentIndex, Optional[DocumentIndex]], Findings]
+    fields: Tuple[str, ...] = ()
+    source: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "rule_id": self.rule_id,
+            "category": self.category,
+            "description": self.description,
+            "severity": self.severity,
+        }
+
+
+def _majority_mismatch(key: str, label: str) -> Callable[[DocumentIndex, Optional[DocumentIndex]], Findings]:
+    """Flag documents whose ``key`` differs from the value most documents agree on."""
+    field = KEY_FIELDS[key]
+
+    def check(application: DocumentIndex, history: Optional[DocumentIndex]) -> Findings:
+        counts = application.key_counts(key)
+        if len(counts) < 2:
+            return
+        # Most common value wins; ties are broken deterministically
+        expected = min(counts, key=lambda value: (-counts[value], value))
+        reference = getattr(application.get(next(iter(application.ids_for(key, expected)))), field)
+        for value in counts:
+            if value == expected:
+                continue
+            for doc_id in sorted(application.ids_for(key, value)):
+                found = getattr(application.get(doc_id), field)
+                yield doc_id, (
+                    f"{label} '{found}' does not match '{reference}' "
+                    f"on {counts[expected]} other document(s) in the application"
+                )
+    return check
+
+
+def _fuzzy_majority_mismatch(key: str, label: str) -> Callable[[DocumentIndex, Optional[DocumentIndex]], Findings]:
+    """Like ``_majority_mismatch``, but values that match fuzzily count as one.
+
+    Variants such as "J. Murphy" and "John Murphy" are grouped first; the
+    group most documents fall in wins, and documents outside it are flagged.
+    """
+    field = KEY_FIELDS[key]
+
+    def check(application: DocumentIndex, history: Optional[DocumentIndex]) -> Findings:
+        counts = application.key_counts(key)
+        if len(counts) < 2:
+            return
+        groups = cluster(counts, FUZZY_THRESHOLDS[key])
+        if len(groups) < 2:
+            return
+        sizes = [sum(counts[value] for value in group) for group in groups]
+        # Largest group wins; groups are sorted, so ties go to the first
+        expected = max(range(len(groups)), key=lambda index: (sizes[index], -index))
+        common = min(groups[expected], key=lambda value: (-counts[value], value))
+        reference = getattr(application.get(next(iter(application.ids_for(key, common)))), field)
+        for index, group in enumerate(groups):
+            if index == expected:
+                continue
+            for value in group:
+                for doc_id in sorted(application.ids_for(key, value)):
+                    found = getattr(application.get(doc_id), field)
+                    yield doc_id, (
+                        f"{label} '{found}' does not match '{reference}' "
+                        f"on {sizes[expected]} other document(s) in the application"
+                    )
+    return check
+
+
+def _of_type(application: DocumentIndex, doc_type: DocumentType) -> List[Document]:
+    return [doc for doc in application if doc.type == doc_type]
+
+
+def _check_employer(application: DocumentIndex, history: Optional[DocumentIndex]) -> Findings:
+    payslip_employers = {
+        application.keys_of(doc.id).get("employer")
+        for doc in _of_type(application, DocumentType.PAYSLIP)
+    } - {None}
+    if not payslip_employers:
+        return
+    for doc in _of_type(application, DocumentType.TAX_RECORD):
+        employer = application.keys_of(doc.id).get("employer")
+        # An application has a handful of payslips, so every pair is scored
+        if employer is not None and all(
+            similarity(employer, other) < FUZZY_THRESHOLDS["employer"] for other in payslip_employers
+        ):
+            yield doc.id, f"Employer '{doc.employer_name}' on the tax record does not match any payslip"
+
+
+def _check_salary(application: DocumentIndex, history: Optional[DocumentIndex]) -> Findings:
+    gross = [doc.gross_pay for doc in _of_type(application, DocumentType.PAYSLIP) if doc.gross_pay]
+    if not gross:
+        return
+    annualised = median(gross) * PAY_PERIODS_PER_YEAR
+    for doc in _of_type(application, DocumentType.TAX_RECORD):
+        if doc.total_income and abs(annualised - doc.total_income) > SALARY_TOLERANCE * doc.total_income:
+            yield doc.id, (
+                f"Declared income €{doc.total_income:,.2f} differs from annualised payslip "
+                f"gross pay €{annualised:,.2f} by more than {SALARY_TOLERANCE:.0%}"
+            )
+
+
+def _shared_identifier(key: str, label: str) -> Callable[[DocumentIndex, Optional[DocumentIndex]], Findings]:
+    """Flag identifiers that history shows on documents of a different customer."""
+    def check(application: DocumentIndex, history: Optional[DocumentIndex]) -> Findings:
+        if history is None:
+            return
+        for doc in application:
+            keys = application.keys_of(doc.id)
+            value = keys.get(key)
+            if value is None:
+                continue
+            owner = keys.get("name")
+            # Exact owner keys differ for "J. Murphy" and "John Murphy"; only a fuzzy mismatch is another customer
+            others = [
+                other_id for other_id in history.ids_with_other_owner(key, value, owner)
+                if other_id not in application
+                and similarity(owner, history.owner_of(other_id)) < FUZZY_THRESHOLDS["name"]
+            ]
+            if others:
+                yield doc.id, f"{label} also appears on {len(others)} document(s) submitted by a different customer"
+    return check
+
+
+CROSS_DOCUMENT_RULES: Tuple[CrossDocumentRule, ...] = (
+    CrossDocumentRule("XDOC-001", "Cross-Document Verification", "Customer name must match across all documents", "HIGH",
+                      "Confirm the customer's legal name against photo ID",
+                      _fuzzy_majority_mismatch("name", "Customer name"), ("customer_name",)),
+    CrossDocumentRule("XDOC-002", "Cross-Document Verification", "Date of birth must match across all documents", "HIGH",
+                      "Confirm the date of birth against photo ID",
+                      _majority_mismatch("dob", "Date of birth"), ("customer_dob",)),
+    CrossDocumentRule("XDOC-003", "Cross-Document Verification", "Address must match across all documents", "MEDIUM",
+                      "Request a recent proof of address",
+                      _majority_mismatch("address", "Address"), ("customer_address",)),
+    CrossDocumentRule("XDOC-004", "Cross-Document Verification", "PPSN on tax records must match the PPSN and IRP documents", "HIGH",
+                      "Verify the PPSN with the Department of Social Protection",
+                      _majority_mismatch("ppsn", "PPSN"), ("ppsn_number",)),
+    CrossDocumentRule("XDOC-005", "Cross-Document Verification", "Employer on the tax record must match the payslip", "MEDIUM",
+                      "Confirm current employment with the employer",
+                      _check_employer, ("type", "employer_name")),
+    CrossDocumentRule("XDOC-006", "Cross-Document Verification", "Declared income must be consistent with payslip salary", "MEDIUM",
+                      "Ask the customer to explain the difference in income",
+                      _check_salary, ("type", "gross_pay", "total_income")),
+    CrossDocumentRule("XDOC-007", "Behavioral & Contextual", "PPSN must not be used by another customer", "HIGH",
+                      "Escalate to the fraud team as a possible identity-sharing ring",
+                      _shared_identifier("ppsn", "PPSN"), ("ppsn_number", "customer_name")),
+    CrossDocumentRule("XDOC-008", "Behavioral & Contextual", "Bank account must not be used by another customer", "HIGH",
+                      "Escalate to the fraud team as a possible mule account",
+                      _shared_identifier("account", "Account number"), ("account_number", "customer_name")),
+)
+
+
+def get_cross_document_rules() -> List[dict]:
+    """Describe the cross-document rules, in execution order."""
+    return [rule.as_dict() for rule in CROSS_DOCUMENT_RULES]
+
+
+def run_cross_rule(
+    rule: CrossDocumentRule,
+    application: DocumentIndex,
+    history: Optional[DocumentIndex] = None,
+) -> Dict[str, List[ValidationIssue]]:
+    """Run one cross-document rule over an indexed application, keyed by document id."""
+    issues: Dict[str, List[ValidationIssue]] = {}
+    for doc_id, message in rule.check(application, history):
+        issues.setdefault(doc_id, []).append(ValidationIssue(
+            severity=rule.severity,
+            category=rule.category,
+            description=message,
+            recommendation=rule.recommendation,
+        ))
+    return issues
+
+
+def cross_validate(
+    documents: Sequence[Document],
+    history: Optional[DocumentIndex] = None,
+    rules: Sequence[CrossDocumentRule] = CROSS_DOCUMENT_RULES,
+) -> Dict[str, List[ValidationIssue]]:
+    """Run the cross-document rules over one application.
+
+    Returns the issues found keyed by document id. ``history`` is the index of
+    previously submitted documents used for fraud-ring checks; ``rules``
+    defaults to the built-in rules (the engine passes the active rule set).
+    """
+    application = DocumentIndex(documents)
+    issues: Dict[str, List[ValidationIssue]] = {}
+    for rule in rules:
+        for doc_id, rule_issues in run_cross_rule(rule, application, history).items():
+            issues.setdefault(doc_id, []).extend(rule_issues)
+    if issues:
+        logger.info(f"Cross-document checks flagged {len(issues)} of {len(documents)} documents")
+    return issues
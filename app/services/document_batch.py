@@ -0,0 +1,424 @@
+"""Columnar storage for large document sets.
+
+A ``Document`` is a wide model in which most fields are unset for any given
+type, and each instance carries a full attribute dict. ``DocumentBatch``
+instead keeps one column per field:
+
+* numeric fields are float64 arrays, NaN where unset;
+* the document type is a uint8 code;
+* every string field is dictionary encoded: int32 codes (-1 where unset)
+  into a dictionary of distinct values packed, Arrow-style, into one UTF-8
+  buffer with an offsets array;
+* nested models (statement ``transactions``, already held as NumPy arrays,
+  and the page ``layout`` hashes) are kept as object arrays of the models,
+  None where unset.
+
+Batches convert to and from ``Document`` and, when ``pyarrow`` is installed,
+to and from Arrow tables and Parquet files; the packed dictionaries map
+directly onto Arrow dictionary arrays. A batch also exposes the column
+interface the validation rules use (``batch[field]``, ``present``,
+``all_present``), so rules run over it without materializing every document.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.models.document import Document, DocumentType, PageLayout, Transactions
+
+DOCUMENT_FIELDS = tuple(Document.model_fields)
+# Fields declared as (Optional) float on Document; these become float64 columns
+NUMERIC_FIELDS = frozenset(
+    name for name, info in Document.model_fields.items()
+    if float in getattr(info.annotation, "__args__", (info.annotation,))
+)
+# Nested model fields -> their model, kept as object columns
+OBJECT_FIELDS = {"transactions": Transactions, "layout": PageLayout}
+STRING_FIELDS = tuple(
+    name for name in DOCUMENT_FIELDS if name not in NUMERIC_FIELDS and name not in OBJECT_FIELDS and name != "type"
+)
+DOCUMENT_TYPES = tuple(DocumentType)
+_TYPE_CODES = {doc_type: code for code, doc_type in enumerate(DOCUMENT_TYPES)}
+
+Rows = Union[slice, np.ndarray, Sequence[int]]
+
+
+def require_pyarrow():
+    """The pyarrow module; an ImportError naming the optional dependency when it is missing."""
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Arrow and Parquet support requires the optional 'pyarrow' package") from exc
+    return pyarrow
+
+
+def _object_value(name: str, value: dict) -> dict:
+    """A row of an Arrow object column as model input; maps come back from Arrow as lists of pairs."""
+    if name == "layout" and value.get("regions") is not None:
+        return {**value, "regions": dict(value["regions"])}
+    return value
+
+
+def _object_column(values: list) -> np.ndarray:
+    # Filled one by one: NumPy would otherwise try to unpack the models as sequences
+    column = np.empty(len(values), dtype=object)
+    for row, value in enumerate(values):
+        column[row] = value
+    return column
+
+
+class StringColumn:
+    """Dictionary-encoded column of optional strings."""
+
+    __slots__ = ("codes", "offsets", "data", "_decoded")
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray, data: bytes):
+        self.codes = codes
+        self.offsets = offsets
+        self.data = data
+        self._decoded: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_dictionary(cls, codes: np.ndarray, dictionary: Sequence[str]) -> "StringColumn":
+        """Build a column from codes and the distinct values they index."""
+        encoded = [value.encode("utf-8") for value in dictionary]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(codes.astype(np.int32, copy=False), offsets, b"".join(encoded))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def dictionary(self) -> List[str]:
+        """The distinct values, in code order."""
+        data, offsets = self.data, self.offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def value(self, row: int) -> Optional[str]:
+        if self._decoded is not None:
+            return self._decoded[row]
+        code = int(self.codes[row])
+        if code < 0:
+            return None
+        return self.data[self.offsets[code]:self.offsets[code + 1]].decode("utf-8")
+
+    def decode(self) -> np.ndarray:
+        """Object array of the values, None where unset (built once, then cached)."""
+        if self._decoded is None:
+            # One extra slot at the end holds None, so code -1 indexes it
+            lookup = np.empty(len(self.offsets), dtype=object)
+            lookup[:-1] = self.dictionary()
+            lookup[-1] = None
+            self._decoded = lookup[self.codes]
+        return self._decoded
+
+    def present(self) -> np.ndarray:
+        return self.codes >= 0
+
+    def take(self, rows: Rows) -> "StringColumn":
+        """Subset of rows sharing this column's dictionary."""
+        return StringColumn(self.codes[rows], self.offsets, self.data)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.offsets.nbytes + len(self.data)
+
+
+class RowView:
+    """Read-only attribute view of one batch row.
+
+    Stands in for a ``Document`` in rule checks, which only read fields, so
+    flagged rows need not be materialized as pydantic models.
+    """
+
+    __slots__ = ("_columns", "_row")
+
+    def __init__(self, batch: "DocumentBatch", row: int):
+        self._columns = batch.columns
+        self._row = row
+
+    def __getattr__(self, name: str):
+        return self._columns[name][self._row]
+
+
+class _ColumnLists(dict):
+    """Field name -> Python list of values, decoded from the batch on first access."""
+
+    def __init__(self, batch: "DocumentBatch"):
+        super().__init__()
+        self._batch = batch
+
+    def __missing__(self, field: str) -> list:
+        batch = self._batch
+        if field in batch.numbers:
+            values = [None if value != value else value for value in batch.numbers[field].tolist()]
+        elif field == "type":
+            values = [DOCUMENT_TYPES[code] for code in batch.types.tolist()]
+        elif field in batch.strings:
+            values = batch.strings[field].decode().tolist()
+        elif field in batch.objects:
+            values = batch.objects[field].tolist()
+        else:
+            raise AttributeError(field)
+        self[field] = values
+        return values
+
+
+class DocumentBatch:
+    """Column-oriented set of documents of any mix of types."""
+
+    def __init__(
+        self,
+        types: np.ndarray,
+        strings: Dict[str, StringColumn],
+        numbers: Dict[str, np.ndarray],
+        objects: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        self.types = types
+        self.strings = strings
+        self.numbers = numbers
+        self.objects = objects if objects is not None else {
+            name: np.full(len(types), None, dtype=object) for name in OBJECT_FIELDS
+        }
+        # Per-field Python lists backing row views, built lazily
+        self.columns = _ColumnLists(self)
+
+    # --- Construction and export ---
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document]) -> "DocumentBatch":
+        """Encode documents column by column in a single pass."""
+        types = array("B")
+        numbers = {name: array("d") for name in NUMERIC_FIELDS}
+        codes = {name: array("i") for name in STRING_FIELDS}
+        dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in STRING_FIELDS}
+        objects: Dict[str, list] = {name: [] for name in OBJECT_FIELDS}
+        nan = float("nan")
+        for document in documents:
+            types.append(_TYPE_CODES[document.type])
+            for name, column in objects.items():
+                column.append(getattr(document, name))
+            for name, column in numbers.items():
+                value = getattr(document, name)
+                column.append(nan if value is None else value)
+            for name, column in codes.items():
+                value = getattr(document, name)
+                if value is None:
+                    column.append(-1)
+                else:
+                    dictionary = dictionaries[name]
+                    code = dictionary.get(value)
+                    if code is None:
+                        code = dictionary[value] = len(dictionary)
+                    column.append(code)
+        return cls(
+            np.frombuffer(types, dtype=np.uint8).copy(),
+            {
+                name: StringColumn.from_dictionary(np.frombuffer(codes[name], dtype=np.int32).copy(), list(dictionaries[name]))
+                for name in STRING_FIELDS
+            },
+            {name: np.frombuffer(column, dtype=np.float64).copy() for name, column in numbers.items()},
+            {name: _object_column(column) for name, column in objects.items()},
+        )
+
+    def document(self, row: int) -> Document:
+        """Materialize one row as a ``Document``."""
+        values = {"type": DOCUMENT_TYPES[self.types[row]]}
+        for name, column in self.strings.items():
+            value = column.value(row)
+            if value is not None:
+                values[name] = value
+        for name, column in self.numbers.items():
+            value = column[row]
+            if value == value:  # not NaN
+                values[name] = float(value)
+        for name, column in self.objects.items():
+            if column[row] is not None:
+                values[name] = column[row]
+        return Document(**values)
+
+    def row(self, row: int) -> RowView:
+        """Lightweight attribute view of one row, for code that only reads fields."""
+        return RowView(self, row)
+
+    def to_documents(self) -> Iterator[Document]:
+        for row in range(len(self)):
+            yield self.document(row)
+
+    def to_arrow(self):
+        """Arrow table with dictionary-typed string columns (requires pyarrow)."""
+        pa = require_pyarrow()
+        arrays, names = [], []
+        names.append("type")
+        arrays.append(pa.DictionaryArray.from_arrays(
+            pa.array(self.types.astype(np.int8)), pa.array([doc_type.value for doc_type in DOCUMENT_TYPES])
+        ))
+        for name in DOCUMENT_FIELDS:
+            if name in self.numbers:
+                column = self.numbers[name]
+                arrays.append(pa.array(column, mask=np.isnan(column), type=pa.float64()))
+            elif name in self.strings:
+                column = self.strings[name]
+                # The packed dictionary is already in Arrow's string layout
+                if len(column.data) < 2 ** 31:
+                    dictionary = pa.StringArray.from_buffers(
+                        len(column.offsets) - 1, pa.py_buffer(column.offsets.astype(np.int32)), pa.py_buffer(column.data)
+                    )
+                else:
+                    dictionary = pa.LargeStringArray.from_buffers(
+                        len(column.offsets) - 1, pa.py_buffer(column.offsets), pa.py_buffer(column.data)
+                    )
+                indices = pa.array(column.codes, mask=column.codes < 0, type=pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            elif name in self.objects:
+                if not any(value is not None for value in self.objects[name]):
+                    continue
+                if name == "layout":
+                    # Region names vary between layouts, so they are map keys rather than struct fields
+                    arrays.append(pa.array([
+                        None if value is None else {"hash": value.hash, "regions": list(value.regions.items())}
+                        for value in self.objects[name]
+                    ], type=pa.struct([("hash", pa.string()), ("regions", pa.map_(pa.string(), pa.string()))])))
+                else:
+                    # A struct of lists per row
+                    arrays.append(pa.array([
+                        None if value is None else value.model_dump(mode="json") for value in self.objects[name]
+                    ]))
+            else:
+                continue
+            names.append(name)
+        return pa.Table.from_arrays(arrays, names=names)
+
+    @classmethod
+    def from_arrow(cls, table) -> "DocumentBatch":
+        """Build a batch from an Arrow table with ``Document`` column names (requires pyarrow)."""
+        pa = require_pyarrow()
+        size = table.num_rows
+
+        def column(name: str):
+            if name not in table.column_names:
+                return None
+            return table.column(name).combine_chunks()
+
+        def dictionary_parts(values) -> tuple:
+            if not pa.types.is_dictionary(values.type):
+                values = values.dictionary_encode()
+            codes = values.indices.fill_null(-1).to_numpy(zero_copy_only=False).astype(np.int32)
+            return codes, values.dictionary.to_pylist()
+
+        type_values = column("type")
+        if type_values is None:
+            raise ValueError("Arrow table has no 'type' column")
+        type_codes, type_names = dictionary_parts(type_values)
+        remap = np.array([_TYPE_CODES[DocumentType(name)] for name in type_names], dtype=np.uint8)
+        types = remap[type_codes]
+
+        strings = {}
+        for name in STRING_FIELDS:
+            values = column(name)
+            if values is None:
+                strings[name] = StringColumn(np.full(size, -1, dtype=np.int32), np.zeros(1, dtype=np.int64), b"")
+            else:
+                if not pa.types.is_dictionary(values.type):
+                    values = values.cast(pa.string())
+                strings[name] = StringColumn.from_dictionary(*dictionary_parts(values))
+        numbers = {}
+        for name in NUMERIC_FIELDS:
+            values = column(name)
+            numbers[name] = (
+                np.full(size, np.nan) if values is None
+                else values.cast(pa.float64()).fill_null(float("nan")).to_numpy(zero_copy_only=False)
+            )
+        objects = {}
+        for name, model in OBJECT_FIELDS.items():
+            values = column(name)
+            objects[name] = _object_column(
+                [None] * size if values is None
+                else [None if value is None else model.model_validate(_object_value(name, value)) for value in values.to_pylist()]
+            )
+        return cls(types, strings, numbers, objects)
+
+    def to_parquet(self, path: str) -> None:
+        require_pyarrow()
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path)
+
+    @classmethod
+    def from_parquet(cls, path: str) -> "DocumentBatch":
+        require_pyarrow()
+        import pyarrow.parquet as pq
+        return cls.from_arrow(pq.read_table(path))
+
+    # --- Column interface used by the rules ---
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        if field in self.numbers:
+            return self.numbers[field]
+        if field == "type":
+            return np.array(DOCUMENT_TYPES, dtype=object)[self.types]
+        if field in self.objects:
+            return self.objects[field]
+        return self.strings[field].decode()
+
+    def present(self, field: str) -> np.ndarray:
+        """Boolean mask of rows where ``field`` is set."""
+        if field in self.numbers:
+            return ~np.isnan(self.numbers[field])
+        if field == "type":
+            return np.ones(len(self), dtype=bool)
+        if field in self.objects:
+            column = self.objects[field]
+            return np.fromiter((value is not None for value in column), dtype=bool, count=len(column))
+        return self.strings[field].present()
+
+    def all_present(self, fields: Iterable[str]) -> np.ndarray:
+        """Boolean mask of rows where every one of ``fields`` is set."""
+        mask = np.ones(len(self), dtype=bool)
+        for field in fields:
+            mask &= self.present(field)
+        return mask
+
+    def value(self, field: str, row: int):
+        """Value of ``field`` on one row, None where unset."""
+        if field in self.numbers:
+            value = self.numbers[field][row]
+            return None if value != value else float(value)
+        if field == "type":
+            return DOCUMENT_TYPES[self.types[row]]
+        if field in self.objects:
+            return self.objects[field][row]
+        return self.strings[field].value(row)
+
+    # --- Slicing ---
+
+    def take(self, rows: Rows) -> "DocumentBatch":
+        """A new batch holding only ``rows`` (string dictionaries are shared)."""
+        return DocumentBatch(
+            self.types[rows],
+            {name: column.take(rows) for name, column in self.strings.items()},
+            {name: column[rows] for name, column in self.numbers.items()},
+            {name: column[rows] for name, column in self.objects.items()},
+        )
+
+    def rows_by_type(self) -> Dict[DocumentType, np.ndarray]:
+        """Row numbers of each document type present in the batch."""
+        return {
+            DOCUMENT_TYPES[code]: np.flatnonzero(self.types == code)
+            for code in np.unique(self.types).tolist()
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch's buffers."""
+        return (
+            self.types.nbytes
+            + sum(column.nbytes for column in self.strings.values())
+            + sum(column.nbytes for column in self.numbers.values())
+            + sum(
+                sum(array.nbytes for array in (value.dates, value.amounts, value.balances) if array is not None)
+                for value in self.objects.get("transactions", ()) if value is not None
+            )
+        )
@@ -0,0 +1,240 @@
+"""In-memory index of documents by normalized identity keys.
+
+Cross-document checks (name/DOB/address agreement, PPSN and employer
+matching, fraud-ring detection against history) look up related documents
+here instead of comparing every document with every other one. Names and
+employers are also kept in a ``BlockingIndex`` for fuzzy lookups.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.document import Document
+from .name_matching import EMPLOYER_THRESHOLD, NAME_THRESHOLD, BlockingIndex
+from .validation_rules import normalize_identifier, parse_date
+
+# Legal-form suffixes dropped from employer names before comparison
+EMPLOYER_SUFFIXES = frozenset({
+    "ltd", "limited", "dac", "plc", "teoranta", "teo", "clg", "uc", "inc", "llc", "co", "company",
+})
+
+# Honorifics dropped from personal names
+NAME_TITLES = frozenset({"mr", "mrs", "ms", "miss", "mx", "dr", "prof", "rev", "fr", "sr", "jr"})
+# Surname particles joined to the token after them, so "O'Brien" and "OBrien" agree
+NAME_PARTICLES = frozenset({"o", "mc", "mac", "de", "di", "da", "du", "le", "la", "van", "von", "st", "fitz"})
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def fold_tokens(value: str) -> List[str]:
+    """Strip accents, casefold and split ``value`` into alphanumeric tokens."""
+    if not value.isascii():
+        decomposed = unicodedata.normalize("NFKD", value)
+        value = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", value.casefold()).split()
+
+
+def name_tokens(value: str) -> List[str]:
+    """Folded tokens of a person's name, without titles and with surname particles joined on."""
+    tokens: List[str] = []
+    particle = ""
+    for token in fold_tokens(value):
+        if token in NAME_TITLES:
+            continue
+        if token in NAME_PARTICLES and not particle:
+            particle = token
+            continue
+        tokens.append(particle + token)
+        particle = ""
+    if particle:
+        tokens.append(particle)
+    return tokens
+
+
+def normalize_name(value: Optional[str]) -> Optional[str]:
+    """Order-insensitive, accent-insensitive key for a person's name."""
+    if not value:
+        return None
+    return " ".join(sorted(name_tokens(value))) or None
+
+
+def normalize_address(value: Optional[str]) -> Optional[str]:
+    """Accent- and punctuation-insensitive key for a postal address."""
+    if not value:
+        return None
+    return " ".join(fold_tokens(value)) or None
+
+
+def normalize_employer(value: Optional[str]) -> Optional[str]:
+    """Key for an employer name with legal-form suffixes removed."""
+    if not value:
+        return None
+    tokens = [token for token in fold_tokens(value) if token not in EMPLOYER_SUFFIXES]
+    return " ".join(tokens) or None
+
+
+def normalize_dob(value: Optional[str]) -> Optional[str]:
+    """ISO date key for a date of birth; unparseable values are kept as typed."""
+    if not value:
+        return None
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed else value.strip()
+
+
+def normalize_account(value: Optional[str]) -> Optional[str]:
+    """Key for an identifier such as a PPSN or IBAN."""
+    if not value:
+        return None
+    return normalize_identifier(value) or None
+
+
+# Index key -> Document field it is derived from
+KEY_FIELDS: Dict[str, str] = {
+    "name": "customer_name",
+    "dob": "customer_dob",
+    "address": "customer_address",
+    "ppsn": "ppsn_number",
+    "account": "account_number",
+    "employer": "employer_name",
+}
+
+# Index key -> normalizer applied to the raw field value
+VALUE_NORMALIZERS: Dict[str, Callable[[Optional[str]], Optional[str]]] = {
+    "name": normalize_name,
+    "dob": normalize_dob,
+    "address": normalize_address,
+    "ppsn": normalize_account,
+    "account": normalize_account,
+    "employer": normalize_employer,
+}
+
+
+# Index keys matched fuzzily, with the score at which two values match
+FUZZY_THRESHOLDS: Dict[str, float] = {
+    "name": NAME_THRESHOLD,
+    "employer": EMPLOYER_THRESHOLD,
+}
+
+
+def key_hash(normalized_value: Optional[str]) -> int:
+    """Stable 64-bit hash of a normalized key (0 when unset), for compact array indexes."""
+    if normalized_value is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(normalized_value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def owner_key(customer_name: Optional[str]) -> int:
+    """Hash identifying a document's owner by normalized customer name."""
+    return key_hash(normalize_name(customer_name))
+
+
+def document_key(document: Document, key: str) -> Optional[str]:
+    """Normalized value of index ``key`` for ``document`` (None when unset)."""
+    return VALUE_NORMALIZERS[key](getattr(document, KEY_FIELDS[key]))
+
+
+class DocumentIndex:
+    """Inverted index from normalized identity keys to document ids.
+
+    Adding, removing and looking up a document are all O(number of keys), so
+    cross-document checks over an application or the full history run in
+    linear time overall.
+    """
+
+    def __init__(self, documents: Iterable[Document] = ()):
+        self._documents: Dict[str, Document] = {}
+        self._keys: Dict[str, Dict[str, str]] = {}
+        self._postings: Dict[str, Dict[str, Set[str]]] = {key: defaultdict(set) for key in KEY_FIELDS}
+        self._blocking: Dict[str, BlockingIndex] = {key: BlockingIndex() for key in FUZZY_THRESHOLDS}
+        for document in documents:
+            self.add(document)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._documents
+
+    def __iter__(self):
+        return iter(self._documents.values())
+
+    def get(self, document_id: str) -> Optional[Document]:
+        return self._documents.get(document_id)
+
+    def add(self, document: Document) -> None:
+        """Index ``document``, replacing any previous version with the same id."""
+        if document.id in self._documents:
+            self.remove(document.id)
+        keys = {}
+        for key in KEY_FIELDS:
+            value = document_key(document, key)
+            if value is not None:
+                keys[key] = value
+                self._postings[key][value].add(document.id)
+                if key in self._blocking:
+                    self._blocking[key].add(value)
+        self._documents[document.id] = document
+        self._keys[document.id] = keys
+
+    def remove(self, document_id: str) -> None:
+        """Drop a document from the index; unknown ids are ignored."""
+        if self._documents.pop(document_id, None) is None:
+            return
+        for key, value in self._keys.pop(document_id).items():
+            postings = self._postings[key]
+            postings[value].discard(document_id)
+            if not postings[value]:
+                del postings[value]
+            if key in self._blocking:
+                self._blocking[key].remove(value)
+
+    def keys_of(self, document_id: str) -> Dict[str, str]:
+        """Normalized keys recorded for a document."""
+        return dict(self._keys.get(document_id, {}))
+
+    def owner_of(self, document_id: str) -> Optional[str]:
+        """Normalized customer name of a document."""
+        return self._keys.get(document_id, {}).get("name")
+
+    def similar(self, key: str, normalized_value: str, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Distinct values of a fuzzy ``key`` that match a normalized value, with their scores, best first."""
+        return self._blocking[key].similar(normalized_value, FUZZY_THRESHOLDS[key] if threshold is None else threshold)
+
+    def key_counts(self, key: str) -> Dict[str, int]:
+        """Number of documents per distinct normalized value of ``key``."""
+        return {value: len(ids) for value, ids in self._postings[key].items()}
+
+    def documents_for(self, key: str, normalized_value: str) -> List[Document]:
+        """Documents whose ``key`` equals an already-normalized value."""
+        return [self._documents[doc_id] for doc_id in self._postings[key].get(normalized_value, ())]
+
+    def ids_for(self, key: str, normalized_value: str) -> Set[str]:
+        """Ids of documents whose ``key`` equals an already-normalized value."""
+        return set(self._postings[key].get(normalized_value, ()))
+
+    def ids_with_other_owner(self, key: str, normalized_value: str, owner: Optional[str]) -> Set[str]:
+        """Ids of documents sharing ``key`` whose normalized customer name is not ``owner``."""
+        return {
+            doc_id for doc_id in self._postings[key].get(normalized_value, ())
+            if self._keys[doc_id].get("name") != owner
+        }
+
+    def lookup(self, key: str, value: Optional[str]) -> List[Document]:
+        """Documents whose ``key`` matches a raw value after normalization."""
+        normalized = VALUE_NORMALIZERS[key](value)
+        if normalized is None:
+            return []
+        return [self._documents[doc_id] for doc_id in self._postings[key].get(normalized, ())]
+
+    def matches(self, document: Document, key: str) -> List[Document]:
+        """Other indexed documents sharing ``document``'s value for ``key``."""
+        normalized = document_key(document, key)
+        if normalized is None:
+            return []
+        return [
+            self._documents[doc_id]
+            for doc_id in self._postings[key].get(normalized, ())
+            if doc_id != document.id
+        ]
@@ -0,0 +1,156 @@
+"""Map the text of one document page onto ``Document`` fields.
+
+Works on the plain text of a page as extracted from a PDF's text layer or
+OCR'd from an image: the document type comes from title keywords, fields
+from "Label: value" lines, and bank statement pages also yield their
+transaction lines (date, description, amount and an optional running
+balance). Pages are parsed independently, so this runs in the extraction
+worker processes and only the small result crosses back.
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.models.document import DocumentType, PageLayout
+
+# Title keywords, most specific first: payslips and tax records also mention PPS numbers
+TYPE_PATTERNS: List[Tuple[DocumentType, re.Pattern]] = [
+    (DocumentType.IRP, re.compile(r"irish\s+residen(ce|cy)\s+permit|\bIRP\b|certificate\s+of\s+registration", re.I)),
+    (DocumentType.TAX_RECORD, re.compile(
+        r"employment\s+detail\s+summary|statement\s+of\s+liability|\bP60\b|\bP21\b|tax\s+(record|return|balancing)", re.I
+    )),
+    (DocumentType.PAYSLIP, re.compile(r"pay\s*slip|pay\s+advice|net\s+pay", re.I)),
+    (DocumentType.BANK_STATEMENT, re.compile(r"bank\s+statement|statement\s+of\s+account|account\s+statement|\bIBAN\b", re.I)),
+    (DocumentType.PPSN, re.compile(r"personal\s+public\s+service\s+number|public\s+services\s+card", re.I)),
+]
+
+# Field -> labels it is printed under; the value is the rest of the line after the label
+FIELD_LABELS: Dict[str, Tuple[str, ...]] = {
+    "customer_name": ("account holder", "account name", "customer name", "employee name", "employee", "name"),
+    "customer_dob": ("date of birth", "dob", "birth date"),
+    "customer_address": ("address",),
+    "account_number": ("iban", "account number"),
+    "opening_balance": ("opening balance", "balance brought forward", "previous balance"),
+    "closing_balance": ("closing balance", "balance carried forward", "new balance"),
+    "statement_date": ("statement date", "date of statement"),
+    "employer_name": ("employer name", "employer"),
+    "gross_pay": ("gross pay", "total gross pay", "gross"),
+    "net_pay": ("net pay", "net amount"),
+    "pay_date": ("pay date", "payment date", "date paid"),
+    "irp_number": ("irp number", "permit number", "card number", "registration number"),
+    "nationality": ("nationality",),
+    "expiry_date": ("expiry date", "date of expiry", "valid until", "expires"),
+    "ppsn_number": ("ppsn", "pps number", "pps no", "personal public service number"),
+    "issue_date": ("issue date", "date of issue", "issued"),
+    "tax_year": ("tax year", "year of assessment"),
+    "total_income": ("total income", "gross income", "total pay"),
+    "tax_paid": ("tax paid", "tax deducted", "total tax"),
+}
+
+AMOUNT_FIELDS = frozenset({"opening_balance", "closing_balance", "gross_pay", "net_pay", "total_income", "tax_paid"})
+DATE_FIELDS = frozenset({"customer_dob", "statement_date", "pay_date", "expiry_date", "issue_date"})
+
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d", "%d %b %Y", "%d %B %Y", "%d %b %y", "%d/%m/%y")
+
+# "Label: value" or "Label   value"; labels are matched longest first so "gross pay" beats "gross"
+_LABEL_LINE = re.compile(
+    r"^\s*(?P<label>"
+    + "|".join(sorted({re.escape(label) for labels in FIELD_LABELS.values() for label in labels}, key=len, reverse=True))
+    + r")\b(?:\s*[:-]\s*|\s{2,}|\s+(?=[€\d-]))(?P<value>\S.*?)\s*$",
+    re.I,
+)
+_LABEL_FIELDS = {label: field for field, labels in FIELD_LABELS.items() for label in labels}
+
+_DATE = r"\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}|\d{4}-\d{2}-\d{2}|\d{1,2}\s+[A-Za-z]{3,9}\s+\d{2,4}"
+_AMOUNT = r"-?€?\s?-?\d{1,3}(?:,\d{3})*(?:\.\d{2})|-?€?\s?-?\d+\.\d{2}"
+# date, description, amount (optionally marked CR/DR or a trailing minus), optional running balance
+_TRANSACTION_LINE = re.compile(
+    rf"^\s*(?P<date>{_DATE})\s+(?P<description>.*?)\s+(?P<amount>{_AMOUNT})\s*(?P<mark>CR|DR|-)?"
+    rf"(?:\s+(?P<balance>{_AMOUNT})\s*(?P<balance_mark>CR|DR)?)?\s*$",
+    re.I,
+)
+
+# Balances printed on a dated line of their own, which are not transactions
+_BALANCE_LINE = re.compile(r"balance\s+(brought|carried)\s+forward|(opening|closing|previous|new)\s+balance", re.I)
+
+
+class ParsedPage(NamedTuple):
+    """What one page contributes to a document."""
+    page: int  # 1-based
+    document_type: Optional[str]  # DocumentType value, None when the page has no title
+    fields: Dict[str, object]
+    # (ISO date, signed amount, running balance or None, description) per statement line
+    lines: List[Tuple[str, float, Optional[float], str]]
+    error: Optional[str] = None
+    layout: Optional[PageLayout] = None  # Perceptual hashes, for pages read from an image
+
+
+def parse_date(value: str) -> Optional[str]:
+    """ISO form of a date printed in one of ``DATE_FORMATS``, else None."""
+    value = " ".join(value.replace(",", " ").split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value: str) -> Optional[float]:
+    """A printed money amount ("€1,234.50", "1234.50 DR", "-12.00") as a signed float."""
+    text = value.replace("€", "").replace(",", "").replace(" ", "").upper()
+    sign = 1.0
+    if text.endswith("DR") or text.endswith("-"):
+        sign, text = -1.0, text.rstrip("DR-")
+    elif text.endswith("CR"):
+        text = text[:-2]
+    try:
+        return sign * float(text)
+    except ValueError:
+        return None
+
+
+def detect_type(text: str) -> Optional[DocumentType]:
+    """Document type named on the page, judged from its title keywords."""
+    for document_type, pattern in TYPE_PATTERNS:
+        if pattern.search(text):
+            return document_type
+    return None
+
+
+def _field_value(field: str, value: str):
+    if field in AMOUNT_FIELDS:
+        return parse_amount(value)
+    if field in DATE_FIELDS:
+        return parse_date(value)
+    return value
+
+
+def parse_page(page: int, text: str) -> ParsedPage:
+    """Fields, statement lines and document type found in the text of one page."""
+    fields: Dict[str, object] = {}
+    lines: List[Tuple[str, float, Optional[float], str]] = []
+    for line in text.splitlines():
+        transaction = _TRANSACTION_LINE.match(line)
+        if transaction and not _BALANCE_LINE.search(transaction["description"]):
+            when = parse_date(transaction["date"])
+            amount = parse_amount(transaction["amount"] + (transaction["mark"] or ""))
+            if when is not None and amount is not None:
+                balance = transaction["balance"]
+                lines.append((
+                    when,
+                    amount,
+                    parse_amount(balance + (transaction["balance_mark"] or "")) if balance else None,
+                    transaction["description"].strip(),
+                ))
+                continue
+        labelled = _LABEL_LINE.match(line)
+        if labelled:
+            field = _LABEL_FIELDS[labelled["label"].lower()]
+            value = _field_value(field, labelled["value"])
+            # The first occurrence wins: later ones are usually totals or repeated headers
+            if value is not None and field not in fields:
+                fields[field] = value
+
+    document_type = detect_type(text)
+    return ParsedPage(page, document_type.value if document_type else None, fields, lines)
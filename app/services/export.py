@@ -0,0 +1,157 @@
+"""Streaming export of stored validation results for compliance.
+
+Exports read the store in keyset-paged batches (``DocumentStore.iter_results``)
+and encode each batch as soon as it is read, so an export of any size runs in
+constant memory and the first bytes go out straight away:
+
+- ``ndjson``: one ``ValidationResult`` per line, with its application id;
+- ``csv`` and ``parquet``: one row per issue, and one row with empty issue
+  columns for a result without issues. Parquet is written in row groups of
+  ``EXPORT_PARQUET_ROW_GROUP`` rows and needs the optional pyarrow package.
+
+With a severity filter, the issue rows are limited to issues of that severity
+or higher, as are the results selected from the store.
+"""
+import csv
+import io
+import json
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.models.document import ValidationResult
+from .document_batch import require_pyarrow
+from .storage import SEVERITIES
+
+logger = get_logger(__name__)
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+ISSUE_COLUMNS = (
+    "application_id", "document_id", "document_type", "customer_name", "validation_date", "is_valid",
+    "risk_score", "severity", "category", "description", "recommendation",
+)
+
+StoredResults = Iterable[Tuple[Optional[str], ValidationResult]]
+
+
+def issue_rows(results: StoredResults, severity: Optional[str] = None) -> Iterator[tuple]:
+    """Flatten results into one tuple per issue, in ``ISSUE_COLUMNS`` order."""
+    allowed = set(SEVERITIES[:SEVERITIES.index(severity) + 1]) if severity else None
+    for application_id, result in results:
+        base = (
+            application_id, result.document_id, result.document_type.value, result.customer_name,
+            result.validation_date, result.is_valid, result.risk_score,
+        )
+        issues = [issue for issue in result.issues if allowed is None or issue.severity in allowed]
+        if not issues:
+            yield base + (None, None, None, None)
+        for issue in issues:
+            yield base + (issue.severity, issue.category, issue.description, issue.recommendation)
+
+
+def export_csv(results: StoredResults, severity: Optional[str] = None, rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    """CSV with a header row, in chunks of ``rows_per_chunk`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ISSUE_COLUMNS)
+    for count, row in enumerate(issue_rows(results, severity), 1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def export_ndjson(results: StoredResults, rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    """One JSON result per line, in chunks of ``rows_per_chunk`` lines."""
+    lines: List[str] = []
+    for application_id, result in results:
+        lines.append(json.dumps({"application_id": application_id, **result.model_dump(mode="json")}))
+        if len(lines) >= rows_per_chunk:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file for the Parquet writer; what it has been given is taken back with ``drain``."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _table(pa, schema, rows: List[tuple]):
+    columns = zip(*rows)
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+
+def export_parquet(
+    results: StoredResults, severity: Optional[str] = None, row_group_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """Parquet file streamed one row group at a time; the footer comes last."""
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+
+    row_group_size = row_group_size or settings.EXPORT_PARQUET_ROW_GROUP
+    schema = pa.schema([
+        (name, pa.bool_() if name == "is_valid" else pa.float64() if name == "risk_score" else pa.string())
+        for name in ISSUE_COLUMNS
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        rows: List[tuple] = []
+        for row in issue_rows(results, severity):
+            rows.append(row)
+            if len(rows) >= row_group_size:
+                writer.write_table(_table(pa, schema, rows))
+                rows.clear()
+                yield sink.drain()
+        if rows:
+            writer.write_table(_table(pa, schema, rows))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_results(fmt: str, results: StoredResults, severity: Optional[str] = None) -> Iterator[bytes]:
+    """Encode stored results in one of ``FORMATS``, lazily."""
+    logger.info(f"Exporting validation results as {fmt}")
+    if fmt == "csv":
+        return export_csv(results, severity, settings.EXPORT_BATCH_SIZE)
+    if fmt == "ndjson":
+        return export_ndjson(results, settings.EXPORT_BATCH_SIZE)
+    if fmt == "parquet":
+        return export_parquet(results, severity)
+    raise ValueError(f"Unknown export format {fmt!r}, expected one of {', '.join(FORMATS)}")
@@ -0,0 +1,524 @@
+"""Streaming extraction of documents from uploaded PDFs and images.
+
+Uploads are spooled to a temporary file in fixed-size chunks and never held
+in memory whole. Pages are then read and parsed in a pool of worker
+processes, a few pages per task, and handed back in page order as a
+generator: only the text of the pages in flight exists at any time, so a
+statement of several hundred pages extracts on a 512 MB VM. Each worker
+runs under a heap limit (``EXTRACTION_WORKER_MEMORY_MB``) and is replaced
+after ``EXTRACTION_MAX_TASKS_PER_CHILD`` tasks; a worker that dies takes only
+its own pages down with it.
+
+Consecutive pages are assembled into documents (a multi-page statement is
+one document, a bundle of payslips is several), and each document is stored
+and validated as soon as its last page has been read.
+
+PDFs need the optional ``pypdf`` package and are read from their text layer;
+images (PNG, JPEG, TIFF, one page per frame) need ``Pillow`` and
+``pytesseract`` with the tesseract binary for OCR.
+"""
+import importlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.models.document import Document, DocumentType, PageLayout, Transactions
+from app.models.extraction import ExtractedDocument, ExtractedPage, ExtractionReport
+from .document_parser import ParsedPage, parse_page
+from .perceptual_hash import page_layout
+from .storage import DocumentStore, get_store
+from .template_library import get_template_library
+from .validation_engine import TEMPLATE_MATCHING, add_issues, triage_threshold, triaged, validate_document
+
+logger = get_logger(__name__)
+
+KINDS = ("pdf", "image")
+
+# Leading bytes of each supported file format
+MAGIC_NUMBERS = (
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),
+    (b"II*\x00", "image"),
+    (b"MM\x00*", "image"),
+)
+
+SPOOL_CHUNK_BYTES = 1 << 16
+
+# Fields that name one particular document: a page disagreeing on any of them starts a new one
+IDENTIFYING_FIELDS = (
+    "customer_name", "account_number", "statement_date", "pay_date", "irp_number", "ppsn_number", "tax_year",
+)
+# Fields repeated on every page with a running value; the last page's value is the document's
+LAST_VALUE_FIELDS = frozenset({"closing_balance"})
+
+
+class ExtractionError(ValueError):
+    """Raised when an upload cannot be read at all (as opposed to a bad page)."""
+
+
+def _require(module: str, package: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ExtractionError(f"Extraction of this file type requires the optional '{package}' package") from exc
+
+
+# --- Spooling ---
+
+def detect_kind(path: str) -> str:
+    """"pdf" or "image", from the leading bytes of the spooled file."""
+    with open(path, "rb") as file:
+        head = file.read(16)
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    raise ExtractionError("Upload a PDF, PNG, JPEG or TIFF file")
+
+
+def _spool_target(directory: Optional[str]):
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return tempfile.NamedTemporaryFile(prefix="upload-", suffix=".spool", dir=directory, delete=False)
+
+
+def _spool_failed(target, message: str) -> ExtractionError:
+    target.close()
+    os.unlink(target.name)
+    return ExtractionError(message)
+
+
+def spool_file(
+    source: BinaryIO,
+    max_bytes: int = settings.EXTRACTION_MAX_UPLOAD_BYTES,
+    directory: Optional[str] = settings.EXTRACTION_UPLOAD_DIR,
+) -> str:
+    """Copy an open upload to a temporary file in chunks and return its path."""
+    target = _spool_target(directory)
+    written = 0
+    while True:
+        chunk = source.read(SPOOL_CHUNK_BYTES)
+        if not chunk:
+            break
+        written += len(chunk)
+        if written > max_bytes:
+            raise _spool_failed(target, f"Upload is larger than {max_bytes} bytes")
+        target.write(chunk)
+    target.close()
+    return target.name
+
+
+async def spool_stream(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int = settings.EXTRACTION_MAX_UPLOAD_BYTES,
+    directory: Optional[str] = settings.EXTRACTION_UPLOAD_DIR,
+) -> str:
+    """Write an async byte stream (e.g. a request body) to a temporary file and return its path."""
+    target = await run_in_threadpool(_spool_target, directory)
+    written = 0
+    try:
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > max_bytes:
+                raise _spool_failed(target, f"Upload is larger than {max_bytes} bytes")
+            await run_in_threadpool(target.write, chunk)
+    except ExtractionError:
+        raise
+    except BaseException:
+        target.close()
+        os.unlink(target.name)
+        raise
+    target.close()
+    return target.name
+
+
+# --- Worker processes ---
+
+def _limit_memory(memory_mb: int) -> None:
+    """Cap the heap of an extraction worker; allocations beyond it raise MemoryError."""
+    if memory_mb:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def _open(path: str, kind: str):
+    if kind == "pdf":
+        pypdf = _require("pypdf", "pypdf")
+        return pypdf.PdfReader(path)
+    Image = _require("PIL.Image", "Pillow")
+    Image.MAX_IMAGE_PIXELS = settings.EXTRACTION_MAX_IMAGE_PIXELS
+    return Image.open(path)
+
+
+def page_count(path: str, kind: str) -> int:
+    """Number of pages (or image frames) in a spooled upload."""
+    if kind == "image":
+        pytesseract = _require("pytesseract", "pytesseract")
+        try:
+            pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError as exc:
+            raise ExtractionError("OCR of images requires the tesseract binary") from exc
+    try:
+        source = _open(path, kind)
+        if kind == "pdf":
+            return len(source.pages)
+        with source:
+            return getattr(source, "n_frames", 1)
+    except ExtractionError:
+        raise
+    except Exception as exc:
+        raise ExtractionError(f"Could not read the {kind}: {exc}")
+
+
+def _ocr(image) -> str:
+    pytesseract = _require("pytesseract", "pytesseract")
+    return pytesseract.image_to_string(image)
+
+
+def _scanned_page(page):
+    """The scan embedded in a PDF page without a text layer, if Pillow can decode it."""
+    try:
+        images = page.images
+        return max((embedded.image for embedded in images), key=lambda image: image.width * image.height, default=None)
+    except ImportError:
+        return None
+
+
+def _read_page(source, kind: str, index: int) -> Tuple[str, Optional[object]]:
+    """The text of a page and, for pages that are images, the image."""
+    if kind == "pdf":
+        page = source.pages[index]
+        text = page.extract_text() or ""
+        if text.strip():
+            return text, None
+        image = _scanned_page(page)
+        if image is None:
+            return "", None
+        image = image.convert("L")
+        try:
+            return _ocr(image), image
+        except ExtractionError:
+            # Without OCR the page still has a layout to check
+            return "", image
+    source.seek(index)
+    # JPEGs can be decoded at reduced size; 300 dpi A4 is about 2500 x 3500
+    source.draft("L", (2500, 3500))
+    image = source.convert("L")
+    return _ocr(image), image
+
+
+def extract_pages(path: str, kind: str, start: int, stop: int) -> List[ParsedPage]:
+    """Read and parse pages ``start`` to ``stop`` (0-based, exclusive) of a spooled upload.
+
+    A page that cannot be read is returned with its error rather than
+    failing the others.
+    """
+    source = _open(path, kind)
+    pages = []
+    try:
+        for index in range(start, stop):
+            try:
+                text, image = _read_page(source, kind, index)
+                layout = page_layout(image) if image is not None else None
+            except ExtractionError:
+                raise
+            except MemoryError:
+                pages.append(ParsedPage(index + 1, None, {}, [], "Page needs more memory than a worker may use"))
+                continue
+            except Exception as exc:
+                pages.append(ParsedPage(index + 1, None, {}, [], f"Could not read the page: {exc}"))
+                continue
+            if not text.strip():
+                pages.append(ParsedPage(index + 1, None, {}, [], "No text found on the page", layout))
+                continue
+            pages.append(parse_page(index + 1, text)._replace(layout=layout))
+    finally:
+        if kind == "image":
+            source.close()
+    return pages
+
+
+def page_image_layout(path: str, kind: str, index: int = 0) -> Optional[PageLayout]:
+    """Perceptual hashes of one page of a spooled upload; None for a PDF page that is not a scan."""
+    source = _open(path, kind)
+    try:
+        if kind == "pdf":
+            image = _scanned_page(source.pages[index])
+            return page_layout(image) if image is not None else None
+        source.seek(index)
+        source.draft("L", (2500, 3500))
+        return page_layout(source.convert("L"))
+    finally:
+        if kind == "image":
+            source.close()
+
+
+class ExtractionPool:
+    """Reads uploads page by page on a pool of memory-limited worker processes."""
+
+    def __init__(
+        self,
+        workers: int = settings.EXTRACTION_WORKERS,
+        pages_per_task: int = settings.EXTRACTION_PAGES_PER_TASK,
+        memory_mb: int = settings.EXTRACTION_WORKER_MEMORY_MB,
+        max_tasks_per_child: int = settings.EXTRACTION_MAX_TASKS_PER_CHILD,
+    ):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.memory_mb = memory_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """The worker pool, created on first use and after a worker has died."""
+        with self._lock:
+            if self._pool is None:
+                # Spawn rather than fork: the server process runs threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_limit_memory,
+                    initargs=(self.memory_mb,),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                logger.info(f"Started {self.workers} extraction workers limited to {self.memory_mb} MB each")
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def count_pages(self, path: str, kind: str) -> int:
+        """Pages in a spooled upload; raises ``ExtractionError`` if it cannot be read."""
+        return self.pool.submit(page_count, path, kind).result()
+
+    def page_layout(self, path: str, kind: str, index: int = 0) -> Optional[PageLayout]:
+        """Perceptual hashes of one page, computed on a worker."""
+        return self.pool.submit(page_image_layout, path, kind, index).result()
+
+    def iter_pages(self, path: str, kind: str, total: Optional[int] = None) -> Iterator[ParsedPage]:
+        """Yield the parsed pages of a spooled upload in page order.
+
+        At most one task per worker plus one is in flight, so memory stays
+        bounded however many pages the file has.
+        """
+        if total is None:
+            total = self.count_pages(path, kind)
+        ranges = deque((start, min(start + self.pages_per_task, total)) for start in range(0, total, self.pages_per_task))
+        in_flight: Deque[Tuple[Tuple[int, int], ProcessPoolExecutor, Future]] = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) <= self.workers:
+                pages, pool = ranges.popleft(), self.pool
+                in_flight.append((pages, pool, pool.submit(extract_pages, path, kind, *pages)))
+            (start, stop), pool, future = in_flight.popleft()
+            try:
+                yield from future.result()
+            except BrokenProcessPool:
+                # A worker was killed (usually by the OOM killer): give up on its pages, retry the rest
+                logger.warning(f"Extraction worker died on pages {start + 1}-{stop} of {path}")
+                self._discard(pool)
+                for page in range(start, stop):
+                    yield ParsedPage(page + 1, None, {}, [], "The extraction worker stopped on this page")
+                ranges.extendleft(reversed([pages for pages, _, _ in in_flight]))
+                in_flight.clear()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            logger.info("Extraction pool shut down")
+
+
+_pool: Optional[ExtractionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Process-wide extraction pool configured from settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool()
+        return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Stop the process-wide extraction workers if they were started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+# --- Assembling documents ---
+
+class DocumentAssembler:
+    """Groups consecutive parsed pages into documents.
+
+    A page naming a different document type, or disagreeing with the current
+    document on an identifying field, starts a new document; other pages
+    continue the current one, adding missing fields and statement lines.
+    """
+
+    def __init__(self, upload_date: Optional[str] = None):
+        self.upload_date = upload_date or datetime.now().isoformat()
+        # Documents get "<upload id>-<n>", like records without an id in bulk feeds
+        self._upload_id = uuid.uuid4().hex
+        self._count = 0
+        self._type: Optional[str] = None
+        self._fields: Dict[str, object] = {}
+        self._lines: List[tuple] = []
+        self._pages: List[int] = []
+        self._layout: Optional[PageLayout] = None
+
+    def _starts_new(self, page: ParsedPage) -> bool:
+        if not self._pages:
+            return True
+        if page.document_type and self._type and page.document_type != self._type:
+            return True
+        return any(
+            field in self._fields and page.fields[field] != self._fields[field]
+            for field in IDENTIFYING_FIELDS if field in page.fields
+        )
+
+    def add(self, page: ParsedPage) -> Optional[ExtractedDocument]:
+        """Take the next page; returns the previous document if this page starts a new one."""
+        if page.error or not (page.document_type or page.fields or page.lines):
+            if page.layout is not None and not self._pages:
+                # An unreadable first page still tells what the document looks like
+                self._layout = page.layout
+            return None
+        finished = self.finish() if self._pages and self._starts_new(page) else None
+        self._type = self._type or page.document_type
+        for field, value in page.fields.items():
+            if field in LAST_VALUE_FIELDS or field not in self._fields:
+                self._fields[field] = value
+        self._lines.extend(page.lines)
+        if not self._pages:
+            self._layout = self._layout or page.layout
+        self._pages.append(page.page)
+        return finished
+
+    def finish(self) -> Optional[ExtractedDocument]:
+        """The document being assembled, if any, as of the pages seen so far."""
+        if not self._pages:
+            return None
+        document_type = self._type or (DocumentType.BANK_STATEMENT.value if self._lines else None)
+        fields, lines, pages, layout = self._fields, self._lines, self._pages, self._layout
+        self._type, self._fields, self._lines, self._pages, self._layout = None, {}, [], [], None
+        if document_type is None:
+            logger.warning(f"Pages {pages[0]}-{pages[-1]} do not name a document type; skipped")
+            return None
+
+        self._count += 1
+        record = dict(fields, id=f"{self._upload_id}-{self._count}", type=document_type, upload_date=self.upload_date)
+        record.setdefault("customer_name", "")
+        if layout is not None:
+            record["layout"] = layout
+        if lines:
+            dates, amounts, balances, descriptions = zip(*lines)
+            record["transactions"] = Transactions(
+                dates=dates,
+                amounts=amounts,
+                balances=[float("nan") if balance is None else balance for balance in balances]
+                if any(balance is not None for balance in balances) else None,
+                descriptions=list(descriptions),
+            )
+        try:
+            document = Document.model_validate(record)
+        except ValidationError as exc:
+            logger.warning(f"Pages {pages[0]}-{pages[-1]} could not be read as a {document_type}: {exc}")
+            return None
+        return ExtractedDocument(document=document, first_page=pages[0], last_page=pages[-1])
+
+
+def extract_documents(
+    path: str,
+    kind: str,
+    filename: Optional[str] = None,
+    application_id: Optional[str] = None,
+    store: Optional[DocumentStore] = None,
+    validate: bool = True,
+    pool: Optional[ExtractionPool] = None,
+    pages: Optional[int] = None,
+) -> Iterator[Union[ExtractedPage, ExtractedDocument, ExtractionReport]]:
+    """Extract a spooled upload, yielding each page as it is read and each document as it completes.
+
+    Documents are stored under ``application_id`` and, with ``validate``,
+    carry their validation result, including the comparison of their layout
+    with the template library. The final item is the report. Pass ``pages``
+    when the upload has already been counted.
+    """
+    if kind not in KINDS:
+        raise ExtractionError(f"Unsupported upload kind '{kind}'")
+    pool = pool or get_extraction_pool()
+    store = store or get_store()
+    templates = get_template_library() if validate else None
+    stop_at = triage_threshold() if validate else None
+    report = ExtractionReport(application_id=application_id, filename=filename)
+    assembler = DocumentAssembler()
+    started = time.perf_counter()
+
+    def completed(extracted: ExtractedDocument) -> ExtractedDocument:
+        store.add_document(extracted.document, application_id)
+        if validate:
+            extracted.result = validate_document(extracted.document)
+            if not triaged(extracted.result, stop_at, TEMPLATE_MATCHING):
+                add_issues(extracted.result, templates.issues_for(extracted.document))
+        report.documents += 1
+        return extracted
+
+    for page in pool.iter_pages(path, kind, pages):
+        report.pages += 1
+        if page.error:
+            report.failed_pages += 1
+        yield ExtractedPage(
+            page=page.page,
+            document_type=page.document_type,
+            fields=list(page.fields),
+            lines=len(page.lines),
+            error=page.error,
+        )
+        extracted = assembler.add(page)
+        if extracted is not None:
+            yield completed(extracted)
+    extracted = assembler.finish()
+    if extracted is not None:
+        yield completed(extracted)
+
+    elapsed = time.perf_counter() - started
+    report.elapsed_seconds = round(elapsed, 3)
+    report.pages_per_second = round(report.pages / elapsed, 1) if elapsed > 0 else float(report.pages)
+    logger.info(
+        f"Extracted {report.documents} documents from {report.pages} pages of {filename or kind} "
+        f"({report.failed_pages} unreadable) in {elapsed:.2f}s"
+    )
+    yield report
+
+
+def remove_spooled(path: str) -> None:
+    """Delete a spooled upload once it has been extracted."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,279 @@
+"""Near-duplicate document detection.
+
+Each document is reduced to a set of field-tagged tokens and summarised by a
+MinHash signature. Signatures are split into bands and stored in an LSH index
+of sorted NumPy key arrays, so finding documents that resemble a new upload
+costs a handful of binary searches instead of a scan over the whole history.
+"""
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.logging_config import get_logger
+from app.models.document import Document, ValidationIssue
+from .document_index import fold_tokens, owner_key
+
+logger = get_logger(__name__)
+
+# Fields left out of the fingerprint: submission metadata, the document type
+# and issuer (shared by every document of that kind) and the customer name,
+# which is the first thing swapped when a document is reused
+EXCLUDED_FIELDS = frozenset({"id", "upload_date", "type", "issuer", "customer_name"})
+# Free-text fields that also contribute one shingle per word
+TEXT_FIELDS = frozenset({"customer_address", "employer_name"})
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+# Pending band entries are merged into the sorted arrays past this size
+MERGE_THRESHOLD = 50_000
+
+
+def document_tokens(document: Document) -> Set[str]:
+    """Field-tagged shingles over a document's normalized content."""
+    tokens = set()
+    for field, value in document:
+        if value is None or field in EXCLUDED_FIELDS:
+            continue
+        if isinstance(value, float):
+            tokens.add(f"{field}:{value:.2f}")
+        elif isinstance(value, str):
+            words = fold_tokens(value)
+            tokens.add(f"{field}:{' '.join(words)}")
+            if field in TEXT_FIELDS:
+                # Word shingles let a slightly edited address or employer still match
+                tokens.update(f"{field}~{word}" for word in words)
+    return tokens
+
+
+class FingerprintArrays(NamedTuple):
+    """A frozen index as plain arrays, e.g. memory-mapped from a snapshot.
+
+    Rows are documents: ``signatures[row]``, ``ids[row]`` (UTF-8 bytes) and
+    ``owners[row]`` (``owner_key`` of the customer name). ``band_keys[band]``
+    is sorted, with ``band_rows[band]`` giving the row of each key;
+    ``sorted_ids``/``sorted_rows`` map ids back to rows.
+    """
+    signatures: np.ndarray
+    ids: np.ndarray
+    owners: np.ndarray
+    band_keys: np.ndarray
+    band_rows: np.ndarray
+    sorted_ids: np.ndarray
+    sorted_rows: np.ndarray
+
+    def row_of(self, document_id: str) -> Optional[int]:
+        key = document_id.encode("utf-8")
+        position = int(np.searchsorted(self.sorted_ids, key))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == key:
+            return int(self.sorted_rows[position])
+        return None
+
+
+class DuplicateIndex:
+    """MinHash/LSH index of previously submitted documents.
+
+    ``num_perm`` hash functions are split into ``bands`` bands; two documents
+    become candidates when any band matches exactly, and candidates are kept
+    when their estimated Jaccard similarity reaches ``threshold``.
+
+    An index can start from a read-only ``FingerprintArrays`` base (see
+    ``shared_indexes.py``); documents added later are kept on top of it.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        threshold: float = 0.8,
+        seed: int = 1,
+        base: Optional[FingerprintArrays] = None,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) % _MERSENNE_PRIME
+        self._b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64) % _MERSENNE_PRIME
+        # Mixing constants used to fold a band's rows into one 64-bit key
+        self._band_mix = rng.randint(1, np.iinfo(np.int64).max, size=self.rows, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+
+        if base is not None and base.signatures.shape[1:] != (num_perm,):
+            raise ValueError(f"Base fingerprints have {base.signatures.shape[1:]} permutations, expected {num_perm}")
+        self._base = base
+        # Rows below this live in the base; later rows are offset into the arrays below
+        self._base_count = len(base.ids) if base is not None else 0
+
+        self._ids: List[str] = []
+        self._owners: List[int] = []
+        self._row_of: Dict[str, int] = {}
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+
+        # Per band: sorted keys with matching rows, plus a small unsorted tail
+        self._keys = [np.empty(0, dtype=np.uint64) for _ in range(bands)]
+        self._rows = [np.empty(0, dtype=np.uint32) for _ in range(bands)]
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._pending_size = 0
+
+    def __len__(self) -> int:
+        return self._base_count + len(self._ids)
+
+    def __contains__(self, document_id: str) -> bool:
+        return self._find(document_id) is not None
+
+    def _find(self, document_id: str) -> Optional[int]:
+        row = self._row_of.get(document_id)
+        if row is None and self._base is not None:
+            row = self._base.row_of(document_id)
+        return row
+
+    def _id_of(self, row: int) -> str:
+        if row < self._base_count:
+            return self._base.ids[row].decode("utf-8")
+        return self._ids[row - self._base_count]
+
+    def _owner_of(self, row: int) -> int:
+        if row < self._base_count:
+            return int(self._base.owners[row])
+        return self._owners[row - self._base_count]
+
+    def _signatures_of(self, rows: np.ndarray) -> np.ndarray:
+        if not self._base_count:
+            return self._signatures[rows]
+        in_base = rows < self._base_count
+        signatures = np.empty((len(rows), self.num_perm), dtype=np.uint32)
+        signatures[in_base] = self._base.signatures[rows[in_base]]
+        signatures[~in_base] = self._signatures[rows[~in_base] - self._base_count]
+        return signatures
+
+    def signature(self, document: Document) -> np.ndarray:
+        """MinHash signature of ``document`` as ``num_perm`` uint32 values."""
+        tokens = document_tokens(document)
+        if not tokens:
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> np.ndarray:
+        bands = signature.astype(np.uint64).reshape(self.bands, self.rows)
+        return (bands * self._band_mix).sum(axis=1, dtype=np.uint64)
+
+    def add(self, document: Document) -> None:
+        """Add ``document`` to the index; re-adding an id is a no-op."""
+        if document.id in self:
+            return
+        signature = self.signature(document)
+        local = len(self._ids)
+        if local == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[local] = signature
+        row = self._base_count + local
+        self._ids.append(document.id)
+        self._owners.append(owner_key(document.customer_name))
+        self._row_of[document.id] = row
+
+        for band, key in enumerate(self._band_keys(signature).tolist()):
+            self._pending[band].setdefault(key, []).append(row)
+        self._pending_size += 1
+        if self._pending_size >= MERGE_THRESHOLD:
+            self._merge_pending()
+
+    def _merge_pending(self) -> None:
+        """Fold the pending band entries into the sorted key arrays."""
+        for band in range(self.bands):
+            pending = self._pending[band]
+            if not pending:
+                continue
+            new_keys = np.fromiter((k for k, rows in pending.items() for _ in rows), dtype=np.uint64)
+            new_rows = np.fromiter((r for rows in pending.values() for r in rows), dtype=np.uint32)
+            keys = np.concatenate([self._keys[band], new_keys])
+            rows = np.concatenate([self._rows[band], new_rows])
+            order = np.argsort(keys, kind="stable")
+            self._keys[band], self._rows[band] = keys[order], rows[order]
+            self._pending[band] = {}
+        self._pending_size = 0
+        logger.info(f"Merged LSH buckets for {len(self)} document fingerprints")
+
+    def _candidate_rows(self, signature: np.ndarray) -> Set[int]:
+        candidates: Set[int] = set()
+        for band, key in enumerate(self._band_keys(signature).tolist()):
+            sorted_bands = [(self._keys[band], self._rows[band])]
+            if self._base is not None:
+                sorted_bands.append((self._base.band_keys[band], self._base.band_rows[band]))
+            for keys, rows in sorted_bands:
+                lo = np.searchsorted(keys, np.uint64(key), side="left")
+                hi = np.searchsorted(keys, np.uint64(key), side="right")
+                if hi > lo:
+                    candidates.update(rows[lo:hi].tolist())
+            candidates.update(self._pending[band].get(key, ()))
+        return candidates
+
+    def to_arrays(self) -> FingerprintArrays:
+        """The whole index as ``FingerprintArrays``, for writing a snapshot."""
+        if self._base is not None:
+            raise ValueError("Only an index built without a base can be exported")
+        self._merge_pending()
+        count = len(self._ids)
+        ids = np.array([doc_id.encode("utf-8") for doc_id in self._ids], dtype=bytes) if count else np.empty(0, "S1")
+        id_order = np.argsort(ids, kind="stable")
+        empty_band = np.empty((self.bands, 0))
+        return FingerprintArrays(
+            signatures=self._signatures[:count].copy(),
+            ids=ids,
+            owners=np.array(self._owners, dtype=np.uint64),
+            band_keys=np.stack(self._keys) if count else empty_band.astype(np.uint64),
+            band_rows=np.stack(self._rows) if count else empty_band.astype(np.uint32),
+            sorted_ids=ids[id_order],
+            sorted_rows=id_order.astype(np.uint32),
+        )
+
+    def query(self, document: Document) -> List[Tuple[str, float]]:
+        """Indexed documents resembling ``document``, most similar first.
+
+        Returns ``(document_id, estimated_jaccard)`` pairs at or above the
+        index threshold, excluding ``document`` itself.
+        """
+        signature = self.signature(document)
+        rows = self._candidate_rows(signature)
+        own_row = self._find(document.id)
+        rows.discard(-1 if own_row is None else own_row)
+        if not rows:
+            return []
+        rows_array = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        similarity = (self._signatures_of(rows_array) == signature).mean(axis=1)
+        keep = similarity >= self.threshold
+        matches = sorted(
+            zip(rows_array[keep].tolist(), similarity[keep].tolist()),
+            key=lambda match: -match[1],
+        )
+        return [(self._id_of(row), score) for row, score in matches]
+
+    def unrelated_matches(self, document: Document) -> List[Tuple[str, float]]:
+        """Near-duplicates of ``document`` submitted under a different customer name."""
+        owner = owner_key(document.customer_name)
+        return [
+            (doc_id, score) for doc_id, score in self.query(document)
+            if self._owner_of(self._find(doc_id)) != owner
+        ]
+
+    def issues_for(self, document: Document) -> List[ValidationIssue]:
+        """Report near-duplicates from unrelated customers as validation issues."""
+        matches = self.unrelated_matches(document)
+        if not matches:
+            return []
+        best_id, best_score = matches[0]
+        return [ValidationIssue(
+            severity="HIGH",
+            category="Behavioral & Contextual",
+            description=(
+                f"Document is {best_score:.0%} similar to document {best_id} submitted by a different customer"
+                + (f" ({len(matches) - 1} further near-duplicate(s) found)" if len(matches) > 1 else "")
+            ),
+            recommendation="Escalate to the fraud team as a possible document reused across applications",
+        )]
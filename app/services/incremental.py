@@ -0,0 +1,244 @@
+"""Incremental re-validation of an application.
+
+``IncrementalValidator`` remembers, for one application, the issue each rule
+raised on each document and the findings of every cross-document rule.
+Syncing it with the application's current documents diffs them against the
+previous run and re-evaluates only what the differences can affect:
+
+* an edited document re-runs the rules of its plan that read a changed field
+  (all of them if its type changed, or if it is new);
+* a cross-document rule re-runs when a document was added or removed, or
+  when a field it reads changed on any document;
+* a rule whose code or metadata changed, for instance through a reloaded
+  rule file, re-runs on every document;
+* layouts are compared with the template library again for edited
+  documents, and for every document once the library has changed.
+
+A new day starts from scratch, since several rules compare against today.
+
+``sync`` can also report each re-checked document's result as soon as its
+own rules and template comparison have run, before the cross-document
+checks, which need every document; their findings follow in the final
+results.
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from app.core.logging_config import get_logger
+from app.models.document import Document, ValidationIssue, ValidationResult
+from .cross_document import run_cross_rule
+from .document_index import DocumentIndex
+from .fingerprint import DuplicateIndex
+from .template_library import TemplateLibrary
+from .validation_engine import build_result, get_cross_rules, get_plan, get_rule_fingerprints
+
+logger = get_logger(__name__)
+
+DOCUMENT_FIELDS = tuple(Document.model_fields)
+
+
+def changed_fields(old: Document, new: Document) -> Set[str]:
+    """Names of the fields whose values differ between two versions of a document."""
+    return {name for name in DOCUMENT_FIELDS if getattr(old, name) != getattr(new, name)}
+
+
+def set_fields(document: Document) -> Set[str]:
+    """Names of the fields set on ``document``."""
+    return {name for name in DOCUMENT_FIELDS if getattr(document, name) is not None}
+
+
+@dataclass
+class Revalidation:
+    """Outcome of one sync: fresh results for every document whose outcome may have changed."""
+    results: List[ValidationResult] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    full: bool = False
+    documents_checked: int = 0
+    rules_run: int = 0
+    cross_rules_run: int = 0
+
+
+class IncrementalValidator:
+    """Keeps one application's validation state and re-validates only what changed.
+
+    ``history`` and ``duplicates`` are the shared indexes used by the
+    fraud-ring and near-duplicate checks; they are updated with new and edited
+    documents under ``history_lock``, which should be shared by everything
+    that touches them.
+    """
+
+    def __init__(
+        self,
+        history: Optional[DocumentIndex] = None,
+        duplicates: Optional[DuplicateIndex] = None,
+        history_lock: Optional[threading.Lock] = None,
+        templates: Optional[TemplateLibrary] = None,
+    ):
+        self.history = history
+        self.duplicates = duplicates
+        self.templates = templates
+        self._history_lock = history_lock or threading.Lock()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all state; the next sync validates every document."""
+        self._application = DocumentIndex()
+        self._order: List[str] = []
+        # document id -> rule id -> issue, for failing rules only
+        self._own: Dict[str, Dict[str, ValidationIssue]] = {}
+        # cross rule id -> document id -> issues, for the cross rules of the rule set last run
+        self._cross_rules = get_cross_rules()
+        self._cross: Dict[str, Dict[str, List[ValidationIssue]]] = {rule.rule_id: {} for rule in self._cross_rules}
+        self._near_duplicates: Dict[str, List[ValidationIssue]] = {}
+        self._template_issues: Dict[str, List[ValidationIssue]] = {}
+        self._template_version: Optional[int] = None
+        self._fingerprints: Dict[str, str] = {}
+        self._day: Optional[date] = None
+
+    def sync(
+        self, documents: Sequence[Document], on_result: Optional[Callable[[ValidationResult], None]] = None
+    ) -> Revalidation:
+        """Bring the state in line with ``documents`` and return the results that changed.
+
+        ``on_result`` is called from this thread with the preliminary result
+        of each re-checked document whose result may have changed, as soon as
+        it is ready. Until the returned results replace them, these carry the
+        cross-document and near-duplicate findings of the previous sync.
+        """
+        with self._lock:
+            today = date.today()
+            full = self._day != today
+            if full:
+                self.reset()
+                self._day = today
+            outcome = Revalidation(full=full)
+
+            current = {doc.id: doc for doc in documents}
+            # Fields whose change on some document can alter cross-document findings
+            touched: Set[str] = set()
+            for old in [doc for doc in self._application if doc.id not in current]:
+                doc_id = old.id
+                touched |= set_fields(old) | {"type"}
+                self._application.remove(doc_id)
+                self._own.pop(doc_id, None)
+                self._near_duplicates.pop(doc_id, None)
+                self._template_issues.pop(doc_id, None)
+                outcome.removed.append(doc_id)
+
+            # Document id -> changed fields, or None to run the whole plan
+            dirty: Dict[str, Optional[Set[str]]] = {}
+            for doc in documents:
+                old = self._application.get(doc.id)
+                if old is None:
+                    dirty[doc.id] = None
+                    touched |= set_fields(doc) | {"type"}
+                elif old != doc:
+                    fields = changed_fields(old, doc)
+                    dirty[doc.id] = None if "type" in fields else fields
+                    touched |= fields
+                else:
+                    continue
+                self._application.add(doc)
+            self._order = list(current)
+
+            fingerprints = get_rule_fingerprints()
+            stale_rules = {rule_id for rule_id, version in fingerprints.items() if self._fingerprints.get(rule_id) != version}
+            dropped_rules = set(self._fingerprints) - set(fingerprints)
+            self._fingerprints = fingerprints
+            if full:
+                stale_rules = set()
+
+            affected: Set[str] = set(dirty)
+            rechecked = current if stale_rules or dropped_rules else dirty
+            library_changed = self.templates is not None and self.templates.version != self._template_version
+            if self.templates is not None:
+                self._template_version = self.templates.version
+            # One pass in document order, so that each result can be reported as soon as it is ready
+            for doc_id in self._order:
+                doc = current[doc_id]
+                changed = False
+                if doc_id in rechecked:
+                    plan = get_plan(doc.type)
+                    own = self._own.setdefault(doc_id, {})
+                    before = dict(own)
+                    fields = dirty.get(doc_id, set())
+                    if fields is None:
+                        own.clear()
+                        rules = plan.rules
+                    else:
+                        rules = tuple(
+                            rule for rule in plan.rules
+                            if rule.rule_id in stale_rules or rule.inputs & fields
+                        )
+                    for rule_id in dropped_rules:
+                        own.pop(rule_id, None)
+                    for rule_id, issue in plan.run_rules(doc, rules).items():
+                        if issue is None:
+                            own.pop(rule_id, None)
+                        else:
+                            own[rule_id] = issue
+                    outcome.rules_run += len(rules)
+                    changed = own != before
+                if self.templates is not None and (library_changed or doc_id in dirty):
+                    issues = self.templates.issues_for(doc)
+                    changed = changed or issues != self._template_issues.get(doc_id, [])
+                    self._template_issues[doc_id] = issues
+                if changed:
+                    affected.add(doc_id)
+                if on_result is not None and doc_id in affected:
+                    on_result(self._result(doc))
+            outcome.documents_checked = len(dirty)
+
+            with self._history_lock:
+                if self.duplicates is not None:
+                    for doc_id in dirty:
+                        self._near_duplicates[doc_id] = self.duplicates.issues_for(current[doc_id])
+
+                # A reload can replace cross rules: new or changed ones run, dropped ones lose their findings
+                cross_rules = get_cross_rules()
+                known = {rule.rule_id: rule for rule in self._cross_rules}
+                for rule_id in set(known) - {rule.rule_id for rule in cross_rules}:
+                    affected.update(self._cross.pop(rule_id, {}))
+                self._cross_rules = cross_rules
+                for rule in cross_rules:
+                    if not full and known.get(rule.rule_id) is rule and not touched.intersection(rule.fields):
+                        continue
+                    findings = run_cross_rule(rule, self._application, self.history)
+                    previous = self._cross.get(rule.rule_id, {})
+                    affected.update(
+                        doc_id for doc_id in set(findings) | set(previous)
+                        if findings.get(doc_id) != previous.get(doc_id)
+                    )
+                    self._cross[rule.rule_id] = findings
+                    outcome.cross_rules_run += 1
+
+                for doc_id in dirty:
+                    if self.history is not None:
+                        self.history.add(current[doc_id])
+                    if self.duplicates is not None:
+                        self.duplicates.add(current[doc_id])
+
+            outcome.results = [self._result(current[doc_id]) for doc_id in self._order if doc_id in affected]
+            logger.info(
+                f"Re-validated {len(dirty)} of {len(current)} documents ({outcome.rules_run} rules, "
+                f"{outcome.cross_rules_run} cross-document rules); {len(outcome.results)} results changed"
+            )
+            return outcome
+
+    def _result(self, document: Document) -> ValidationResult:
+        """Assemble a document's result in the same issue order as a full validation."""
+        own = self._own.get(document.id, {})
+        issues = [own[rule.rule_id] for rule in get_plan(document.type).rules if rule.rule_id in own]
+        issues.extend(self._near_duplicates.get(document.id, []))
+        issues.extend(self._template_issues.get(document.id, []))
+        for rule in self._cross_rules:
+            issues.extend(self._cross.get(rule.rule_id, {}).get(document.id, []))
+        return build_result(document, issues)
+
+    def results(self) -> List[ValidationResult]:
+        """Current results for every document of the application."""
+        with self._lock:
+            return [self._result(self._application.get(doc_id)) for doc_id in self._order]
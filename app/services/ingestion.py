@@ -0,0 +1,219 @@
+"""Streaming bulk ingestion of NDJSON and CSV document feeds.
+
+Feeds are consumed line by line: records are parsed into ``Document``s,
+stored and queued for validation in fixed-size chunks, and rejected lines are
+reported with their line number. Only the current chunk is ever held in
+memory, whatever the size of the upload: validation jobs write their results
+to the store as they go, and parsing waits for the oldest job once the feed
+has ``INGEST_MAX_PENDING_JOBS`` of them queued.
+"""
+import asyncio
+import csv
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+from pydantic_core import from_json
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.models.document import Document
+from app.models.ingest import IngestError, IngestReport
+from .job_queue import JobNotFoundError, ValidationJobQueue, get_job_queue
+from .storage import DocumentStore, get_store
+
+logger = get_logger(__name__)
+
+FORMATS = ("ndjson", "csv")
+
+# Raw body chunks buffered between the event loop and the parsing thread
+BUFFERED_CHUNKS = 16
+
+
+class IngestFormatError(ValueError):
+    """Raised when a feed cannot be parsed at all (as opposed to a bad record)."""
+
+
+def iter_lines(chunks: Iterable[bytes], max_line_bytes: int = settings.INGEST_MAX_LINE_BYTES) -> Iterator[bytes]:
+    """Split a stream of byte chunks into lines without the trailing newline."""
+    remainder = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        if len(remainder) > max_line_bytes:
+            raise IngestFormatError(f"Line longer than {max_line_bytes} bytes")
+        for line in lines:
+            yield line.rstrip(b"\r")
+    if remainder:
+        yield remainder.rstrip(b"\r")
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+class DocumentIngestor:
+    """Parses a feed into documents, storing and queueing them in chunks."""
+
+    def __init__(
+        self,
+        fmt: str,
+        application_id: Optional[str] = None,
+        store: Optional[DocumentStore] = None,
+        job_queue: Optional[ValidationJobQueue] = None,
+        validate: bool = True,
+        chunk_size: int = settings.INGEST_CHUNK_SIZE,
+        max_reported_errors: int = settings.INGEST_MAX_REPORTED_ERRORS,
+        max_pending_jobs: int = settings.INGEST_MAX_PENDING_JOBS,
+    ):
+        if fmt not in FORMATS:
+            raise IngestFormatError(f"Unsupported feed format '{fmt}'")
+        self.fmt = fmt
+        self.store = store or get_store()
+        self.job_queue = (job_queue or get_job_queue()) if validate else None
+        self.chunk_size = chunk_size
+        self.max_reported_errors = max_reported_errors
+        self.max_pending_jobs = max(1, max_pending_jobs)
+        # Jobs of this feed that may not have finished yet, oldest first
+        self._pending_jobs: "deque[str]" = deque()
+        self.report = IngestReport(application_id=application_id)
+        self._chunk: List[Document] = []
+        self._upload_date = datetime.now().isoformat()
+        # Records without an id get "<feed id>-<line>", cheaper than a uuid per row
+        self._feed_id = uuid.uuid4().hex
+
+    def _reject(self, line: int, error: str) -> None:
+        self.report.rejected += 1
+        if len(self.report.errors) < self.max_reported_errors:
+            self.report.errors.append(IngestError(line=line, error=error))
+        else:
+            self.report.errors_truncated = True
+
+    def _accept(self, line: int, record: dict) -> None:
+        record.setdefault("id", f"{self._feed_id}-{line}")
+        record.setdefault("upload_date", self._upload_date)
+        try:
+            document = Document.model_validate(record)
+        except ValidationError as exc:
+            self._reject(line, _format_validation_error(exc))
+            return
+        self._chunk.append(document)
+        if len(self._chunk) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._chunk:
+            return
+        documents, self._chunk = self._chunk, []
+        self.store.add_documents(documents, self.report.application_id)
+        self.report.accepted += len(documents)
+        if self.job_queue is not None:
+            # Backpressure: the parser (and through its buffer, the upload) waits for validation
+            while len(self._pending_jobs) >= self.max_pending_jobs:
+                try:
+                    self.job_queue.wait(self._pending_jobs.popleft())
+                except JobNotFoundError:
+                    pass  # Already finished and evicted
+            # Feeds are not one customer's application, so skip cross-document checks
+            job_id = self.job_queue.submit(
+                documents, cross_check=False, application_id=self.report.application_id, keep_results=False
+            )
+            self._pending_jobs.append(job_id)
+            self.report.job_ids.append(job_id)
+
+    def _records(self, lines: Iterator[bytes]) -> Iterator[tuple]:
+        """Yield ``(line_number, record_or_error)`` for every non-blank line."""
+        if self.fmt == "ndjson":
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = from_json(line)
+                except ValueError as exc:
+                    yield number, f"Invalid JSON: {exc}"
+                    continue
+                yield number, record if isinstance(record, dict) else "Record is not a JSON object"
+            return
+
+        reader = csv.reader(line.decode("utf-8-sig", errors="replace") for line in lines)
+        header = next(reader, None)
+        if not header:
+            raise IngestFormatError("CSV feed has no header row")
+        header = [column.strip() for column in header]
+        for row in reader:
+            if not any(row):
+                continue
+            if len(row) != len(header):
+                yield reader.line_num, f"Expected {len(header)} columns, found {len(row)}"
+                continue
+            # Empty cells mean "not provided" rather than an empty string
+            yield reader.line_num, {column: value for column, value in zip(header, row) if value != ""}
+
+    def ingest(self, lines: Iterable[bytes]) -> IngestReport:
+        """Consume every line of the feed and return the final report."""
+        started = time.perf_counter()
+        for number, record in self._records(iter(lines)):
+            if isinstance(record, str):
+                self._reject(number, record)
+            else:
+                self._accept(number, record)
+        self._flush()
+
+        elapsed = time.perf_counter() - started
+        rows = self.report.accepted + self.report.rejected
+        self.report.elapsed_seconds = round(elapsed, 3)
+        self.report.rows_per_second = round(rows / elapsed, 1) if elapsed > 0 else float(rows)
+        logger.info(
+            f"Ingested {self.fmt} feed: {self.report.accepted} accepted, {self.report.rejected} rejected "
+            f"in {elapsed:.2f}s ({self.report.rows_per_second:,.0f} rows/s)"
+        )
+        return self.report
+
+
+async def ingest_stream(chunks: AsyncIterator[bytes], ingestor: DocumentIngestor) -> IngestReport:
+    """Feed an async byte stream (e.g. a request body) to ``ingestor``.
+
+    Parsing runs on a worker thread; a bounded buffer between the two applies
+    backpressure so the body is never read faster than it is processed.
+    """
+    buffer: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=BUFFERED_CHUNKS)
+    finished = threading.Event()
+
+    def drain() -> Iterator[bytes]:
+        while True:
+            chunk = buffer.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def run() -> IngestReport:
+        try:
+            return ingestor.ingest(iter_lines(drain()))
+        finally:
+            finished.set()
+
+    def put(chunk: Optional[bytes]) -> bool:
+        while not finished.is_set():
+            try:
+                buffer.put(chunk, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    loop = asyncio.get_running_loop()
+    worker = loop.run_in_executor(None, run)
+    async for chunk in chunks:
+        if not await loop.run_in_executor(None, put, chunk):
+            break
+    await loop.run_in_executor(None, put, None)
+    return await worker
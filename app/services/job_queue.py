@@ -0,0 +1,472 @@
+"""Background validation jobs.
+
+Submitting documents returns a job id immediately. A coordinator thread
+splits the documents into chunks, hands them to a thread or process pool
+(``VALIDATION_EXECUTOR``), records progress as chunks finish and finally runs
+the cross-document and near-duplicate checks, which need the whole set.
+Callers poll ``get`` or iterate ``stream`` for progress; neither blocks the
+event loop.
+
+Chunks start small and double in size, so the first results of even a large
+job are ready within milliseconds. ``stream_results`` yields them as they
+come, coalesced into batches, from any offset in the job's result stream:
+every result in submission order, then again each result the
+cross-document checks changed (``ValidationJob.revised``). A client that
+lost its connection resumes from the offset it had reached.
+
+When the server runs several worker processes (``WORKERS`` > 1), jobs and
+their results are also written to the document store, so any worker can
+answer for a job another one is running. Whatever the number of workers,
+the final results of a completed job are stored with the other validation
+results under the job's application (``VALIDATION_STORE_RESULTS``), where
+the compliance exports read them. Jobs submitted without ``keep_results``
+(bulk ingestion) write each chunk's results straight to the store and hold
+none of them in memory.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import callback_metric
+from app.models.document import Document, ValidationResult
+from app.models.job import JobStatus, ValidationJob
+from .cross_document import cross_validate
+from .document_index import DocumentIndex
+from .fingerprint import DuplicateIndex
+from .storage import DocumentStore, get_store
+from .template_library import TemplateLibrary
+from .validation_engine import (
+    DUPLICATE_SEARCH, TEMPLATE_MATCHING, add_issues, get_cross_rules, triage_threshold, triaged, validate_batch,
+)
+
+logger = get_logger(__name__)
+
+
+class JobNotFoundError(KeyError):
+    """Raised when a job id is unknown or has been evicted."""
+
+
+class ResultBatch(NamedTuple):
+    """Entries of a job's result stream from ``offset`` on, as (position, result), and the job as of then."""
+    job: ValidationJob
+    offset: int
+    results: List[Tuple[int, ValidationResult]]
+
+    @property
+    def next_offset(self) -> int:
+        return self.offset + len(self.results)
+
+
+class _JobState:
+    """Mutable bookkeeping for one job, guarded by its ``changed`` condition."""
+
+    def __init__(self, job: ValidationJob, store: Optional[DocumentStore] = None, keep_results: bool = True):
+        self.job = job
+        self.results: List[ValidationResult] = []
+        self.changed = threading.Condition()
+        # Where the job and its results are written, if anywhere
+        self.store = store
+        # False: results are only in the store, and read back from there
+        self.keep_results = keep_results
+
+
+class ValidationJobQueue:
+    """Runs validation jobs on a configurable worker pool."""
+
+    def __init__(
+        self,
+        executor: str = settings.VALIDATION_EXECUTOR,
+        max_workers: int = settings.VALIDATION_WORKERS,
+        chunk_size: int = settings.VALIDATION_CHUNK_SIZE,
+        first_chunk_size: int = settings.VALIDATION_FIRST_CHUNK_SIZE,
+        max_concurrent_jobs: int = settings.VALIDATION_MAX_CONCURRENT_JOBS,
+        retention: int = settings.VALIDATION_JOB_RETENTION,
+        store: Optional[DocumentStore] = None,
+        shared: bool = settings.WORKERS > 1,
+        store_results: bool = settings.VALIDATION_STORE_RESULTS,
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown validation executor '{executor}'")
+        self.executor_kind = executor
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.first_chunk_size = max(1, min(first_chunk_size, chunk_size))
+        self.retention = retention
+        self._workers: Optional[Executor] = None
+        self._coordinators = ThreadPoolExecutor(max_workers=max_concurrent_jobs, thread_name_prefix="validation-job")
+        self._jobs: "OrderedDict[str, _JobState]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cross-document checks read and update shared history indexes
+        self._history_lock = threading.Lock()
+        # Chunks handed to the worker pool that have not finished yet
+        self._pending_chunks = 0
+        # Where jobs are mirrored for the other worker processes, if any
+        self.store = (store or get_store()) if shared else None
+        # Where completed jobs' results are kept, if anywhere; opened on first use
+        self.store_results = store_results
+        self._results_store = store
+
+    @property
+    def workers(self) -> Executor:
+        """The worker pool, created on first use."""
+        if self._workers is None:
+            if self.executor_kind == "process":
+                # Spawn rather than fork: the server process runs threads
+                self._workers = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._workers = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="validation-worker")
+            logger.info(f"Started {self.executor_kind} pool with {self.max_workers} validation workers")
+        return self._workers
+
+    def submit(
+        self,
+        documents: Sequence[Document],
+        history: Optional[DocumentIndex] = None,
+        duplicates: Optional[DuplicateIndex] = None,
+        cross_check: bool = True,
+        templates: Optional[TemplateLibrary] = None,
+        triage: Optional[bool] = None,
+        application_id: Optional[str] = None,
+        keep_results: bool = True,
+    ) -> str:
+        """Queue ``documents`` for validation and return the job id.
+
+        When ``cross_check`` is set the documents are treated as one
+        application and checked against each other; ``history`` and
+        ``duplicates`` are consulted for fraud-ring checks and then updated
+        with the new documents. Documents with a page layout are compared
+        with ``templates`` as their chunk finishes. ``triage`` overrides
+        ``TRIAGE_MODE`` for the job. The final results are stored under
+        ``application_id``. Without ``keep_results`` the results are written
+        to the store chunk by chunk instead of being held in memory, e.g. for
+        bulk feeds; that rules out the cross-document checks.
+        """
+        if cross_check and not keep_results:
+            raise ValueError("Cross-document checks need the job's results in memory")
+        documents = list(documents)
+        job = ValidationJob(
+            id=str(uuid.uuid4()), total=len(documents), application_id=application_id, created_at=datetime.now().isoformat()
+        )
+        store = self.store if self.store is not None or keep_results else self._result_store()
+        state = _JobState(job, store, keep_results)
+        with self._lock:
+            self._jobs[job.id] = state
+            self._evict_finished()
+        if store is not None:
+            store.save_job(job)
+            store.prune_jobs(self.retention)
+        self._coordinators.submit(self._run, state, documents, history, duplicates, cross_check, templates, triage)
+        logger.info(f"Queued validation job {job.id} for {len(documents)} documents")
+        return job.id
+
+    def _result_store(self) -> DocumentStore:
+        return self._results_store or get_store()
+
+    def _chunks(self, documents: List[Document]) -> List[List[Document]]:
+        """Split a job into chunks doubling from ``first_chunk_size`` up to ``chunk_size``."""
+        chunks = []
+        start, size = 0, self.first_chunk_size
+        while start < len(documents):
+            chunks.append(documents[start:start + size])
+            start += size
+            size = min(size * 2, self.chunk_size)
+        return chunks
+
+    def _evict_finished(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit."""
+        excess = len(self._jobs) - self.retention
+        for job_id in [job_id for job_id, state in self._jobs.items() if state.job.is_finished][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _update(self, state: _JobState, **changes) -> None:
+        with state.changed:
+            state.job = state.job.model_copy(update=changes)
+            state.changed.notify_all()
+        if state.store is not None:
+            state.store.save_job(state.job)
+
+    def _run(
+        self,
+        state: _JobState,
+        documents: List[Document],
+        history: Optional[DocumentIndex],
+        duplicates: Optional[DuplicateIndex],
+        cross_check: bool,
+        templates: Optional[TemplateLibrary] = None,
+        triage: Optional[bool] = None,
+    ) -> None:
+        job_id = state.job.id
+        self._update(state, status=JobStatus.RUNNING, started_at=datetime.now().isoformat())
+        try:
+            stop_at = triage_threshold(triage)
+            chunks = self._chunks(documents)
+            futures: List[Future] = [
+                self.workers.submit(validate_batch, chunk, stop_at is not None) for chunk in chunks
+            ]
+            with self._lock:
+                self._pending_chunks += len(futures)
+            for chunk, future in zip(chunks, futures):
+                try:
+                    chunk_results = future.result()
+                finally:
+                    with self._lock:
+                        self._pending_chunks -= 1
+                if templates is not None:
+                    for document, result in zip(chunk, chunk_results):
+                        if not triaged(result, stop_at, TEMPLATE_MATCHING):
+                            add_issues(result, templates.issues_for(document))
+                if state.store is not None:
+                    state.store.add_job_results(job_id, chunk_results, state.job.completed)
+                if state.keep_results:
+                    with state.changed:
+                        state.results.extend(chunk_results)
+                elif self.store_results:
+                    self._result_store().replace_results(chunk_results, state.job.application_id)
+                self._update(state, completed=state.job.completed + len(chunk_results))
+
+            revised: List[int] = []
+            if cross_check:
+                revised = self._apply_cross_checks(state.results, documents, history, duplicates, stop_at)
+                if state.store is not None:
+                    state.store.replace_job_results(job_id, state.results)
+            if self.store_results and state.keep_results:
+                # Stored before the job reports completion, so exports taken after it see them
+                self._result_store().replace_results(state.results, state.job.application_id)
+
+            self._update(state, status=JobStatus.COMPLETED, finished_at=datetime.now().isoformat(), revised=revised)
+            logger.info(f"Validation job {job_id} completed for {len(documents)} documents")
+        except Exception as exc:
+            logger.exception(f"Validation job {job_id} failed")
+            self._update(state, status=JobStatus.FAILED, error=str(exc), finished_at=datetime.now().isoformat())
+
+    def _apply_cross_checks(
+        self,
+        results: List[ValidationResult],
+        documents: List[Document],
+        history: Optional[DocumentIndex],
+        duplicates: Optional[DuplicateIndex],
+        stop_at: Optional[float] = None,
+    ) -> List[int]:
+        """Add the cross-document and near-duplicate findings; returns the positions of the results they changed."""
+        revised = []
+        with self._history_lock:
+            cross_issues = cross_validate(documents, history, get_cross_rules())
+            for position, (document, result) in enumerate(zip(documents, results)):
+                reported = len(result.issues)
+                add_issues(result, cross_issues.get(document.id, []))
+                if duplicates is not None and not triaged(result, stop_at, DUPLICATE_SEARCH):
+                    add_issues(result, duplicates.issues_for(document))
+                if len(result.issues) != reported:
+                    revised.append(position)
+            for document in documents:
+                if history is not None:
+                    history.add(document)
+                if duplicates is not None:
+                    duplicates.add(document)
+        return revised
+
+    def _local(self, job_id: str) -> Optional[_JobState]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _state(self, job_id: str) -> _JobState:
+        state = self._local(job_id)
+        if state is None:
+            raise JobNotFoundError(job_id)
+        return state
+
+    def _stored(self, job_id: str) -> ValidationJob:
+        """A job run by another worker process, as last written to the store."""
+        job = self.store.get_job(job_id) if self.store is not None else None
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    def get(self, job_id: str) -> ValidationJob:
+        """Current status and progress of a job."""
+        state = self._local(job_id)
+        return state.job if state is not None else self._stored(job_id)
+
+    def results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ValidationResult]:
+        """Results validated so far, in submission order."""
+        state = self._local(job_id)
+        if state is None:
+            self._stored(job_id)
+            return self.store.list_job_results(job_id, offset, limit)
+        if not state.keep_results:
+            return state.store.list_job_results(job_id, offset, limit)
+        with state.changed:
+            end = None if limit is None else offset + limit
+            return state.results[offset:end]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> ValidationJob:
+        """Block until the job has finished (for scripts and worker threads)."""
+        state = self._local(job_id)
+        if state is None:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            job = self._stored(job_id)
+            while not job.is_finished and (deadline is None or time.monotonic() < deadline):
+                time.sleep(settings.JOB_POLL_INTERVAL)
+                job = self._stored(job_id)
+            return job
+        with state.changed:
+            state.changed.wait_for(lambda: state.job.is_finished, timeout=timeout)
+            return state.job
+
+    def _wait_for_change(self, state: _JobState, seen: ValidationJob, timeout: float) -> ValidationJob:
+        with state.changed:
+            state.changed.wait_for(lambda: state.job is not seen, timeout=timeout)
+            return state.job
+
+    async def stream(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[ValidationJob]:
+        """Yield the job each time its progress changes, ending once it finishes."""
+        loop = asyncio.get_running_loop()
+        state = self._local(job_id)
+        if state is None:
+            # Another worker runs the job: poll the store instead of waiting on its condition
+            job = await loop.run_in_executor(None, self._stored, job_id)
+            yield job
+            last_yield = loop.time()
+            while not job.is_finished:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                latest = await loop.run_in_executor(None, self._stored, job_id)
+                if latest != job or loop.time() - last_yield >= heartbeat:
+                    job = latest
+                    last_yield = loop.time()
+                    yield job
+            return
+        job = state.job
+        yield job
+        while not job.is_finished:
+            # The wait happens on a default-executor thread, never on the loop
+            job = await loop.run_in_executor(None, self._wait_for_change, state, job, heartbeat)
+            yield job
+
+    def _stream_entries(
+        self, job_id: str, state: Optional[_JobState], job: ValidationJob, start: int, end: int
+    ) -> List[Tuple[int, ValidationResult]]:
+        """Entries ``start`` to ``end`` of the result stream of ``job``."""
+        positions = [i if i < job.total else job.revised[i - job.total] for i in range(start, end)]
+        if state is not None and state.keep_results:
+            with state.changed:
+                return [(position, state.results[position]) for position in positions]
+        store = state.store if state is not None else self.store
+        # Results in submission order come in one query, revised ones one by one
+        in_order = max(0, min(end, job.total) - start)
+        entries = list(zip(positions, store.list_job_results(job_id, start, in_order))) if in_order else []
+        for position in positions[in_order:]:
+            entries.extend((position, result) for result in store.list_job_results(job_id, position, 1))
+        return entries
+
+    async def _next_change(self, job_id: str, state: Optional[_JobState], seen: ValidationJob, timeout: float) -> ValidationJob:
+        """The job once it differs from ``seen``, or as it is after ``timeout`` seconds."""
+        loop = asyncio.get_running_loop()
+        if state is not None:
+            return await loop.run_in_executor(None, self._wait_for_change, state, seen, timeout)
+        deadline = loop.time() + timeout
+        job = seen
+        while job == seen and loop.time() < deadline:
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+            job = await loop.run_in_executor(None, self._stored, job_id)
+        return job
+
+    async def stream_results(
+        self,
+        job_id: str,
+        offset: int = 0,
+        interval: float = settings.STREAM_COALESCE_INTERVAL,
+        max_batch: int = settings.STREAM_MAX_BATCH,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[ResultBatch]:
+        """Yield the job's result stream from ``offset`` on, in batches, ending once the job has finished.
+
+        A batch goes out as soon as results are ready; results that arrive
+        within ``interval`` of it wait for the next one, so a large job sends
+        a few hundred messages rather than one per document. Batches without
+        results report a change of status, or the unchanged job after
+        ``heartbeat`` seconds. The last batch carries the finished job.
+        """
+        loop = asyncio.get_running_loop()
+        state = self._local(job_id)
+        job = state.job if state is not None else await loop.run_in_executor(None, self._stored, job_id)
+        reported: Optional[ValidationJob] = None
+        while True:
+            available = job.completed + len(job.revised)
+            if offset < available:
+                end = min(available, offset + max_batch)
+                entries = await loop.run_in_executor(None, self._stream_entries, job_id, state, job, offset, end)
+                yield ResultBatch(job, offset, entries)
+                offset, reported = end, job
+                if offset < available:
+                    continue
+                if not job.is_finished:
+                    await asyncio.sleep(interval)
+            elif reported is None or job.status != reported.status:
+                yield ResultBatch(job, offset, [])
+                reported = job
+            if job.is_finished and offset >= available:
+                return
+            latest = await self._next_change(job_id, state, job, heartbeat)
+            if latest is job or latest == job:
+                # Nothing happened for a while; let the client know the stream is alive
+                yield ResultBatch(job, offset, [])
+            job = latest
+
+    def depth(self) -> Dict[str, int]:
+        """Number of retained jobs per status, plus chunks waiting on the worker pool."""
+        with self._lock:
+            counts = {status.value: 0 for status in JobStatus}
+            for state in self._jobs.values():
+                counts[state.job.status.value] += 1
+            counts["pending_chunks"] = self._pending_chunks
+        return counts
+
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running jobs to finish."""
+        self._coordinators.shutdown(wait=True)
+        if self._workers is not None:
+            self._workers.shutdown(wait=True)
+        logger.info("Validation job queue shut down")
+
+
+_queue: Optional[ValidationJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> ValidationJobQueue:
+    """Process-wide job queue configured from settings."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ValidationJobQueue()
+        return _queue
+
+
+def _queue_depth() -> Dict[tuple, float]:
+    if _queue is None:
+        return {}
+    depth = _queue.depth()
+    pending = depth.pop("pending_chunks")
+    return {("jobs", status): count for status, count in depth.items()} | {("chunks", "pending"): pending}
+
+
+callback_metric("validation_queue_depth", "Validation jobs by status and chunks awaiting a worker", ("kind", "status"), _queue_depth)
+
+
+def shutdown_job_queue() -> None:
+    """Shut down the process-wide job queue if it was started."""
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown()
+            _queue = None
@@ -0,0 +1,245 @@
+"""Fuzzy matching of customer and employer names.
+
+Exact comparison of normalized names fails on spelling variants ("Seán" and
+"Shaun", "Catherine" and "Kathryn") and initials ("J. Murphy"), while
+scoring every pair of names is quadratic. Names are therefore first
+grouped into blocks by cheap keys, and only names sharing a block are scored:
+
+- the token-sorted, accent-folded name (``normalize_name`` or
+  ``normalize_employer``);
+- for every pair of tokens, their Double Metaphone codes, so word order and
+  spelling variants still collide;
+- for every token, the initial of another token with its code, so
+  "J Murphy" and "John Murphy" meet.
+
+Pairs are scored with Jaro-Winkler per aligned token (and a Levenshtein
+ratio over the whole name when tokens were split or merged differently),
+and the scores are memoized. ``BlockingIndex`` holds
+the blocks for an application or for the full history of customers.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .phonetic import double_metaphone
+
+# Scores at or above which two names are taken to be the same customer or employer
+NAME_THRESHOLD = 0.87
+EMPLOYER_THRESHOLD = 0.9
+
+# Score of an initial against a full token starting with it
+INITIAL_SCORE = 0.92
+# Score of two tokens sharing a Double Metaphone code ("catherine" and "kathryn"),
+# if it has at least PHONETIC_MIN_CODE characters: "john" and "jane" are both JN
+PHONETIC_SCORE = 0.9
+PHONETIC_MIN_CODE = 3
+# An aligned token scoring below this caps the whole name at its score: "sean" is not "sulhan"
+TOKEN_FLOOR = 0.8
+# Deducted per token of the longer name left unaligned, e.g. a middle name
+EXTRA_TOKEN_PENALTY = 0.04
+
+SCORE_CACHE_SIZE = 262144
+# Blocks larger than this ("I:j|MRF": every J. Murphy) are skipped when a name has a smaller one
+MAX_BLOCK_SIZE = 500
+
+
+def _codes(token: str) -> Set[str]:
+    return {code for code in double_metaphone(token) if code} or {token.upper()}
+
+
+@lru_cache(maxsize=SCORE_CACHE_SIZE)
+def blocking_keys(key: str) -> FrozenSet[str]:
+    """Block keys of a normalized name; names sharing any key are scored against each other."""
+    words = key.split()
+    keys = {"T:" + " ".join(sorted(words))}
+    full = [word for word in words if len(word) > 1]
+    if len(full) == 1 and len(words) == 1:
+        keys.update("P:" + code for code in _codes(full[0]))
+    for i, first in enumerate(full):
+        for second in full[i + 1:]:
+            keys.update(
+                "P:" + "|".join(sorted((a, b))) for a in _codes(first) for b in _codes(second)
+            )
+    for i, word in enumerate(words):
+        if len(word) > 1:
+            keys.update(
+                f"I:{other[0]}|{code}" for j, other in enumerate(words) if j != i for code in _codes(word)
+            )
+    return frozenset(keys)
+
+
+@lru_cache(maxsize=SCORE_CACHE_SIZE)
+def jaro_winkler(a: str, b: str) -> float:
+    """Jaro-Winkler similarity of two strings, from 0 to 1."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    matched_b = [False] * len(b)
+    a_matches = []
+    for i, char in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not matched_b[j] and b[j] == char:
+                matched_b[j] = True
+                a_matches.append(char)
+                break
+    if not a_matches:
+        return 0.0
+    b_matches = [char for char, matched in zip(b, matched_b) if matched]
+    transpositions = sum(x != y for x, y in zip(a_matches, b_matches)) / 2
+    m = len(a_matches)
+    jaro = (m / len(a) + m / len(b) + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def _token_score(a: str, b: str) -> float:
+    if len(a) == 1 or len(b) == 1:
+        return INITIAL_SCORE if a[0] == b[0] else 0.0
+    score = jaro_winkler(a, b)
+    if score < PHONETIC_SCORE and any(len(code) >= PHONETIC_MIN_CODE for code in _codes(a) & _codes(b)):
+        return PHONETIC_SCORE
+    return score
+
+
+@lru_cache(maxsize=SCORE_CACHE_SIZE)
+def _score(a: str, b: str) -> float:
+    words_a, words_b = a.split(), b.split()
+    if not words_a or not words_b:
+        return 0.0
+    shorter, longer = sorted((words_a, words_b), key=len)
+    # Align each token of the shorter name with its best unused counterpart
+    remaining = list(longer)
+    scores = []
+    for word in sorted(shorter, key=len, reverse=True):
+        best = max(range(len(remaining)), key=lambda index: _token_score(word, remaining[index]))
+        scores.append(_token_score(word, remaining.pop(best)))
+    aligned = sum(scores) / len(scores) - EXTRA_TOKEN_PENALTY * len(remaining)
+    aligned = min(aligned, min(scores)) if min(scores) < TOKEN_FLOOR else aligned
+    if len(words_a) == len(words_b):
+        return aligned
+    # Tokens split or merged differently: "anne marie" and "annemarie"
+    joined_a, joined_b = "".join(words_a), "".join(words_b)
+    whole = 1 - levenshtein(joined_a, joined_b) / max(len(joined_a), len(joined_b))
+    return max(aligned, whole)
+
+
+def similarity(a: Optional[str], b: Optional[str]) -> float:
+    """Memoized similarity of two normalized names, from 0 to 1."""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    return _score(a, b) if a < b else _score(b, a)
+
+
+def names_match(a: Optional[str], b: Optional[str], threshold: float = NAME_THRESHOLD) -> bool:
+    """Whether two normalized names are close enough to be the same."""
+    return similarity(a, b) >= threshold
+
+
+def selective(blocks: List, size: Callable) -> List:
+    """The blocks of at most ``MAX_BLOCK_SIZE`` names, or the smallest block if all are larger."""
+    small = [block for block in blocks if size(block) <= MAX_BLOCK_SIZE]
+    if small or not blocks:
+        return small
+    return [min(blocks, key=size)]
+
+
+class BlockingIndex:
+    """Normalized names grouped into blocks, for finding similar names without a full scan.
+
+    Names are reference-counted, so the index can follow the postings of a
+    ``DocumentIndex`` as documents come and go.
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self._blocks: Dict[str, Set[str]] = defaultdict(set)
+        self._counts: Dict[str, int] = {}
+        for value in values:
+            self.add(value)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._counts
+
+    def add(self, value: str) -> None:
+        if value in self._counts:
+            self._counts[value] += 1
+            return
+        self._counts[value] = 1
+        for key in blocking_keys(value):
+            self._blocks[key].add(value)
+
+    def remove(self, value: str) -> None:
+        count = self._counts.get(value)
+        if count is None:
+            return
+        if count > 1:
+            self._counts[value] = count - 1
+            return
+        del self._counts[value]
+        for key in blocking_keys(value):
+            block = self._blocks[key]
+            block.discard(value)
+            if not block:
+                del self._blocks[key]
+
+    def candidates(self, value: str) -> Set[str]:
+        """Indexed names sharing a block with ``value``."""
+        blocks = [block for block in (self._blocks.get(key) for key in blocking_keys(value)) if block]
+        return set().union(*selective(blocks, len))
+
+    def similar(self, value: str, threshold: float = NAME_THRESHOLD) -> List[Tuple[str, float]]:
+        """Indexed names scoring at least ``threshold`` against ``value``, best first."""
+        scored = [(other, similarity(value, other)) for other in self.candidates(value)]
+        return sorted(
+            ((other, score) for other, score in scored if score >= threshold), key=lambda item: (-item[1], item[0])
+        )
+
+
+def cluster(values: Iterable[str], threshold: float = NAME_THRESHOLD) -> List[List[str]]:
+    """Group normalized names that match, directly or through each other.
+
+    Only names sharing a block are compared. Groups and their members are
+    sorted, so the result is deterministic.
+    """
+    values = sorted(set(values))
+    parent = {value: value for value in values}
+
+    def root(value: str) -> str:
+        while parent[value] != value:
+            parent[value] = parent[parent[value]]
+            value = parent[value]
+        return value
+
+    index = BlockingIndex(values)
+    for value in values:
+        for other, _ in index.similar(value, threshold):
+            a, b = root(value), root(other)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for value in values:
+        groups[root(value)].append(value)
+    return sorted(groups.values())
@@ -0,0 +1,84 @@
+"""Perceptual hashes of page images, and Hamming distances between them.
+
+A page is hashed with the DCT-based pHash: the grayscale image is shrunk to
+32 x 32, transformed with a 2-D DCT, and the 8 x 8 lowest frequencies are
+compared with their median to give 64 bits. Re-scanning, recompression or a
+different customer's details printed on the page flip only a few bits,
+while a different layout, logo or seal flips many. Besides the whole page,
+each of ``REGIONS`` is hashed on its own so a deviation can be located.
+
+Hashes are packed as rows of 8 bytes, so the distance from one hash to
+thousands is a single vectorized XOR and popcount (``hamming``).
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.models.document import PageLayout
+
+HASH_BITS = 64
+HASH_BYTES = HASH_BITS // 8
+
+# Region -> (left, top, right, bottom) as fractions of the page
+REGIONS: Dict[str, Tuple[float, float, float, float]] = {
+    "logo": (0.0, 0.0, 0.5, 0.15),
+    "header": (0.0, 0.0, 1.0, 0.25),
+    "seal": (0.5, 0.75, 1.0, 1.0),
+    "footer": (0.0, 0.85, 1.0, 1.0),
+}
+
+_SIZE = 32
+_LOW = 8
+# Orthonormal DCT-II basis: coefficients = D @ pixels @ D.T
+_DCT = np.sqrt(2.0 / _SIZE) * np.cos(np.pi * np.outer(np.arange(_SIZE), 2 * np.arange(_SIZE) + 1) / (2 * _SIZE))
+_DCT[0] /= np.sqrt(2.0)
+
+# Bits set in each byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def phash_pixels(pixels: np.ndarray) -> int:
+    """pHash of a 32 x 32 grayscale array."""
+    coefficients = _DCT @ np.asarray(pixels, dtype=np.float64) @ _DCT.T
+    low = coefficients[:_LOW, :_LOW].ravel()
+    # The DC term only measures overall brightness
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash(image) -> int:
+    """pHash of a PIL image."""
+    from PIL import Image
+    gray = image.convert("L").resize((_SIZE, _SIZE), resample=Image.Resampling.LANCZOS)
+    return phash_pixels(np.asarray(gray))
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def page_layout(image) -> PageLayout:
+    """Whole-page and per-region hashes of a page image (requires Pillow)."""
+    width, height = image.size
+    regions = {}
+    for name, (left, top, right, bottom) in REGIONS.items():
+        box = (int(left * width), int(top * height), max(int(right * width), 1), max(int(bottom * height), 1))
+        regions[name] = to_hex(phash(image.crop(box)))
+    return PageLayout(hash=to_hex(phash(image)), regions=regions)
+
+
+def pack(hashes: Iterable[Optional[str]]) -> np.ndarray:
+    """Hex hashes as an (n, 8) uint8 array; missing hashes become zero rows."""
+    hashes = list(hashes)
+    return np.frombuffer(
+        b"".join(bytes.fromhex(value) if value else bytes(HASH_BYTES) for value in hashes), dtype=np.uint8
+    ).reshape(len(hashes), HASH_BYTES)
+
+
+def hamming(packed: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Bits differing between every row of ``packed`` and ``query``.
+
+    ``packed`` is (..., 8) and ``query`` broadcasts against it: one hash,
+    or one hash per row of a batch given as (m, 1, 8) against (n, 8).
+    """
+    return POPCOUNT[np.bitwise_xor(packed, query)].sum(axis=-1, dtype=np.int32)
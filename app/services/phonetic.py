@@ -0,0 +1,372 @@
+"""Double Metaphone phonetic codes.
+
+A port of Lawrence Philips' Double Metaphone for the folded ASCII tokens of
+names and employer names. Each word gets a primary code and an alternate
+code for a second plausible pronunciation (they are often the same), so
+"Smith" and "Schmidt", or "Catherine" and "Kathryn", share a code. Codes are
+cut to ``MAX_LENGTH`` characters.
+"""
+from functools import lru_cache
+from typing import Tuple
+
+MAX_LENGTH = 4
+
+_VOWELS = frozenset("AEIOUY")
+_PAD = "      "
+
+
+class _Encoder:
+    """The state of encoding one word."""
+
+    def __init__(self, word: str):
+        self.word = word.upper() + _PAD
+        self.length = len(word)
+        self.last = self.length - 1
+        self.primary = []
+        self.alternate = []
+        self.slavo_germanic = any(part in self.word for part in ("W", "K", "CZ", "WITZ"))
+
+    def at(self, start: int, length: int, *options: str) -> bool:
+        if start < 0:
+            return False
+        return self.word[start:start + length] in options
+
+    def vowel(self, position: int) -> bool:
+        return 0 <= position < self.length and self.word[position] in _VOWELS
+
+    def add(self, main: str, alternate: str = None) -> None:
+        self.primary.append(main)
+        self.alternate.append(main if alternate is None else alternate)
+
+    def next_is(self, letter: str, position: int) -> int:
+        """2 when the letter after ``position`` repeats ``letter``, else 1."""
+        return 2 if self.word[position + 1] == letter else 1
+
+    def encode(self) -> Tuple[str, str]:
+        word, position = self.word, 0
+        if self.at(0, 2, "GN", "KN", "PN", "WR", "PS"):
+            position = 1
+        if word[0] == "X":
+            self.add("S")
+            position = 1
+        while position < self.length:
+            letter = word[position]
+            if letter in _VOWELS:
+                if position == 0:
+                    self.add("A")
+                position += 1
+            elif letter in "FKNQV":
+                self.add({"Q": "K", "V": "F"}.get(letter, letter))
+                position += self.next_is(letter, position)
+            else:
+                handler = getattr(self, f"_{letter}", None)
+                position = handler(position) if handler is not None else position + 1
+        primary = "".join(self.primary)[:MAX_LENGTH]
+        alternate = "".join(self.alternate)[:MAX_LENGTH]
+        return primary, alternate
+
+    def _B(self, position: int) -> int:
+        self.add("P")
+        return position + self.next_is("B", position)
+
+    def _C(self, position: int) -> int:
+        word = self.word
+        if (
+            position > 1 and not self.vowel(position - 2) and self.at(position - 1, 3, "ACH")
+            and word[position + 2] != "I"
+            and (word[position + 2] != "E" or self.at(position - 2, 6, "BACHER", "MACHER"))
+        ):
+            self.add("K")
+            return position + 2
+        if position == 0 and self.at(position, 6, "CAESAR"):
+            self.add("S")
+            return position + 2
+        if self.at(position, 4, "CHIA"):
+            self.add("K")
+            return position + 2
+        if self.at(position, 2, "CH"):
+            if position > 0 and self.at(position, 4, "CHAE"):
+                self.add("K", "X")
+            elif (
+                position == 0
+                and (self.at(position + 1, 5, "HARAC", "HARIS") or self.at(position + 1, 3, "HOR", "HYM", "HIA", "HEM"))
+                and not self.at(0, 5, "CHORE")
+            ):
+                self.add("K")
+            elif (
+                self.at(0, 4, "VAN ", "VON ") or self.at(0, 3, "SCH")
+                or self.at(position - 2, 6, "ORCHES", "ARCHIT", "ORCHID")
+                or self.at(position + 2, 1, "T", "S")
+                or (
+                    (self.at(position - 1, 1, "A", "O", "U", "E") or position == 0)
+                    and self.at(position + 2, 1, "L", "R", "N", "M", "B", "H", "F", "V", "W", " ")
+                )
+            ):
+                self.add("K")
+            elif position > 0:
+                if self.at(0, 2, "MC"):
+                    self.add("K")
+                else:
+                    self.add("X", "K")
+            else:
+                self.add("X")
+            return position + 2
+        if self.at(position, 2, "CZ") and not self.at(position - 2, 4, "WICZ"):
+            self.add("S", "X")
+            return position + 2
+        if self.at(position + 1, 3, "CIA"):
+            self.add("X")
+            return position + 3
+        if self.at(position, 2, "CC") and not (position == 1 and word[0] == "M"):
+            if self.at(position + 2, 1, "I", "E", "H") and not self.at(position + 2, 2, "HU"):
+                if (position == 1 and word[0] == "A") or self.at(position - 1, 5, "UCCEE", "UCCES"):
+                    self.add("KS")
+                else:
+                    self.add("X")
+                return position + 3
+            self.add("K")
+            return position + 2
+        if self.at(position, 2, "CK", "CG", "CQ"):
+            self.add("K")
+            return position + 2
+        if self.at(position, 2, "CI", "CE", "CY"):
+            if self.at(position, 3, "CIO", "CIE", "CIA"):
+                self.add("S", "X")
+            else:
+                self.add("S")
+            return position + 2
+        self.add("K")
+        if self.at(position + 1, 1, "C", "K", "Q") and not self.at(position + 1, 2, "CE", "CI"):
+            return position + 2
+        return position + 1
+
+    def _D(self, position: int) -> int:
+        if self.at(position, 2, "DG"):
+            if self.at(position + 2, 1, "I", "E", "Y"):
+                self.add("J")
+                return position + 3
+            self.add("TK")
+            return position + 2
+        self.add("T")
+        return position + (2 if self.at(position, 2, "DT", "DD") else 1)
+
+    def _G(self, position: int) -> int:
+        word = self.word
+        following = word[position + 1]
+        if following == "H":
+            if position > 0 and not self.vowel(position - 1):
+                self.add("K")
+            elif position == 0:
+                self.add("J" if word[position + 2] == "I" else "K")
+            elif (
+                (position > 1 and self.at(position - 2, 1, "B", "H", "D"))
+                or (position > 2 and self.at(position - 3, 1, "B", "H", "D"))
+                or (position > 3 and self.at(position - 4, 1, "B", "H"))
+            ):
+                pass
+            elif position > 2 and word[position - 1] == "U" and self.at(position - 3, 1, "C", "G", "L", "R", "T"):
+                self.add("F")
+            elif word[position - 1] != "I":
+                self.add("K")
+            return position + 2
+        if following == "N":
+            if position == 1 and self.vowel(0) and not self.slavo_germanic:
+                self.add("KN", "N")
+            elif not self.at(position + 2, 2, "EY") and not self.slavo_germanic:
+                self.add("N", "KN")
+            else:
+                self.add("KN")
+            return position + 2
+        if self.at(position + 1, 2, "LI") and not self.slavo_germanic:
+            self.add("KL", "L")
+            return position + 2
+        if position == 0 and (
+            following == "Y"
+            or self.at(position + 1, 2, "ES", "EP", "EB", "EL", "EY", "IB", "IL", "IN", "IE", "EI", "ER")
+        ):
+            self.add("K", "J")
+            return position + 2
+        if (
+            (self.at(position + 1, 2, "ER") or following == "Y")
+            and not self.at(0, 6, "DANGER", "RANGER", "MANGER")
+            and not self.at(position - 1, 1, "E", "I")
+            and not self.at(position - 1, 3, "RGY", "OGY")
+        ):
+            self.add("K", "J")
+            return position + 2
+        if self.at(position + 1, 1, "E", "I", "Y") or self.at(position - 1, 4, "AGGI", "OGGI"):
+            if self.at(0, 4, "VAN ", "VON ") or self.at(0, 3, "SCH") or self.at(position + 1, 2, "ET"):
+                self.add("K")
+            elif self.at(position + 1, 4, "IER "):
+                self.add("J")
+            else:
+                self.add("J", "K")
+            return position + 2
+        self.add("K")
+        return position + self.next_is("G", position)
+
+    def _H(self, position: int) -> int:
+        if (position == 0 or self.vowel(position - 1)) and self.vowel(position + 1):
+            self.add("H")
+            return position + 2
+        return position + 1
+
+    def _J(self, position: int) -> int:
+        word = self.word
+        if self.at(position, 4, "JOSE") or self.at(0, 4, "SAN "):
+            if (position == 0 and word[position + 4] == " ") or self.at(0, 4, "SAN "):
+                self.add("H")
+            else:
+                self.add("J", "H")
+            return position + 1
+        if position == 0:
+            self.add("J", "A")
+        elif self.vowel(position - 1) and not self.slavo_germanic and word[position + 1] in "AO":
+            self.add("J", "H")
+        elif position == self.last:
+            self.add("J", "")
+        elif not self.at(position + 1, 1, "L", "T", "K", "S", "N", "M", "B", "Z") and not self.at(position - 1, 1, "S", "K", "L"):
+            self.add("J")
+        return position + self.next_is("J", position)
+
+    def _L(self, position: int) -> int:
+        if self.word[position + 1] == "L":
+            if (
+                (position == self.length - 3 and self.at(position - 1, 4, "ILLO", "ILLA", "ALLE"))
+                or (
+                    (self.at(self.last - 1, 2, "AS", "OS") or self.at(self.last, 1, "A", "O"))
+                    and self.at(position - 1, 4, "ALLE")
+                )
+            ):
+                self.add("L", "")
+            else:
+                self.add("L")
+            return position + 2
+        self.add("L")
+        return position + 1
+
+    def _M(self, position: int) -> int:
+        self.add("M")
+        if (
+            self.at(position - 1, 3, "UMB") and (position + 1 == self.last or self.at(position + 2, 2, "ER"))
+        ) or self.word[position + 1] == "M":
+            return position + 2
+        return position + 1
+
+    def _P(self, position: int) -> int:
+        if self.word[position + 1] == "H":
+            self.add("F")
+            return position + 2
+        self.add("P")
+        return position + (2 if self.at(position + 1, 1, "P", "B") else 1)
+
+    def _R(self, position: int) -> int:
+        if (
+            position == self.last and not self.slavo_germanic
+            and self.at(position - 2, 2, "IE") and not self.at(position - 4, 2, "ME", "MA")
+        ):
+            self.add("", "R")
+        else:
+            self.add("R")
+        return position + self.next_is("R", position)
+
+    def _S(self, position: int) -> int:
+        word = self.word
+        if self.at(position - 1, 3, "ISL", "YSL"):
+            return position + 1
+        if position == 0 and self.at(position, 5, "SUGAR"):
+            self.add("X", "S")
+            return position + 1
+        if self.at(position, 2, "SH"):
+            self.add("S" if self.at(position + 1, 4, "HEIM", "HOEK", "HOLM", "HOLZ") else "X")
+            return position + 2
+        if self.at(position, 3, "SIO", "SIA") or self.at(position, 4, "SIAN"):
+            if self.slavo_germanic:
+                self.add("S")
+            else:
+                self.add("S", "X")
+            return position + 3
+        if (position == 0 and self.at(position + 1, 1, "M", "N", "L", "W")) or self.at(position + 1, 1, "Z"):
+            self.add("S", "X")
+            return position + (2 if self.at(position + 1, 1, "Z") else 1)
+        if self.at(position, 2, "SC"):
+            if word[position + 2] == "H":
+                if self.at(position + 3, 2, "OO", "ER", "EN", "UY", "ED", "EM"):
+                    if self.at(position + 3, 2, "ER", "EN"):
+                        self.add("X", "SK")
+                    else:
+                        self.add("SK")
+                elif position == 0 and not self.vowel(3) and word[3] != "W":
+                    self.add("X", "S")
+                else:
+                    self.add("X")
+            elif self.at(position + 2, 1, "I", "E", "Y"):
+                self.add("S")
+            else:
+                self.add("SK")
+            return position + 3
+        if position == self.last and self.at(position - 2, 2, "AI", "OI"):
+            self.add("", "S")
+        else:
+            self.add("S")
+        return position + (2 if self.at(position + 1, 1, "S", "Z") else 1)
+
+    def _T(self, position: int) -> int:
+        if self.at(position, 4, "TION") or self.at(position, 3, "TIA", "TCH"):
+            self.add("X")
+            return position + 3
+        if self.at(position, 2, "TH") or self.at(position, 3, "TTH"):
+            if self.at(position + 2, 2, "OM", "AM") or self.at(0, 4, "VAN ", "VON ") or self.at(0, 3, "SCH"):
+                self.add("T")
+            else:
+                self.add("0", "T")
+            return position + 2
+        self.add("T")
+        return position + (2 if self.at(position + 1, 1, "T", "D") else 1)
+
+    def _W(self, position: int) -> int:
+        if self.at(position, 2, "WR"):
+            self.add("R")
+            return position + 2
+        if position == 0 and (self.vowel(position + 1) or self.at(position, 2, "WH")):
+            if self.vowel(position + 1):
+                self.add("A", "F")
+            else:
+                self.add("A")
+        if (
+            (position == self.last and self.vowel(position - 1))
+            or self.at(position - 1, 5, "EWSKI", "EWSKY", "OWSKI", "OWSKY")
+            or self.at(0, 3, "SCH")
+        ):
+            self.add("", "F")
+            return position + 1
+        if self.at(position, 4, "WICZ", "WITZ"):
+            self.add("TS", "FX")
+            return position + 4
+        return position + 1
+
+    def _X(self, position: int) -> int:
+        if not (
+            position == self.last
+            and (self.at(position - 3, 3, "IAU", "EAU") or self.at(position - 2, 2, "AU", "OU"))
+        ):
+            self.add("KS")
+        return position + (2 if self.at(position + 1, 1, "C", "X") else 1)
+
+    def _Z(self, position: int) -> int:
+        if self.word[position + 1] == "H":
+            self.add("J")
+            return position + 2
+        if self.at(position + 1, 2, "ZO", "ZI", "ZA") or (
+            self.slavo_germanic and position > 0 and self.word[position - 1] != "T"
+        ):
+            self.add("S", "TS")
+        else:
+            self.add("S")
+        return position + self.next_is("Z", position)
+
+
+@lru_cache(maxsize=65536)
+def double_metaphone(word: str) -> Tuple[str, str]:
+    """Primary and alternate codes of one word; the alternate often equals the primary."""
+    return _Encoder(word).encode()
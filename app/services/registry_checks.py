@@ -0,0 +1,99 @@
+"""Checks of document identifiers against official registries.
+
+Every distinct PPSN, IBAN and employer in a batch is looked up concurrently
+through the ``RegistryClient``, and each document is compared with what the
+registry holds: whether the identifier is registered at all, and whether it
+is registered to the same person (name and date of birth) or is still active.
+A registry that cannot be reached yields a LOW issue asking for a manual
+check rather than failing the validation.
+"""
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.logging_config import get_logger
+from app.models.document import Document, ValidationIssue
+from app.models.registry import RegistryKind, RegistryRecord
+from .document_index import normalize_dob, normalize_name
+from .name_matching import names_match
+from .registry_client import RegistryClient, RegistryUnavailableError, get_registry_client
+
+logger = get_logger(__name__)
+
+CATEGORY = "Official Source Verification"
+
+# Registry -> (Document field looked up, label used in issues)
+REGISTRY_FIELDS: Dict[RegistryKind, Tuple[str, str]] = {
+    RegistryKind.PPSN: ("ppsn_number", "PPSN"),
+    RegistryKind.ACCOUNT: ("account_number", "Account number"),
+    RegistryKind.EMPLOYER: ("employer_name", "Employer"),
+}
+
+# Registry statuses that mean the identifier is no longer in good standing
+INACTIVE_STATUSES = frozenset({"closed", "ceased", "cancelled", "dissolved", "struck off", "liquidation"})
+
+
+def _issue(severity: str, description: str, recommendation: str) -> ValidationIssue:
+    return ValidationIssue(severity=severity, category=CATEGORY, description=description, recommendation=recommendation)
+
+
+def _compare(document: Document, kind: RegistryKind, record: Optional[RegistryRecord]) -> List[ValidationIssue]:
+    """Issues raised by comparing ``document`` with the registry's answer for one of its fields."""
+    label = REGISTRY_FIELDS[kind][1]
+    if record is None:
+        if kind == RegistryKind.EMPLOYER:
+            return [_issue("MEDIUM", "Employer is not on the companies register",
+                           "Confirm the employer's legal name and registration with the customer")]
+        return [_issue("HIGH", f"{label} is not registered", f"Verify the {label.lower()} with the issuing authority")]
+
+    issues = []
+    if record.status and record.status.casefold() in INACTIVE_STATUSES:
+        issues.append(_issue("HIGH" if kind == RegistryKind.ACCOUNT else "MEDIUM",
+                             f"{label} is registered as {record.status}",
+                             f"Ask for evidence of a current {label.lower()}"))
+    if kind == RegistryKind.EMPLOYER:
+        return issues
+    if record.name and not names_match(normalize_name(record.name), normalize_name(document.customer_name)):
+        issues.append(_issue("HIGH", f"{label} is registered to a different name",
+                             "Escalate to the fraud team as a possible identity mismatch"))
+    if record.dob and document.customer_dob and normalize_dob(record.dob) != normalize_dob(document.customer_dob):
+        issues.append(_issue("HIGH", f"{label} is registered with a different date of birth",
+                             "Confirm the date of birth against photo ID"))
+    return issues
+
+
+async def registry_issues(
+    documents: Sequence[Document],
+    client: Optional[RegistryClient] = None,
+) -> List[List[ValidationIssue]]:
+    """Registry issues for each of ``documents``, in input order (empty when lookups are disabled)."""
+    client = client or get_registry_client()
+    if client is None:
+        return [[] for _ in documents]
+
+    lookups = [
+        (position, kind, getattr(document, field))
+        for position, document in enumerate(documents)
+        for kind, (field, _) in REGISTRY_FIELDS.items()
+        if getattr(document, field)
+    ]
+    # Repeated identifiers are coalesced or cached by the client
+    answers = await asyncio.gather(
+        *(client.lookup(kind, value) for _, kind, value in lookups), return_exceptions=True
+    )
+
+    issues: List[List[ValidationIssue]] = [[] for _ in documents]
+    unavailable = 0
+    for (position, kind, _), answer in zip(lookups, answers):
+        if isinstance(answer, RegistryUnavailableError):
+            unavailable += 1
+            issues[position].append(_issue(
+                "LOW", f"{REGISTRY_FIELDS[kind][1]} could not be checked with the registry",
+                "Verify it manually with the issuing authority",
+            ))
+        elif isinstance(answer, BaseException):
+            raise answer
+        else:
+            issues[position].extend(_compare(documents[position], kind, answer))
+    if unavailable:
+        logger.warning(f"{unavailable} of {len(lookups)} registry lookups failed")
+    return issues
@@ -0,0 +1,188 @@
+"""Async client for official-registry lookups.
+
+PPSNs are checked with Revenue, IBANs with the issuing bank and employers
+with the companies register, all through one HTTP gateway at
+``REGISTRY_URL`` (``registry_stub.py`` serves the same API locally):
+
+    GET /ppsn/{ppsn}            -> {"name", "dob", "status"}
+    GET /accounts/{iban}        -> {"name", "status"}
+    GET /employers?name={name}  -> {"name", "status"}
+
+404 means the identifier is not registered. Lookups share a pool of
+keep-alive connections and at most ``REGISTRY_CONCURRENCY`` run at once.
+Identical lookups already in flight are coalesced into one request, and
+answers (including "not registered") are kept in a bounded TTL cache, so
+validating an application costs one round trip per distinct identifier at
+most. Failures are raised as ``RegistryUnavailableError`` and never cached.
+"""
+import asyncio
+import threading
+import time
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+import httpx
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import callback_metric, counter, histogram
+from app.models.registry import RegistryKind, RegistryRecord
+from .document_index import normalize_account, normalize_employer
+
+logger = get_logger(__name__)
+
+REGISTRY_REQUESTS = counter("registry_requests_total", "Requests sent to official registries", ("registry", "outcome"))
+REGISTRY_SECONDS = histogram("registry_request_duration_seconds", "Official registry request latency", ("registry",))
+
+# Lookup key for each registry, so spelling variants share requests and cache entries
+KEY_NORMALIZERS = {
+    RegistryKind.PPSN: normalize_account,
+    RegistryKind.ACCOUNT: normalize_account,
+    RegistryKind.EMPLOYER: normalize_employer,
+}
+
+_MISSING = object()
+
+
+class RegistryUnavailableError(Exception):
+    """The registry could not be reached or answered with an error."""
+
+
+class RegistryClient:
+    """Pooled, coalescing and caching client for the registry gateway.
+
+    Must be used from a single event loop, since the connection pool and the
+    in-flight requests belong to it.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = settings.REGISTRY_TIMEOUT,
+        max_connections: int = settings.REGISTRY_MAX_CONNECTIONS,
+        concurrency: int = settings.REGISTRY_CONCURRENCY,
+        cache_size: int = settings.REGISTRY_CACHE_SIZE,
+        cache_ttl: int = settings.REGISTRY_CACHE_TTL,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._in_flight: Dict[Tuple[RegistryKind, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _request(kind: RegistryKind, key: str) -> Tuple[str, Optional[dict]]:
+        if kind == RegistryKind.PPSN:
+            return f"/ppsn/{key}", None
+        if kind == RegistryKind.ACCOUNT:
+            return f"/accounts/{key}", None
+        return "/employers", {"name": key}
+
+    async def lookup(self, kind: RegistryKind, value: Optional[str]) -> Optional[RegistryRecord]:
+        """The registry's record for ``value``; None when it is unset or not registered."""
+        key = KEY_NORMALIZERS[kind](value)
+        if key is None:
+            return None
+        cache_key = (kind, key)
+        cached = self._cache.get(cache_key, _MISSING)
+        if cached is not _MISSING:
+            self.hits += 1
+            return cached
+
+        task = self._in_flight.get(cache_key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.get_running_loop().create_task(self._fetch(kind, key))
+            self._in_flight[cache_key] = task
+            task.add_done_callback(partial(self._finished, cache_key))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller giving up does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def _finished(self, cache_key: Tuple[RegistryKind, str], task: asyncio.Task) -> None:
+        self._in_flight.pop(cache_key, None)
+        # Reading the exception marks it retrieved even if every caller has gone
+        if not task.cancelled() and task.exception() is None:
+            self._cache[cache_key] = task.result()
+
+    async def _fetch(self, kind: RegistryKind, key: str) -> Optional[RegistryRecord]:
+        path, params = self._request(kind, key)
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self._client.get(path, params=params)
+            except httpx.HTTPError as exc:
+                REGISTRY_REQUESTS.labels(kind.value, "error").inc()
+                logger.warning(f"{kind.value} registry lookup failed: {exc!r}")
+                raise RegistryUnavailableError(f"{kind.value} registry unavailable: {exc!r}") from exc
+            finally:
+                REGISTRY_SECONDS.labels(kind.value).observe(time.perf_counter() - started)
+
+        if response.status_code == 404:
+            REGISTRY_REQUESTS.labels(kind.value, "not_found").inc()
+            return None
+        if response.status_code >= 400:
+            REGISTRY_REQUESTS.labels(kind.value, "error").inc()
+            logger.warning(f"{kind.value} registry answered {response.status_code} for a lookup")
+            raise RegistryUnavailableError(f"{kind.value} registry answered {response.status_code}")
+        REGISTRY_REQUESTS.labels(kind.value, "found").inc()
+        return RegistryRecord(kind=kind, key=key, **response.json())
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "entries": len(self._cache),
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_client: Optional[RegistryClient] = None
+_client_lock = threading.Lock()
+
+
+def get_registry_client() -> Optional[RegistryClient]:
+    """Process-wide registry client, or None when ``REGISTRY_URL`` is not set."""
+    global _client
+    if not settings.REGISTRY_URL:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = RegistryClient(settings.REGISTRY_URL)
+            logger.info(f"Registry lookups go to {settings.REGISTRY_URL}")
+        return _client
+
+
+async def close_registry_client() -> None:
+    """Close the process-wide client's connections, if it was created."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+def _client_metric(name: str):
+    def read():
+        return {(): _client.stats()[name]} if _client is not None else {}
+    return read
+
+
+callback_metric("registry_cache_hits_total", "Registry lookups answered from cache", (), _client_metric("hits"), kind="counter")
+callback_metric("registry_coalesced_total", "Registry lookups joined to one already in flight", (),
+                _client_metric("coalesced"), kind="counter")
+callback_metric("registry_cache_entries", "Registry answers held in the cache", (), _client_metric("entries"))
@@ -0,0 +1,108 @@
+"""Local stand-in for the official-registry gateway.
+
+Serves the API ``RegistryClient`` expects from records held in memory, with
+optional latency and failure injection, so registry checks can be exercised
+without the real services:
+
+    python -m app.services.registry_stub --port 8100 --latency 0.05
+    REGISTRY_URL=http://localhost:8100 python main.py
+
+Run from the command line, it registers every PPSN, account and employer in
+the document store to the customer who first submitted it. In-process, pass
+``create_stub_app(...)`` to ``httpx.ASGITransport`` and hand the transport
+to ``RegistryClient``.
+"""
+import argparse
+import asyncio
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from fastapi import FastAPI, HTTPException
+
+from app.models.document import Document
+from .document_index import normalize_account, normalize_employer
+
+
+@dataclass
+class RegistryData:
+    """Registry records by normalized key: PPSNs, IBANs and employer names."""
+    ppsns: Dict[str, dict] = field(default_factory=dict)
+    accounts: Dict[str, dict] = field(default_factory=dict)
+    employers: Dict[str, dict] = field(default_factory=dict)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document]) -> "RegistryData":
+        """Register each identifier to the first customer seen with it; every employer is active."""
+        data = cls()
+        for document in documents:
+            ppsn = normalize_account(document.ppsn_number)
+            if ppsn:
+                data.ppsns.setdefault(ppsn, {
+                    "name": document.customer_name, "dob": document.customer_dob, "status": "active",
+                })
+            account = normalize_account(document.account_number)
+            if account:
+                data.accounts.setdefault(account, {"name": document.customer_name, "status": "open"})
+            employer = normalize_employer(document.employer_name)
+            if employer:
+                data.employers.setdefault(employer, {"name": document.employer_name, "status": "normal"})
+        return data
+
+
+def create_stub_app(
+    data: RegistryData,
+    latency: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    """Registry gateway serving ``data``; ``app.state.requests`` counts requests per registry."""
+    app = FastAPI(title="Registry stub")
+    app.state.requests = Counter()
+    rnd = random.Random(seed)
+
+    async def answer(registry: str, records: Dict[str, dict], key: Optional[str]) -> dict:
+        app.state.requests[registry] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if failure_rate and rnd.random() < failure_rate:
+            raise HTTPException(status_code=503, detail="Registry temporarily unavailable")
+        record = records.get(key) if key else None
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Not registered with the {registry} registry")
+        return record
+
+    @app.get("/ppsn/{ppsn}")
+    async def ppsn_record(ppsn: str):
+        return await answer("ppsn", data.ppsns, normalize_account(ppsn))
+
+    @app.get("/accounts/{iban}")
+    async def account_record(iban: str):
+        return await answer("account", data.accounts, normalize_account(iban))
+
+    @app.get("/employers")
+    async def employer_record(name: str):
+        return await answer("employer", data.employers, normalize_employer(name))
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+    from .storage import get_store
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the official registries")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    data = RegistryData.from_documents(get_store().iter_documents())
+    app = create_stub_app(data, latency=args.latency, failure_rate=args.failure_rate)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
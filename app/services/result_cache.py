@@ -0,0 +1,166 @@
+"""Content-addressed cache of per-document validation issues.
+
+The key is a hash of the document's canonical content (everything except its
+id and upload date), the rule-set version and the current date, since some
+rules compare against today. A new rule-set version therefore never hits old
+entries, and the cache drops them as soon as it sees the version change.
+
+The memory tier is a bounded LRU/TTL ``cachetools.TTLCache``; an optional
+SQLite file adds a larger second tier that survives restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import callback_metric
+from app.models.document import Document, ValidationIssue
+
+logger = get_logger(__name__)
+
+# Fields that identify a submission rather than describe its content
+KEY_EXCLUDED_FIELDS = frozenset({"id", "upload_date"})
+
+
+def content_key(document: Document, version: str) -> str:
+    """Cache key for ``document`` under rule-set ``version``."""
+    canonical = document.model_dump_json(exclude=KEY_EXCLUDED_FIELDS, exclude_none=True)
+    digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{version}:{date.today().isoformat()}:{digest}"
+
+
+class ResultCache:
+    """Two-tier cache mapping document content to the issues it produced."""
+
+    def __init__(
+        self,
+        maxsize: int = settings.RESULT_CACHE_SIZE,
+        ttl: int = settings.RESULT_CACHE_TTL,
+        disk_path: Optional[str] = settings.RESULT_CACHE_DISK_PATH,
+    ):
+        self.ttl = ttl
+        self._memory: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, timeout=30)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, created REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._disk.commit()
+
+    def _check_version(self, version: str) -> None:
+        """Drop every entry when the rule-set version changes (caller holds the lock)."""
+        if version == self._version:
+            return
+        if self._version is not None:
+            logger.info(f"Rule set changed from {self._version} to {version}; clearing result cache")
+        self._memory.clear()
+        if self._disk is not None:
+            with self._disk:
+                self._disk.execute("DELETE FROM result_cache WHERE version != ?", (version,))
+        self._version = version
+
+    def get(self, document: Document, version: str) -> Optional[Tuple[ValidationIssue, ...]]:
+        """Cached issues for ``document``, or None on a miss."""
+        key = content_key(document, version)
+        with self._lock:
+            self._check_version(version)
+            issues = self._memory.get(key)
+            if issues is None and self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT payload FROM result_cache WHERE key = ? AND created > ?",
+                    (key, time.time() - self.ttl),
+                ).fetchone()
+                if row:
+                    issues = tuple(ValidationIssue(**issue) for issue in json.loads(row[0]))
+                    self._memory[key] = issues
+            if issues is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return issues
+
+    def put(self, document: Document, version: str, issues: List[ValidationIssue]) -> None:
+        """Remember the issues found for ``document`` under ``version``."""
+        self.put_many([(document, issues)], version)
+
+    def put_many(self, entries: Sequence[Tuple[Document, List[ValidationIssue]]], version: str) -> None:
+        """Remember several results at once, in a single disk transaction."""
+        if not entries:
+            return
+        frozen = [(content_key(document, version), tuple(issues)) for document, issues in entries]
+        with self._lock:
+            self._check_version(version)
+            for key, issues in frozen:
+                self._memory[key] = issues
+            if self._disk is not None:
+                now = time.time()
+                with self._disk:
+                    self._disk.executemany(
+                        "INSERT OR REPLACE INTO result_cache (key, version, created, payload) VALUES (?, ?, ?, ?)",
+                        [
+                            (key, version, now, json.dumps([issue.model_dump() for issue in issues]))
+                            for key, issues in frozen
+                        ],
+                    )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                with self._disk:
+                    self._disk.execute("DELETE FROM result_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, or None when disabled in settings."""
+    global _cache
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def _cache_metric(name: str):
+    """Callback reading one counter from the live cache's stats."""
+    def read():
+        return {(): _cache.stats()[name]} if _cache is not None else {}
+    return read
+
+
+callback_metric("validation_result_cache_hits_total", "Result cache hits", (), _cache_metric("hits"), kind="counter")
+callback_metric("validation_result_cache_misses_total", "Result cache misses", (), _cache_metric("misses"), kind="counter")
+callback_metric("validation_result_cache_entries", "Results held in the memory tier", (), _cache_metric("entries"))
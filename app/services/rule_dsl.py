@@ -0,0 +1,551 @@
+"""Declarative validation rules, compiled to Python.
+
+A rule file (JSON, or YAML with the optional PyYAML package) adjusts the
+built-in catalogue without a code change: its rules replace built-in rules
+with the same id, in place, or are appended; ``disable`` drops rules::
+
+    version: 4
+    constants:
+      high_monthly_gross: 30000
+    disable: [PAY-004]
+    rules:
+      - id: PAY-005
+        category: Behavioral & Contextual
+        description: Gross pay should be within the expected range
+        severity: MEDIUM
+        recommendation: Verify the salary with the employer
+        types: [Payslip]
+        fail: gross_pay > high_monthly_gross
+        message: "Gross pay €{gross_pay:,.2f} is unusually high for a single pay period"
+    cross_rules:
+      - id: XDOC-009
+        ...
+        join: [Payslip, Payslip]
+        on: employer
+        flag: left
+        fail: abs(left.gross_pay - right.gross_pay) > 0.25 * right.gross_pay
+        message: "..."
+
+``fail`` and the ``{...}`` parts of ``message`` are Python expressions over
+document fields, the file's constants and ``FUNCTIONS``; attribute access
+(other than ``.year``, ``.month`` and ``.day``), comprehensions, lambdas
+and every other construct are rejected. A rule runs only on documents where
+the fields in ``requires`` (by default, every field it reads) are set. An
+expression that cannot be evaluated, such as a division by zero, passes.
+
+Cross-document rules join each document of the first ``join`` type with
+every document of the second, optionally only where the ``on`` index key
+(see ``KEY_FIELDS``) is equal, and flag the ``flag`` side when ``any`` (or,
+with ``match: all``, every) pair fails.
+
+Every rule is compiled once into a function whose source is what one would
+write by hand: fields read into locals, constants inlined as literals,
+patterns compiled up front. Rules over numeric fields alone also get a
+NumPy prefilter, so batch validation treats them like the built-in rules.
+The generated source is kept on the rule and is part of its fingerprint.
+"""
+import ast
+import hashlib
+import json
+import re
+from datetime import date
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar
+
+import numpy as np
+
+from app.models.document import SEVERITY_WEIGHTS, Document, DocumentType
+from .cross_document import CROSS_DOCUMENT_RULES, CrossDocumentRule, Findings
+from .document_batch import NUMERIC_FIELDS
+from .document_index import KEY_FIELDS, DocumentIndex
+from .validation_rules import (
+    ALL_DOCUMENT_TYPES, RULES, Rule, iban_checksum_valid, normalize_identifier, parse_date, ppsn_check_character,
+)
+
+DOCUMENT_FIELDS: FrozenSet[str] = frozenset(Document.model_fields)
+
+RULE_KEYS = frozenset({"id", "category", "description", "severity", "recommendation", "types", "requires", "fail", "message"})
+CROSS_RULE_KEYS = frozenset({
+    "id", "category", "description", "severity", "recommendation", "join", "on", "flag", "match", "requires", "fail",
+    "message",
+})
+REQUIRED_KEYS = ("id", "category", "description", "severity", "recommendation", "fail", "message")
+FILE_KEYS = frozenset({"version", "constants", "disable", "rules", "cross_rules"})
+
+# Attributes of the dates returned by date() that expressions may read
+DATE_ATTRIBUTES = frozenset({"year", "month", "day"})
+# Errors that make a rule pass rather than fail the validation, e.g. a function applied to an unset field
+EVALUATION_ERRORS = "(ArithmeticError, AttributeError, TypeError, ValueError)"
+
+
+def _age(value: Optional[str]) -> Optional[int]:
+    born = parse_date(value)
+    if born is None:
+        return None
+    today = date.today()
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+def _days_since(value: Optional[str]) -> Optional[int]:
+    when = parse_date(value)
+    return None if when is None else (date.today() - when).days
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+# Functions rule expressions may call; matches(value, "pattern") is compiled separately
+FUNCTIONS: Dict[str, Callable] = {
+    "date": parse_date,  # ISO date prefix of a string, or None
+    "today": date.today,
+    "age": _age,  # Full years from an ISO date to today
+    "days_since": _days_since,
+    "normalized": normalize_identifier,  # Uppercased, without spaces and dashes
+    "iban_valid": iban_checksum_valid,
+    "ppsn_check_character": ppsn_check_character,
+    "blank": _blank,  # None or only whitespace
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "round": round,
+    "len": len,
+}
+MATCHES = "matches"
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv,
+    ast.Mod, ast.UnaryOp, ast.USub, ast.UAdd, ast.Not, ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt,
+    ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot, ast.IfExp, ast.Load, ast.List, ast.Tuple, ast.JoinedStr,
+    ast.FormattedValue,
+)
+_VECTOR_NODES = (
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.UnaryOp, ast.USub, ast.UAdd, ast.Load,
+)
+_VECTOR_COMPARISONS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+_VECTOR_FUNCTIONS = {"abs": "abs", "min": "minimum", "max": "maximum"}
+_CONSTANT_TYPES = (bool, int, float, str, type(None))
+
+RuleT = TypeVar("RuleT", Rule, CrossDocumentRule)
+
+
+class RuleSpecError(ValueError):
+    """A rule file that cannot be parsed or compiled."""
+
+
+class RuleFile(NamedTuple):
+    """The compiled contents of a rule file."""
+    path: str
+    version: Optional[int]
+    digest: str  # SHA-256 of the file, for logs and the rules endpoint
+    rules: Tuple[Rule, ...]
+    cross_rules: Tuple[CrossDocumentRule, ...]
+    disabled: FrozenSet[str]
+
+
+def _literal(value, rule_id: str) -> ast.expr:
+    if isinstance(value, (list, tuple)):
+        return ast.Tuple([_literal(item, rule_id) for item in value], ast.Load())
+    if not isinstance(value, _CONSTANT_TYPES):
+        raise RuleSpecError(f"{rule_id}: constant {value!r} is not a number, string, boolean or list")
+    return ast.Constant(value)
+
+
+class _Expression(ast.NodeTransformer):
+    """Checks a parsed expression against the rule language and rewrites it for compilation.
+
+    Constants are inlined, ``matches`` calls become precompiled patterns, and
+    the fields read are collected: per side (``left``/``right``) for the
+    pair expressions of cross-document rules.
+    """
+
+    def __init__(self, rule_id: str, constants: Dict[str, object], patterns: Dict[str, str], sides: Sequence[str] = ()):
+        self.rule_id = rule_id
+        self.constants = constants
+        self.patterns = patterns
+        self.fields: Set[str] = set()
+        self.sides: Dict[str, Set[str]] = {side: set() for side in sides}
+
+    def fail(self, message: str) -> RuleSpecError:
+        return RuleSpecError(f"{self.rule_id}: {message}")
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, _ALLOWED_NODES):
+            raise self.fail(f"{type(node).__name__} is not allowed in rule expressions")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if not isinstance(node.value, _CONSTANT_TYPES):
+            raise self.fail(f"literal {node.value!r} is not allowed")
+        return node
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in self.constants:
+            return ast.copy_location(_literal(self.constants[node.id], self.rule_id), node)
+        if not self.sides and node.id in DOCUMENT_FIELDS:
+            self.fields.add(node.id)
+            return node
+        if self.sides and node.id in DOCUMENT_FIELDS:
+            raise self.fail(f"'{node.id}' must be read from a side of the join, e.g. left.{node.id}")
+        raise self.fail(f"unknown name '{node.id}'")
+
+    def visit_Attribute(self, node: ast.Attribute) -> ast.AST:
+        if isinstance(node.value, ast.Name) and node.value.id in self.sides:
+            if node.attr not in DOCUMENT_FIELDS:
+                raise self.fail(f"unknown field '{node.value.id}.{node.attr}'")
+            self.sides[node.value.id].add(node.attr)
+            return node
+        if node.attr not in DATE_ATTRIBUTES:
+            raise self.fail(f"attribute '.{node.attr}' is not allowed")
+        node.value = self.visit(node.value)
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in FUNCTIONS and name != MATCHES:
+            raise self.fail(f"unknown function '{ast.unparse(node.func)}'")
+        if node.keywords:
+            raise self.fail(f"{name}() takes no keyword arguments")
+        args = [self.visit(arg) for arg in node.args]
+        if name != MATCHES:
+            node.args = args
+            return node
+        if len(args) != 2 or not (isinstance(args[1], ast.Constant) and isinstance(args[1].value, str)):
+            raise self.fail("matches() takes a value and a literal pattern")
+        try:
+            re.compile(args[1].value)
+        except re.error as exc:
+            raise self.fail(f"invalid pattern {args[1].value!r}: {exc}") from exc
+        pattern = self.patterns.setdefault(args[1].value, f"_pattern{len(self.patterns)}")
+        fullmatch = ast.Attribute(ast.Name(pattern, ast.Load()), "fullmatch", ast.Load())
+        return ast.copy_location(
+            ast.Compare(ast.Call(fullmatch, [args[0]], []), [ast.IsNot()], [ast.Constant(None)]), node
+        )
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        node = self.generic_visit(node)
+        # Membership in a literal list compiles to a frozenset lookup
+        node.comparators = [
+            ast.Set(comparator.elts) if isinstance(op, (ast.In, ast.NotIn)) and isinstance(comparator, (ast.Tuple, ast.List))
+            and comparator.elts and all(isinstance(item, ast.Constant) for item in comparator.elts) else comparator
+            for op, comparator in zip(node.ops, node.comparators)
+        ]
+        return node
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+class _Vectorize(ast.NodeTransformer):
+    """Rewrites a compiled scalar expression over numeric fields into NumPy array operations."""
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        if not isinstance(node, _VECTOR_NODES):
+            raise _NotVectorizable
+        return super().generic_visit(node)
+
+    @staticmethod
+    def numpy(function: str, args: List[ast.expr]) -> ast.Call:
+        return ast.Call(ast.Attribute(ast.Name("np", ast.Load()), function, ast.Load()), args, [])
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id not in NUMERIC_FIELDS:
+            raise _NotVectorizable
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if not isinstance(node.value, (bool, int, float)):
+            raise _NotVectorizable
+        return node
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        function = "logical_and" if isinstance(node.op, ast.And) else "logical_or"
+        values = [self.visit(value) for value in node.values]
+        combined = values[0]
+        for value in values[1:]:
+            combined = self.numpy(function, [combined, value])
+        return combined
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        if isinstance(node.op, ast.Not):
+            return self.numpy("logical_not", [self.visit(node.operand)])
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        if not all(isinstance(op, _VECTOR_COMPARISONS) for op in node.ops):
+            raise _NotVectorizable
+        operands = [self.visit(node.left)] + [self.visit(comparator) for comparator in node.comparators]
+        # a < b < c is (a < b) & (b < c)
+        pairs = [ast.Compare(operands[i], [op], [operands[i + 1]]) for i, op in enumerate(node.ops)]
+        combined = pairs[0]
+        for pair in pairs[1:]:
+            combined = self.numpy("logical_and", [combined, pair])
+        return combined
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        function = _VECTOR_FUNCTIONS.get(node.func.id) if isinstance(node.func, ast.Name) else None
+        if function is None or len(node.args) != (1 if function == "abs" else 2):
+            raise _NotVectorizable
+        return self.numpy(function, [self.visit(arg) for arg in node.args])
+
+
+def _parse(rule_id: str, key: str, text, compiler: _Expression) -> ast.expr:
+    if not isinstance(text, str) or not text.strip():
+        raise RuleSpecError(f"{rule_id}: '{key}' must be a non-empty string")
+    source = text if key == "fail" else "f" + repr(text)
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as exc:
+        raise RuleSpecError(f"{rule_id}: '{key}' is not a valid expression: {exc.msg}") from exc
+    return compiler.visit(tree).body
+
+
+def _compile(rule_id: str, source: str, patterns: Dict[str, str]) -> Dict[str, object]:
+    namespace: Dict[str, object] = dict(FUNCTIONS, np=np, re=re)
+    exec(compile(source, f"<rule {rule_id}>", "exec"), namespace)
+    return namespace
+
+
+def _header(patterns: Dict[str, str]) -> List[str]:
+    return [f"{name} = re.compile({pattern!r})" for pattern, name in patterns.items()]
+
+
+def _document_types(rule_id: str, values) -> FrozenSet[DocumentType]:
+    if values in (None, "all"):
+        return ALL_DOCUMENT_TYPES
+    values = [values] if isinstance(values, str) else values
+    types = set()
+    for value in values:
+        try:
+            types.add(DocumentType(value))
+        except ValueError:
+            # Enum names ("PAYSLIP") are accepted as well as values ("Payslip")
+            if value not in DocumentType.__members__:
+                raise RuleSpecError(f"{rule_id}: unknown document type {value!r}") from None
+            types.add(DocumentType[value])
+    return frozenset(types)
+
+
+def _common(spec: dict, keys: FrozenSet[str]) -> Tuple[str, str]:
+    if not isinstance(spec, dict):
+        raise RuleSpecError(f"Rule {spec!r} is not a mapping")
+    rule_id = spec.get("id")
+    if not isinstance(rule_id, str) or not rule_id:
+        raise RuleSpecError(f"Rule without an 'id': {spec!r}")
+    unknown = set(spec) - keys
+    if unknown:
+        raise RuleSpecError(f"{rule_id}: unknown keys {', '.join(sorted(unknown))}")
+    missing = [key for key in REQUIRED_KEYS if spec.get(key) in (None, "")]
+    if missing:
+        raise RuleSpecError(f"{rule_id}: missing {', '.join(missing)}")
+    severity = str(spec["severity"]).upper()
+    if severity not in SEVERITY_WEIGHTS:
+        raise RuleSpecError(f"{rule_id}: severity must be one of {', '.join(SEVERITY_WEIGHTS)}")
+    return rule_id, severity
+
+
+def _requires(rule_id: str, spec: dict, read: Iterable[str]) -> List[str]:
+    requires = spec.get("requires")
+    if requires is None:
+        return sorted(read)
+    if not isinstance(requires, list) or not all(isinstance(field, str) for field in requires):
+        raise RuleSpecError(f"{rule_id}: 'requires' must be a list of fields")
+    return list(requires)
+
+
+def compile_rule(spec: dict, constants: Optional[Dict[str, object]] = None) -> Rule:
+    """Compile one rule of a rule file into a ``Rule``."""
+    rule_id, severity = _common(spec, RULE_KEYS)
+    patterns: Dict[str, str] = {}
+    compiler = _Expression(rule_id, constants or {}, patterns)
+    fail = _parse(rule_id, "fail", spec["fail"], compiler)
+    fail_fields = set(compiler.fields)
+    message = _parse(rule_id, "message", spec["message"], compiler)
+    requires = _requires(rule_id, spec, compiler.fields)
+    unknown = set(requires) - DOCUMENT_FIELDS
+    if unknown:
+        raise RuleSpecError(f"{rule_id}: unknown fields in 'requires': {', '.join(sorted(unknown))}")
+
+    lines = _header(patterns) + ["def check(doc):"]
+    lines += [f"    {field} = doc.{field}" for field in sorted(compiler.fields)]
+    lines += [
+        "    try:",
+        f"        if {ast.unparse(fail)}:",
+        f"            return {ast.unparse(message)}",
+        f"    except {EVALUATION_ERRORS}:",
+        "        pass",
+        "    return None",
+    ]
+    vector = None
+    if fail_fields:
+        try:
+            vector = _Vectorize().visit(fail)
+        except _NotVectorizable:
+            vector = None
+    if vector is not None:
+        lines += ["", "def vector_check(cols):"]
+        lines += [f"    {field} = cols[{field!r}]" for field in sorted(fail_fields)]
+        lines += [f"    return np.asarray({ast.unparse(vector)}, dtype=bool)"]
+    source = "\n".join(lines) + "\n"
+    namespace = _compile(rule_id, source, patterns)
+    return Rule(
+        rule_id, str(spec["category"]), str(spec["description"]), severity, str(spec["recommendation"]),
+        _document_types(rule_id, spec.get("types")), tuple(requires), namespace["check"],
+        vector_check=namespace.get("vector_check"),
+        reads=tuple(sorted(compiler.fields - set(requires))),
+        source=source,
+    )
+
+
+def _join(
+    types: Tuple[DocumentType, DocumentType],
+    requires: Tuple[Tuple[str, ...], Tuple[str, ...]],
+    on: Optional[str],
+    flag: int,
+    every: bool,
+    pair: Callable[[Document, Document], Optional[str]],
+) -> Callable[[DocumentIndex, Optional[DocumentIndex]], Findings]:
+    def check(application: DocumentIndex, history: Optional[DocumentIndex]) -> Findings:
+        sides = [
+            {doc.id: doc for doc in application if doc.type == doc_type and all(getattr(doc, f) is not None for f in fields)}
+            for doc_type, fields in zip(types, requires)
+        ]
+        own, others = sides[flag], sides[1 - flag]
+        if not own or not others:
+            return
+        for doc_id, doc in own.items():
+            if on is None:
+                partners = [other for other_id, other in others.items() if other_id != doc_id]
+            else:
+                key = application.keys_of(doc_id).get(on)
+                if key is None:
+                    continue
+                partners = [others[i] for i in sorted(application.ids_for(on, key)) if i in others and i != doc_id]
+            if not partners:
+                continue
+            messages = [pair(doc, other) if flag == 0 else pair(other, doc) for other in partners]
+            failed = [message for message in messages if message]
+            if failed and (not every or len(failed) == len(messages)):
+                yield doc_id, failed[0]
+    return check
+
+
+def compile_cross_rule(spec: dict, constants: Optional[Dict[str, object]] = None) -> CrossDocumentRule:
+    """Compile one cross-document rule of a rule file into a ``CrossDocumentRule``."""
+    rule_id, severity = _common(spec, CROSS_RULE_KEYS)
+    join = spec.get("join")
+    if not isinstance(join, list) or len(join) != 2:
+        raise RuleSpecError(f"{rule_id}: 'join' must name two document types")
+    types = tuple(next(iter(_document_types(rule_id, [value]))) for value in join)
+    on = spec.get("on")
+    if on is not None and on not in KEY_FIELDS:
+        raise RuleSpecError(f"{rule_id}: 'on' must be one of {', '.join(KEY_FIELDS)}")
+    flag = spec.get("flag", "right")
+    match = spec.get("match", "any")
+    if flag not in ("left", "right") or match not in ("any", "all"):
+        raise RuleSpecError(f"{rule_id}: 'flag' must be left or right and 'match' any or all")
+
+    patterns: Dict[str, str] = {}
+    compiler = _Expression(rule_id, constants or {}, patterns, sides=("left", "right"))
+    fail = _parse(rule_id, "fail", spec["fail"], compiler)
+    message = _parse(rule_id, "message", spec["message"], compiler)
+    read = [f"{side}.{field}" for side, fields in compiler.sides.items() for field in fields]
+    requires = _requires(rule_id, spec, read)
+    per_side: Dict[str, List[str]] = {"left": [], "right": []}
+    for entry in requires:
+        side, _, field = entry.partition(".")
+        if side not in per_side or field not in DOCUMENT_FIELDS:
+            raise RuleSpecError(f"{rule_id}: 'requires' entries must be left.<field> or right.<field>, not {entry!r}")
+        per_side[side].append(field)
+
+    source = "\n".join(_header(patterns) + [
+        "def pair(left, right):",
+        "    try:",
+        f"        if {ast.unparse(fail)}:",
+        f"            return {ast.unparse(message)}",
+        f"    except {EVALUATION_ERRORS}:",
+        "        pass",
+        "    return None",
+    ]) + "\n"
+    namespace = _compile(rule_id, source, patterns)
+    fields = {"type"} | set().union(*compiler.sides.values()) | ({KEY_FIELDS[on]} if on else set())
+    return CrossDocumentRule(
+        rule_id, str(spec["category"]), str(spec["description"]), severity, str(spec["recommendation"]),
+        _join(
+            types, (tuple(per_side["left"]), tuple(per_side["right"])), on, 0 if flag == "left" else 1,
+            match == "all", namespace["pair"],
+        ),
+        tuple(sorted(fields)),
+        source=source,
+    )
+
+
+def _read(path: str) -> Tuple[dict, str]:
+    with open(path, "rb") as handle:
+        raw = handle.read()
+    text = raw.decode("utf-8")
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as exc:
+            raise ImportError("YAML rule files require the optional 'PyYAML' package; use JSON instead") from exc
+        try:
+            content = yaml.safe_load(text)
+        except yaml.YAMLError as exc:
+            raise RuleSpecError(f"{path} is not valid YAML: {exc}") from exc
+    else:
+        try:
+            content = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise RuleSpecError(f"{path} is not valid JSON: {exc}") from exc
+    if not isinstance(content, dict):
+        raise RuleSpecError(f"{path} must hold a mapping with 'rules' and/or 'cross_rules'")
+    return content, hashlib.sha256(raw).hexdigest()
+
+
+def load_rule_file(path: str) -> RuleFile:
+    """Parse and compile a rule file; raises ``RuleSpecError`` without compiling anything partially."""
+    content, digest = _read(path)
+    unknown = set(content) - FILE_KEYS
+    if unknown:
+        raise RuleSpecError(f"{path}: unknown keys {', '.join(sorted(unknown))}")
+    version = content.get("version")
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        raise RuleSpecError(f"{path}: 'version' must be an integer")
+    constants = content.get("constants") or {}
+    if not isinstance(constants, dict):
+        raise RuleSpecError(f"{path}: 'constants' must be a mapping")
+    clashes = set(constants) & (DOCUMENT_FIELDS | set(FUNCTIONS) | {MATCHES, "left", "right"})
+    if clashes:
+        raise RuleSpecError(f"{path}: constants shadow fields or functions: {', '.join(sorted(clashes))}")
+    for name, value in constants.items():
+        if not name.isidentifier():
+            raise RuleSpecError(f"{path}: constant name {name!r} is not an identifier")
+        _literal(value, f"{path}: constant {name}")
+    for key in ("rules", "cross_rules"):
+        if not isinstance(content.get(key) or [], list):
+            raise RuleSpecError(f"{path}: '{key}' must be a list of rules")
+
+    rules = tuple(compile_rule(spec, constants) for spec in content.get("rules") or ())
+    cross_rules = tuple(compile_cross_rule(spec, constants) for spec in content.get("cross_rules") or ())
+    ids = [rule.rule_id for rule in rules + cross_rules]
+    duplicated = {rule_id for rule_id in ids if ids.count(rule_id) > 1}
+    if duplicated:
+        raise RuleSpecError(f"{path}: rule ids defined more than once: {', '.join(sorted(duplicated))}")
+    # A per-document rule cannot take the id of a cross-document rule, or the reverse
+    crossed = {rule.rule_id for rule in rules} & {rule.rule_id for rule in CROSS_DOCUMENT_RULES}
+    crossed |= {rule.rule_id for rule in cross_rules} & {rule.rule_id for rule in RULES}
+    if crossed:
+        raise RuleSpecError(f"{path}: ids already used by the other kind of rule: {', '.join(sorted(crossed))}")
+    disabled = content.get("disable") or []
+    if not isinstance(disabled, list) or not all(isinstance(rule_id, str) for rule_id in disabled):
+        raise RuleSpecError(f"{path}: 'disable' must be a list of rule ids")
+    return RuleFile(path, version, digest, rules, cross_rules, frozenset(disabled))
+
+
+def merge_rules(builtin: Sequence[RuleT], added: Sequence[RuleT], disabled: FrozenSet[str] = frozenset()) -> Tuple[RuleT, ...]:
+    """Built-in rules with ``added`` replacing those of the same id in place and appended otherwise, less ``disabled``."""
+    replacements = {rule.rule_id: rule for rule in added}
+    merged = [replacements.pop(rule.rule_id, rule) for rule in builtin]
+    merged.extend(rule for rule in added if rule.rule_id in replacements)
+    return tuple(rule for rule in merged if rule.rule_id not in disabled)
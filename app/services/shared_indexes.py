@@ -0,0 +1,341 @@
+"""History and near-duplicate indexes shared by every server worker.
+
+Building ``DocumentIndex`` and ``DuplicateIndex`` over the whole store takes
+time and memory in every process. Instead, a snapshot of both is written once
+to ``INDEX_SNAPSHOT_DIR`` as plain ``.npy`` arrays, and each worker
+memory-maps it read-only, so the pages are shared by the OS rather than
+copied per worker. Documents stored after the snapshot was taken are kept in
+a small per-process overlay, caught up from the store with ``refresh()``.
+
+    python -m app.services.shared_indexes   # (re)build the snapshot
+
+A worker that starts with more than ``INDEX_SNAPSHOT_MAX_LAG`` documents
+missing from the snapshot (or with no snapshot at all) rebuilds it in a
+low-priority child process, so the next cold start maps them instead of
+indexing them again.
+
+Only what the fraud-ring and near-duplicate checks read is snapshotted: the
+PPSN and account keys, the owner of every document and its MinHash signature,
+and the distinct customer names, as normalized and as first written, with
+their blocks for fuzzy name lookups.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.models.document import Document
+from .document_index import DocumentIndex, document_key, key_hash
+from .fingerprint import DuplicateIndex, FingerprintArrays
+from .name_matching import NAME_THRESHOLD, blocking_keys, selective, similarity
+from .storage import DocumentStore, get_store
+
+logger = get_logger(__name__)
+
+# Index keys consulted in history by the shared-identifier checks
+SNAPSHOT_KEYS = ("ppsn", "account")
+META_FILE = "meta.json"
+SNAPSHOT_VERSION = 3
+
+
+class IndexSnapshot:
+    """A snapshot directory, memory-mapped read-only."""
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as handle:
+            self.meta: dict = json.load(handle)
+        if self.meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported index snapshot version {self.meta.get('version')} in {directory}")
+        self.directory = directory
+        self.arrays: Dict[str, np.ndarray] = {
+            name[:-4]: np.load(os.path.join(directory, name), mmap_mode="r")
+            for name in os.listdir(directory) if name.endswith(".npy")
+        }
+        self.fingerprints = FingerprintArrays(**{name: self.arrays[name] for name in FingerprintArrays._fields})
+
+    @property
+    def position(self) -> int:
+        """Store position of the last document in the snapshot."""
+        return self.meta["position"]
+
+    def __len__(self) -> int:
+        return self.meta["documents"]
+
+    def ids_with_other_owner(self, key: str, normalized_value: str, owner: Optional[str]) -> Set[str]:
+        values, rows = self.arrays[f"{key}_values"], self.arrays[f"{key}_rows"]
+        target = np.uint64(key_hash(normalized_value))
+        lo, hi = np.searchsorted(values, target, side="left"), np.searchsorted(values, target, side="right")
+        if hi == lo:
+            return set()
+        matched = np.asarray(rows[lo:hi])
+        matched = matched[self.fingerprints.owners[matched] != np.uint64(key_hash(owner))]
+        return {self.fingerprints.ids[row].decode("utf-8") for row in matched.tolist()}
+
+    def owner_of(self, row: int) -> Optional[str]:
+        """Normalized customer name of the document in ``row``."""
+        hashes = self.arrays["customer_hashes"]
+        target = self.fingerprints.owners[row]
+        position = int(np.searchsorted(hashes, target))
+        if target == 0 or position == len(hashes) or hashes[position] != target:
+            return None
+        return self.arrays["customer_names"][position].decode("utf-8")
+
+    def similar_customers(self, name: str, threshold: float = NAME_THRESHOLD) -> List[Tuple[str, str, float]]:
+        """(normalized name, display name, score) of the customers in the snapshot matching a normalized name."""
+        keys, rows = self.arrays["customer_block_keys"], self.arrays["customer_block_rows"]
+        blocks = []
+        for key in blocking_keys(name):
+            target = np.uint64(key_hash(key))
+            lo, hi = np.searchsorted(keys, target, side="left"), np.searchsorted(keys, target, side="right")
+            if hi > lo:
+                blocks.append((lo, hi))
+        candidates: Set[int] = set()
+        for lo, hi in selective(blocks, lambda block: block[1] - block[0]):
+            candidates.update(np.asarray(rows[lo:hi]).tolist())
+        names, display = self.arrays["customer_names"], self.arrays["customer_display"]
+        matches = []
+        for row in candidates:
+            other = names[row].decode("utf-8")
+            score = similarity(name, other)
+            if score >= threshold:
+                matches.append((other, display[row].decode("utf-8"), score))
+        return matches
+
+
+class HistoryIndex:
+    """Previously submitted documents: a snapshot plus documents added since.
+
+    Offers the part of ``DocumentIndex`` used for history by the cross-document
+    checks. A document added again replaces its snapshot version.
+    """
+
+    def __init__(self, snapshot: Optional[IndexSnapshot] = None):
+        self.snapshot = snapshot
+        self.recent = DocumentIndex()
+
+    def __len__(self) -> int:
+        return (len(self.snapshot) if self.snapshot is not None else 0) + len(self.recent)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.recent or (
+            self.snapshot is not None and self.snapshot.fingerprints.row_of(document_id) is not None
+        )
+
+    def add(self, document: Document) -> None:
+        self.recent.add(document)
+
+    def owner_of(self, document_id: str) -> Optional[str]:
+        """Normalized customer name of a previously submitted document."""
+        if document_id in self.recent or self.snapshot is None:
+            return self.recent.owner_of(document_id)
+        row = self.snapshot.fingerprints.row_of(document_id)
+        return self.snapshot.owner_of(row) if row is not None else None
+
+    def similar_customers(self, name: str, threshold: float = NAME_THRESHOLD) -> List[Tuple[str, str, float]]:
+        """Distinct customers in history matching a normalized name, best first.
+
+        Each match is (normalized name, display name, score); the display
+        name is as written on a stored document, a recent one if any.
+        """
+        matches: Dict[str, Tuple[str, float]] = {}
+        if self.snapshot is not None:
+            for other, display, score in self.snapshot.similar_customers(name, threshold):
+                matches[other] = (display, score)
+        for other, score in self.recent.similar("name", name, threshold):
+            matches[other] = (self.recent.documents_for("name", other)[0].customer_name, score)
+        return sorted(
+            ((other, display, score) for other, (display, score) in matches.items()),
+            key=lambda match: (-match[2], match[0]),
+        )
+
+    def ids_with_other_owner(self, key: str, normalized_value: str, owner: Optional[str]) -> Set[str]:
+        """Ids of documents sharing ``key`` whose normalized customer name is not ``owner``."""
+        ids = self.recent.ids_with_other_owner(key, normalized_value, owner)
+        if self.snapshot is not None and key in SNAPSHOT_KEYS:
+            ids |= {
+                doc_id for doc_id in self.snapshot.ids_with_other_owner(key, normalized_value, owner)
+                if doc_id not in self.recent
+            }
+        return ids
+
+
+def write_snapshot(store: DocumentStore, directory: str) -> dict:
+    """Index every stored document and write the snapshot to ``directory``.
+
+    The snapshot is written next to ``directory`` and renamed into place, so
+    workers never see a partial one. Returns the snapshot metadata.
+    """
+    started = time.perf_counter()
+    duplicates = DuplicateIndex()
+    keys: Dict[str, list] = {key: [] for key in SNAPSHOT_KEYS}
+    # Normalized customer name -> the name as first written
+    customers: Dict[str, str] = {}
+    position = 0
+    for position, document in store.documents_since(0):
+        row = len(duplicates)
+        duplicates.add(document)
+        name = document_key(document, "name")
+        if name is not None:
+            customers.setdefault(name, document.customer_name)
+        for key in SNAPSHOT_KEYS:
+            value = document_key(document, key)
+            if value is not None:
+                keys[key].append((key_hash(value), row))
+
+    arrays = duplicates.to_arrays()._asdict()
+    for key, entries in keys.items():
+        values = np.array([value for value, _ in entries], dtype=np.uint64)
+        rows = np.array([row for _, row in entries], dtype=np.uint32)
+        order = np.argsort(values, kind="stable")
+        arrays[f"{key}_values"], arrays[f"{key}_rows"] = values[order], rows[order]
+
+    # Distinct customer names, ordered by owner hash, and the blocks each one falls in
+    names = sorted(customers, key=key_hash)
+    arrays["customer_hashes"] = np.array([key_hash(name) for name in names], dtype=np.uint64)
+    arrays["customer_names"] = np.array([name.encode("utf-8") for name in names], dtype=bytes)
+    arrays["customer_display"] = np.array([customers[name].encode("utf-8") for name in names], dtype=bytes)
+    blocks = [(key_hash(key), row) for row, name in enumerate(names) for key in blocking_keys(name)]
+    block_keys = np.array([key for key, _ in blocks], dtype=np.uint64)
+    order = np.argsort(block_keys, kind="stable")
+    arrays["customer_block_keys"] = block_keys[order]
+    arrays["customer_block_rows"] = np.array([row for _, row in blocks], dtype=np.uint32)[order]
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "documents": len(duplicates),
+        "customers": len(names),
+        "position": position,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "num_perm": duplicates.num_perm,
+        "bands": duplicates.bands,
+    }
+    directory = os.path.abspath(directory)
+    staging = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), array)
+    with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2)
+
+    # Swap the new snapshot in; workers that mapped the old one keep their open files
+    retired = f"{directory}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.rename(directory, retired)
+    os.rename(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+    logger.info(
+        f"Wrote index snapshot of {meta['documents']} documents to {directory} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return meta
+
+
+def load_snapshot(directory: str) -> Optional[IndexSnapshot]:
+    """Memory-map the snapshot in ``directory``; None when there is none."""
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        return None
+    try:
+        return IndexSnapshot(directory)
+    except ValueError as exc:
+        # E.g. written by an older release: index the store instead, which triggers a rebuild
+        logger.warning(f"Ignoring index snapshot: {exc}")
+        return None
+
+
+class SharedIndexes:
+    """The history and near-duplicate indexes of one worker, over an optional snapshot.
+
+    ``lock`` guards both indexes and should be held by everything that
+    reads or updates them.
+    """
+
+    def __init__(self, store: DocumentStore, snapshot: Optional[IndexSnapshot] = None):
+        self.store = store
+        self.snapshot = snapshot
+        self.history = HistoryIndex(snapshot)
+        self.duplicates = DuplicateIndex(base=snapshot.fingerprints if snapshot is not None else None)
+        if snapshot is not None and snapshot.meta["bands"] != self.duplicates.bands:
+            raise ValueError(f"Index snapshot has {snapshot.meta['bands']} bands, expected {self.duplicates.bands}")
+        self.lock = threading.Lock()
+        self.position = snapshot.position if snapshot is not None else 0
+
+    def refresh(self) -> int:
+        """Index documents stored since the last refresh, e.g. by other workers; returns how many."""
+        added = 0
+        with self.lock:
+            for position, document in self.store.documents_since(self.position):
+                self.history.add(document)
+                self.duplicates.add(document)
+                self.position = position
+                added += 1
+        if added:
+            logger.info(f"Indexed {added} newly stored documents, up to position {self.position}")
+        return added
+
+
+_indexes: Optional[SharedIndexes] = None
+_indexes_lock = threading.Lock()
+
+
+def get_shared_indexes() -> SharedIndexes:
+    """Process-wide indexes: the snapshot in ``INDEX_SNAPSHOT_DIR`` (if any), caught up with the store."""
+    global _indexes
+    with _indexes_lock:
+        if _indexes is None:
+            started = time.perf_counter()
+            snapshot = load_snapshot(settings.INDEX_SNAPSHOT_DIR) if settings.INDEX_SNAPSHOT_DIR else None
+            indexes = SharedIndexes(get_store(), snapshot)
+            missing = indexes.refresh()
+            logger.info(
+                f"Loaded history of {len(indexes.history)} documents "
+                f"({len(snapshot) if snapshot is not None else 0} memory-mapped) "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+            if settings.INDEX_SNAPSHOT_DIR and 0 < settings.INDEX_SNAPSHOT_MAX_LAG < missing:
+                rebuild_snapshot()
+            _indexes = indexes
+        return _indexes
+
+
+def rebuild_snapshot() -> subprocess.Popen:
+    """Rewrite the snapshot from the store in a low-priority child process.
+
+    This worker keeps its own indexes; workers started afterwards map the
+    new snapshot. A rebuild already running elsewhere makes this one a no-op.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.services.shared_indexes"],
+        preexec_fn=(lambda: os.nice(10)) if hasattr(os, "nice") else None,
+    )
+    logger.info(f"Rebuilding the index snapshot in {settings.INDEX_SNAPSHOT_DIR} (pid {process.pid})")
+    # Reap the child when it exits
+    threading.Thread(target=process.wait, name="index-snapshot", daemon=True).start()
+    return process
+
+
+def shared_indexes_loaded() -> bool:
+    return _indexes is not None
+
+
+if __name__ == "__main__":
+    if not settings.INDEX_SNAPSHOT_DIR:
+        raise SystemExit("INDEX_SNAPSHOT_DIR is not set")
+    import fcntl
+    os.makedirs(os.path.dirname(os.path.abspath(settings.INDEX_SNAPSHOT_DIR)), exist_ok=True)
+    # One writer at a time; workers starting together would otherwise each rebuild it
+    with open(f"{os.path.abspath(settings.INDEX_SNAPSHOT_DIR)}.lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SystemExit(f"The index snapshot in {settings.INDEX_SNAPSHOT_DIR} is already being rebuilt")
+        write_snapshot(get_store(), settings.INDEX_SNAPSHOT_DIR)
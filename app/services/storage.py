@@ -0,0 +1,660 @@
+"""Persistent storage for documents and validation results.
+
+``DocumentStore`` defines the storage interface used by the UI, the API and
+the job queue; ``SQLiteDocumentStore`` is the default backend. Documents and
+results are stored as JSON payloads next to the indexed columns used for
+lookups (document id, customer, document type, application) and paging.
+
+Validation jobs can also be kept here, so that every server worker process
+sees the same jobs (see ``job_queue.py``), as can the library of genuine
+document layouts (see ``template_library.py``).
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.models.document import Document, DocumentType, ValidationResult
+from app.models.job import ValidationJob
+from app.models.template import LayoutTemplate
+from .document_index import normalize_name
+
+logger = get_logger(__name__)
+
+SEVERITIES = ("HIGH", "MEDIUM", "LOW")
+
+
+class ResultFilter(NamedTuple):
+    """Selection of stored results, e.g. for an export; unset fields do not filter."""
+    application_id: Optional[str] = None
+    doc_types: Tuple[DocumentType, ...] = ()
+    since: Optional[str] = None  # ISO date or timestamp, inclusive
+    until: Optional[str] = None  # ISO date or timestamp, exclusive
+    severity: Optional[str] = None  # results with at least one issue of this severity or higher
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    application_id TEXT,
+    customer_key TEXT,
+    type TEXT NOT NULL,
+    upload_date TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_customer ON documents (customer_key);
+CREATE INDEX IF NOT EXISTS idx_documents_type ON documents (type);
+CREATE INDEX IF NOT EXISTS idx_documents_application ON documents (application_id, upload_date);
+
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id TEXT NOT NULL,
+    application_id TEXT,
+    document_type TEXT NOT NULL,
+    validation_date TEXT NOT NULL,
+    is_valid INTEGER NOT NULL,
+    high_count INTEGER NOT NULL,
+    medium_count INTEGER NOT NULL,
+    low_count INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_document ON results (document_id);
+CREATE INDEX IF NOT EXISTS idx_results_application ON results (application_id, seq);
+CREATE INDEX IF NOT EXISTS idx_results_date ON results (validation_date);
+CREATE INDEX IF NOT EXISTS idx_results_type ON results (document_type);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    finished INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS templates (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    document_type TEXT NOT NULL,
+    issuer TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+class DocumentStore(ABC):
+    """Storage interface for documents and validation results."""
+
+    @abstractmethod
+    def add_documents(self, documents: Iterable[Document], application_id: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def add_document(self, document: Document, application_id: Optional[str] = None) -> None:
+        self.add_documents([document], application_id)
+
+    @abstractmethod
+    def get_document(self, document_id: str) -> Optional[Document]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_document(self, document_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_documents(
+        self,
+        application_id: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        doc_type: Optional[DocumentType] = None,
+        offset: int = 0,
+        limit: Optional[int] = 100,
+    ) -> List[Document]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_documents(
+        self,
+        application_id: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        doc_type: Optional[DocumentType] = None,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Document]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def documents_since(self, position: int = 0, batch_size: int = 1000) -> Iterator[Tuple[int, Document]]:
+        """``(position, document)`` for documents stored after ``position``, oldest first.
+
+        Positions only grow, so a reader can resume from the last one it saw.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_results(self, results: Iterable[ValidationResult], application_id: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace_results(self, results: Iterable[ValidationResult], application_id: Optional[str] = None) -> int:
+        """Store ``results``, dropping any earlier results for the same documents."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_results(
+        self,
+        application_id: Optional[str] = None,
+        doc_type: Optional[DocumentType] = None,
+        offset: int = 0,
+        limit: Optional[int] = 100,
+    ) -> List[ValidationResult]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_results(self, application_id: Optional[str] = None, doc_type: Optional[DocumentType] = None) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_results(
+        self, selection: ResultFilter = ResultFilter(), offset: int = 0, limit: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Tuple[Optional[str], ValidationResult]]:
+        """(application id, result) for the stored results in ``selection``, in storage order, fetched in batches."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def result_summary(self, selection: ResultFilter = ResultFilter()) -> Dict[str, Dict[str, int]]:
+        """Per document type: results, valid results and issues per severity in ``selection``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def severity_counts(self, application_id: Optional[str] = None) -> Dict[str, int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def result_counts(self, application_id: Optional[str] = None) -> Dict[str, Tuple[int, int, int]]:
+        """(HIGH, MEDIUM, LOW) issue counts per document id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear_results(self, application_id: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_job(self, job: ValidationJob) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[ValidationJob]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_job_results(self, job_id: str, results: List[ValidationResult], start: int) -> None:
+        """Store a chunk of a job's results at positions ``start``, ``start + 1``, ..."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace_job_results(self, job_id: str, results: List[ValidationResult]) -> None:
+        """Overwrite all of a job's results, e.g. after cross-document checks amended them."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_job_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ValidationResult]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def prune_jobs(self, keep: int) -> int:
+        """Delete the oldest finished jobs beyond the newest ``keep``; returns how many went."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_template(self, template: LayoutTemplate) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_templates(
+        self, document_type: Optional[DocumentType] = None, issuer: Optional[str] = None
+    ) -> List[LayoutTemplate]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_template(self, template_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def template_version(self) -> Tuple[int, int]:
+        """(count, last sequence number) of the stored templates; changes whenever they do."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def _where(clauses: Dict[str, Optional[object]]) -> Tuple[str, list]:
+    """Build a WHERE clause from column -> value pairs, skipping None values."""
+    filters = [(column, value) for column, value in clauses.items() if value is not None]
+    if not filters:
+        return "", []
+    return " WHERE " + " AND ".join(f"{column} = ?" for column, _ in filters), [value for _, value in filters]
+
+
+# Results with an issue of at least the given severity
+_SEVERITY_AT_LEAST = {
+    "HIGH": "high_count > 0",
+    "MEDIUM": "high_count + medium_count > 0",
+    "LOW": "high_count + medium_count + low_count > 0",
+}
+
+
+def _selection_filters(selection: ResultFilter) -> Tuple[List[str], list]:
+    """SQL conditions and parameters for a ``ResultFilter`` over the results table."""
+    clauses, params = [], []
+    if selection.application_id is not None:
+        clauses.append("application_id = ?")
+        params.append(selection.application_id)
+    if selection.doc_types:
+        clauses.append(f"document_type IN ({', '.join('?' * len(selection.doc_types))})")
+        params.extend(DocumentType(doc_type).value for doc_type in selection.doc_types)
+    if selection.since:
+        clauses.append("validation_date >= ?")
+        params.append(selection.since)
+    if selection.until:
+        clauses.append("validation_date < ?")
+        params.append(selection.until)
+    if selection.severity:
+        if selection.severity not in _SEVERITY_AT_LEAST:
+            raise ValueError(f"Unknown severity {selection.severity!r}, expected one of {', '.join(SEVERITIES)}")
+        clauses.append(_SEVERITY_AT_LEAST[selection.severity])
+    return clauses, params
+
+
+def _paging(offset: int, limit: Optional[int]) -> str:
+    return f" LIMIT {int(limit)} OFFSET {int(offset)}" if limit is not None else f" LIMIT -1 OFFSET {int(offset)}"
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """SQLite backend; one connection per thread, WAL journal for concurrent readers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path == ":memory:":
+            # A named shared-cache database so every thread sees the same data
+            self._uri = f"file:memdb{id(self)}?mode=memory&cache=shared"
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._uri = f"file:{path}"
+        self._local = threading.local()
+        # Keeps a shared in-memory database alive for the lifetime of the store
+        self._anchor = self._connect()
+        self._anchor.executescript(_SCHEMA)
+        logger.info(f"Document store ready at {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._uri, uri=True, timeout=30)
+        if self.path != ":memory:":
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection
+        with connection:
+            yield connection
+
+    # --- Documents ---
+
+    def add_documents(self, documents: Iterable[Document], application_id: Optional[str] = None) -> int:
+        rows = [
+            (
+                doc.id,
+                application_id,
+                normalize_name(doc.customer_name),
+                doc.type.value,
+                doc.upload_date,
+                doc.model_dump_json(exclude_none=True),
+            )
+            for doc in documents
+        ]
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO documents (id, application_id, customer_key, type, upload_date, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def get_document(self, document_id: str) -> Optional[Document]:
+        row = self._connection.execute("SELECT payload FROM documents WHERE id = ?", (document_id,)).fetchone()
+        return Document.model_validate_json(row[0]) if row else None
+
+    def remove_document(self, document_id: str) -> bool:
+        with self._transaction() as connection:
+            deleted = connection.execute("DELETE FROM documents WHERE id = ?", (document_id,)).rowcount
+            connection.execute("DELETE FROM results WHERE document_id = ?", (document_id,))
+        return deleted > 0
+
+    def _document_filters(self, application_id, customer_name, doc_type) -> Tuple[str, list]:
+        return _where({
+            "application_id": application_id,
+            "customer_key": normalize_name(customer_name) if customer_name else None,
+            "type": DocumentType(doc_type).value if doc_type else None,
+        })
+
+    def list_documents(
+        self,
+        application_id: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        doc_type: Optional[DocumentType] = None,
+        offset: int = 0,
+        limit: Optional[int] = 100,
+    ) -> List[Document]:
+        where, params = self._document_filters(application_id, customer_name, doc_type)
+        rows = self._connection.execute(
+            f"SELECT payload FROM documents{where} ORDER BY upload_date, id{_paging(offset, limit)}", params
+        ).fetchall()
+        return [Document.model_validate_json(payload) for (payload,) in rows]
+
+    def count_documents(
+        self,
+        application_id: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        doc_type: Optional[DocumentType] = None,
+    ) -> int:
+        where, params = self._document_filters(application_id, customer_name, doc_type)
+        return self._connection.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Document]:
+        """Every stored document, fetched in batches to keep memory flat."""
+        cursor = self._connect().execute("SELECT payload FROM documents ORDER BY rowid")
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for (payload,) in rows:
+                    yield Document.model_validate_json(payload)
+        finally:
+            cursor.connection.close()
+
+    def documents_since(self, position: int = 0, batch_size: int = 1000) -> Iterator[Tuple[int, Document]]:
+        cursor = self._connect().execute(
+            "SELECT rowid, payload FROM documents WHERE rowid > ? ORDER BY rowid", (position,)
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for rowid, payload in rows:
+                    yield rowid, Document.model_validate_json(payload)
+        finally:
+            cursor.connection.close()
+
+    # --- Results ---
+
+    @staticmethod
+    def _result_rows(results: Iterable[ValidationResult], application_id: Optional[str]) -> List[tuple]:
+        rows = []
+        for result in results:
+            counts = {severity: 0 for severity in SEVERITIES}
+            for issue in result.issues:
+                if issue.severity in counts:
+                    counts[issue.severity] += 1
+            rows.append((
+                result.document_id,
+                application_id,
+                result.document_type.value,
+                result.validation_date,
+                int(result.is_valid),
+                counts["HIGH"],
+                counts["MEDIUM"],
+                counts["LOW"],
+                result.model_dump_json(),
+            ))
+        return rows
+
+    def _insert_results(self, connection: sqlite3.Connection, rows: List[tuple]) -> None:
+        connection.executemany(
+            "INSERT INTO results (document_id, application_id, document_type, validation_date, is_valid, "
+            "high_count, medium_count, low_count, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def add_results(self, results: Iterable[ValidationResult], application_id: Optional[str] = None) -> int:
+        rows = self._result_rows(results, application_id)
+        with self._transaction() as connection:
+            self._insert_results(connection, rows)
+        return len(rows)
+
+    def replace_results(self, results: Iterable[ValidationResult], application_id: Optional[str] = None) -> int:
+        """Update results in place, so they keep their position in the listing."""
+        rows = self._result_rows(results, application_id)
+        with self._transaction() as connection:
+            new_rows = []
+            for row in rows:
+                updated = connection.execute(
+                    "UPDATE results SET document_type = ?, validation_date = ?, is_valid = ?, high_count = ?, "
+                    "medium_count = ?, low_count = ?, payload = ? WHERE document_id = ? AND application_id IS ?",
+                    row[2:] + (row[0], application_id),
+                ).rowcount
+                if not updated:
+                    new_rows.append(row)
+            self._insert_results(connection, new_rows)
+        return len(rows)
+
+    def _result_filters(self, application_id, doc_type) -> Tuple[str, list]:
+        return _where({
+            "application_id": application_id,
+            "document_type": DocumentType(doc_type).value if doc_type else None,
+        })
+
+    def list_results(
+        self,
+        application_id: Optional[str] = None,
+        doc_type: Optional[DocumentType] = None,
+        offset: int = 0,
+        limit: Optional[int] = 100,
+    ) -> List[ValidationResult]:
+        where, params = self._result_filters(application_id, doc_type)
+        rows = self._connection.execute(
+            f"SELECT payload FROM results{where} ORDER BY seq{_paging(offset, limit)}", params
+        ).fetchall()
+        return [ValidationResult.model_validate_json(payload) for (payload,) in rows]
+
+    def count_results(self, application_id: Optional[str] = None, doc_type: Optional[DocumentType] = None) -> int:
+        where, params = self._result_filters(application_id, doc_type)
+        return self._connection.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+
+    def iter_results(
+        self, selection: ResultFilter = ResultFilter(), offset: int = 0, limit: Optional[int] = None, batch_size: int = 1000
+    ) -> Iterator[Tuple[Optional[str], ValidationResult]]:
+        """Results in ``selection``, read in keyset-paged batches.
+
+        Each batch is a short query of its own, so a long export neither holds
+        a read snapshot open (which would stop WAL checkpoints) nor ties the
+        iteration to one thread's connection. ``offset`` only applies to the
+        first batch.
+        """
+        clauses, params = _selection_filters(selection)
+        last_seq, remaining = 0, limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            where = " AND ".join(clauses + ["seq > ?"])
+            rows = self._connection.execute(
+                f"SELECT seq, application_id, payload FROM results WHERE {where} ORDER BY seq{_paging(offset, size)}",
+                params + [last_seq],
+            ).fetchall()
+            if not rows:
+                break
+            offset = 0
+            last_seq = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+            for _, application_id, payload in rows:
+                yield application_id, ValidationResult.model_validate_json(payload)
+            if len(rows) < size:
+                break
+
+    def result_summary(self, selection: ResultFilter = ResultFilter()) -> Dict[str, Dict[str, int]]:
+        """Per-type totals, aggregated in SQL from the per-result counters."""
+        clauses, params = _selection_filters(selection)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection.execute(
+            f"SELECT document_type, COUNT(*), SUM(is_valid), SUM(high_count), SUM(medium_count), SUM(low_count) "
+            f"FROM results{where} GROUP BY document_type ORDER BY document_type", params
+        ).fetchall()
+        return {
+            doc_type: {"results": count, "valid": valid, "HIGH": high, "MEDIUM": medium, "LOW": low}
+            for doc_type, count, valid, high, medium, low in rows
+        }
+
+    def severity_counts(self, application_id: Optional[str] = None) -> Dict[str, int]:
+        """Issue counts per severity, aggregated in SQL from the per-result counters."""
+        where, params = self._result_filters(application_id, None)
+        high, medium, low = self._connection.execute(
+            f"SELECT COALESCE(SUM(high_count), 0), COALESCE(SUM(medium_count), 0), COALESCE(SUM(low_count), 0) "
+            f"FROM results{where}", params
+        ).fetchone()
+        return {"HIGH": high, "MEDIUM": medium, "LOW": low}
+
+    def result_counts(self, application_id: Optional[str] = None) -> Dict[str, Tuple[int, int, int]]:
+        where, params = self._result_filters(application_id, None)
+        rows = self._connection.execute(
+            f"SELECT document_id, high_count, medium_count, low_count FROM results{where}", params
+        ).fetchall()
+        return {document_id: (high, medium, low) for document_id, high, medium, low in rows}
+
+    def clear_results(self, application_id: Optional[str] = None) -> int:
+        where, params = self._result_filters(application_id, None)
+        with self._transaction() as connection:
+            return connection.execute(f"DELETE FROM results{where}", params).rowcount
+
+    # --- Jobs ---
+
+    def save_job(self, job: ValidationJob) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (id, created_at, finished, payload) VALUES (?, ?, ?, ?)",
+                (job.id, job.created_at, int(job.is_finished), job.model_dump_json()),
+            )
+
+    def get_job(self, job_id: str) -> Optional[ValidationJob]:
+        row = self._connection.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return ValidationJob.model_validate_json(row[0]) if row else None
+
+    def add_job_results(self, job_id: str, results: List[ValidationResult], start: int) -> None:
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO job_results (job_id, position, payload) VALUES (?, ?, ?)",
+                [(job_id, start + i, result.model_dump_json()) for i, result in enumerate(results)],
+            )
+
+    def replace_job_results(self, job_id: str, results: List[ValidationResult]) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            connection.executemany(
+                "INSERT INTO job_results (job_id, position, payload) VALUES (?, ?, ?)",
+                [(job_id, i, result.model_dump_json()) for i, result in enumerate(results)],
+            )
+
+    def list_job_results(self, job_id: str, offset: int = 0, limit: Optional[int] = None) -> List[ValidationResult]:
+        rows = self._connection.execute(
+            f"SELECT payload FROM job_results WHERE job_id = ? ORDER BY position{_paging(offset, limit)}", (job_id,)
+        ).fetchall()
+        return [ValidationResult.model_validate_json(payload) for (payload,) in rows]
+
+    def prune_jobs(self, keep: int) -> int:
+        with self._transaction() as connection:
+            stale = [job_id for (job_id,) in connection.execute(
+                "SELECT id FROM jobs WHERE finished = 1 AND id NOT IN "
+                "(SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)", (keep,)
+            )]
+            connection.executemany("DELETE FROM job_results WHERE job_id = ?", [(job_id,) for job_id in stale])
+            connection.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in stale])
+        return len(stale)
+
+    # --- Layout templates ---
+
+    def save_template(self, template: LayoutTemplate) -> None:
+        with self._transaction() as connection:
+            # Replacing gives the template a new sequence number, so readers see the change
+            connection.execute("DELETE FROM templates WHERE id = ?", (template.id,))
+            connection.execute(
+                "INSERT INTO templates (id, document_type, issuer, payload) VALUES (?, ?, ?, ?)",
+                (template.id, template.document_type.value, template.issuer, template.model_dump_json()),
+            )
+
+    def list_templates(
+        self, document_type: Optional[DocumentType] = None, issuer: Optional[str] = None
+    ) -> List[LayoutTemplate]:
+        where, params = _where({
+            "document_type": DocumentType(document_type).value if document_type else None,
+            "issuer": issuer,
+        })
+        rows = self._connection.execute(f"SELECT payload FROM templates{where} ORDER BY seq", params).fetchall()
+        return [LayoutTemplate.model_validate_json(payload) for (payload,) in rows]
+
+    def remove_template(self, template_id: str) -> bool:
+        with self._transaction() as connection:
+            return connection.execute("DELETE FROM templates WHERE id = ?", (template_id,)).rowcount > 0
+
+    def template_version(self) -> Tuple[int, int]:
+        count, last = self._connection.execute("SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM templates").fetchone()
+        return count, last
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+        self._anchor.close()
+
+
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+
+def create_store(url: str = settings.STORAGE_URL) -> DocumentStore:
+    """Create a store from a URL such as ``sqlite:///data/documents.db`` or ``sqlite://:memory:``."""
+    scheme, _, location = url.partition("://")
+    if scheme != "sqlite":
+        raise ValueError(f"Unsupported storage backend '{scheme}'")
+    path = location[1:] if location.startswith("/") else location
+    return SQLiteDocumentStore(path or ":memory:")
+
+
+def get_store() -> DocumentStore:
+    """Process-wide document store configured from settings."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = create_store()
+        return _store
+
+
+def close_store() -> None:
+    """Close the process-wide store if it was opened."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
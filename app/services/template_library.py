@@ -0,0 +1,343 @@
+"""Library of genuine document layouts for authenticity checks.
+
+Each template holds the perceptual hashes (whole page and per region, see
+``perceptual_hash.py``) of a known genuine document of one type from one
+issuer. A document whose first-page layout was hashed on upload is compared
+with the templates of its type:
+
+* it should be within ``MATCH_DISTANCE`` bits of one of its issuer's
+  templates; a closer match to another issuer's template suggests a forged
+  document built on someone else's layout;
+* once matched, every region (logo, header, seal, footer) should be within
+  ``REGION_DISTANCE`` bits of the template's, so an altered logo or a pasted
+  seal stands out even when the page as a whole still matches.
+
+Templates of one type are held as packed (n, 8) byte arrays, so comparing
+an upload with every template is one vectorized XOR and popcount. Past
+``INDEX_MIN_TEMPLATES`` templates a multi-index hash narrows the radius
+search to a few candidates first. Templates live in the document store,
+shared by every worker process; ``refresh`` picks up changes.
+"""
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.logging_config import get_logger
+from app.models.document import Document, DocumentType, PageLayout, ValidationIssue
+from app.models.template import LayoutTemplate, TemplateMatch
+from .document_index import normalize_account, normalize_employer
+from .perceptual_hash import HASH_BITS, HASH_BYTES, POPCOUNT, REGIONS, hamming, pack
+from .storage import DocumentStore, get_store
+
+logger = get_logger(__name__)
+
+CATEGORY = "Document Authenticity"
+
+# Page hashes this close are taken to be the same layout
+MATCH_DISTANCE = 10
+# Region hashes further apart than this mean the region was altered
+REGION_DISTANCE = 12
+# Templates of one type above which radius searches go through the multi-index
+INDEX_MIN_TEMPLATES = 5000
+
+REGION_NAMES = tuple(REGIONS)
+
+
+def issuer_key(issuer: Optional[str]) -> Optional[str]:
+    """Key for an issuer name, ignoring case, punctuation and legal-form suffixes."""
+    return normalize_employer(issuer)
+
+
+def document_issuer(document: Document) -> Optional[str]:
+    """The issuer a document claims: its ``issuer``, else the IBAN bank code or the employer."""
+    if document.issuer:
+        return document.issuer
+    if document.type == DocumentType.BANK_STATEMENT:
+        account = normalize_account(document.account_number)
+        # IE29 AIBK 9311 ...: characters 5-8 are the bank code
+        return account[4:8] if account and len(account) >= 8 else None
+    if document.type == DocumentType.PAYSLIP:
+        return document.employer_name
+    return None
+
+
+class _MultiIndex:
+    """Multi-index hashing over the 8 bytes of each hash.
+
+    Two hashes within r bits agree to within r // 8 bits on at least one of
+    their bytes, so probing each byte's sorted table with the query byte's
+    neighbours within that radius finds every candidate.
+    """
+
+    # Byte masks with at most k bits set, k = 0..2
+    MASKS = [np.flatnonzero(POPCOUNT <= k).astype(np.uint8) for k in range(3)]
+
+    def __init__(self, hashes: np.ndarray):
+        self.size = len(hashes)
+        order = np.argsort(hashes, axis=0, kind="stable")
+        ordered = np.take_along_axis(hashes, order, axis=0)
+        # Row ids of each byte's sorted column, one column after another
+        self.rows = order.T.ravel()
+        # starts[byte, value]: first position of value in that byte's sorted column
+        self.starts = np.stack([np.searchsorted(ordered[:, byte], np.arange(257)) for byte in range(HASH_BYTES)])
+
+    @staticmethod
+    def supports(radius: int) -> bool:
+        return radius // HASH_BYTES < len(_MultiIndex.MASKS)
+
+    def candidates(self, query: np.ndarray, radius: int) -> np.ndarray:
+        masks = self.MASKS[radius // HASH_BYTES]
+        byte = np.arange(HASH_BYTES)[:, None]
+        values = np.bitwise_xor(query[:, None], masks[None, :]).astype(np.int64)
+        offset = byte * self.size
+        starts = (self.starts[byte, values] + offset).ravel()
+        lengths = (self.starts[byte, values + 1] + offset).ravel() - starts
+        # Concatenate the ranges [start, start + length) without a Python loop
+        ends = np.cumsum(lengths)
+        positions = np.arange(ends[-1]) + np.repeat(starts - ends + lengths, lengths)
+        return np.unique(self.rows[positions])
+
+
+class _TypeTemplates:
+    """The templates of one document type as packed arrays."""
+
+    def __init__(self, templates: List[LayoutTemplate]):
+        self.templates = templates
+        self.hashes = pack(template.layout.hash for template in templates)
+        # (n, regions, 8), with a mask of the regions each template has
+        self.regions = np.stack(
+            [pack(template.layout.regions.get(name) for template in templates) for name in REGION_NAMES], axis=1
+        )
+        self.has_region = np.array(
+            [[name in template.layout.regions for name in REGION_NAMES] for template in templates], dtype=bool
+        )
+        by_issuer: Dict[str, List[int]] = defaultdict(list)
+        for row, template in enumerate(templates):
+            by_issuer[issuer_key(template.issuer)].append(row)
+        self.by_issuer = {issuer: np.array(rows) for issuer, rows in by_issuer.items()}
+        self._index = _MultiIndex(self.hashes) if len(templates) >= INDEX_MIN_TEMPLATES else None
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def within(self, query: np.ndarray, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows within ``radius`` bits of ``query`` and their distances, nearest first."""
+        if self._index is not None and _MultiIndex.supports(radius):
+            rows = self._index.candidates(query, radius)
+            distances = hamming(self.hashes[rows], query)
+        else:
+            distances = hamming(self.hashes, query)
+            rows = np.arange(len(self.templates))
+        close = distances <= radius
+        rows, distances = rows[close], distances[close]
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
+
+    def region_distances(self, row: int, layout: PageLayout) -> Dict[str, int]:
+        """Per-region distances between a template and a layout, for the regions both have."""
+        names = [name for position, name in enumerate(REGION_NAMES)
+                 if self.has_region[row, position] and name in layout.regions]
+        if not names:
+            return {}
+        positions = [REGION_NAMES.index(name) for name in names]
+        distances = hamming(self.regions[row, positions], pack(layout.regions[name] for name in names))
+        return dict(zip(names, distances.tolist()))
+
+    def match(self, row: int, distance: int, layout: PageLayout) -> TemplateMatch:
+        template = self.templates[row]
+        return TemplateMatch(
+            template_id=template.id,
+            issuer=template.issuer,
+            name=template.name,
+            distance=int(distance),
+            region_distances=self.region_distances(row, layout),
+        )
+
+
+def _issue(severity: str, description: str, recommendation: str) -> ValidationIssue:
+    return ValidationIssue(severity=severity, category=CATEGORY, description=description, recommendation=recommendation)
+
+
+class TemplateLibrary:
+    """Genuine layouts per document type and issuer, searched by Hamming distance."""
+
+    def __init__(self, templates: Iterable[LayoutTemplate] = (), store: Optional[DocumentStore] = None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._stored_version: Optional[Tuple[int, int]] = None
+        # Bumped on every change, so callers caching issues know to recompute them
+        self.version = 0
+        self._load(list(templates))
+
+    @classmethod
+    def from_store(cls, store: DocumentStore) -> "TemplateLibrary":
+        library = cls(store=store)
+        library.refresh()
+        return library
+
+    def _load(self, templates: List[LayoutTemplate]) -> None:
+        grouped: Dict[DocumentType, List[LayoutTemplate]] = defaultdict(list)
+        for template in templates:
+            grouped[template.document_type].append(template)
+        types = {document_type: _TypeTemplates(group) for document_type, group in grouped.items()}
+        with self._lock:
+            self._types = types
+            self.version += 1
+
+    def refresh(self) -> bool:
+        """Reload from the store if templates were added or removed there; returns whether they were."""
+        if self.store is None:
+            return False
+        version = self.store.template_version()
+        if version == self._stored_version:
+            return False
+        self._load(self.store.list_templates())
+        self._stored_version = version
+        logger.info(f"Loaded {len(self)} layout templates")
+        return True
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self._types.values())
+
+    def templates(self, document_type: Optional[DocumentType] = None, issuer: Optional[str] = None) -> List[LayoutTemplate]:
+        key = issuer_key(issuer)
+        return [
+            template
+            for group_type, group in self._types.items() if document_type is None or group_type == document_type
+            for template in group.templates if issuer is None or issuer_key(template.issuer) == key
+        ]
+
+    def add(
+        self,
+        document_type: DocumentType,
+        issuer: str,
+        layout: PageLayout,
+        name: Optional[str] = None,
+    ) -> LayoutTemplate:
+        """Register a genuine layout."""
+        template = LayoutTemplate(
+            id=str(uuid.uuid4()),
+            document_type=document_type,
+            issuer=issuer,
+            name=name,
+            layout=layout,
+            added_at=datetime.now().isoformat(),
+        )
+        if self.store is not None:
+            self.store.save_template(template)
+            self.refresh()
+        else:
+            self._load(self.templates() + [template])
+        return template
+
+    def remove(self, template_id: str) -> bool:
+        if self.store is not None:
+            removed = self.store.remove_template(template_id)
+            self.refresh()
+            return removed
+        templates = self.templates()
+        remaining = [template for template in templates if template.id != template_id]
+        self._load(remaining)
+        return len(remaining) < len(templates)
+
+    def matches(
+        self,
+        document_type: DocumentType,
+        layout: PageLayout,
+        issuer: Optional[str] = None,
+        max_distance: int = HASH_BITS,
+        limit: int = 5,
+    ) -> List[TemplateMatch]:
+        """Templates of ``document_type`` (and ``issuer``, if given) nearest to ``layout``."""
+        group = self._types.get(document_type)
+        if group is None:
+            return []
+        query = pack([layout.hash])[0]
+        rows, distances = group.within(query, max_distance)
+        if issuer is not None:
+            mine = np.isin(rows, group.by_issuer.get(issuer_key(issuer), np.empty(0, dtype=np.int64)))
+            rows, distances = rows[mine], distances[mine]
+        return [group.match(row, distance, layout) for row, distance in zip(rows[:limit], distances[:limit])]
+
+    def issues_for(self, document: Document) -> List[ValidationIssue]:
+        """Authenticity issues from comparing a document's layout with the library."""
+        group = self._types.get(document.type)
+        if document.layout is None or group is None:
+            return []
+        layout = document.layout
+        query = pack([layout.hash])[0]
+        issuer = document_issuer(document)
+        label = document.type.value.lower()
+
+        own_rows = group.by_issuer.get(issuer_key(issuer)) if issuer else None
+        if own_rows is not None:
+            distances = hamming(group.hashes[own_rows], query)
+            best = int(np.argmin(distances))
+            if distances[best] <= MATCH_DISTANCE:
+                return self._region_issues(group.match(own_rows[best], distances[best], layout))
+
+        rows, distances = group.within(query, MATCH_DISTANCE)
+        if issuer:
+            own = set(own_rows.tolist()) if own_rows is not None else set()
+            others = [row for row in rows.tolist() if row not in own]
+            if others:
+                other = group.templates[others[0]]
+                return [_issue(
+                    "HIGH",
+                    f"Layout matches {other.issuer}'s {label} template, but the document names {issuer} as issuer",
+                    "Escalate to the fraud team as a possible forgery built on another issuer's document",
+                )]
+            if own_rows is not None:
+                return [_issue(
+                    "HIGH",
+                    f"Layout does not match any of {len(own_rows)} genuine {issuer} {label} template(s) "
+                    f"(closest differs in {int(np.min(hamming(group.hashes[own_rows], query)))} of {HASH_BITS} bits)",
+                    f"Request the original document or confirm it directly with {issuer}",
+                )]
+            return [_issue(
+                "LOW",
+                f"No genuine {label} layout from {issuer} is on file to compare with",
+                f"Check the layout manually and add a genuine {issuer} {label} to the template library",
+            )]
+
+        if len(rows):
+            return self._region_issues(group.match(rows[0], distances[0], layout))
+        return [_issue(
+            "LOW",
+            f"Layout matches none of the {len(group)} known {label} templates",
+            "Confirm the issuer and check the layout against a genuine document",
+        )]
+
+    def issues_for_batch(self, documents: Sequence[Document]) -> List[List[ValidationIssue]]:
+        """``issues_for`` of each document, in input order."""
+        return [self.issues_for(document) for document in documents]
+
+    @staticmethod
+    def _region_issues(match: TemplateMatch) -> List[ValidationIssue]:
+        altered = {name: distance for name, distance in match.region_distances.items() if distance > REGION_DISTANCE}
+        if not altered:
+            return []
+        regions = ", ".join(f"{name} ({distance} of {HASH_BITS} bits)" for name, distance in altered.items())
+        return [_issue(
+            "MEDIUM",
+            f"Layout matches {match.issuer}'s template{f' {match.name!r}' if match.name else ''} "
+            f"but differs in the {regions}",
+            "Compare the logo and seal with a genuine document from the issuer",
+        )]
+
+
+_library: Optional[TemplateLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_template_library() -> TemplateLibrary:
+    """Process-wide template library, loaded from the document store on first use."""
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = TemplateLibrary.from_store(get_store())
+        return _library
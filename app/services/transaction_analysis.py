@@ -0,0 +1,190 @@
+"""Vectorized analysis of bank statement lines.
+
+Statements carry 500-5000 lines, so every check here works on the NumPy
+columns of ``Transactions`` at once rather than looping over lines:
+
+* ``balance_breaks`` reconciles the printed running balance with the
+  amounts, using the cumulative sum of amounts;
+* ``activity_spike`` compares rolling-window credit totals shortly before
+  the statement ends with the customer's usual level;
+* ``salary_streams`` groups salary-sized credits by payer and detects the
+  ones arriving at a regular weekly, fortnightly or monthly interval, and
+  ``extra_payments`` finds a second salary paid within one pay period.
+"""
+import re
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.models.document import Transactions
+
+# Largest difference between printed and computed balances treated as rounding
+BALANCE_TOLERANCE = 0.01
+
+# Activity spikes: credits in any SPIKE_WINDOW_DAYS window ending in the last
+# SPIKE_LOOKBACK_DAYS, against the usual level over the rest of the statement
+SPIKE_WINDOW_DAYS = 7
+SPIKE_LOOKBACK_DAYS = 30
+SPIKE_MIN_HISTORY_DAYS = 60
+SPIKE_BASELINE_PERCENTILE = 90
+SPIKE_FACTOR = 2.0
+SPIKE_MIN_AMOUNT = 1000.0
+
+# Salary detection
+SALARY_MIN_CREDIT = 500.0
+SALARY_MIN_PAYMENTS = 3
+# Credits within this relative difference are treated as one payer when lines have no description
+SALARY_AMOUNT_SPREAD = 0.10
+# Pay period -> accepted median interval in days
+PAY_PERIODS = {"weekly": (6, 8), "fortnightly": (13, 15), "monthly": (26, 33)}
+# Share of a stream's intervals that must fall within its period (allowing for weekends and holidays)
+PAY_PERIOD_REGULARITY = 0.75
+PAY_PERIOD_SLACK_DAYS = 3
+
+_DIGITS = re.compile(r"\d+")
+
+
+class BalanceBreak(NamedTuple):
+    line: Optional[int]  # None for the closing balance
+    difference: float
+
+
+def balance_breaks(
+    transactions: Transactions,
+    opening_balance: Optional[float] = None,
+    closing_balance: Optional[float] = None,
+) -> List[BalanceBreak]:
+    """Places where the printed running balance does not carry forward.
+
+    Every printed balance implies an opening balance (the balance minus the
+    cumulative sum of amounts up to it); on an untouched statement that is
+    the same for every line. A changed amount shifts it from that line on,
+    and a changed balance shifts it on that line only, so a break is reported
+    wherever it differs from the previous line's. The closing balance is
+    checked against the last one.
+    """
+    running = np.cumsum(transactions.amounts)
+    balances = transactions.balances
+    lines = np.flatnonzero(~np.isnan(balances)) if balances is not None else np.empty(0, dtype=np.int64)
+
+    implied = balances[lines] - running[lines] if len(lines) else np.empty(0)
+    reference = np.empty_like(implied)
+    if len(implied):
+        reference[0] = opening_balance if opening_balance is not None else implied[0]
+        reference[1:] = implied[:-1]
+    differences = implied - reference
+    broken = np.flatnonzero(np.abs(differences) > BALANCE_TOLERANCE)
+    breaks = [BalanceBreak(int(line), float(diff)) for line, diff in zip(lines[broken], differences[broken])]
+
+    start = implied[-1] if len(implied) else opening_balance
+    if closing_balance is not None and start is not None and len(running):
+        difference = closing_balance - (start + running[-1])
+        if abs(difference) > BALANCE_TOLERANCE:
+            breaks.append(BalanceBreak(None, float(difference)))
+    return breaks
+
+
+class ActivitySpike(NamedTuple):
+    window_end: date
+    credits: float
+    usual: float
+
+
+def activity_spike(transactions: Transactions) -> Optional[ActivitySpike]:
+    """The largest burst of credits shortly before the statement ends, if it is far above the usual level.
+
+    Credits are totalled per day on a dense day grid, and rolling
+    ``SPIKE_WINDOW_DAYS`` sums come from one cumulative sum. The usual level
+    is a high percentile of the windows outside the lookback period, so a
+    regular salary week does not count as a spike.
+    """
+    dates, amounts = transactions.dates, transactions.amounts
+    if not len(dates):
+        return None
+    first = dates.min()
+    days = (dates - first).astype(np.int64)
+    span = int(days.max()) + 1
+    if span < SPIKE_MIN_HISTORY_DAYS:
+        return None
+
+    daily = np.bincount(days, weights=np.where(amounts > 0, amounts, 0.0), minlength=span)
+    cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+    windows = cumulative[SPIKE_WINDOW_DAYS:] - cumulative[:-SPIKE_WINDOW_DAYS]
+    # windows[i] covers days i .. i + SPIKE_WINDOW_DAYS - 1
+    recent_start = span - SPIKE_LOOKBACK_DAYS
+    recent = windows[recent_start - SPIKE_WINDOW_DAYS + 1:]
+    earlier = windows[:max(recent_start - SPIKE_WINDOW_DAYS + 1, 0)]
+    if not len(earlier) or not len(recent):
+        return None
+
+    usual = float(np.percentile(earlier, SPIKE_BASELINE_PERCENTILE))
+    peak = int(np.argmax(recent))
+    credits = float(recent[peak])
+    if credits < max(SPIKE_FACTOR * usual, SPIKE_MIN_AMOUNT):
+        return None
+    # recent[peak] covers the SPIKE_WINDOW_DAYS days up to and including recent_start + peak
+    return ActivitySpike((first + np.timedelta64(recent_start + peak, "D")).astype(date), credits, usual)
+
+
+class SalaryStream(NamedTuple):
+    payer: str
+    period: str
+    dates: np.ndarray
+    amounts: np.ndarray
+
+
+def _payer_groups(transactions: Transactions, credits: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """Group number per credit line, and a label per group."""
+    if transactions.descriptions is not None:
+        # Digits are usually references or dates that change every payment
+        keys = [_DIGITS.sub("", transactions.descriptions[line]).strip().upper() for line in credits.tolist()]
+        labels, groups = np.unique(np.array(keys, dtype=object), return_inverse=True)
+        return groups, [label or "unlabelled credits" for label in labels.tolist()]
+    # No descriptions: credits of similar size are taken to come from one payer
+    amounts = transactions.amounts[credits]
+    order = np.argsort(amounts)
+    ordered = amounts[order]
+    starts = np.concatenate(([True], ordered[1:] > ordered[:-1] * (1 + SALARY_AMOUNT_SPREAD)))
+    groups = np.empty(len(order), dtype=np.int64)
+    groups[order] = np.cumsum(starts) - 1
+    labels = [f"credits of about €{amount:,.0f}" for amount in ordered[starts].tolist()]
+    return groups, labels
+
+
+def salary_streams(transactions: Transactions) -> List[SalaryStream]:
+    """Salary-sized credits from one payer arriving at a regular interval."""
+    credits = np.flatnonzero(transactions.amounts >= SALARY_MIN_CREDIT)
+    if len(credits) < SALARY_MIN_PAYMENTS:
+        return []
+    groups, labels = _payer_groups(transactions, credits)
+    counts = np.bincount(groups)
+
+    # Sort by payer, then date, and split into one run per payer
+    order = np.lexsort((transactions.dates[credits], groups))
+    boundaries = np.flatnonzero(np.diff(groups[order])) + 1
+    streams = []
+    for run in np.split(order, boundaries):
+        group = int(groups[run[0]])
+        if counts[group] < SALARY_MIN_PAYMENTS:
+            continue
+        lines = credits[run]
+        dates = transactions.dates[lines]
+        intervals = np.diff(dates).astype(np.int64)
+        median = float(np.median(intervals))
+        for period, (low, high) in PAY_PERIODS.items():
+            if low <= median <= high:
+                # Judge regularity without any extra payments, which split one interval in two
+                cycles = np.diff(dates[np.concatenate(([True], intervals >= low / 2))]).astype(np.int64)
+                regular = (cycles >= low - PAY_PERIOD_SLACK_DAYS) & (cycles <= high + PAY_PERIOD_SLACK_DAYS)
+                if len(cycles) and regular.mean() >= PAY_PERIOD_REGULARITY:
+                    streams.append(SalaryStream(labels[group], period, dates, transactions.amounts[lines]))
+                break
+    return streams
+
+
+def extra_payments(stream: SalaryStream) -> np.ndarray:
+    """Dates of payments in ``stream`` arriving within half a pay period of the previous one."""
+    low = PAY_PERIODS[stream.period][0]
+    intervals = np.diff(stream.dates).astype(np.int64)
+    return stream.dates[1:][intervals < low / 2]
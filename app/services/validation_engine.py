@@ -0,0 +1,922 @@
+"""Validation engine.
+
+The rule catalogue in ``validation_rules.py`` is compiled once, at import
+time, into a ``ValidationPlan`` per ``DocumentType``. A plan is an ordered
+tuple of rules together with a bitmask of the fields each rule reads, so
+validating a document only touches the rules for its type and skips those
+whose inputs are not set.
+
+``validate_batch`` groups documents by type and evaluates each rule over the
+whole group in columnar form, using the rule's NumPy prefilter where it has
+one and only falling back to the per-document check for flagged rows.
+``validate_application`` adds the index-based cross-document checks, the
+near-duplicate search and the comparison with genuine layout templates.
+
+Per-document issues are cached by content hash and rule-set version (see
+``result_cache.py``), so resubmitted documents are not re-evaluated.
+
+With ``RULES_PATH`` set, the rule file it names (see ``rule_dsl.py``)
+replaces, extends or disables built-in rules. The built-in and file rules
+are compiled together into a ``RuleSet``: the plans, the cross-document
+rules and the version. The file is checked for changes every
+``RULES_RELOAD_INTERVAL`` seconds, in every worker process. A changed file
+is compiled in full and then swapped in as one new rule set, so each
+validation sees one generation of the rules. A file that fails to compile
+leaves the previous rule set in place. Because the version changes, results
+cached under the old rules are not reused.
+
+In fast triage mode (``TRIAGE_MODE``, or ``triage=True`` per call) a
+document stops being checked once its risk score reaches
+``TRIAGE_RISK_THRESHOLD``. Rules then run in order of expected risk found
+per second: hit rate times severity weight over mean cost, re-measured
+every ``RULE_SCHEDULE_INTERVAL`` seconds. The expensive stages (near-duplicate
+search, template matching, registry lookups) run after the rules and are
+skipped for documents that already crossed the threshold. Skipped rules and
+stages are listed in ``ValidationResult.skipped_checks``. Issues are always
+reported in catalogue order.
+
+Plans count every rule evaluation and failure, and documents per type; rule
+and document latencies are timed for a sample of validations (see
+``app/core/metrics.py``).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from operator import itemgetter
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.metrics import callback_metric, counter, histogram, sampled
+from app.core.startup import startup_phase
+from app.models.document import SEVERITY_WEIGHTS, Document, DocumentType, ValidationIssue, ValidationResult
+from .cross_document import CROSS_DOCUMENT_RULES, CrossDocumentRule, cross_validate
+from .document_batch import NUMERIC_FIELDS, DocumentBatch
+from .document_index import DocumentIndex
+from .fingerprint import DuplicateIndex
+from .result_cache import get_result_cache
+from .rule_dsl import RuleFile, RuleSpecError, load_rule_file, merge_rules
+from .template_library import TemplateLibrary
+from .validation_rules import RULES, Rule
+
+logger = get_logger(__name__)
+
+RULE_FAILURES = counter("validation_rule_failures_total", "Rule evaluations that raised an issue", ("rule_id",))
+RULE_SECONDS = histogram("validation_rule_duration_seconds", "Sampled rule evaluation latency", ("rule_id",))
+DOCUMENT_SECONDS = histogram(
+    "validation_document_duration_seconds", "Sampled per-document plan latency", ("document_type",)
+)
+
+# Expensive stages run after the rules, recorded in skipped_checks when fast triage skips them
+DUPLICATE_SEARCH = "duplicate-search"
+TEMPLATE_MATCHING = "template-matching"
+REGISTRY_LOOKUPS = "registry-lookups"
+
+# Assumed cost of a rule until enough of its evaluations have been timed
+PRIOR_RULE_SECONDS = 2e-6
+MIN_TIMINGS = 20
+
+
+class RuleMetrics:
+    """Pre-bound metric children for one rule, so the hot path skips label lookups."""
+
+    __slots__ = ("failures", "seconds")
+
+    def __init__(self, rule_id: str):
+        self.failures = RULE_FAILURES.labels(rule_id)
+        self.seconds = RULE_SECONDS.labels(rule_id)
+
+
+class ValidationPlan:
+    """Compiled, ordered rule set for a single document type.
+
+    Usage is tallied per document rather than per rule: ``run`` counts how
+    many documents had each combination of fields present, and ``usage``
+    derives the per-rule call counts from that when metrics are scraped.
+    """
+
+    __slots__ = (
+        "document_type", "rules", "field_bits", "_steps", "_catalogue", "_triage_steps", "_document_seconds",
+        "_usage_lock", "_masks", "_calls", "_column_documents",
+    )
+
+    def __init__(self, document_type: DocumentType, rules: Iterable[Rule]):
+        self.document_type = document_type
+        self.rules: Tuple[Rule, ...] = tuple(rules)
+
+        # Assign one bit per field read by any rule of this type
+        fields = sorted({field for rule in self.rules for field in rule.fields})
+        self.field_bits: Tuple[Tuple[str, int], ...] = tuple(
+            (field, 1 << position) for position, field in enumerate(fields)
+        )
+        bit_of = dict(self.field_bits)
+        self._steps: Tuple[Tuple[int, Rule, RuleMetrics], ...] = tuple(
+            (sum(bit_of[field] for field in rule.fields), rule, RuleMetrics(rule.rule_id)) for rule in self.rules
+        )
+        # Steps with their catalogue position; fast triage runs them in scheduled order
+        self._catalogue = tuple((position,) + step for position, step in enumerate(self._steps))
+        self._triage_steps = self._catalogue
+        self._document_seconds = DOCUMENT_SECONDS.labels(document_type.value)
+        self._usage_lock = threading.Lock()
+        # Presence mask -> documents run with it; the column and partial paths count calls directly
+        self._masks: Dict[int, int] = defaultdict(int)
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._column_documents = 0
+
+    def present_mask(self, document: Document) -> int:
+        """Bitmask of the plan's fields that are set on ``document``."""
+        mask = 0
+        for field, bit in self.field_bits:
+            if getattr(document, field) is not None:
+                mask |= bit
+        return mask
+
+    def run(self, document: Document) -> List[ValidationIssue]:
+        """Run every applicable rule against ``document`` and collect the issues."""
+        timed = sampled()
+        started = time.perf_counter() if timed else 0.0
+        present = self.present_mask(document)
+        issues = []
+        for required, rule, metrics in self._steps:
+            if required & present != required:
+                continue
+            if timed:
+                rule_started = time.perf_counter()
+                message = rule.check(document)
+                metrics.seconds.observe(time.perf_counter() - rule_started)
+            else:
+                message = rule.check(document)
+            if message:
+                metrics.failures.inc()
+                issues.append(make_issue(rule, message))
+        with self._usage_lock:
+            self._masks[present] += 1
+        if timed:
+            self._document_seconds.observe(time.perf_counter() - started)
+        return issues
+
+    def schedule(self, priorities: Dict[str, float]) -> None:
+        """Order fast-triage evaluation by descending priority (expected risk found per second)."""
+        self._triage_steps = tuple(
+            sorted(self._catalogue, key=lambda step: -priorities.get(step[2].rule_id, 0.0))
+        )
+
+    def scheduled_rules(self) -> Tuple[Rule, ...]:
+        """Rules in the order fast triage evaluates them."""
+        return tuple(step[2] for step in self._triage_steps)
+
+    def triage(self, document: Document, stop_at: float) -> Tuple[List[ValidationIssue], List[str]]:
+        """Run rules in scheduled order until the risk score reaches ``stop_at``.
+
+        Returns the issues found, in catalogue order, and the ids of the
+        applicable rules that were not run.
+        """
+        timed = sampled()
+        started = time.perf_counter() if timed else 0.0
+        present = self.present_mask(document)
+        found: List[Tuple[int, ValidationIssue]] = []
+        skipped: List[str] = []
+        called: List[str] = []
+        risk = 0.0
+        for position, required, rule, metrics in self._triage_steps:
+            if required & present != required:
+                continue
+            if risk >= stop_at:
+                skipped.append(rule.rule_id)
+                continue
+            if timed:
+                rule_started = time.perf_counter()
+                message = rule.check(document)
+                metrics.seconds.observe(time.perf_counter() - rule_started)
+            else:
+                message = rule.check(document)
+            called.append(rule.rule_id)
+            if message:
+                metrics.failures.inc()
+                found.append((position, make_issue(rule, message)))
+                risk += SEVERITY_WEIGHTS.get(rule.severity, 0.0)
+        with self._usage_lock:
+            for rule_id in called:
+                self._calls[rule_id] += 1
+        if timed:
+            self._document_seconds.observe(time.perf_counter() - started)
+        found.sort(key=itemgetter(0))
+        return [issue for _, issue in found], skipped
+
+    def rules_reading(self, fields: Iterable[str]) -> Tuple[Rule, ...]:
+        """Rules of this plan whose outcome can depend on any of ``fields``."""
+        fields = set(fields)
+        return tuple(rule for rule in self.rules if rule.inputs & fields)
+
+    def run_rules(self, document: Document, rules: Iterable[Rule]) -> Dict[str, Optional[ValidationIssue]]:
+        """Evaluate only ``rules`` on ``document``, mapping each rule id to its issue (or None)."""
+        present = self.present_mask(document)
+        wanted = {rule.rule_id for rule in rules}
+        outcome: Dict[str, Optional[ValidationIssue]] = {}
+        called = []
+        for required, rule, metrics in self._steps:
+            if rule.rule_id not in wanted:
+                continue
+            message = None
+            if required & present == required:
+                message = rule.check(document)
+                called.append(rule.rule_id)
+                if message:
+                    metrics.failures.inc()
+            outcome[rule.rule_id] = make_issue(rule, message) if message else None
+        with self._usage_lock:
+            for rule_id in called:
+                self._calls[rule_id] += 1
+        return outcome
+
+    def run_batch(
+        self,
+        documents: Sequence[Document],
+        sinks: Sequence[List[ValidationIssue]],
+        stop_at: Optional[float] = None,
+        skipped: Optional[Sequence[List[str]]] = None,
+    ) -> None:
+        """Run the plan over a group of documents of this type.
+
+        Issues for ``documents[i]`` are appended to ``sinks[i]`` in rule order.
+        """
+        self.run_columns(DocumentColumns(documents), documents.__getitem__, sinks, stop_at, skipped)
+
+    def run_columns(
+        self,
+        columns: Union["DocumentColumns", DocumentBatch],
+        document_at: Callable[[int], Document],
+        sinks: Sequence[List[ValidationIssue]],
+        stop_at: Optional[float] = None,
+        skipped: Optional[Sequence[List[str]]] = None,
+    ) -> None:
+        """Run the plan over a column view of documents of this type.
+
+        Rows the vector checks cannot clear are fetched with ``document_at``
+        for the per-document check; issues for row i go to ``sinks[i]``.
+        Sampled timings are recorded as the mean per-row latency, once per row.
+
+        With ``stop_at``, rules run in scheduled order and a row is no longer
+        checked once its risk score reaches it; the ids of rules it skipped
+        go to ``skipped[i]``.
+        """
+        size = len(columns)
+        if not size:
+            return
+        timed = sampled()
+        started = time.perf_counter() if timed else 0.0
+        called: Dict[str, int] = {}
+        risk = np.zeros(size) if stop_at is not None else None
+        # Issues found in triage order, per row, re-sorted into catalogue order at the end
+        found: Dict[int, List[Tuple[int, ValidationIssue]]] = defaultdict(list)
+        for position, _, rule, metrics in (self._catalogue if stop_at is None else self._triage_steps):
+            rule_started = time.perf_counter() if timed else 0.0
+            present = columns.all_present(rule.fields)
+            if risk is not None:
+                stopped = present & (risk >= stop_at)
+                if skipped is not None:
+                    for row in np.flatnonzero(stopped).tolist():
+                        skipped[row].append(rule.rule_id)
+                present = present & ~stopped
+            candidates = present
+            if rule.vector_check is not None:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    candidates = present & rule.vector_check(columns)
+            failures = 0
+            for row in np.flatnonzero(candidates).tolist():
+                message = rule.check(document_at(row))
+                if message:
+                    failures += 1
+                    if risk is None:
+                        sinks[row].append(make_issue(rule, message))
+                    else:
+                        found[row].append((position, make_issue(rule, message)))
+                        risk[row] += SEVERITY_WEIGHTS.get(rule.severity, 0.0)
+            evaluated = int(np.count_nonzero(present))
+            called[rule.rule_id] = evaluated
+            if failures:
+                metrics.failures.inc(failures)
+            if timed and evaluated:
+                metrics.seconds.observe((time.perf_counter() - rule_started) / evaluated, evaluated)
+        for row, issues in found.items():
+            issues.sort(key=itemgetter(0))
+            sinks[row].extend(issue for _, issue in issues)
+        with self._usage_lock:
+            self._column_documents += size
+            for rule_id, evaluated in called.items():
+                self._calls[rule_id] += evaluated
+        if timed:
+            self._document_seconds.observe((time.perf_counter() - started) / size, size)
+
+    def usage(self) -> Tuple[int, Dict[str, int]]:
+        """Documents run through the plan so far, and how many times each rule was evaluated."""
+        with self._usage_lock:
+            masks = dict(self._masks)
+            calls = dict(self._calls)
+            documents = self._column_documents + sum(masks.values())
+        for required, rule, _ in self._steps:
+            calls[rule.rule_id] = calls.get(rule.rule_id, 0) + sum(
+                count for present, count in masks.items() if required & present == required
+            )
+        return documents, calls
+
+
+class DocumentColumns:
+    """Lazily built column view over a group of documents.
+
+    Indexing by field name returns a float64 array (NaN where unset) for
+    numeric fields and an object array otherwise; columns are built on first
+    use and cached for the rest of the batch.
+    """
+
+    def __init__(self, documents: Sequence[Document]):
+        self._documents = documents
+        self._columns: Dict[str, np.ndarray] = {}
+        self._present: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        column = self._columns.get(field)
+        if column is None:
+            values = [getattr(doc, field) for doc in self._documents]
+            if field in NUMERIC_FIELDS:
+                column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            else:
+                column = np.array(values, dtype=object)
+            self._columns[field] = column
+        return column
+
+    def present(self, field: str) -> np.ndarray:
+        """Boolean mask of rows where ``field`` is set."""
+        mask = self._present.get(field)
+        if mask is None:
+            column = self[field]
+            if column.dtype == np.float64:
+                mask = ~np.isnan(column)
+            else:
+                mask = np.fromiter((value is not None for value in column), dtype=bool, count=len(column))
+            self._present[field] = mask
+        return mask
+
+    def all_present(self, fields: Iterable[str]) -> np.ndarray:
+        """Boolean mask of rows where every one of ``fields`` is set."""
+        mask = np.ones(len(self._documents), dtype=bool)
+        for field in fields:
+            mask &= self.present(field)
+        return mask
+
+
+def make_issue(rule: Rule, message: str) -> ValidationIssue:
+    """Build the issue reported by ``rule``."""
+    return ValidationIssue(
+        severity=rule.severity,
+        category=rule.category,
+        description=message,
+        recommendation=rule.recommendation,
+    )
+
+
+def compile_rules(rules: Iterable[Rule] = RULES) -> Dict[DocumentType, ValidationPlan]:
+    """Compile the rule catalogue into one plan per document type."""
+    rules = tuple(rules)
+    plans = {
+        doc_type: ValidationPlan(doc_type, (rule for rule in rules if doc_type in rule.document_types))
+        for doc_type in DocumentType
+    }
+    logger.info(f"Compiled {len(rules)} validation rules into {len(plans)} document plans")
+    return plans
+
+
+def _hash_code(digest, code) -> None:
+    """Feed a code object into ``digest``, recursing into nested code such as generator expressions.
+
+    The repr of a nested code object holds its memory address, which would
+    make the fingerprint differ from one process to the next.
+    """
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _hash_code(digest, const)
+        else:
+            digest.update(repr(const).encode("utf-8"))
+
+
+def rule_fingerprint(rule: Union[Rule, CrossDocumentRule]) -> str:
+    """Fingerprint of one rule: changes whenever its metadata or code changes."""
+    document_types = getattr(rule, "document_types", ())
+    digest = hashlib.sha256(repr((
+        rule.rule_id, rule.category, rule.description, rule.severity, rule.recommendation,
+        sorted(doc_type.value for doc_type in document_types), rule.fields, getattr(rule, "reads", ()),
+    )).encode("utf-8"))
+    if rule.source is not None:
+        digest.update(rule.source.encode("utf-8"))
+    for function in (rule.check, getattr(rule, "vector_check", None)):
+        code = getattr(function, "__code__", None)
+        if code is not None:
+            _hash_code(digest, code)
+        # Parameters captured by rule factories such as _required(field, label)
+        for cell in getattr(function, "__closure__", None) or ():
+            captured = getattr(cell.cell_contents, "__code__", None)
+            if captured is not None:
+                _hash_code(digest, captured)
+            else:
+                digest.update(repr(cell.cell_contents).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def ruleset_version(rules: Iterable[Rule] = RULES, file_version: Optional[int] = None) -> str:
+    """Fingerprint of the whole rule set; bumping a rule file's ``version`` changes it too."""
+    digest = hashlib.sha256()
+    for rule in rules:
+        digest.update(rule_fingerprint(rule).encode("ascii"))
+    if file_version is not None:
+        digest.update(f"file version {file_version}".encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+class RuleSet(NamedTuple):
+    """One compiled generation of the rules; a reload swaps in a new one as a whole."""
+    version: str
+    plans: Dict[DocumentType, ValidationPlan]
+    fingerprints: Dict[str, str]  # Per-document rules only
+    cross_rules: Tuple[CrossDocumentRule, ...]
+    rule_file: Optional[RuleFile]
+    loaded_at: str
+
+
+def build_rule_set(rule_file: Optional[RuleFile] = None) -> RuleSet:
+    """Compile the built-in rules, adjusted by ``rule_file`` if given, into a rule set."""
+    rules, cross_rules = RULES, CROSS_DOCUMENT_RULES
+    if rule_file is not None:
+        rules = merge_rules(RULES, rule_file.rules, rule_file.disabled)
+        cross_rules = merge_rules(CROSS_DOCUMENT_RULES, rule_file.cross_rules, rule_file.disabled)
+    return RuleSet(
+        version=ruleset_version(rules, rule_file.version if rule_file is not None else None),
+        plans=compile_rules(rules),
+        fingerprints={rule.rule_id: rule_fingerprint(rule) for rule in rules},
+        cross_rules=tuple(cross_rules),
+        rule_file=rule_file,
+        loaded_at=datetime.now().isoformat(),
+    )
+
+
+_reload_lock = threading.Lock()
+_rules_checked_at: Optional[float] = None
+# (mtime, size, inode) of the rule file last read, so an unchanged file is not parsed again
+_rules_stamp: Optional[Tuple[int, int, int]] = None
+_reload_error: Optional[str] = None
+# Usage of plans replaced by a reload, so the rule and document counters never go backwards
+_retired_calls: Dict[str, int] = defaultdict(int)
+_retired_documents: Dict[DocumentType, int] = defaultdict(int)
+
+
+def _file_stamp(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _activate(rule_set: RuleSet) -> None:
+    """Make ``rule_set`` the one every later validation uses (caller holds ``_reload_lock``)."""
+    global _ACTIVE, _scheduled_at
+    previous = _ACTIVE
+    for doc_type, plan in previous.plans.items():
+        documents, calls = plan.usage()
+        _retired_documents[doc_type] += documents
+        for rule_id, count in calls.items():
+            _retired_calls[rule_id] += count
+    _ACTIVE = rule_set
+    # New plans start in catalogue order; fast triage re-orders them on next use
+    _scheduled_at = None
+    source = rule_set.rule_file.path if rule_set.rule_file is not None else "the built-in catalogue"
+    logger.info(
+        f"Activated rule set {rule_set.version} (was {previous.version}) from {source}: "
+        f"{len(rule_set.fingerprints)} rules, "
+        f"{len(rule_set.cross_rules)} cross-document rules"
+    )
+
+
+def _keep_active(error: str) -> RuleSet:
+    """Record a rule file error, logging it once, and keep the active rule set (caller holds ``_reload_lock``)."""
+    global _reload_error
+    if error != _reload_error:
+        logger.error(f"{error}; keeping rule set {_ACTIVE.version}")
+    _reload_error = error
+    return _ACTIVE
+
+
+def reload_rules(force: bool = False) -> RuleSet:
+    """Compile and activate the rule file if it changed since it was last read.
+
+    With ``force`` the file is compiled even if unchanged. Errors are logged
+    and leave the active rule set in place; a broken file is not read again
+    until it changes. Returns the active rule set.
+    """
+    global _rules_checked_at, _rules_stamp, _reload_error
+    with _reload_lock:
+        _rules_checked_at = time.monotonic()
+        path = settings.RULES_PATH
+        try:
+            stamp = _file_stamp(path) if path else None
+        except OSError as exc:
+            return _keep_active(f"Cannot read rule file {path}: {exc}")
+        if stamp == _rules_stamp and not force:
+            return _ACTIVE
+        _rules_stamp = stamp
+        try:
+            rule_set = build_rule_set(load_rule_file(path) if path else None)
+        except (OSError, ImportError, RuleSpecError) as exc:
+            return _keep_active(f"Cannot load rule file {path}: {exc}")
+        _reload_error = None
+        if rule_set.version != _ACTIVE.version:
+            _activate(rule_set)
+        return _ACTIVE
+
+
+def current_rules() -> RuleSet:
+    """The active rule set, after checking the rule file for changes if one is configured and due."""
+    if settings.RULES_PATH or _ACTIVE.rule_file is not None:
+        checked = _rules_checked_at
+        if checked is None or time.monotonic() - checked >= settings.RULES_RELOAD_INTERVAL:
+            return reload_rules()
+    return _ACTIVE
+
+
+def _initial_rule_set() -> RuleSet:
+    global _rules_stamp, _reload_error
+    with startup_phase("rules"):
+        if settings.RULES_PATH:
+            try:
+                stamp = _file_stamp(settings.RULES_PATH)
+                rule_set = build_rule_set(load_rule_file(settings.RULES_PATH))
+                _rules_stamp = stamp
+                return rule_set
+            except (OSError, ImportError, RuleSpecError) as exc:
+                _reload_error = f"Cannot load rule file {settings.RULES_PATH}: {exc}"
+                logger.error(f"{_reload_error}; using the built-in rules")
+        return build_rule_set()
+
+
+_ACTIVE: RuleSet = _initial_rule_set()
+
+
+def _rule_calls() -> Dict[Tuple[str, ...], float]:
+    calls: Dict[Tuple[str, ...], float] = {(rule_id,): count for rule_id, count in _retired_calls.items()}
+    for plan in _ACTIVE.plans.values():
+        for rule_id, count in plan.usage()[1].items():
+            calls[(rule_id,)] = calls.get((rule_id,), 0) + count
+    return calls
+
+
+def _documents_validated() -> Dict[Tuple[str, ...], float]:
+    return {
+        (doc_type.value,): plan.usage()[0] + _retired_documents[doc_type] for doc_type, plan in _ACTIVE.plans.items()
+    }
+
+
+callback_metric("validation_rule_calls_total", "Rule evaluations", ("rule_id",), _rule_calls, kind="counter")
+callback_metric(
+    "validation_documents_total", "Documents run through a plan", ("document_type",), _documents_validated, kind="counter"
+)
+
+
+def get_ruleset_version() -> str:
+    """Version of the active rule set, used to key cached results."""
+    return current_rules().version
+
+
+def get_rule_fingerprints() -> Dict[str, str]:
+    """Per-rule fingerprints of the active rule set, keyed by rule id."""
+    return dict(current_rules().fingerprints)
+
+
+def get_cross_rules() -> Tuple[CrossDocumentRule, ...]:
+    """Cross-document rules of the active rule set, in execution order."""
+    return current_rules().cross_rules
+
+
+def get_rule_set_info() -> dict:
+    """Version and origin of the active rule set, and the last rule file error if any."""
+    rule_set = current_rules()
+    rule_file = rule_set.rule_file
+    return {
+        "version": rule_set.version,
+        "loaded_at": rule_set.loaded_at,
+        "rules": len(rule_set.fingerprints),
+        "cross_rules": len(rule_set.cross_rules),
+        "rule_file": rule_file.path if rule_file is not None else None,
+        "file_version": rule_file.version if rule_file is not None else None,
+        "file_digest": rule_file.digest if rule_file is not None else None,
+        "error": _reload_error,
+    }
+
+
+def get_plan(doc_type: DocumentType) -> ValidationPlan:
+    """Return the compiled plan for ``doc_type`` in the active rule set."""
+    return current_rules().plans[DocumentType(doc_type)]
+
+
+def get_validation_rules(doc_type: DocumentType) -> List[dict]:
+    """Describe the rules that apply to ``doc_type``, in execution order."""
+    return [rule.as_dict() for rule in get_plan(doc_type).rules]
+
+
+def rule_statistics(rule_set: Optional[RuleSet] = None) -> Dict[str, dict]:
+    """Measured evaluations, failures, hit rate and mean cost of every rule in ``rule_set``, keyed by rule id.
+
+    Defaults to the active rule set, so rules from ``RULES_PATH`` are
+    included and replaced built-in rules are reported as replaced.
+
+    The hit rate is smoothed towards 1/2 and the cost falls back to
+    ``PRIOR_RULE_SECONDS`` until the rule has ``MIN_TIMINGS`` sampled
+    timings. ``priority`` is the expected risk found per second of
+    evaluation, which fast triage orders rules by.
+    """
+    rule_set = rule_set or current_rules()
+    rules = {rule.rule_id: rule for plan in rule_set.plans.values() for rule in plan.rules}
+    calls = {rule_id: count for (rule_id,), count in _rule_calls().items()}
+    stats: Dict[str, dict] = {}
+    for rule in rules.values():
+        evaluations = int(calls.get(rule.rule_id, 0))
+        failures = int(RULE_FAILURES.labels(rule.rule_id).value)
+        timings = RULE_SECONDS.labels(rule.rule_id)
+        seconds = timings.sum / timings.count if timings.count >= MIN_TIMINGS else PRIOR_RULE_SECONDS
+        hit_rate = (failures + 1) / (evaluations + 2)
+        stats[rule.rule_id] = {
+            "rule_id": rule.rule_id,
+            "severity": rule.severity,
+            "evaluations": evaluations,
+            "failures": failures,
+            "hit_rate": hit_rate,
+            "mean_seconds": seconds,
+            "priority": hit_rate * SEVERITY_WEIGHTS.get(rule.severity, 0.0) / max(seconds, 1e-9),
+        }
+    return stats
+
+
+_schedule_lock = threading.Lock()
+_scheduled_at: Optional[float] = None
+
+
+def reschedule() -> None:
+    """Re-order every plan's fast-triage evaluation from the current rule statistics."""
+    global _scheduled_at
+    rule_set = current_rules()
+    priorities = {rule_id: stats["priority"] for rule_id, stats in rule_statistics(rule_set).items()}
+    for plan in rule_set.plans.values():
+        plan.schedule(priorities)
+    _scheduled_at = time.monotonic()
+    logger.debug("Re-ordered validation rules for fast triage")
+
+
+def _ensure_schedule() -> None:
+    if _scheduled_at is not None and time.monotonic() - _scheduled_at < settings.RULE_SCHEDULE_INTERVAL:
+        return
+    with _schedule_lock:
+        if _scheduled_at is None or time.monotonic() - _scheduled_at >= settings.RULE_SCHEDULE_INTERVAL:
+            reschedule()
+
+
+def get_rule_schedule(doc_type: DocumentType) -> List[dict]:
+    """Rules of ``doc_type`` in fast-triage order, with their current statistics.
+
+    The order is the one in use, fixed at the last re-schedule, so it can
+    lag the priorities shown by up to ``RULE_SCHEDULE_INTERVAL``.
+    """
+    _ensure_schedule()
+    rule_set = current_rules()
+    stats = rule_statistics(rule_set)
+    return [stats[rule.rule_id] for rule in rule_set.plans[DocumentType(doc_type)].scheduled_rules()]
+
+
+def triage_threshold(triage: Optional[bool] = None) -> Optional[float]:
+    """Risk score at which fast triage stops checking a document; None when triage is off.
+
+    ``triage`` overrides ``TRIAGE_MODE`` for one call.
+    """
+    enabled = settings.TRIAGE_MODE if triage is None else triage
+    if not enabled:
+        return None
+    _ensure_schedule()
+    return settings.TRIAGE_RISK_THRESHOLD
+
+
+def triaged(result: ValidationResult, stop_at: Optional[float], check: str) -> bool:
+    """Whether fast triage skips the expensive ``check`` for ``result``; the skip is recorded on it."""
+    if stop_at is None or result.risk_score < stop_at:
+        return False
+    result.skipped_checks.append(check)
+    return True
+
+
+def add_issues(result: ValidationResult, issues: List[ValidationIssue]) -> None:
+    """Append issues from a later check to ``result`` and update its validity."""
+    if issues:
+        result.issues.extend(issues)
+        result.is_valid = result.is_valid and not any(issue.severity == "HIGH" for issue in issues)
+
+
+def build_result(
+    document: Document, issues: List[ValidationIssue], skipped: Optional[List[str]] = None
+) -> ValidationResult:
+    """Wrap the issues found for ``document`` in a ``ValidationResult``."""
+    return ValidationResult(
+        document_id=document.id,
+        document_type=document.type,
+        customer_name=document.customer_name,
+        validation_date=datetime.now().isoformat(),
+        issues=issues,
+        is_valid=not any(issue.severity == "HIGH" for issue in issues),
+        skipped_checks=skipped or [],
+    )
+
+
+def validate_document(document: Document, triage: Optional[bool] = None) -> ValidationResult:
+    """Validate a single document against the compiled plan for its type.
+
+    In fast triage mode only complete results are cached, and a cached
+    complete result is always preferred.
+    """
+    stop_at = triage_threshold(triage)
+    rules = current_rules()
+    plan = rules.plans[document.type]
+    cache = get_result_cache()
+    cached = cache.get(document, rules.version) if cache is not None else None
+    if cached is not None:
+        return build_result(document, list(cached))
+    skipped: List[str] = []
+    if stop_at is None:
+        issues = plan.run(document)
+    else:
+        issues, skipped = plan.triage(document, stop_at)
+    if cache is not None and not skipped:
+        cache.put(document, rules.version, issues)
+    return build_result(document, issues, skipped)
+
+
+def _batch_issues(
+    documents: Sequence[Document], stop_at: Optional[float] = None, rules: Optional[RuleSet] = None
+) -> Tuple[List[List[ValidationIssue]], List[List[str]]]:
+    """Per-document issues, and rules skipped by fast triage, computed one type group at a time.
+
+    Cached documents are answered from the result cache; only the misses are
+    evaluated, and their issues are cached afterwards unless triage cut
+    them short.
+    """
+    rules = rules or current_rules()
+    sinks: List[List[ValidationIssue]] = [[] for _ in documents]
+    skipped: List[List[str]] = [[] for _ in documents]
+    cache = get_result_cache()
+    groups: Dict[DocumentType, List[int]] = defaultdict(list)
+    for position, document in enumerate(documents):
+        if cache is not None:
+            cached = cache.get(document, rules.version)
+            if cached is not None:
+                sinks[position].extend(cached)
+                continue
+        groups[document.type].append(position)
+
+    for doc_type, positions in groups.items():
+        rules.plans[doc_type].run_batch(
+            [documents[p] for p in positions],
+            [sinks[p] for p in positions],
+            stop_at,
+            [skipped[p] for p in positions],
+        )
+    evaluated = sum(len(positions) for positions in groups.values())
+    if cache is not None and evaluated:
+        cache.put_many(
+            [(documents[p], sinks[p]) for positions in groups.values() for p in positions if not skipped[p]],
+            rules.version,
+        )
+    logger.info(
+        f"Validated batch of {len(documents)} documents across {len(groups)} document types "
+        f"({len(documents) - evaluated} from cache)"
+    )
+    return sinks, skipped
+
+
+def validate_batch(documents: Sequence[Document], triage: Optional[bool] = None) -> List[ValidationResult]:
+    """Validate many documents at once; results are returned in input order."""
+    sinks, skipped = _batch_issues(documents, triage_threshold(triage))
+    return [build_result(document, issues, rules) for document, issues, rules in zip(documents, sinks, skipped)]
+
+
+def validate_document_batch(
+    batch: DocumentBatch, chunk_size: int = 50_000, triage: Optional[bool] = None
+) -> Iterator[ValidationResult]:
+    """Validate a columnar batch, yielding results in row order.
+
+    Rules run on the batch's columns directly; rows that still need the
+    per-document check (no vector check, or flagged by it) are passed as
+    lightweight row views rather than materialized ``Document``s. Work
+    proceeds one chunk at a time so decoded columns never outlive their
+    chunk. The result cache is bypassed, as hashing every row would cost
+    more than the vectorized rules themselves.
+    """
+    stop_at = triage_threshold(triage)
+    plans = current_rules().plans
+    for start in range(0, len(batch), chunk_size):
+        chunk = batch.take(slice(start, start + chunk_size))
+        sinks: List[List[ValidationIssue]] = [[] for _ in range(len(chunk))]
+        skipped: List[List[str]] = [[] for _ in range(len(chunk))]
+        for doc_type, rows in chunk.rows_by_type().items():
+            group = chunk.take(rows)
+            rows = rows.tolist()
+            plans[doc_type].run_columns(
+                group, group.row, [sinks[row] for row in rows], stop_at, [skipped[row] for row in rows]
+            )
+
+        ids, names, types = chunk["id"], chunk["customer_name"], chunk["type"]
+        validation_date = datetime.now().isoformat()
+        for row, issues in enumerate(sinks):
+            yield ValidationResult(
+                document_id=ids[row],
+                document_type=types[row],
+                customer_name=names[row],
+                validation_date=validation_date,
+                issues=issues,
+                is_valid=not any(issue.severity == "HIGH" for issue in issues),
+                skipped_checks=skipped[row],
+            )
+        logger.info(f"Validated columnar chunk of {len(chunk)} documents")
+
+
+_WARM_UP: Dict[str, Optional[float]] = {"started_at": None, "seconds": None}
+
+
+def _warm_up_document(doc_type: DocumentType) -> Document:
+    """A document of ``doc_type`` with every field set, so every rule of its plan runs."""
+    today = date.today().isoformat()
+    values = {name: 1000.0 for name in NUMERIC_FIELDS}
+    values.update(
+        customer_dob="1990-01-01", customer_address="1 Main Street, Dublin", account_number="IE00WARM00000000000000",
+        statement_date=today, employer_name="Warm-up Ltd", pay_date=today, irp_number="IRP0000000",
+        nationality="Irish", expiry_date=today, ppsn_number="0000000W", issue_date=today, tax_year=str(date.today().year),
+    )
+    return Document(id=f"warm-up-{doc_type.name}", type=doc_type, customer_name="Warm Up", upload_date=today, **values)
+
+
+def warm_up() -> float:
+    """Run every plan once, per document and columnar, so the first request pays no first-call costs.
+
+    Bypasses the result cache. Returns the time taken in seconds.
+    """
+    _WARM_UP["started_at"] = time.time()
+    started = time.perf_counter()
+    plans = current_rules().plans
+    documents = [_warm_up_document(doc_type) for doc_type in plans]
+    for document in documents:
+        plans[document.type].run(document)
+    batch = DocumentBatch.from_documents(documents)
+    for _ in validate_document_batch(batch):
+        pass
+    elapsed = time.perf_counter() - started
+    _WARM_UP["seconds"] = elapsed
+    logger.info(f"Warmed up {len(plans)} validation plans in {elapsed * 1000:.1f}ms")
+    return elapsed
+
+
+def get_warm_up_state() -> Dict[str, Optional[float]]:
+    """When warm-up started and how long it took (None until it has finished)."""
+    return dict(_WARM_UP)
+
+
+def is_warm() -> bool:
+    return _WARM_UP["seconds"] is not None
+
+
+def validate_application(
+    documents: Sequence[Document],
+    history: Optional[DocumentIndex] = None,
+    duplicates: Optional[DuplicateIndex] = None,
+    templates: Optional[TemplateLibrary] = None,
+    triage: Optional[bool] = None,
+) -> List[ValidationResult]:
+    """Validate the documents of one application, including cross-document checks.
+
+    ``history`` is the index of previously submitted documents consulted by
+    the fraud-ring checks; ``duplicates`` is the fingerprint index used to
+    find near-identical documents submitted by other customers; ``templates``
+    holds the genuine layouts that document page hashes are compared with.
+    In fast triage mode the last two are skipped for documents the rules
+    already put over the risk threshold.
+    """
+    stop_at = triage_threshold(triage)
+    rule_set = current_rules()
+    sinks, skipped = _batch_issues(documents, stop_at, rule_set)
+    results = [build_result(document, issues, rules) for document, issues, rules in zip(documents, sinks, skipped)]
+    cross_issues = cross_validate(documents, history, rule_set.cross_rules)
+    for document, result in zip(documents, results):
+        if duplicates is not None and not triaged(result, stop_at, DUPLICATE_SEARCH):
+            add_issues(result, duplicates.issues_for(document))
+        if templates is not None and not triaged(result, stop_at, TEMPLATE_MATCHING):
+            add_issues(result, templates.issues_for(document))
+        add_issues(result, cross_issues.get(document.id, []))
+    return results
@@ -0,0 +1,479 @@
+"""Rule catalogue for the document validation engine.
+
+Each rule declares the document types it applies to and the ``Document``
+fields its check reads. The engine (see ``validation_engine.py``) compiles
+this catalogue once per ``DocumentType`` and skips any rule whose fields are
+not set on the document being validated.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, FrozenSet, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.models.document import Document, DocumentType
+from .transaction_analysis import SPIKE_WINDOW_DAYS, activity_spike, balance_breaks, extra_payments, salary_streams
+
+# --- Precompiled structural patterns ---
+# PPSN: 7 digits, a check letter (A-W) and an optional second letter (A-I or W)
+PPSN_PATTERN = re.compile(r"^\d{7}[A-W][A-IW]?$")
+# Generic IBAN shape; Irish IBANs are checked against the stricter pattern below
+IBAN_PATTERN = re.compile(r"^[A-Z]{2}\d{2}[A-Z0-9]{11,30}$")
+IE_IBAN_PATTERN = re.compile(r"^IE\d{2}[A-Z]{4}\d{14}$")
+# IRP card number: one or two letter prefix followed by 6-8 digits
+IRP_PATTERN = re.compile(r"^[A-Z]{1,2}\d{6,8}$")
+TAX_YEAR_PATTERN = re.compile(r"^(19|20)\d{2}$")
+DIGIT_PATTERN = re.compile(r"\d")
+
+ALL_DOCUMENT_TYPES: FrozenSet[DocumentType] = frozenset(DocumentType)
+
+# Thresholds used by the content and behavioural checks
+MIN_APPLICANT_AGE = 18
+MAX_APPLICANT_AGE = 110
+MIN_NET_TO_GROSS_RATIO = 0.4
+MAX_EFFECTIVE_TAX_RATE = 0.55
+HIGH_MONTHLY_GROSS = 25000.0
+ROUND_SALARY_STEP = 100.0
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A single validation rule.
+
+    ``check`` returns ``None`` when the document passes and a description of
+    the problem when it fails. It is only called when every field named in
+    ``fields`` is set on the document.
+
+    ``vector_check`` optionally evaluates the same condition over a whole
+    column batch (field name -> NumPy array, plus ``present(field)`` masks)
+    and returns a boolean mask of rows that may fail. Batch validation only
+    calls ``check`` on those rows.
+
+    ``reads`` names any further fields the check inspects without requiring
+    them (the required-field checks). ``inputs`` is the full set, used to
+    work out which rules an edited field affects.
+
+    ``source`` is the generated code of a rule compiled from a rule file
+    (see ``rule_dsl.py``); built-in rules have none.
+    """
+    rule_id: str
+    category: str
+    description: str
+    severity: str
+    recommendation: str
+    document_types: FrozenSet[DocumentType]
+    fields: Tuple[str, ...]
+    check: Callable[[Document], Optional[str]]
+    vector_check: Optional[Callable[[Mapping[str, np.ndarray]], np.ndarray]] = None
+    reads: Tuple[str, ...] = ()
+    source: Optional[str] = None
+
+    @property
+    def inputs(self) -> FrozenSet[str]:
+        """Every document field the rule looks at."""
+        return frozenset(self.fields) | frozenset(self.reads)
+
+    def as_dict(self) -> dict:
+        """Public description of the rule, as shown on the rules tab."""
+        return {
+            "rule_id": self.rule_id,
+            "category": self.category,
+            "description": self.description,
+            "severity": self.severity,
+        }
+
+
+# --- Helpers ---
+
+def normalize_identifier(value: str) -> str:
+    """Uppercase an identifier and strip the spaces and dashes people type into it."""
+    return value.replace(" ", "").replace("-", "").upper()
+
+
+def parse_date(value: str) -> Optional[date]:
+    """Parse the ISO date prefix of ``value``; returns None if it is not a date."""
+    try:
+        return date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def ppsn_check_character(ppsn: str) -> Optional[str]:
+    """Compute the expected check letter of a PPSN (weighted modulus 23)."""
+    digits = ppsn[:7]
+    if not digits.isdigit():
+        return None
+    total = sum(int(d) * w for d, w in zip(digits, range(8, 1, -1)))
+    if len(ppsn) == 9 and ppsn[8] != "W":
+        total += (ord(ppsn[8]) - 64) * 9
+    remainder = total % 23
+    return "W" if remainder == 0 else chr(64 + remainder)
+
+
+def iban_checksum_valid(iban: str) -> bool:
+    """Validate an IBAN with the ISO 13616 mod-97 check."""
+    rearranged = iban[4:] + iban[:4]
+    numeric = "".join(str(int(ch, 36)) for ch in rearranged)
+    return int(numeric) % 97 == 1
+
+
+# --- Checks ---
+
+def _required(field: str, label: str) -> Callable[[Document], Optional[str]]:
+    def check(doc: Document) -> Optional[str]:
+        value = getattr(doc, field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return f"{label} is missing"
+        return None
+    return check
+
+
+def _not_in_future(field: str, label: str) -> Callable[[Document], Optional[str]]:
+    def check(doc: Document) -> Optional[str]:
+        parsed = parse_date(getattr(doc, field))
+        if parsed is None:
+            return f"{label} '{getattr(doc, field)}' is not a valid date"
+        if parsed > date.today():
+            return f"{label} {parsed.isoformat()} is in the future"
+        return None
+    return check
+
+
+def _check_dob(doc: Document) -> Optional[str]:
+    dob = parse_date(doc.customer_dob)
+    if dob is None:
+        return f"Date of birth '{doc.customer_dob}' is not a valid date"
+    today = date.today()
+    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    if age < MIN_APPLICANT_AGE or age > MAX_APPLICANT_AGE:
+        return f"Date of birth {dob.isoformat()} gives an implausible applicant age of {age}"
+    return None
+
+
+def _check_name_characters(doc: Document) -> Optional[str]:
+    if DIGIT_PATTERN.search(doc.customer_name):
+        return f"Customer name '{doc.customer_name}' contains digits"
+    return None
+
+
+def _check_iban_format(doc: Document) -> Optional[str]:
+    iban = normalize_identifier(doc.account_number)
+    if not IBAN_PATTERN.match(iban):
+        return f"Account number '{doc.account_number}' is not a valid IBAN"
+    if iban.startswith("IE") and not IE_IBAN_PATTERN.match(iban):
+        return f"Account number '{doc.account_number}' does not follow the Irish IBAN structure"
+    return None
+
+
+def _check_iban_checksum(doc: Document) -> Optional[str]:
+    iban = normalize_identifier(doc.account_number)
+    if IBAN_PATTERN.match(iban) and not iban_checksum_valid(iban):
+        return f"IBAN '{doc.account_number}' fails the mod-97 checksum"
+    return None
+
+
+def _check_negative_balance(doc: Document) -> Optional[str]:
+    if doc.closing_balance < 0:
+        return f"Closing balance is negative (€{doc.closing_balance:,.2f})"
+    return None
+
+
+def _check_balance_carry_forward(doc: Document) -> Optional[str]:
+    breaks = balance_breaks(doc.transactions, doc.opening_balance, doc.closing_balance)
+    if not breaks:
+        return None
+    first = breaks[0]
+    where = "the closing balance" if first.line is None else f"the line dated {doc.transactions.dates[first.line]}"
+    return (
+        f"Running balance does not carry forward at {len(breaks)} point(s), "
+        f"first at {where} (out by €{abs(first.difference):,.2f})"
+    )
+
+
+def _check_salary_frequency(doc: Document) -> Optional[str]:
+    streams = salary_streams(doc.transactions)
+    monthly = [stream.payer for stream in streams if stream.period == "monthly"]
+    if len(monthly) > 1:
+        return f"Monthly salary-sized credits arrive from {len(monthly)} payers: {', '.join(monthly)}"
+    for stream in streams:
+        extra = extra_payments(stream)
+        if len(extra):
+            return (
+                f"{stream.payer} was paid {len(extra)} extra time(s) within a {stream.period} pay period, "
+                f"first on {extra[0]}"
+            )
+    return None
+
+
+def _check_activity_spike(doc: Document) -> Optional[str]:
+    spike = activity_spike(doc.transactions)
+    if spike is None:
+        return None
+    usual = f"{spike.credits / spike.usual:.1f} times the usual €{spike.usual:,.0f}" if spike.usual else "against almost none usually"
+    return (
+        f"Credits of €{spike.credits:,.2f} in the {SPIKE_WINDOW_DAYS} days to {spike.window_end.isoformat()} "
+        f"are {usual}"
+    )
+
+
+def _check_net_not_above_gross(doc: Document) -> Optional[str]:
+    if doc.net_pay > doc.gross_pay:
+        return f"Net pay €{doc.net_pay:,.2f} exceeds gross pay €{doc.gross_pay:,.2f}"
+    return None
+
+
+def _check_deduction_ratio(doc: Document) -> Optional[str]:
+    if doc.gross_pay > 0 and doc.net_pay <= doc.gross_pay:
+        ratio = doc.net_pay / doc.gross_pay
+        if ratio < MIN_NET_TO_GROSS_RATIO:
+            return f"Deductions take {1 - ratio:.0%} of gross pay, which is implausibly high"
+    return None
+
+
+def _check_round_salary(doc: Document) -> Optional[str]:
+    if doc.gross_pay >= 1000 and doc.gross_pay % ROUND_SALARY_STEP == 0:
+        return f"Gross pay €{doc.gross_pay:,.2f} is a suspiciously round figure"
+    return None
+
+
+def _check_high_salary(doc: Document) -> Optional[str]:
+    if doc.gross_pay > HIGH_MONTHLY_GROSS:
+        return f"Gross pay €{doc.gross_pay:,.2f} is unusually high for a single pay period"
+    return None
+
+
+def _check_irp_format(doc: Document) -> Optional[str]:
+    if not IRP_PATTERN.match(normalize_identifier(doc.irp_number)):
+        return f"IRP number '{doc.irp_number}' does not match the IRP card format"
+    return None
+
+
+def _check_irp_expiry(doc: Document) -> Optional[str]:
+    expiry = parse_date(doc.expiry_date)
+    if expiry is None:
+        return f"Expiry date '{doc.expiry_date}' is not a valid date"
+    if expiry < date.today():
+        return f"IRP expired on {expiry.isoformat()}"
+    return None
+
+
+def _check_ppsn_format(doc: Document) -> Optional[str]:
+    if not PPSN_PATTERN.match(normalize_identifier(doc.ppsn_number)):
+        return f"PPSN '{doc.ppsn_number}' does not match the format of 7 digits followed by 1 or 2 letters"
+    return None
+
+
+def _check_ppsn_check_character(doc: Document) -> Optional[str]:
+    ppsn = normalize_identifier(doc.ppsn_number)
+    if PPSN_PATTERN.match(ppsn):
+        expected = ppsn_check_character(ppsn)
+        if expected != ppsn[7]:
+            return f"PPSN '{doc.ppsn_number}' has check character '{ppsn[7]}', expected '{expected}'"
+    return None
+
+
+def _check_ppsn_issue_after_birth(doc: Document) -> Optional[str]:
+    issued, dob = parse_date(doc.issue_date), parse_date(doc.customer_dob)
+    if issued and dob and issued < dob:
+        return f"PPSN issue date {issued.isoformat()} is before the date of birth {dob.isoformat()}"
+    return None
+
+
+def _check_tax_year(doc: Document) -> Optional[str]:
+    year = doc.tax_year.strip()
+    if not TAX_YEAR_PATTERN.match(year):
+        return f"Tax year '{doc.tax_year}' is not a four-digit year"
+    if int(year) > date.today().year:
+        return f"Tax year {year} is in the future"
+    return None
+
+
+def _check_tax_not_above_income(doc: Document) -> Optional[str]:
+    if doc.tax_paid > doc.total_income:
+        return f"Tax paid €{doc.tax_paid:,.2f} exceeds total income €{doc.total_income:,.2f}"
+    return None
+
+
+def _check_effective_tax_rate(doc: Document) -> Optional[str]:
+    if doc.total_income > 0 and doc.tax_paid <= doc.total_income:
+        rate = doc.tax_paid / doc.total_income
+        if rate > MAX_EFFECTIVE_TAX_RATE:
+            return f"Effective tax rate of {rate:.0%} is above the highest marginal rate"
+    return None
+
+
+# --- Vectorized prefilters (column batch -> mask of rows that may fail) ---
+
+def _vec_required(field: str) -> Callable[[Mapping[str, np.ndarray]], np.ndarray]:
+    def vector_check(cols) -> np.ndarray:
+        present = cols.present(field)
+        column = cols[field]
+        if column.dtype == np.float64:
+            return ~present
+        filled = np.where(present, column, "").astype(str)
+        return np.char.str_len(np.char.strip(filled)) == 0
+    return vector_check
+
+
+def _vec_name_characters(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    names = cols["customer_name"]
+    return np.fromiter((DIGIT_PATTERN.search(name) is not None for name in names), dtype=bool, count=len(names))
+
+
+def _vec_negative_balance(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    return cols["closing_balance"] < 0
+
+
+def _vec_net_above_gross(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    return cols["net_pay"] > cols["gross_pay"]
+
+
+def _vec_deduction_ratio(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    gross, net = cols["gross_pay"], cols["net_pay"]
+    return (gross > 0) & (net <= gross) & (net < gross * MIN_NET_TO_GROSS_RATIO)
+
+
+def _vec_round_salary(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    gross = cols["gross_pay"]
+    return (gross >= 1000) & (np.fmod(gross, ROUND_SALARY_STEP) == 0)
+
+
+def _vec_high_salary(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    return cols["gross_pay"] > HIGH_MONTHLY_GROSS
+
+
+def _vec_tax_above_income(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    return cols["tax_paid"] > cols["total_income"]
+
+
+def _vec_effective_tax_rate(cols: Mapping[str, np.ndarray]) -> np.ndarray:
+    income, paid = cols["total_income"], cols["tax_paid"]
+    return (income > 0) & (paid <= income) & (paid > income * MAX_EFFECTIVE_TAX_RATE)
+
+
+# --- Catalogue ---
+
+def _types(*document_types: DocumentType) -> FrozenSet[DocumentType]:
+    return frozenset(document_types)
+
+
+RULES: Tuple[Rule, ...] = (
+    # Common checks
+    Rule("COMMON-001", "Required Fields", "Customer name must be present", "HIGH",
+         "Request a document showing the customer's full name",
+         ALL_DOCUMENT_TYPES, (), _required("customer_name", "Customer name"),
+         vector_check=_vec_required("customer_name"), reads=("customer_name",)),
+    Rule("COMMON-002", "Content Consistency", "Date of birth must be a valid date giving a plausible age", "MEDIUM",
+         "Verify the date of birth against a photo ID",
+         ALL_DOCUMENT_TYPES, ("customer_dob",), _check_dob),
+    Rule("COMMON-003", "Content Consistency", "Customer name must not contain digits", "LOW",
+         "Check the name for OCR or data-entry errors",
+         ALL_DOCUMENT_TYPES, ("customer_name",), _check_name_characters,
+         vector_check=_vec_name_characters),
+    Rule("COMMON-004", "Regulatory & Structural", "PPSN must be 7 digits followed by 1 or 2 letters", "HIGH",
+         "Request the customer's PPSN confirmation letter",
+         ALL_DOCUMENT_TYPES, ("ppsn_number",), _check_ppsn_format),
+    Rule("COMMON-005", "Regulatory & Structural", "PPSN check character must be correct", "HIGH",
+         "Treat the PPSN as potentially fabricated and verify it with the Department of Social Protection",
+         ALL_DOCUMENT_TYPES, ("ppsn_number",), _check_ppsn_check_character),
+
+    # Bank statement checks
+    Rule("BANK-001", "Required Fields", "Bank statement must include an account number", "HIGH",
+         "Request a statement showing the full IBAN",
+         _types(DocumentType.BANK_STATEMENT), (), _required("account_number", "Account number"),
+         vector_check=_vec_required("account_number"), reads=("account_number",)),
+    Rule("BANK-002", "Regulatory & Structural", "Account number must be a valid IBAN", "HIGH",
+         "Confirm the IBAN directly with the issuing bank",
+         _types(DocumentType.BANK_STATEMENT), ("account_number",), _check_iban_format),
+    Rule("BANK-003", "Regulatory & Structural", "IBAN checksum must be valid", "HIGH",
+         "Treat the statement as potentially altered and confirm the account with the bank",
+         _types(DocumentType.BANK_STATEMENT), ("account_number",), _check_iban_checksum),
+    Rule("BANK-004", "Content Consistency", "Statement date must not be in the future", "MEDIUM",
+         "Check the statement date for tampering",
+         _types(DocumentType.BANK_STATEMENT), ("statement_date",), _not_in_future("statement_date", "Statement date")),
+    Rule("BANK-005", "Behavioral & Contextual", "Closing balance should not be negative", "LOW",
+         "Review the account for sustained overdraft usage",
+         _types(DocumentType.BANK_STATEMENT), ("closing_balance",), _check_negative_balance,
+         vector_check=_vec_negative_balance),
+    Rule("BANK-006", "Content Consistency", "Running balance must carry forward between statement lines", "HIGH",
+         "Treat the statement as potentially altered and obtain it directly from the bank",
+         _types(DocumentType.BANK_STATEMENT), ("transactions",), _check_balance_carry_forward,
+         reads=("opening_balance", "closing_balance")),
+    Rule("BANK-007", "Behavioral & Contextual", "Salary should be credited once per pay period by one employer", "MEDIUM",
+         "Compare the salary credits with the payslips and ask about any further income",
+         _types(DocumentType.BANK_STATEMENT), ("transactions",), _check_salary_frequency),
+    Rule("BANK-008", "Behavioral & Contextual", "Credits should not spike in the weeks before the application", "MEDIUM",
+         "Ask the customer to explain the source of the recent lodgements",
+         _types(DocumentType.BANK_STATEMENT), ("transactions",), _check_activity_spike),
+
+    # Payslip checks
+    Rule("PAY-001", "Required Fields", "Payslip must name the employer", "MEDIUM",
+         "Request a payslip showing the employer's registered name",
+         _types(DocumentType.PAYSLIP), (), _required("employer_name", "Employer name"),
+         vector_check=_vec_required("employer_name"), reads=("employer_name",)),
+    Rule("PAY-002", "Content Consistency", "Net pay must not exceed gross pay", "HIGH",
+         "Treat the payslip as potentially altered and verify with the employer",
+         _types(DocumentType.PAYSLIP), ("gross_pay", "net_pay"), _check_net_not_above_gross,
+         vector_check=_vec_net_above_gross),
+    Rule("PAY-003", "Content Consistency", "Deductions must be a plausible share of gross pay", "MEDIUM",
+         "Ask the customer to explain the level of deductions",
+         _types(DocumentType.PAYSLIP), ("gross_pay", "net_pay"), _check_deduction_ratio,
+         vector_check=_vec_deduction_ratio),
+    Rule("PAY-004", "Behavioral & Contextual", "Gross pay should not be a suspiciously round figure", "LOW",
+         "Compare against salary credits on the bank statement",
+         _types(DocumentType.PAYSLIP), ("gross_pay",), _check_round_salary,
+         vector_check=_vec_round_salary),
+    Rule("PAY-005", "Behavioral & Contextual", "Gross pay should be within the expected range", "MEDIUM",
+         "Verify the salary with the employer",
+         _types(DocumentType.PAYSLIP), ("gross_pay",), _check_high_salary,
+         vector_check=_vec_high_salary),
+    Rule("PAY-006", "Content Consistency", "Pay date must not be in the future", "MEDIUM",
+         "Check the pay date for tampering",
+         _types(DocumentType.PAYSLIP), ("pay_date",), _not_in_future("pay_date", "Pay date")),
+
+    # IRP checks
+    Rule("IRP-001", "Required Fields", "IRP must include a card number", "HIGH",
+         "Request a clear copy of both sides of the IRP card",
+         _types(DocumentType.IRP), (), _required("irp_number", "IRP number"),
+         vector_check=_vec_required("irp_number"), reads=("irp_number",)),
+    Rule("IRP-002", "Regulatory & Structural", "IRP number must match the card format", "HIGH",
+         "Verify the IRP card with the immigration service",
+         _types(DocumentType.IRP), ("irp_number",), _check_irp_format),
+    Rule("IRP-003", "Content Consistency", "IRP must not be expired", "HIGH",
+         "Request a current residence permit",
+         _types(DocumentType.IRP), ("expiry_date",), _check_irp_expiry),
+    Rule("IRP-004", "Required Fields", "IRP should state the holder's nationality", "LOW",
+         "Confirm nationality from the passport",
+         _types(DocumentType.IRP), (), _required("nationality", "Nationality"),
+         vector_check=_vec_required("nationality"), reads=("nationality",)),
+
+    # PPSN document checks
+    Rule("PPSN-001", "Required Fields", "PPSN document must include the PPSN", "HIGH",
+         "Request the customer's PPSN confirmation letter",
+         _types(DocumentType.PPSN), (), _required("ppsn_number", "PPSN"),
+         vector_check=_vec_required("ppsn_number"), reads=("ppsn_number",)),
+    Rule("PPSN-002", "Content Consistency", "PPSN issue date must not be in the future", "MEDIUM",
+         "Check the issue date for tampering",
+         _types(DocumentType.PPSN), ("issue_date",), _not_in_future("issue_date", "Issue date")),
+    Rule("PPSN-003", "Content Consistency", "PPSN must not be issued before the date of birth", "HIGH",
+         "Verify the PPSN with the Department of Social Protection",
+         _types(DocumentType.PPSN), ("issue_date", "customer_dob"), _check_ppsn_issue_after_birth),
+
+    # Tax record checks
+    Rule("TAX-001", "Required Fields", "Tax record must state the tax year", "MEDIUM",
+         "Request a complete tax statement",
+         _types(DocumentType.TAX_RECORD), (), _required("tax_year", "Tax year"),
+         vector_check=_vec_required("tax_year"), reads=("tax_year",)),
+    Rule("TAX-002", "Regulatory & Structural", "Tax year must be a valid, non-future year", "MEDIUM",
+         "Check the tax year for tampering",
+         _types(DocumentType.TAX_RECORD), ("tax_year",), _check_tax_year),
+    Rule("TAX-003", "Content Consistency", "Tax paid must not exceed total income", "HIGH",
+         "Verify the tax statement with Revenue",
+         _types(DocumentType.TAX_RECORD), ("total_income", "tax_paid"), _check_tax_not_above_income,
+         vector_check=_vec_tax_above_income),
+    Rule("TAX-004", "Content Consistency", "Effective tax rate must be plausible", "MEDIUM",
+         "Verify the tax statement with Revenue",
+         _types(DocumentType.TAX_RECORD), ("total_income", "tax_paid"), _check_effective_tax_rate,
+         vector_check=_vec_effective_tax_rate),
+)
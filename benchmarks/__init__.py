@@ -0,0 +1 @@
+"""Benchmarks for the validation engine and HTTP API (see ``run.py``)."""
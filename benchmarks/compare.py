@@ -0,0 +1,57 @@
+"""Compare two benchmark reports written by ``benchmarks.run``.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Prints throughput, p99 latency and peak RSS side by side for every scenario
+and size present in both reports. Exits with status 1 when any throughput
+dropped, or p99 latency rose, by more than ``--threshold`` percent.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+def load(path: str) -> Dict[Tuple[str, int], dict]:
+    with open(path, encoding="utf-8") as handle:
+        report = json.load(handle)
+    return {(result["scenario"], result["size"]): result for result in report["results"]}
+
+
+def change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    """Relative change from ``old`` to ``new`` in percent."""
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def fmt_change(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression tolerance in percent")
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    regressions = 0
+    print(f"{'scenario':<20} {'size':>9}  {'docs/s':>12} {'change':>8}  {'p99 ms':>10} {'change':>8}  {'RSS MB':>8}")
+    for key in sorted(set(baseline) & set(candidate), key=lambda key: (key[1], key[0])):
+        old, new = baseline[key], candidate[key]
+        throughput = change(old["documents_per_second"], new["documents_per_second"])
+        p99 = change(old["p99_ms"], new["p99_ms"])
+        regressed = (throughput is not None and throughput < -args.threshold) or (p99 is not None and p99 > args.threshold)
+        regressions += regressed
+        print(
+            f"{key[0]:<20} {key[1]:>9,}  {new['documents_per_second'] or 0:>12,.0f} {fmt_change(throughput):>8}  "
+            f"{new['p99_ms']:>10.3f} {fmt_change(p99):>8}  {new['peak_rss_mb']:>8,.0f}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Synthetic applications for benchmarking the validation engine.
+
+``DocumentGenerator`` produces applications the way customers submit them:
+one customer, a bank statement, a payslip, a PPSN letter, a tax record and,
+for non-Irish nationals, an IRP card. Identifiers are structurally valid
+(IBANs pass mod-97, PPSNs carry the right check character) so clean
+documents really are clean, and a configurable share of documents is
+tampered with so the failure paths are exercised too. A further share of
+customers reuses a PPSN or bank account from an earlier customer, which
+feeds the fraud-ring checks that look across applications. With
+``statement_lines`` set, bank statements also carry that many transaction
+lines (six months of monthly salary and card spending) whose running balance
+reconciles with the opening and closing balances.
+
+Output is fully determined by the seed.
+"""
+import random
+import uuid
+from datetime import date, timedelta
+from typing import Callable, Iterator, List, Tuple
+
+import numpy as np
+
+from app.models.document import Document, DocumentType, Transactions
+from app.services.validation_rules import ppsn_check_character
+
+FIRST_NAMES = (
+    "Aoife", "Ciara", "Niamh", "Sinead", "Roisin", "Sean", "Padraig", "Cian", "Conor", "Darragh",
+    "Anna", "Maria", "Olena", "Wei", "Priya", "Tomasz", "Lukas", "Mohammed", "Ana", "Joao",
+)
+SURNAMES = (
+    "Murphy", "Kelly", "O'Sullivan", "Walsh", "Byrne", "Ryan", "O'Brien", "Doyle", "McCarthy", "Gallagher",
+    "Nowak", "Kowalski", "Silva", "Santos", "Chen", "Singh", "Khan", "Ivanova", "Popescu", "Garcia",
+)
+STREETS = ("Main Street", "Church Road", "Dublin Road", "Mill Lane", "Green Park", "Station Road", "Oak Avenue")
+TOWNS = ("Dublin 8", "Cork", "Galway", "Limerick", "Waterford", "Kilkenny", "Sligo", "Athlone", "Drogheda")
+EMPLOYERS = (
+    "Kerry Foods Ltd", "ESB Networks", "Primark Ireland", "Tesco Ireland", "Intel Ireland", "HSE",
+    "Bank of Ireland", "Dunnes Stores", "Accenture Ireland", "Glanbia plc",
+)
+BANK_CODES = ("AIBK", "BOFI", "IPBS", "ULSB", "PTSB")
+NATIONALITIES = ("Irish", "Irish", "Irish", "Polish", "Brazilian", "Indian", "Chinese", "Ukrainian", "Romanian")
+SPENDING = ("POS TESCO", "POS DUNNES", "DD ELECTRIC IRELAND", "DD VIRGIN MEDIA", "ATM WITHDRAWAL", "CARD AMAZON", "POS CIRCLE K")
+STATEMENT_DAYS = 182
+
+
+def iban(bank_code: str, sort_code: int, account: int) -> str:
+    """A valid Irish IBAN for the given bank, sort code and account number."""
+    bban = f"{bank_code}{sort_code:06d}{account:08d}"
+    numeric = "".join(str(int(ch, 36)) for ch in bban + "IE00")
+    return f"IE{98 - int(numeric) % 97:02d}{bban}"
+
+
+def ppsn(number: int) -> str:
+    """A PPSN with the correct check character for a seven-digit number."""
+    digits = f"{number:07d}"
+    return digits + ppsn_check_character(digits + "A")
+
+
+class DocumentGenerator:
+    """Deterministic generator of realistic applications.
+
+    ``fraud_rate`` is the share of documents with one tampered field;
+    ``link_rate`` is the share of customers who reuse another customer's PPSN
+    or bank account.
+    """
+
+    def __init__(self, seed: int = 42, fraud_rate: float = 0.05, link_rate: float = 0.01, statement_lines: int = 0):
+        self.random = random.Random(seed)
+        self.fraud_rate = fraud_rate
+        self.link_rate = link_rate
+        self.statement_lines = statement_lines
+        self.today = date.today()
+        self._ids = uuid.UUID(int=self.random.getrandbits(128))
+        self._counter = 0
+        self._customers = 0
+        self._offset = self.random.randrange(9_000_000)
+        self._ppsns: List[str] = []
+        self._accounts: List[str] = []
+        # (field the tampering needs, tampering)
+        self._tampers: List[Tuple[str, Callable[[dict], None]]] = [
+            ("gross_pay", self._tamper_net_pay), ("gross_pay", self._tamper_round_salary),
+            ("ppsn_number", self._tamper_ppsn_check), ("account_number", self._tamper_iban),
+            ("expiry_date", self._tamper_expired_irp), ("customer_name", self._tamper_name),
+            ("customer_dob", self._tamper_dob), ("total_income", self._tamper_income),
+            ("total_income", self._tamper_tax_rate), ("closing_balance", self._tamper_negative_balance),
+            ("transactions", self._tamper_line_amount), ("transactions", self._tamper_lodgement_spike),
+            ("transactions", self._tamper_second_salary),
+        ]
+
+    def _id(self) -> str:
+        self._counter += 1
+        return f"{self._ids.hex[:12]}-{self._counter:09d}"
+
+    def _day(self, days_ago_low: int, days_ago_high: int) -> str:
+        return (self.today - timedelta(days=self.random.randint(days_ago_low, days_ago_high))).isoformat()
+
+    def _shared_or_new(self, pool: List[str], make: Callable[[], str]) -> str:
+        if pool and self.random.random() < self.link_rate:
+            return self.random.choice(pool)
+        value = make()
+        pool.append(value)
+        return value
+
+    def application(self) -> List[Document]:
+        """One customer's documents, possibly tampered with."""
+        rnd = self.random
+        name = f"{rnd.choice(FIRST_NAMES)} {rnd.choice(SURNAMES)}"
+        dob = self._day(18 * 365 + 30, 75 * 365)
+        address = f"{rnd.randint(1, 250)} {rnd.choice(STREETS)}, {rnd.choice(TOWNS)}"
+        nationality = rnd.choice(NATIONALITIES)
+        self._customers += 1
+        # Fresh identifiers are a scrambled customer number, so they never collide by chance
+        scrambled = (self._customers * 7_919 + self._offset) % 9_000_000
+        customer_ppsn = self._shared_or_new(self._ppsns, lambda: ppsn(1_000_000 + scrambled))
+        account = self._shared_or_new(
+            self._accounts, lambda: iban(rnd.choice(BANK_CODES), rnd.randint(900_000, 999_999), scrambled),
+        )
+        employer = rnd.choice(EMPLOYERS)
+        # Monthly gross with cents, so honest salaries are never "round"
+        gross = rnd.randint(2200, 9500) + rnd.randint(1, 99) / 100
+        net = round(gross * rnd.uniform(0.62, 0.82), 2)
+        income = round(gross * 12 * rnd.uniform(0.95, 1.05), 2)
+        upload = self.today.isoformat()
+
+        common = dict(customer_name=name, customer_dob=dob, customer_address=address, upload_date=upload)
+        statement = dict(common, type=DocumentType.BANK_STATEMENT, account_number=account,
+                         opening_balance=round(rnd.uniform(200, 15000), 2), closing_balance=round(rnd.uniform(50, 15000), 2),
+                         statement_date=self._day(1, 60))
+        if self.statement_lines:
+            statement["transactions"] = self._transactions(statement, net, employer)
+        records = [
+            statement,
+            dict(common, type=DocumentType.PAYSLIP, employer_name=employer, gross_pay=gross, net_pay=net,
+                 pay_date=self._day(1, 35)),
+            dict(common, type=DocumentType.PPSN, ppsn_number=customer_ppsn, issue_date=self._day(30, 15 * 365)),
+            dict(common, type=DocumentType.TAX_RECORD, ppsn_number=customer_ppsn, employer_name=employer,
+                 tax_year=str(self.today.year - 1), total_income=income,
+                 tax_paid=round(income * rnd.uniform(0.18, 0.35), 2)),
+        ]
+        if nationality != "Irish":
+            records.append(dict(common, type=DocumentType.IRP, nationality=nationality,
+                                irp_number=f"{rnd.choice('ABCDEFGHJK')}{rnd.randint(100_000, 99_999_999):06d}",
+                                expiry_date=(self.today + timedelta(days=rnd.randint(30, 3 * 365))).isoformat()))
+
+        for record in records:
+            if rnd.random() < self.fraud_rate:
+                rnd.choice([tamper for field, tamper in self._tampers if field in record])(record)
+        return [Document(id=self._id(), **record) for record in records]
+
+    def applications(self, documents: int) -> Iterator[List[Document]]:
+        """Applications until at least ``documents`` documents have been produced."""
+        produced = 0
+        while produced < documents:
+            application = self.application()
+            produced += len(application)
+            yield application
+
+    def documents(self, count: int) -> List[Document]:
+        """Exactly ``count`` documents, in application order."""
+        documents: List[Document] = []
+        for application in self.applications(count):
+            documents.extend(application)
+        return documents[:count]
+
+    # --- Statement lines ---
+
+    def _transactions(self, statement: dict, net_pay: float, employer: str) -> Transactions:
+        """Six months of lines ending on the statement date: monthly salary and card spending."""
+        rng = np.random.default_rng(self.random.getrandbits(64))
+        end = np.datetime64(statement["statement_date"], "D")
+        salaries = end - np.arange(0, STATEMENT_DAYS, 30)[::-1] - rng.integers(0, 3)
+        spending = max(self.statement_lines - len(salaries), 1)
+        dates = np.concatenate([salaries, end - rng.integers(0, STATEMENT_DAYS, spending)])
+        # Spending roughly matches pay, so balances stay plausible
+        debits = -np.round(rng.gamma(2.0, net_pay * len(salaries) * 0.95 / spending / 2.0, spending), 2)
+        amounts = np.concatenate([np.full(len(salaries), net_pay), debits])
+        reference = rng.integers(1000, 9999, len(dates))
+        descriptions = [f"SALARY {employer.upper()} {ref}" for ref in reference[:len(salaries)].tolist()]
+        descriptions += [SPENDING[code] for code in rng.integers(0, len(SPENDING), spending).tolist()]
+        order = np.argsort(dates, kind="stable")
+        return self._with_balances(statement, dates[order], amounts[order], [descriptions[i] for i in order.tolist()])
+
+    @staticmethod
+    def _with_balances(statement: dict, dates: np.ndarray, amounts: np.ndarray, descriptions: List[str]) -> Transactions:
+        """Lines with their running balance printed; the closing balance is set to match."""
+        balances = np.round(statement["opening_balance"] + np.cumsum(amounts), 2)
+        statement["closing_balance"] = float(balances[-1])
+        return Transactions(dates=dates, amounts=amounts, balances=balances, descriptions=descriptions)
+
+    def _insert_line(self, record: dict, day: np.datetime64, amount: float, description: str) -> None:
+        lines: Transactions = record["transactions"]
+        position = int(np.searchsorted(lines.dates, day, side="right"))
+        record["transactions"] = self._with_balances(
+            record,
+            np.insert(lines.dates, position, day),
+            np.insert(lines.amounts, position, amount),
+            lines.descriptions[:position] + [description] + lines.descriptions[position:],
+        )
+
+    # --- Tampering: each changes one field of ``record`` in a way some rule should catch ---
+
+    def _tamper_line_amount(self, record: dict) -> None:
+        lines: Transactions = record["transactions"]
+        amounts = lines.amounts.copy()
+        amounts[self.random.randrange(len(amounts))] += round(self.random.uniform(50, 900), 2)
+        record["transactions"] = lines.model_copy(update={"amounts": amounts})
+
+    def _tamper_lodgement_spike(self, record: dict) -> None:
+        lines: Transactions = record["transactions"]
+        day = lines.dates[-1] - np.timedelta64(self.random.randint(0, 20), "D")
+        self._insert_line(record, day, round(self.random.uniform(8000, 30000), 2), "LODGEMENT")
+
+    def _tamper_second_salary(self, record: dict) -> None:
+        lines: Transactions = record["transactions"]
+        salary = next(i for i, text in enumerate(lines.descriptions) if text.startswith("SALARY"))
+        day = lines.dates[salary] + np.timedelta64(self.random.randint(3, 10), "D")
+        self._insert_line(record, day, float(lines.amounts[salary]), lines.descriptions[salary])
+
+
+    def _tamper_net_pay(self, record: dict) -> None:
+        record["net_pay"] = round(record["gross_pay"] * self.random.uniform(1.01, 1.3), 2)
+
+    def _tamper_round_salary(self, record: dict) -> None:
+        record["gross_pay"] = float(round(record["gross_pay"], -3))
+
+    def _tamper_ppsn_check(self, record: dict) -> None:
+        value = record["ppsn_number"]
+        record["ppsn_number"] = value[:7] + ("B" if value[7] == "A" else "A")
+
+    def _tamper_iban(self, record: dict) -> None:
+        value = record["account_number"]
+        record["account_number"] = value[:-1] + str((int(value[-1]) + 1) % 10)
+
+    def _tamper_expired_irp(self, record: dict) -> None:
+        record["expiry_date"] = self._day(1, 400)
+
+    def _tamper_name(self, record: dict) -> None:
+        record["customer_name"] = f"{self.random.choice(FIRST_NAMES)} {self.random.choice(SURNAMES)}"
+
+    def _tamper_dob(self, record: dict) -> None:
+        record["customer_dob"] = self._day(18 * 365 + 30, 75 * 365)
+
+    def _tamper_income(self, record: dict) -> None:
+        record["total_income"] = round(record["total_income"] * self.random.uniform(1.6, 3.0), 2)
+
+    def _tamper_tax_rate(self, record: dict) -> None:
+        record["tax_paid"] = round(record["total_income"] * self.random.uniform(0.6, 0.9), 2)
+
+    def _tamper_negative_balance(self, record: dict) -> None:
+        record["closing_balance"] = -round(self.random.uniform(10, 5000), 2)
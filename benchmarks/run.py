@@ -0,0 +1,321 @@
+"""Benchmark the validation engine and the HTTP API.
+
+    python -m benchmarks.run                      # 1k, 100k and 1M documents
+    python -m benchmarks.run --sizes 1000,100000 --output results.json
+    python -m benchmarks.compare old.json new.json
+
+A full run takes several minutes and about 3 GB of memory at 1M documents,
+most of it in the near-duplicate scenario.
+
+Every scenario runs at every size on documents from ``DocumentGenerator``
+with a fixed seed, and reports throughput, p50/p99 latency of one operation
+(a document, a chunk, an application or a request, see ``unit``) and the
+process's peak RSS so far. Results are written as JSON together with the
+machine and commit they were measured on, so runs can be compared across
+releases and VM sizes. Reports go to ``benchmarks/results/`` unless
+``--output`` is given; progress is printed to stderr.
+
+The result cache is disabled unless ``--cache`` is given: the documents are
+all distinct, and a warm cache would measure lookups rather than rules.
+``--rules`` validates with a rule file (see ``app/services/rule_dsl.py``),
+so compiled file rules can be compared with the built-in ones:
+
+    python -m benchmarks.run --sizes 100000 --output builtin.json
+    python -m benchmarks.run --sizes 100000 --rules rules.example.yaml --output dsl.json
+    python -m benchmarks.compare builtin.json dsl.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.models.document import Document  # noqa: E402
+from benchmarks.generator import DocumentGenerator  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SCENARIOS = (
+    "validate_document", "validate_batch", "validate_columnar", "cross_document", "duplicates", "http_validate_batch",
+    "bank_transactions",
+)
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of the process's resident set size."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(scenario: str, size: int, unit: str, documents: int, elapsed: float, latencies: List[float]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "scenario": scenario,
+        "size": size,
+        "unit": unit,
+        "operations": len(latencies),
+        "documents": documents,
+        "seconds": round(elapsed, 4),
+        "documents_per_second": round(documents / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def timed(operations: Iterable, run: Callable) -> tuple:
+    """Call ``run`` on every operation; return total seconds and per-call latencies."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for operation in operations:
+        call_started = time.perf_counter()
+        run(operation)
+        latencies.append(time.perf_counter() - call_started)
+    return time.perf_counter() - started, latencies
+
+
+def chunked(documents: List[Document], size: int) -> List[List[Document]]:
+    return [documents[i:i + size] for i in range(0, len(documents), size)]
+
+
+# --- Scenarios: each takes the documents (grouped by application) and returns a result row ---
+
+def bench_validate_document(applications: List[List[Document]], size: int, args) -> dict:
+    from app.services.validation_engine import validate_document
+    documents = [document for application in applications for document in application]
+    elapsed, latencies = timed(documents, validate_document)
+    return summarize("validate_document", size, "document", len(documents), elapsed, latencies)
+
+
+def bench_validate_batch(applications: List[List[Document]], size: int, args) -> dict:
+    from app.services.validation_engine import validate_batch
+    documents = [document for application in applications for document in application]
+    elapsed, latencies = timed(chunked(documents, args.chunk_size), validate_batch)
+    return summarize("validate_batch", size, f"chunk of {args.chunk_size}", len(documents), elapsed, latencies)
+
+
+def bench_validate_columnar(applications: List[List[Document]], size: int, args) -> dict:
+    from app.services.document_batch import DocumentBatch
+    from app.services.validation_engine import validate_document_batch
+
+    def run(chunk: List[Document]) -> None:
+        for _ in validate_document_batch(DocumentBatch.from_documents(chunk)):
+            pass
+
+    documents = [document for application in applications for document in application]
+    elapsed, latencies = timed(chunked(documents, args.chunk_size), run)
+    return summarize("validate_columnar", size, f"chunk of {args.chunk_size}", len(documents), elapsed, latencies)
+
+
+def bench_cross_document(applications: List[List[Document]], size: int, args) -> dict:
+    """Cross-document rules per application, against a history that grows as applications arrive."""
+    from app.services.cross_document import cross_validate
+    from app.services.document_index import DocumentIndex
+    history = DocumentIndex()
+
+    def run(application: List[Document]) -> None:
+        cross_validate(application, history)
+        for document in application:
+            history.add(document)
+
+    elapsed, latencies = timed(applications, run)
+    documents = sum(len(application) for application in applications)
+    return summarize("cross_document", size, "application", documents, elapsed, latencies)
+
+
+def bench_duplicates(applications: List[List[Document]], size: int, args) -> dict:
+    """Near-duplicate lookup of each document against everything indexed before it."""
+    from app.services.fingerprint import DuplicateIndex
+    index = DuplicateIndex()
+
+    def run(document: Document) -> None:
+        index.issues_for(document)
+        index.add(document)
+
+    documents = [document for application in applications for document in application]
+    elapsed, latencies = timed(documents, run)
+    return summarize("duplicates", size, "document", len(documents), elapsed, latencies)
+
+
+def bench_http_validate_batch(applications: List[List[Document]], size: int, args) -> dict:
+    """POST /api/validate/batch through the ASGI app in-process, ``--concurrency`` requests at a time."""
+    import httpx
+    from app import app
+
+    documents = [document for application in applications for document in application][:args.http_max_documents]
+    bodies = [
+        json.dumps([document.model_dump(mode="json") for document in chunk]).encode()
+        for chunk in chunked(documents, args.http_batch_size)
+    ]
+
+    async def main() -> tuple:
+        latencies: List[float] = []
+        pending = iter(bodies)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            async def worker() -> None:
+                for body in pending:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/api/validate/batch", content=body, headers={"content-type": "application/json"}
+                    )
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            return time.perf_counter() - started, latencies
+
+    elapsed, latencies = asyncio.run(main())
+    return summarize(
+        "http_validate_batch", size, f"request of {args.http_batch_size}", len(documents), elapsed, latencies
+    )
+
+
+def bench_bank_transactions(applications: List[List[Document]], size: int, args) -> dict:
+    """Bank statements with ``--statement-lines`` lines each, up to ``--max-statements`` per size."""
+    from app.models.document import DocumentType
+    from app.services.validation_engine import validate_document
+    generator = DocumentGenerator(
+        seed=args.seed, fraud_rate=args.fraud_rate, link_rate=args.link_rate, statement_lines=args.statement_lines,
+    )
+    statements: List[Document] = []
+    for application in generator.applications(size):
+        statements.extend(document for document in application if document.type == DocumentType.BANK_STATEMENT)
+        if len(statements) >= args.max_statements:
+            break
+    elapsed, latencies = timed(statements, validate_document)
+    return summarize(
+        "bank_transactions", size, f"statement of {args.statement_lines} lines", len(statements), elapsed, latencies
+    )
+
+
+BENCHMARKS: Dict[str, Callable[[List[List[Document]], int, argparse.Namespace], dict]] = {
+    "validate_document": bench_validate_document,
+    "validate_batch": bench_validate_batch,
+    "validate_columnar": bench_validate_columnar,
+    "cross_document": bench_cross_document,
+    "duplicates": bench_duplicates,
+    "http_validate_batch": bench_http_validate_batch,
+    "bank_transactions": bench_bank_transactions,
+}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "app_version": settings.APP_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated document counts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fraud-rate", type=float, default=0.05, help="share of tampered documents")
+    parser.add_argument("--link-rate", type=float, default=0.01, help="share of customers reusing an identifier")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="documents per batch call")
+    parser.add_argument("--http-batch-size", type=int, default=100, help="documents per HTTP request")
+    parser.add_argument("--http-max-documents", type=int, default=100_000,
+                        help="cap on documents sent over HTTP at each size")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent HTTP requests")
+    parser.add_argument("--statement-lines", type=int, default=1000, help="transaction lines per bank statement")
+    parser.add_argument("--max-statements", type=int, default=2000,
+                        help="cap on bank statements with transactions at each size")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache enabled")
+    parser.add_argument("--rules", help="rule file to validate with (sets RULES_PATH)")
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--verbose", action="store_true", help="keep the application's INFO logging")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    settings.RESULT_CACHE_ENABLED = args.cache
+    settings.RULES_PATH = args.rules
+    if not args.verbose:
+        # Per-batch INFO lines would otherwise be part of what is measured
+        logging.getLogger("app").setLevel(logging.WARNING)
+    from app.services.validation_engine import get_rule_set_info, reload_rules, warm_up
+    if args.rules:
+        reload_rules(force=True)
+        if get_rule_set_info()["error"]:
+            raise SystemExit(get_rule_set_info()["error"])
+    warm_up()
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            "seed": args.seed, "fraud_rate": args.fraud_rate, "link_rate": args.link_rate,
+            "chunk_size": args.chunk_size, "http_batch_size": args.http_batch_size,
+            "concurrency": args.concurrency, "cache": args.cache,
+            "statement_lines": args.statement_lines, "rules": args.rules,
+        },
+        "results": [],
+    }
+    for size in sizes:
+        started = time.perf_counter()
+        generator = DocumentGenerator(seed=args.seed, fraud_rate=args.fraud_rate, link_rate=args.link_rate)
+        applications = list(generator.applications(size))
+        print(f"Generated {size:,} documents in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        for name in scenarios:
+            result = BENCHMARKS[name](applications, size, args)
+            report["results"].append(result)
+            print(
+                f"  {name:<20} {result['documents_per_second'] or 0:>12,.0f} docs/s  "
+                f"p50 {result['p50_ms']:>9.3f}ms  p99 {result['p99_ms']:>9.3f}ms  "
+                f"per {result['unit']:<18} peak RSS {result['peak_rss_mb']:,.0f} MB",
+                file=sys.stderr,
+            )
+        del applications
+
+    output = args.output
+    if not output:
+        stamp = report["environment"]["timestamp"].replace(":", "")
+        output = os.path.join(RESULTS_DIR, f"{report['environment']['commit'] or 'unknown'}-{stamp}.json")
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+    print(f"Wrote {output}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Gunicorn settings for serving the API with several worker processes.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Each worker is a uvicorn worker running the FastAPI app. Workers share
+documents, results and validation jobs through the document store, and
+memory-map the same index snapshot, which is rebuilt once here before the
+workers start.
+"""
+import os
+import subprocess
+import sys
+
+from app.core.config import settings
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+# Workers import the app themselves, so none inherits the master's threads or connections
+preload_app = False
+forwarded_allow_ips = "*"
+graceful_timeout = 30
+timeout = 120
+
+
+def on_starting(server) -> None:
+    """Snapshot the history indexes before any worker loads them."""
+    if not settings.INDEX_SNAPSHOT_DIR:
+        return
+    # In a child process, so the master stays small
+    result = subprocess.run([sys.executable, "-m", "app.services.shared_indexes"], check=False)
+    if result.returncode:
+        server.log.warning("Index snapshot failed; workers will index the document store themselves")
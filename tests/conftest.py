@@ -0,0 +1,33 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read when the app is first imported: keep the tests away from data/ and logs/
+_data_dir = tempfile.mkdtemp(prefix="hst-tests-")
+os.environ["STORAGE_URL"] = f"sqlite:///{os.path.join(_data_dir, 'documents.db')}"
+os.environ["LOG_FILE"] = ""
+os.environ.pop("RULES_PATH", None)
+os.environ.pop("RESULT_CACHE_DISK_PATH", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.services.validation_engine import reload_rules  # noqa: E402
+
+
+@pytest.fixture
+def rule_file(tmp_path, monkeypatch):
+    """Write rule files to a configured RULES_PATH; the built-in rules are restored afterwards."""
+    path = tmp_path / "rules.json"
+
+    def write(content) -> str:
+        path.write_text(content if isinstance(content, str) else json.dumps(content))
+        return str(path)
+
+    monkeypatch.setattr(settings, "RULES_PATH", str(path))
+    yield write
+    monkeypatch.setattr(settings, "RULES_PATH", None)
+    reload_rules(force=True)
@@ -0,0 +1,37 @@
+import pytest
+
+from app.models.document import Document, DocumentType, PageLayout
+from app.services.document_batch import DocumentBatch
+
+pytest.importorskip("pyarrow")
+
+
+def _payslip(document_id: str, layout=None) -> Document:
+    return Document(
+        id=document_id,
+        type=DocumentType.PAYSLIP,
+        customer_name="Ciara Byrne",
+        upload_date="2024-03-01",
+        employer_name="Acme Ltd",
+        gross_pay=4200.0,
+        net_pay=3100.0,
+        layout=layout,
+    )
+
+
+def test_parquet_round_trip_keeps_layouts(tmp_path):
+    documents = [
+        _payslip("doc-1", PageLayout(hash="0123456789abcdef")),
+        _payslip("doc-2", PageLayout(hash="fedcba9876543210", regions={"logo": "00000000000000ff"})),
+        _payslip("doc-3", PageLayout(hash="1111111111111111", regions={"seal": "2222222222222222"})),
+        _payslip("doc-4"),
+    ]
+    batch = DocumentBatch.from_documents(documents)
+    assert batch.nbytes > 0
+
+    path = str(tmp_path / "documents.parquet")
+    batch.to_parquet(path)
+
+    assert [document.layout for document in DocumentBatch.from_parquet(path).to_documents()] == [
+        document.layout for document in documents
+    ]
@@ -0,0 +1,77 @@
+from app.models.document import DocumentType
+from app.services.incremental import IncrementalValidator
+from app.services.validation_engine import reload_rules, validate_application
+from benchmarks.generator import DocumentGenerator
+
+
+def _outcomes(results):
+    return {result.document_id: [issue.model_dump() for issue in result.issues] for result in results}
+
+
+def _application(seed: int):
+    generator = DocumentGenerator(seed=seed, fraud_rate=0.3, link_rate=0.3)
+    return [document for _ in range(8) for document in generator.application()]
+
+
+def _assert_matches_full_validation(validator, documents, outcome=None):
+    expected = _outcomes(validate_application(documents, triage=False))
+    assert _outcomes(validator.results()) == expected
+    if outcome is not None:
+        # Every result that differs from the previous sync is reported
+        for doc_id, issues in _outcomes(outcome.results).items():
+            assert issues == expected[doc_id]
+
+
+def test_sync_matches_full_validation_after_edits_and_removals():
+    documents = _application(seed=3)
+    validator = IncrementalValidator()
+    first = validator.sync(documents)
+    assert first.full
+    _assert_matches_full_validation(validator, documents, first)
+
+    payslip = next(document for document in documents if document.type == DocumentType.PAYSLIP)
+    statement = next(document for document in documents if document.type == DocumentType.BANK_STATEMENT)
+    edited = [
+        payslip.model_copy(update={"net_pay": payslip.gross_pay + 500.0}) if document.id == payslip.id
+        else statement.model_copy(update={"closing_balance": -250.0}) if document.id == statement.id
+        else document
+        for document in documents
+    ]
+    removed = edited[3]
+    edited.remove(removed)
+    edited.append(_application(seed=4)[0])
+
+    outcome = validator.sync(edited)
+    assert not outcome.full
+    assert outcome.removed == [removed.id]
+    assert outcome.documents_checked == 3
+    _assert_matches_full_validation(validator, edited, outcome)
+
+    # Nothing changed: nothing is re-checked
+    assert validator.sync(edited).documents_checked == 0
+
+
+def test_sync_matches_full_validation_after_a_rule_reload(rule_file):
+    documents = _application(seed=5)
+    validator = IncrementalValidator()
+    validator.sync(documents)
+
+    rule_file({
+        "version": 1,
+        "disable": ["PAY-004"],
+        "rules": [{
+            "id": "BANK-005",
+            "category": "Behavioral & Contextual",
+            "description": "Closing balance should stay above a small buffer",
+            "severity": "MEDIUM",
+            "recommendation": "Review the account for sustained overdraft usage",
+            "types": ["Bank Statement"],
+            "fail": "closing_balance < 5000",
+            "message": "Closing balance is low ({closing_balance})",
+        }],
+    })
+    reload_rules(force=True)
+    outcome = validator.sync(documents)
+    assert not outcome.full
+    assert outcome.results
+    _assert_matches_full_validation(validator, documents, outcome)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.ingestion import DocumentIngestor, IngestFormatError, ingest_stream, iter_lines
+from app.services.job_queue import ValidationJobQueue
+from app.services.storage import create_store
+from benchmarks.generator import DocumentGenerator
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = create_store(f"sqlite:///{tmp_path / 'documents.db'}")
+    yield store
+    store.close()
+
+
+def _record(document) -> dict:
+    return document.model_dump(mode="json", exclude_none=True)
+
+
+def test_ndjson_report_lists_rejected_lines(store):
+    documents = DocumentGenerator(seed=1).application()
+    lines = [json.dumps(_record(document)).encode() for document in documents]
+    lines[1:1] = [b"{not json", b"", b"[1, 2]", json.dumps({"type": "Passport", "customer_name": "X"}).encode()]
+
+    report = DocumentIngestor("ndjson", "app-1", store=store, validate=False).ingest(lines)
+
+    assert report.accepted == len(documents)
+    assert report.rejected == 3
+    assert [error.line for error in report.errors] == [2, 4, 5]
+    assert report.errors[0].error.startswith("Invalid JSON")
+    assert report.errors[1].error == "Record is not a JSON object"
+    assert "type" in report.errors[2].error
+    assert store.count_documents(application_id="app-1") == len(documents)
+
+
+def test_csv_report_lists_column_count_mismatches(store):
+    lines = [
+        b"type,customer_name,employer_name,gross_pay,net_pay",
+        b"Payslip,Ciara Byrne,Acme Ltd,4200.10,3100.20",
+        b"Payslip,Ciara Byrne,Acme Ltd,4200.10",
+        b"Payslip,Ciara Byrne,Acme Ltd,4200.10,3100.20,extra",
+        b"Payslip,Aoife Kelly,,3900.55,2800.45",
+    ]
+    report = DocumentIngestor("csv", store=store, validate=False).ingest(lines)
+
+    assert report.accepted == 2
+    assert [(error.line, error.error) for error in report.errors] == [
+        (3, "Expected 5 columns, found 4"),
+        (4, "Expected 5 columns, found 6"),
+    ]
+    employers = {document.customer_name: document.employer_name for document in store.list_documents()}
+    assert employers == {"Ciara Byrne": "Acme Ltd", "Aoife Kelly": None}
+
+
+def test_report_stops_listing_errors_at_the_limit(store):
+    report = DocumentIngestor("ndjson", store=store, validate=False, max_reported_errors=2).ingest([b"x"] * 5)
+    assert report.rejected == 5
+    assert len(report.errors) == 2
+    assert report.errors_truncated
+
+
+def test_unknown_format_and_empty_csv_are_refused(store):
+    with pytest.raises(IngestFormatError):
+        DocumentIngestor("xml", store=store, validate=False)
+    with pytest.raises(IngestFormatError):
+        DocumentIngestor("csv", store=store, validate=False).ingest([])
+
+
+def test_streamed_feed_is_stored_and_validated_in_chunks(store):
+    documents = [document for application in DocumentGenerator(seed=2).applications(230) for document in application]
+    body = b"".join(json.dumps(_record(document)).encode() + b"\n" for document in documents)
+
+    async def chunks():
+        # Split lines across network chunks
+        for start in range(0, len(body), 1000):
+            yield body[start:start + 1000]
+
+    job_queue = ValidationJobQueue(executor="thread", max_workers=2, store=store, shared=False, store_results=True)
+    try:
+        ingestor = DocumentIngestor("ndjson", "feed-1", store=store, job_queue=job_queue, chunk_size=50,
+                                    max_pending_jobs=1)
+        report = asyncio.run(ingest_stream(chunks(), ingestor))
+        for job_id in report.job_ids:
+            job_queue.wait(job_id)
+    finally:
+        job_queue.shutdown()
+
+    assert report.accepted == len(documents)
+    assert report.rejected == 0
+    assert len(report.job_ids) == -(-len(documents) // 50)
+    assert store.count_documents(application_id="feed-1") == len(documents)
+    assert store.count_results(application_id="feed-1") == len(documents)
+
+
+def test_long_lines_are_refused():
+    with pytest.raises(IngestFormatError):
+        list(iter_lines([b"a" * 20], max_line_bytes=10))
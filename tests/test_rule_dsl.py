@@ -0,0 +1,69 @@
+import pytest
+
+from app.models.document import Document, DocumentType
+from app.services.rule_dsl import RuleSpecError, compile_rule, load_rule_file
+
+
+def _spec(fail: str, message: str = "Net pay {net_pay} exceeds gross pay {gross_pay}") -> dict:
+    return {
+        "id": "TEST-001",
+        "category": "Content Consistency",
+        "description": "Net pay must not exceed gross pay",
+        "severity": "HIGH",
+        "recommendation": "Verify with the employer",
+        "types": ["Payslip"],
+        "fail": fail,
+        "message": message,
+    }
+
+
+def _payslip(gross_pay: float, net_pay: float) -> Document:
+    return Document(
+        id="doc-1",
+        type=DocumentType.PAYSLIP,
+        customer_name="Ciara Byrne",
+        upload_date="2024-03-01",
+        employer_name="Acme Ltd",
+        gross_pay=gross_pay,
+        net_pay=net_pay,
+    )
+
+
+def test_compiled_rule_checks_documents():
+    rule = compile_rule(_spec("net_pay > gross_pay * ratio"), {"ratio": 1.0})
+    assert rule.fields == ("gross_pay", "net_pay")
+    assert rule.check(_payslip(3000.5, 2500.25)) is None
+    assert rule.check(_payslip(3000.5, 3100.25)) == "Net pay 3100.25 exceeds gross pay 3000.5"
+    assert rule.vector_check is not None
+
+
+@pytest.mark.parametrize("fail", [
+    "__import__('os').system('true')",
+    "net_pay.__class__",
+    "(lambda: True)()",
+    "[x for x in (1, 2)]",
+    "{'a': 1}['a'] == 1",
+    "(x := net_pay) > 0",
+    "open('/etc/passwd')",
+    "round(net_pay, ndigits=2) > 0",
+    "secret > 0",
+    "net_pay >",
+])
+def test_expressions_outside_the_rule_language_are_rejected(fail):
+    with pytest.raises(RuleSpecError, match="TEST-001"):
+        compile_rule(_spec(fail))
+
+
+def test_messages_are_checked_like_expressions():
+    with pytest.raises(RuleSpecError, match="not allowed"):
+        compile_rule(_spec("net_pay > gross_pay", "{net_pay.__class__}"))
+
+
+def test_rule_file_errors_compile_nothing(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"rules": [{"id": "TEST-002"}], "extra": 1}')
+    with pytest.raises(RuleSpecError, match="unknown keys extra"):
+        load_rule_file(str(path))
+    path.write_text('{"constants": {"net_pay": 1}}')
+    with pytest.raises(RuleSpecError, match="shadow"):
+        load_rule_file(str(path))
@@ -0,0 +1,117 @@
+import pytest
+
+from app.core.config import settings
+from app.models.document import Document, DocumentType
+from app.services import validation_engine
+from app.services.validation_engine import (
+    current_rules,
+    reload_rules,
+    validate_batch,
+    validate_document,
+    validate_document_batch,
+)
+from benchmarks.generator import DocumentGenerator
+
+
+def _corpus(applications: int = 60, seed: int = 7):
+    generator = DocumentGenerator(seed=seed, fraud_rate=0.3)
+    return [document for _ in range(applications) for document in generator.application()]
+
+
+def _outcome(result):
+    return (
+        result.document_id,
+        result.document_type,
+        result.is_valid,
+        [issue.model_dump() for issue in result.issues],
+        result.skipped_checks,
+    )
+
+
+def _payslip(document_id: str, gross_pay: float, net_pay: float) -> Document:
+    return Document(
+        id=document_id,
+        type=DocumentType.PAYSLIP,
+        customer_name="Ciara Byrne",
+        upload_date="2024-03-01",
+        employer_name="Acme Ltd",
+        gross_pay=gross_pay,
+        net_pay=net_pay,
+    )
+
+
+def _net_above_gross(severity: str, version: int) -> dict:
+    return {
+        "version": version,
+        "rules": [{
+            "id": "PAY-002",
+            "category": "Content Consistency",
+            "description": "Net pay must not exceed gross pay",
+            "severity": severity,
+            "recommendation": "Verify with the employer",
+            "types": ["Payslip"],
+            "fail": "net_pay > gross_pay",
+            "message": "Net pay {net_pay} exceeds gross pay {gross_pay}",
+        }],
+    }
+
+
+def test_batch_and_columnar_results_match_single_validation():
+    pytest.importorskip("pyarrow")
+    from app.services.document_batch import DocumentBatch
+
+    documents = _corpus()
+    expected = [_outcome(validate_document(document, triage=False)) for document in documents]
+    assert any(issues for _, _, _, issues, _ in expected)
+
+    assert [_outcome(result) for result in validate_batch(documents, triage=False)] == expected
+    columnar = validate_document_batch(DocumentBatch.from_documents(documents), chunk_size=97, triage=False)
+    assert [_outcome(result) for result in columnar] == expected
+
+
+def test_triage_only_skips_rules_once_the_threshold_is_reached():
+    documents = _corpus(seed=11)
+    stop_at = settings.TRIAGE_RISK_THRESHOLD
+    for document in documents:
+        full = validate_document(document, triage=False)
+        fast = validate_document(document, triage=True)
+        assert not full.skipped_checks
+        if fast.skipped_checks:
+            assert fast.risk_score >= stop_at
+            assert all(issue in full.issues for issue in fast.issues)
+        else:
+            assert fast.issues == full.issues
+
+
+def test_cached_results_are_not_served_after_a_rule_reload(rule_file):
+    document = _payslip("doc-1", gross_pay=3012.34, net_pay=3498.71)
+    rule_file(_net_above_gross("HIGH", 1))
+    reload_rules(force=True)
+    assert [issue.severity for issue in validate_document(document, triage=False).issues] == ["HIGH"]
+    # Served from the cache under the same rule set version
+    assert [issue.severity for issue in validate_document(document, triage=False).issues] == ["HIGH"]
+
+    rule_file(_net_above_gross("LOW", 2))
+    reload_rules(force=True)
+    result = validate_document(document, triage=False)
+    assert [issue.severity for issue in result.issues] == ["LOW"]
+    assert result.is_valid
+    assert [issue.severity for issue in validate_batch([document], triage=False)[0].issues] == ["LOW"]
+
+
+def test_a_broken_rule_file_keeps_the_active_rules(rule_file):
+    rule_file(_net_above_gross("LOW", 1))
+    active = reload_rules(force=True)
+    assert active.rule_file is not None
+
+    rule_file("{not json")
+    assert reload_rules(force=True) is active
+    assert validation_engine._reload_error is not None
+
+    broken = _net_above_gross("LOW", 2)
+    broken["rules"][0]["fail"] = "__import__('os').system('true')"
+    rule_file(broken)
+    assert reload_rules(force=True) is active
+    assert current_rules() is active
+    document = _payslip("doc-2", gross_pay=3012.34, net_pay=3498.71)
+    assert [issue.severity for issue in validate_document(document, triage=False).issues] == ["LOW"]